@@ -0,0 +1,87 @@
+import gzip
+import json
+import logging
+import os
+import zlib
+from typing import Any, Dict, Iterator, List
+from models import Tarefa
+import busca_paralela
+
+logger = logging.getLogger(__name__)
+
+# Sufixo do arquivo morto, que fica ao lado do arquivo de dados
+# (ex: "dados_tarefas.json" -> "dados_tarefas_arquivadas.jsonl.gz")
+SUFIXO_ARQUIVO_MORTO = "_arquivadas.jsonl.gz"
+
+
+def caminho_para(caminho_dados: str) -> str:
+    """Retorna o caminho do arquivo morto correspondente a um arquivo de dados."""
+
+    return os.path.splitext(caminho_dados)[0] + SUFIXO_ARQUIVO_MORTO
+
+
+def arquivar(tarefas: List[Tarefa], caminho: str):
+    """
+    Acrescenta tarefas ao final do arquivo morto, sem reescrever o que já está lá.
+
+    O arquivo guarda uma tarefa por linha, em JSON, compactado com gzip. Cada chamada
+    acrescenta um novo trecho compactado ao fim do arquivo, e o gzip lê todos os
+    trechos em sequência como se fossem um só.
+
+    Raises:
+        OSError: Se não for possível gravar no arquivo.
+    """
+
+    with gzip.open(caminho, 'at', encoding='utf-8') as f:
+        for tarefa in tarefas:
+            f.write(json.dumps(tarefa.to_dict(), ensure_ascii=False) + "\n")
+
+
+def _ler_registros(caminho: str) -> Iterator[Dict[str, Any]]:
+    """Lê os registros do arquivo morto um por um, sem carregá-lo inteiro na memória."""
+
+    if not os.path.exists(caminho):
+        return
+
+    try:
+        with gzip.open(caminho, 'rt', encoding='utf-8') as f:
+            for linha in f:
+                yield json.loads(linha)
+    except (EOFError, zlib.error, gzip.BadGzipFile, json.JSONDecodeError) as erro:
+        # Um arquivamento interrompido pode deixar o último trecho incompleto;
+        # os registros anteriores continuam válidos.
+        logger.warning("O arquivo morto '%s' termina com dados incompletos: %s", caminho, erro)
+
+
+def ler_arquivadas(caminho: str) -> List[Tarefa]:
+    """
+    Retorna todas as tarefas do arquivo morto, em ordem de ID.
+
+    Se a mesma tarefa foi arquivada mais de uma vez, vale o registro mais recente.
+    """
+
+    registros = {registro["id"]: registro for registro in _ler_registros(caminho)}
+    return Tarefa.from_dicts(registros[tarefa_id] for tarefa_id in sorted(registros))
+
+
+def buscar(termo: str, caminho: str, regex: bool = False) -> List[Tarefa]:
+    """
+    Busca no arquivo morto as tarefas que contenham o termo no título, nas notas ou nas tags.
+
+    Lê o arquivo do começo ao fim, então só deve ser usada sob demanda. A comparação é
+    a mesma da busca das tarefas ativas (inclusive com `regex=True`), e só são criados
+    os objetos Tarefa dos registros encontrados.
+
+    Raises:
+        ValueError: Se `regex` for True e o termo não for uma expressão regular válida.
+    """
+
+    criterio = busca_paralela.criar_criterio(termo, regex)
+    encontrados: Dict[int, Dict[str, Any]] = {}
+    for registro in _ler_registros(caminho):
+        if busca_paralela.corresponde(registro["titulo"], registro.get("notas") or "", registro.get("tags") or [], criterio):
+            encontrados[registro["id"]] = registro
+        else:
+            # Um registro mais recente da mesma tarefa substitui o anterior
+            encontrados.pop(registro["id"], None)
+    return Tarefa.from_dicts(encontrados[tarefa_id] for tarefa_id in sorted(encontrados))
@@ -0,0 +1,288 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from typing import Any, Callable, Dict, List
+import busca_paralela
+import consultas
+import gerador_dados
+import persistence
+import visoes
+from consultas import filtrar_tarefas, ordenar_tarefas, tarefas_da_lista
+from manager import TaskManager
+
+# Ações de cada rajada na medição da vazão do salvamento a cada ação e da gravação em grupo
+ACOES_RAJADA = 10
+
+
+def _silencioso():
+    """Descarta as mensagens impressas pela persistência durante as medições."""
+
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def medir(funcao: Callable[[], Any], repeticoes: int, medir_memoria: bool = True) -> Dict[str, Any]:
+    """
+    Mede o tempo de execução de uma função e, opcionalmente, o seu pico de memória.
+
+    O tempo é medido sem o tracemalloc, que deixa a execução bem mais lenta; o pico de
+    memória é obtido em uma execução extra, separada das medições de tempo.
+    """
+
+    tempos = []
+    with _silencioso():
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append(time.perf_counter() - inicio)
+
+        resultado = {
+            "repeticoes": repeticoes,
+            "segundos_min": min(tempos),
+            "segundos_mediana": statistics.median(tempos),
+            "segundos_max": max(tempos)
+        }
+
+        if medir_memoria:
+            tracemalloc.start()
+            funcao()
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            resultado["pico_memoria_bytes"] = pico
+
+    return resultado
+
+
+def executar_suite(num_tarefas: int, repeticoes: int, diretorio: str, medir_memoria: bool = True) -> List[Dict[str, Any]]:
+    """Gera um conjunto de dados com `num_tarefas` tarefas e mede todos os caminhos principais sobre ele."""
+
+    resultados = []
+
+    def registrar(nome: str, funcao: Callable[[], Any]):
+        resultado = {"operacao": nome, "num_tarefas": num_tarefas}
+        resultado.update(medir(funcao, repeticoes, medir_memoria))
+        resultados.append(resultado)
+        print(f"  {nome:<40} {resultado['segundos_mediana'] * 1000:>10.2f} ms", file=sys.stderr)
+
+    print(f"Gerando {num_tarefas} tarefas...", file=sys.stderr)
+    listas, tarefas = gerador_dados.gerar_dados(num_tarefas)
+    persistence.DATA_FILE = os.path.join(diretorio, f"benchmark_{num_tarefas}.json")
+    with _silencioso():
+        persistence.salvar_dados(listas, tarefas)
+    arquivo_bytes = os.path.getsize(persistence.DATA_FILE)
+    print(f"Arquivo de {arquivo_bytes / 1e6:.1f} MB", file=sys.stderr)
+
+    # Persistência
+    registrar("carregar_dados", persistence.carregar_dados)
+    resultados[-1]["tarefas_por_segundo"] = num_tarefas / resultados[-1]["segundos_mediana"]
+    print(f"    {resultados[-1]['tarefas_por_segundo']:,.0f} tarefas/s", file=sys.stderr)
+    registrar("salvar_dados", lambda: persistence.salvar_dados(listas, tarefas))
+
+    # Snapshots compactados: a taxa é em relação ao arquivo JSON, e a vazão é medida em
+    # MB do arquivo JSON equivalente por segundo
+    for extensao, codec in persistence.EXTENSOES_SNAPSHOT.items():
+        if codec not in persistence.codecs_disponiveis():
+            continue
+        caminho_snapshot = persistence.DATA_FILE + extensao
+        registrar(f"salvar_dados[{codec}]",
+                  lambda caminho=caminho_snapshot: persistence.salvar_dados(listas, tarefas, caminho=caminho))
+        taxa = arquivo_bytes / os.path.getsize(caminho_snapshot)
+        resultados[-1]["taxa_compressao"] = taxa
+        resultados[-1]["mb_por_segundo"] = arquivo_bytes / 1e6 / resultados[-1]["segundos_mediana"]
+        registrar(f"carregar_dados[{codec}]", lambda caminho=caminho_snapshot: persistence.carregar_dados(caminho))
+        resultados[-1]["taxa_compressao"] = taxa
+        resultados[-1]["mb_por_segundo"] = arquivo_bytes / 1e6 / resultados[-1]["segundos_mediana"]
+        resultados[-1]["tarefas_por_segundo"] = num_tarefas / resultados[-1]["segundos_mediana"]
+        print(f"    {codec}: {os.path.getsize(caminho_snapshot) / 1e6:.1f} MB, taxa {taxa:.1f}x, "
+              f"salvar {resultados[-2]['mb_por_segundo']:.1f} MB/s, carregar {resultados[-1]['mb_por_segundo']:.1f} MB/s "
+              f"({resultados[-1]['tarefas_por_segundo']:,.0f} tarefas/s)", file=sys.stderr)
+
+    # Durabilidade: o salvamento sem fsync (ainda atômico) e a vazão de uma rajada de ações
+    # salvando e esperando o disco a cada ação, ou com a gravação em grupo
+    registrar("salvar_dados[sem fsync]", lambda: persistence.salvar_dados(listas, tarefas, duravel=False))
+    for nome, em_grupo in (("a cada acao", False), ("em grupo", True)):
+        caminho_rajada = os.path.join(diretorio, f"rajada_{num_tarefas}.json")
+        shutil.copyfile(persistence.DATA_FILE, caminho_rajada)
+        with _silencioso():
+            gerenciador_rajada = TaskManager(caminho_rajada, gravacao_em_grupo=em_grupo)
+
+        def rajada(gerenciador_rajada=gerenciador_rajada):
+            for numero in range(ACOES_RAJADA):
+                gerenciador_rajada.adicionar_tarefa({"titulo": f"Rajada {numero}", "lista_id": 1})
+            gerenciador_rajada.salvar()
+
+        registrar(f"rajada[{ACOES_RAJADA} acoes, gravacao {nome}]", rajada)
+        resultados[-1]["acoes_por_segundo"] = ACOES_RAJADA / resultados[-1]["segundos_mediana"]
+        print(f"    {resultados[-1]['acoes_por_segundo']:.1f} ações/s", file=sys.stderr)
+
+    with _silencioso():
+        gerenciador = TaskManager()
+    todas = gerenciador.get_todas_tarefas()
+    hoje = date.today()
+
+    # Leitura: busca, ordenação e os filtros de visualização
+    registrar("buscar_tarefas_por_termo[frequente]", lambda: gerenciador.buscar_tarefas_por_termo("relatorio"))
+    registrar("buscar_tarefas_por_termo[inexistente]", lambda: gerenciador.buscar_tarefas_por_termo("termo-inexistente"))
+    registrar("ordenar_tarefas[DATA]", lambda: ordenar_tarefas(todas, "DATA"))
+    registrar("ordenar_tarefas[PRIORIDADE]", lambda: ordenar_tarefas(todas, "PRIORIDADE"))
+    registrar("visualizar[contexto=lista]", lambda: tarefas_da_lista(todas, 1))
+    # Tags ordenadas da mais usada para a menos usada
+    tags = sorted(gerenciador.get_contagem_tags().items(), key=lambda item: -item[1])
+    tag_frequente = tags[0][0] if tags else "inexistente"
+    tag_media = tags[len(tags) // 10][0] if tags else "inexistente"
+    tag_rara = tags[-1][0] if tags else "inexistente"
+    registrar("visualizar[contexto=tag]", lambda: gerenciador.buscar_tarefas_por_tags(tag_frequente))
+    expressao = f"({tag_frequente} OR {tag_media}) NOT {tag_rara}"
+    registrar("buscar_tarefas_por_tags[expressao]", lambda: gerenciador.buscar_tarefas_por_tags(expressao))
+    registrar("contar_tarefas_por_tags[expressao]", lambda: gerenciador.contar_tarefas_por_tags(expressao))
+    registrar("get_contadores_por_lista", gerenciador.get_contadores_por_lista)
+    # A mesma consulta repetida é respondida pelo cache; a primeira execução já o preenche
+    registrar("consultar_tarefas[lista, pendentes, prioridade]",
+              lambda: gerenciador.consultar_tarefas(consultas.CONTEXTO_LISTA, '4', consultas.ORDENACAO_PRIORIDADE, 1))
+    # A visão salva fica ativa até o fim, então as mutações abaixo incluem o custo de mantê-la
+    with _silencioso():
+        gerenciador.salvar_visao(visoes.VisaoSalva("Minha semana", [1], visoes.STATUS_PENDENTES, 7,
+                                                   consultas.ORDENACAO_PRIORIDADE))
+    registrar("abrir_visao", lambda: gerenciador.abrir_visao("Minha semana"))
+
+    # Busca paralela: as mesmas varreduras completas com 1, 2, 4 e 8 processos,
+    # com a aceleração de cada uma em relação a um processo só
+    limite_original, processos_original = busca_paralela.LIMITE_PARALELO, busca_paralela.NUM_PROCESSOS
+    busca_paralela.LIMITE_PARALELO = 0
+    try:
+        for nome, termo, regex in (("termo", "termo-inexistente", False), ("regex", r"relat\w*o\s+final", True)):
+            mediana_serial = None
+            for num_processos in (1, 2, 4, 8):
+                busca_paralela.NUM_PROCESSOS = num_processos
+                registrar(f"buscar_tarefas_por_termo[{nome}, {num_processos} processos]",
+                          lambda termo=termo, regex=regex: gerenciador.buscar_tarefas_por_termo(termo, regex))
+                mediana_serial = mediana_serial or resultados[-1]["segundos_mediana"]
+                resultados[-1]["aceleracao"] = mediana_serial / resultados[-1]["segundos_mediana"]
+    finally:
+        busca_paralela.LIMITE_PARALELO, busca_paralela.NUM_PROCESSOS = limite_original, processos_original
+    for filtro in "12345":
+        registrar(f"visualizar[filtro={filtro}]", lambda filtro=filtro: filtrar_tarefas(todas, filtro, hoje))
+
+    # Mutações: cada execução age sobre uma tarefa diferente, sorteada de forma reprodutível
+    rng = random.Random(num_tarefas)
+    ids = [tarefa.id for tarefa in todas]
+
+    def sorteio(quantidade: int) -> Callable[[], int]:
+        return iter(rng.sample(ids, quantidade)).__next__
+
+    execucoes = repeticoes + (1 if medir_memoria else 0)
+    dados_nova = {"titulo": "Tarefa de benchmark", "lista_id": 1, "data_termino": hoje, "tags": ["benchmark"]}
+    registrar("adicionar_tarefa", lambda: gerenciador.adicionar_tarefa(dados_nova))
+    proximo = sorteio(execucoes)
+    registrar("editar_tarefa", lambda: gerenciador.editar_tarefa(proximo(), {"prioridade": "alta", "tags": ["editada"]}))
+    proximo = sorteio(execucoes)
+    registrar("concluir_tarefa", lambda: gerenciador.concluir_tarefa(proximo()))
+    proximo = sorteio(execucoes)
+    registrar("desmarcar_tarefa", lambda: gerenciador.desmarcar_tarefa(proximo()))
+    proximo = sorteio(execucoes)
+    registrar("remover_tarefa", lambda: gerenciador.remover_tarefa(proximo()))
+    registrar("desfazer", gerenciador.desfazer)
+    registrar("refazer", gerenciador.refazer)
+
+    tamanho_lote = min(100, len(ids) // (4 * execucoes) or 1)
+
+    def lotes() -> Callable[[], List[int]]:
+        amostra = rng.sample(ids, tamanho_lote * execucoes)
+        return iter([amostra[i:i + tamanho_lote] for i in range(0, len(amostra), tamanho_lote)]).__next__
+
+    proximo_lote = lotes()
+    registrar(f"concluir_tarefas[{tamanho_lote}]", lambda: gerenciador.concluir_tarefas(proximo_lote()))
+    proximo_lote = lotes()
+    registrar(f"editar_tarefas[{tamanho_lote}]", lambda: gerenciador.editar_tarefas(proximo_lote(), {"prioridade": "baixa"}))
+    proximo_lote = lotes()
+    registrar(f"mover_tarefas[{tamanho_lote}]", lambda: gerenciador.mover_tarefas(proximo_lote(), 2))
+    proximo_lote = lotes()
+    registrar(f"remover_tarefas[{tamanho_lote}]", lambda: gerenciador.remover_tarefas(proximo_lote()))
+    registrar("avancar_recorrencias_atrasadas", gerenciador.avancar_recorrencias_atrasadas)
+    registrar("arquivar_tarefas_concluidas", lambda: gerenciador.arquivar_tarefas_concluidas(30))
+    registrar("buscar_tarefas_arquivadas", lambda: gerenciador.buscar_tarefas_arquivadas("relatorio"))
+
+    contador_listas = iter(range(execucoes)).__next__
+    registrar("adicionar_lista", lambda: gerenciador.adicionar_lista(f"Benchmark {contador_listas()}"))
+    # Remove as listas menos usadas primeiro, do fim para o começo
+    proxima_lista = iter(range(len(listas), 1, -1)).__next__
+    registrar("remover_lista", lambda: gerenciador.remover_lista(proxima_lista()))
+
+    return resultados
+
+
+def _commit_atual() -> str:
+    """Retorna o hash do commit atual do repositório, se houver um."""
+
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def comparar(anterior: Dict[str, Any], atual: Dict[str, Any]):
+    """Imprime a variação da mediana de cada operação entre dois resultados de benchmark."""
+
+    referencia = {(r["operacao"], r["num_tarefas"]): r for r in anterior["resultados"]}
+    print(f"\n{'operação':<40} {'tarefas':>9} {'antes (ms)':>12} {'depois (ms)':>12} {'variação':>9}")
+    for resultado in atual["resultados"]:
+        base = referencia.get((resultado["operacao"], resultado["num_tarefas"]))
+        if not base:
+            continue
+        antes = base["segundos_mediana"] * 1000
+        depois = resultado["segundos_mediana"] * 1000
+        variacao = (depois / antes - 1) * 100 if antes else 0.0
+        print(f"{resultado['operacao']:<40} {resultado['num_tarefas']:>9} {antes:>12.2f} {depois:>12.2f} {variacao:>+8.1f}%")
+
+
+def main():
+    """Executa a suíte de benchmark pela linha de comando e grava os resultados em JSON."""
+
+    parser = argparse.ArgumentParser(description="Mede o desempenho do gerenciador de tarefas em dados sintéticos.")
+    parser.add_argument("tamanhos", type=int, nargs="*", default=[10000],
+                        help="quantidades de tarefas a medir (padrão: 10000)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções por operação (padrão: 3)")
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória (mais rápido)")
+    parser.add_argument("--saida", default="benchmark.json", help="arquivo JSON de resultados (padrão: benchmark.json)")
+    parser.add_argument("--comparar", help="arquivo JSON de uma execução anterior para comparação")
+    args = parser.parse_args()
+
+    arquivo_original = persistence.DATA_FILE
+    resultados = []
+    with tempfile.TemporaryDirectory() as diretorio:
+        try:
+            for num_tarefas in args.tamanhos:
+                resultados.extend(executar_suite(num_tarefas, args.repeticoes, diretorio, not args.sem_memoria))
+        finally:
+            persistence.DATA_FILE = arquivo_original
+
+    documento = {
+        "commit": _commit_atual(),
+        "data": date.today().isoformat(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resultados
+    }
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(documento, f, indent=4, ensure_ascii=False)
+    print(f"\nResultados salvos em {args.saida}", file=sys.stderr)
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            comparar(json.load(f), documento)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Pattern, Sequence, Tuple, Union
+from models import Tarefa
+
+# Quantidade mínima de tarefas para a busca ser dividida entre processos. Abaixo
+# disso, o custo de criar os processos é maior que o ganho.
+LIMITE_PARALELO = 50_000
+
+# Quantidade de processos da busca paralela. None usa todos os núcleos da máquina.
+NUM_PROCESSOS: Optional[int] = None
+
+# Cada processo recebe alguns trechos, para equilibrar a carga entre eles
+TRECHOS_POR_PROCESSO = 4
+
+# Critério da busca: um termo em minúsculas ou uma expressão regular compilada
+Criterio = Union[str, Pattern]
+
+# Tarefas visíveis aos processos criados por fork, que as herdam sem cópia
+_tarefas_compartilhadas: Sequence[Tarefa] = ()
+
+
+def corresponde(titulo: str, notas: str, tags: List[str], criterio: Criterio) -> bool:
+    """Indica se o título, as notas ou alguma das tags satisfazem o critério."""
+
+    if isinstance(criterio, str):
+        if criterio in titulo.lower():
+            return True
+        if notas and criterio in notas.lower():
+            return True
+        return any(criterio in tag.lower() for tag in tags)
+
+    if criterio.search(titulo):
+        return True
+    if notas and criterio.search(notas):
+        return True
+    return any(criterio.search(tag) for tag in tags)
+
+
+def _posicoes_no_trecho(inicio: int, fim: int, criterio: Criterio) -> List[int]:
+    """Retorna as posições das tarefas compartilhadas em [inicio, fim) que satisfazem o critério."""
+
+    return [posicao for posicao, tarefa in enumerate(_tarefas_compartilhadas[inicio:fim], inicio)
+            if corresponde(tarefa.titulo, tarefa.notas, tarefa.tags, criterio)]
+
+
+def _posicoes_no_lote(lote: List[Tuple[str, str, List[str]]], deslocamento: int, criterio: Criterio) -> List[int]:
+    """Retorna as posições (somadas ao deslocamento) dos itens do lote que satisfazem o critério."""
+
+    return [deslocamento + indice for indice, (titulo, notas, tags) in enumerate(lote)
+            if corresponde(titulo, notas, tags, criterio)]
+
+
+def criar_criterio(termo: str, regex: bool) -> Criterio:
+    """Converte o termo da busca no critério usado para comparar as tarefas."""
+
+    if not regex:
+        return termo.lower()
+    try:
+        return re.compile(termo, re.IGNORECASE)
+    except re.error as erro:
+        raise ValueError(f"Expressão regular inválida: {erro}") from erro
+
+
+def _buscar_em_paralelo(tarefas: Sequence[Tarefa], criterio: Criterio, num_processos: int) -> List[int]:
+    """Divide as tarefas em trechos, avalia cada trecho em um processo e junta as posições em ordem."""
+
+    global _tarefas_compartilhadas
+
+    num_trechos = num_processos * TRECHOS_POR_PROCESSO
+    tamanho_trecho = -(-len(tarefas) // num_trechos)
+    faixas = [(inicio, min(inicio + tamanho_trecho, len(tarefas)))
+              for inicio in range(0, len(tarefas), tamanho_trecho)]
+
+    # Com fork, os processos herdam as tarefas já carregadas e só as posições
+    # encontradas voltam pelo pickle. Sem fork (Windows, macOS), cada processo
+    # recebe uma cópia compacta do seu trecho, só com os campos da busca.
+    usar_fork = "fork" in multiprocessing.get_all_start_methods()
+    contexto = multiprocessing.get_context("fork" if usar_fork else None)
+
+    if usar_fork:
+        _tarefas_compartilhadas = tarefas
+    try:
+        with ProcessPoolExecutor(max_workers=num_processos, mp_context=contexto) as executor:
+            if usar_fork:
+                futuros = [executor.submit(_posicoes_no_trecho, inicio, fim, criterio) for inicio, fim in faixas]
+            else:
+                futuros = [executor.submit(_posicoes_no_lote,
+                                           [(t.titulo, t.notas, t.tags) for t in tarefas[inicio:fim]], inicio, criterio)
+                           for inicio, fim in faixas]
+            # Os trechos são juntados na ordem original, não na ordem em que terminaram
+            return [posicao for futuro in futuros for posicao in futuro.result()]
+    finally:
+        _tarefas_compartilhadas = ()
+
+
+def _nucleos_disponiveis() -> int:
+    """Retorna quantos núcleos este processo pode usar (no Linux, respeita a afinidade de CPU)."""
+
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def buscar_por_termo(tarefas: Sequence[Tarefa], termo: str, regex: bool = False) -> List[Tarefa]:
+    """
+    Busca as tarefas que contenham o termo no título, nas notas ou nas tags.
+
+    A busca não diferencia maiúsculas de minúsculas. Com `regex=True`, o termo é uma
+    expressão regular procurada em cada campo. A partir de LIMITE_PARALELO tarefas,
+    e se houver mais de um processo disponível, as tarefas são divididas entre
+    processos; o resultado é o mesmo, e na mesma ordem, da busca em um só processo.
+
+    Raises:
+        ValueError: Se `regex` for True e o termo não for uma expressão regular válida.
+    """
+
+    criterio = criar_criterio(termo, regex)
+    num_processos = min(NUM_PROCESSOS or _nucleos_disponiveis(), len(tarefas))
+
+    if num_processos <= 1 or len(tarefas) < LIMITE_PARALELO:
+        return [tarefa for tarefa in tarefas if corresponde(tarefa.titulo, tarefa.notas, tarefa.tags, criterio)]
+
+    return [tarefas[posicao] for posicao in _buscar_em_paralelo(tarefas, criterio, num_processos)]
@@ -0,0 +1,156 @@
+from datetime import date
+from typing import Dict, Optional, Tuple
+from models import Tarefa
+
+# Maior posição de uma árvore: 2^22 cobre o ordinal de qualquer data (`date.max` é 3652059)
+BITS_POSICAO = 22
+TAMANHO = 1 << BITS_POSICAO
+
+
+class ArvoreFenwick:
+    """
+    Árvore de Fenwick (binary indexed tree) esparsa sobre as posições 1 a `TAMANHO`.
+
+    Soma um valor a uma posição e consulta a soma de um intervalo de posições em
+    O(log TAMANHO), ou seja, no máximo 22 passos. Os nós ficam em um dicionário e só
+    existem enquanto a sua soma não é zero, então a memória acompanha as posições
+    usadas, e não o tamanho do intervalo coberto.
+    """
+
+    def __init__(self):
+        """Inicializa a árvore com todas as posições zeradas."""
+
+        self._nos: Dict[int, int] = {}
+
+    def somar(self, posicao: int, valor: int):
+        """Soma um valor a uma posição."""
+
+        nos = self._nos
+        while posicao <= TAMANHO:
+            total = nos.get(posicao, 0) + valor
+            if total:
+                nos[posicao] = total
+            else:
+                nos.pop(posicao, None)
+            posicao += posicao & -posicao
+
+    def prefixo(self, posicao: int) -> int:
+        """Retorna a soma das posições 1 a `posicao`."""
+
+        nos = self._nos
+        total = 0
+        posicao = min(posicao, TAMANHO)
+        while posicao > 0:
+            total += nos.get(posicao, 0)
+            posicao &= posicao - 1
+        return total
+
+    def intervalo(self, inicio: int, fim: int) -> int:
+        """Retorna a soma das posições de `inicio` a `fim`, inclusive."""
+
+        if fim < inicio:
+            return 0
+        return self.prefixo(fim) - self.prefixo(inicio - 1)
+
+
+class CalendarioVencimentos:
+    """
+    Quantidade de tarefas que vencem em cada dia, por lista e geral, pendentes e concluídas.
+
+    Cada conjunto (uma lista, ou todas, e uma situação) guarda a quantidade por dia,
+    indexada pelo ordinal da data de término, e uma árvore de Fenwick com as mesmas
+    quantidades. O `TaskManager` soma cada tarefa ao indexá-la e a subtrai ao desindexá-la,
+    então mudar a data, concluir ou avançar uma série recorrente custa O(log n), e contar
+    as tarefas de qualquer intervalo de datas também, sem percorrer as tarefas. As tarefas
+    sem data de término não são contadas.
+
+    A árvore de um conjunto só é montada na primeira contagem por intervalo, a partir das
+    quantidades por dia, para que carregar os dados custe só um dicionário por tarefa.
+    """
+
+    def __init__(self):
+        """Inicializa o calendário sem nenhuma tarefa."""
+
+        # Quantidade por ordinal do dia, por (lista_id, concluida); a lista None guarda as de todas as listas
+        self._por_dia: Dict[Tuple[Optional[int], bool], Dict[int, int]] = {}
+        # Árvores já montadas, pelas mesmas chaves
+        self._arvores: Dict[Tuple[Optional[int], bool], ArvoreFenwick] = {}
+
+    def _somar(self, tarefa: Tarefa, sinal: int):
+        """Soma ou subtrai uma tarefa do conjunto geral e do da sua lista."""
+
+        if tarefa.data_termino is None:
+            return
+
+        posicao = tarefa.data_termino.toordinal()
+        for chave in ((None, tarefa.concluida), (tarefa.lista_id, tarefa.concluida)):
+            contagens = self._por_dia.get(chave)
+            if contagens is None:
+                contagens = self._por_dia[chave] = {}
+            total = contagens.get(posicao, 0) + sinal
+            if total:
+                contagens[posicao] = total
+            else:
+                del contagens[posicao]
+                if not contagens:
+                    # Um conjunto vazio é descartado inteiro, com a sua árvore
+                    del self._por_dia[chave]
+                    self._arvores.pop(chave, None)
+                    continue
+
+            arvore = self._arvores.get(chave)
+            if arvore is not None:
+                arvore.somar(posicao, sinal)
+
+    def adicionar(self, tarefa: Tarefa):
+        """Conta uma tarefa nova ou recém-alterada."""
+
+        self._somar(tarefa, 1)
+
+    def remover(self, tarefa: Tarefa):
+        """Retira uma tarefa da contagem, com os mesmos valores que ela tinha ao ser adicionada."""
+
+        self._somar(tarefa, -1)
+
+    def _arvore(self, chave: Tuple[Optional[int], bool]) -> Optional[ArvoreFenwick]:
+        """Retorna a árvore de um conjunto, montando-a na primeira consulta. None se ele estiver vazio."""
+
+        arvore = self._arvores.get(chave)
+        if arvore is None and chave in self._por_dia:
+            arvore = self._arvores[chave] = ArvoreFenwick()
+            for posicao, quantidade in self._por_dia[chave].items():
+                arvore.somar(posicao, quantidade)
+        return arvore
+
+    def contar(self, inicio: Optional[date], fim: Optional[date],
+               lista_id: Optional[int] = None, concluidas: bool = False) -> int:
+        """
+        Conta as tarefas que vencem entre duas datas, inclusive.
+
+        Args:
+            inicio (Optional[date]): A primeira data. None conta desde a menor data possível.
+            fim (Optional[date]): A última data. None conta até a maior data possível.
+            lista_id (Optional[int]): A lista. None conta as tarefas de todas as listas.
+            concluidas (bool): Se True, conta as concluídas; se False, as pendentes.
+        """
+
+        arvore = self._arvore((lista_id, concluidas))
+        if arvore is None:
+            return 0
+        return arvore.intervalo((inicio or date.min).toordinal(), (fim or date.max).toordinal())
+
+    def por_dia(self, inicio: date, fim: date,
+                lista_id: Optional[int] = None, concluidas: bool = False) -> Dict[date, int]:
+        """
+        Retorna a quantidade de tarefas que vencem em cada dia entre duas datas, inclusive.
+
+        Os dias sem tarefas ficam de fora. Custa O(1) por dia do intervalo.
+        """
+
+        contagens = self._por_dia.get((lista_id, concluidas), {})
+        por_dia = {}
+        for posicao in range(inicio.toordinal(), fim.toordinal() + 1):
+            quantidade = contagens.get(posicao)
+            if quantidade:
+                por_dia[date.fromordinal(posicao)] = quantidade
+        return por_dia
@@ -0,0 +1,217 @@
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+from models import Tarefa
+import recorrencia
+
+# Contextos de uma consulta da visualização
+CONTEXTO_TODAS = "todas"
+CONTEXTO_LISTA = "lista"
+CONTEXTO_TAGS = "tags"
+
+# Critérios de ordenação
+ORDENACAO_DATA = "DATA"
+ORDENACAO_PRIORIDADE = "PRIORIDADE"
+
+# Quantas consultas diferentes ficam guardadas no cache
+TAMANHO_CACHE_PADRAO = 32
+
+
+def tarefas_da_lista(tarefas: List[Tarefa], lista_id: int) -> List[Tarefa]:
+    """Retorna as tarefas que pertencem à lista informada."""
+
+    return [t for t in tarefas if t.lista_id == lista_id]
+
+
+def limite_do_filtro(filtro_escolha: str, hoje: Optional[date] = None) -> Optional[date]:
+    """
+    Retorna a maior data de término aceita por um filtro por data ('2' ou '3').
+
+    Os filtros por data incluem as atrasadas, então não têm data inicial. Retorna None
+    para os filtros que não são por data.
+    """
+
+    hoje = hoje or date.today()
+    if filtro_escolha == '2':
+        return hoje
+    if filtro_escolha == '3':
+        return hoje + timedelta(days=7)
+    return None
+
+
+def filtrar_tarefas(tarefas: List[Tarefa], filtro_escolha: str, hoje: Optional[date] = None) -> Optional[List[Tarefa]]:
+    """
+    Aplica um dos filtros secundários da visualização às tarefas.
+
+    Nos filtros por data, uma série recorrente entra uma vez, pela sua próxima
+    ocorrência pendente; `expandir_ocorrencias()` lista cada ocorrência do período.
+
+    Retorna a lista filtrada ou None se a opção de filtro for inválida.
+    """
+
+    if filtro_escolha == '1':
+        return tarefas
+
+    elif filtro_escolha in ('2', '3'):
+        limite = limite_do_filtro(filtro_escolha, hoje)
+        return [t for t in tarefas if t.data_termino and t.data_termino <= limite]
+
+    elif filtro_escolha == '4':
+        return [t for t in tarefas if not t.concluida]
+
+    elif filtro_escolha == '5':
+        return [t for t in tarefas if t.concluida]
+
+    return None
+
+
+_PRIORIDADE_MAP = {"alta": 0, "media": 1, "baixa": 2, "nenhuma": 3}
+
+
+def chave_ordenacao(tarefa: Tarefa, criterio: str) -> Tuple:
+    """Retorna a chave usada para ordenar a tarefa pelo critério especificado."""
+
+    data_key = tarefa.data_termino if tarefa.data_termino is not None else date.max
+    prioridade_key = _PRIORIDADE_MAP.get(tarefa.prioridade.lower(), 4)
+    lista_key = tarefa.lista_id
+
+    if criterio == ORDENACAO_PRIORIDADE:
+        return (prioridade_key, data_key, lista_key)
+
+    return (data_key, prioridade_key, lista_key)
+
+
+def ordenar_tarefas(tarefas: List[Tarefa], criterio: str) -> List[Tarefa]:
+    """Ordena uma lista de tarefas pelo criterio especificado."""
+
+    return sorted(tarefas, key=lambda tarefa: chave_ordenacao(tarefa, criterio))
+
+
+def eh_serie_pendente(tarefa: Tarefa) -> bool:
+    """Indica se a tarefa é uma série recorrente com ocorrências ainda por vir."""
+
+    return recorrencia.eh_recorrente(tarefa.repeticao) and not tarefa.concluida and tarefa.data_termino is not None
+
+
+def ocorrencias_seguintes(tarefa: Tarefa, de: Optional[date], ate: date) -> Iterator[date]:
+    """
+    Gera as ocorrências de uma série pendente posteriores à sua data de término, no intervalo [de, ate].
+
+    A data de término é a próxima ocorrência pendente; as seguintes são calculadas sob
+    demanda a partir da regra da série, sem criar tarefas.
+    """
+
+    inicio = tarefa.inicio_serie or tarefa.data_termino
+    de = max(de or date.min, tarefa.data_termino + timedelta(days=1))
+    return recorrencia.ocorrencias_entre(inicio, tarefa.repeticao, de, ate)
+
+
+def contar_ocorrencias_seguintes(tarefa: Tarefa, de: Optional[date], ate: date) -> int:
+    """Conta, em tempo constante, as ocorrências que `ocorrencias_seguintes()` geraria."""
+
+    inicio = tarefa.inicio_serie or tarefa.data_termino
+    de = max(de or date.min, tarefa.data_termino + timedelta(days=1))
+    return recorrencia.contar_ocorrencias(inicio, tarefa.repeticao, de, ate)
+
+
+def expandir_ocorrencias(tarefas: Sequence[Tarefa],
+                         ate: date,
+                         de: Optional[date] = None,
+                         criterio: str = ORDENACAO_DATA) -> List[Tuple[Tarefa, date]]:
+    """
+    Retorna as ocorrências das tarefas com data de término no intervalo [de, ate], como pares (tarefa, data).
+
+    Uma tarefa comum aparece uma vez; uma série recorrente pendente aparece uma vez por
+    ocorrência no intervalo (ex: uma série diária, sete vezes em uma semana). Cada par
+    guarda a própria série, então uma ação sobre as tarefas dos pares age sobre a série.
+
+    Args:
+        tarefas (Sequence[Tarefa]): As tarefas, normalmente já filtradas.
+        ate (date): A última data do intervalo.
+        de (Optional[date]): A primeira data. None inclui as atrasadas.
+        criterio (str): A ordenação, com a data da ocorrência no lugar da data de término.
+    """
+
+    pares = []
+    for tarefa in tarefas:
+        if tarefa.data_termino is None or tarefa.data_termino > ate:
+            continue
+        if de is None or tarefa.data_termino >= de:
+            pares.append((tarefa, tarefa.data_termino))
+        if eh_serie_pendente(tarefa):
+            pares.extend((tarefa, data) for data in ocorrencias_seguintes(tarefa, de, ate))
+
+    def chave(par: Tuple[Tarefa, date]) -> Tuple:
+        tarefa, data = par
+        prioridade = _PRIORIDADE_MAP.get(tarefa.prioridade.lower(), 4)
+        if criterio == ORDENACAO_PRIORIDADE:
+            return (prioridade, data, tarefa.lista_id, tarefa.id)
+        return (data, prioridade, tarefa.lista_id, tarefa.id)
+
+    return sorted(pares, key=chave)
+
+
+class CacheConsultas:
+    """
+    Cache limitado (LRU) dos resultados das consultas da visualização.
+
+    Cada resultado é guardado junto com a geração dos dados de que depende (um número
+    que o gerenciador aumenta a cada alteração). Uma entrada cuja geração ficou para
+    trás é descartada ao ser consultada, então nada precisa ser apagado a cada alteração.
+    """
+
+    def __init__(self, tamanho_maximo: int = TAMANHO_CACHE_PADRAO):
+        """
+        Args:
+            tamanho_maximo (int): Quantas consultas ficam guardadas. 0 desliga o cache.
+        """
+
+        self._tamanho_maximo = tamanho_maximo
+        # Chave normalizada da consulta -> (geração, resultado)
+        self._entradas: "OrderedDict[Hashable, Tuple[Any, List[Tarefa]]]" = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidadas = 0
+
+    def obter(self, chave: Hashable, geracao: Any) -> Optional[List[Tarefa]]:
+        """Retorna o resultado guardado para a chave, se ainda for da geração informada."""
+
+        entrada = self._entradas.get(chave)
+        if entrada is not None:
+            if entrada[0] == geracao:
+                self.acertos += 1
+                self._entradas.move_to_end(chave)
+                return entrada[1]
+            del self._entradas[chave]
+            self.invalidadas += 1
+
+        self.falhas += 1
+        return None
+
+    def guardar(self, chave: Hashable, geracao: Any, resultado: List[Tarefa]):
+        """Guarda um resultado, descartando o usado há mais tempo se o cache estiver cheio."""
+
+        if self._tamanho_maximo <= 0:
+            return
+        self._entradas[chave] = (geracao, resultado)
+        self._entradas.move_to_end(chave)
+        while len(self._entradas) > self._tamanho_maximo:
+            self._entradas.popitem(last=False)
+
+    def limpar(self):
+        """Descarta todos os resultados guardados."""
+
+        self._entradas.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna os acertos, as falhas, a taxa de acerto e quantas entradas estão guardadas."""
+
+        pedidos = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / pedidos if pedidos else 0.0,
+            "invalidadas": self.invalidadas,
+            "entradas": len(self._entradas),
+            "tamanho_maximo": self._tamanho_maximo
+        }
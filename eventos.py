@@ -0,0 +1,323 @@
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import historico
+
+# Tipos de evento publicados pelo TaskManager
+TAREFA_CRIADA = "tarefa_criada"        # objeto: a tarefa criada (ou que voltou a existir)
+TAREFA_ALTERADA = "tarefa_alterada"    # campos: {campo: (valor_antigo, valor_novo)}
+TAREFA_CONCLUIDA = "tarefa_concluida"  # campos: como em TAREFA_ALTERADA
+TAREFA_REMOVIDA = "tarefa_removida"    # objeto: a tarefa como estava ao ser removida
+LISTA_CRIADA = "lista_criada"          # objeto: a lista criada
+LISTA_ALTERADA = "lista_alterada"      # campos: {campo: (valor_antigo, valor_novo)}
+LISTA_REMOVIDA = "lista_removida"      # objeto: a lista removida; afetadas: IDs das tarefas removidas com ela
+
+# Quantos eventos ficam guardados para os assinantes que retomam de um cursor
+RETENCAO_PADRAO = 10000
+
+logger = logging.getLogger(__name__)
+
+
+class CursorExpirado(ValueError):
+    """O cursor informado é mais antigo que os eventos guardados (ou não é deste feed)."""
+
+
+class Evento:
+    """Uma alteração publicada aos assinantes, com o número de sequência que serve de cursor."""
+
+    __slots__ = ("sequencia", "acao", "tipo", "objeto_id", "objeto", "campos", "afetadas", "descricao")
+
+    def __init__(self, sequencia: int, acao: int, tipo: str, objeto_id: int, descricao: str,
+                 objeto: Any = None, campos: Optional[Dict[str, Tuple[Any, Any]]] = None,
+                 afetadas: Optional[List[int]] = None):
+        """
+        Args:
+            sequencia (int): A posição do evento no feed, sempre crescente.
+            acao (int): A sequência do primeiro evento da mesma ação, igual em todos os eventos dela.
+            tipo (str): Um dos tipos de evento (ex: `TAREFA_CRIADA`).
+            objeto_id (int): O ID da tarefa ou lista.
+            descricao (str): A ação que causou o evento (ex: "desfazer: remover a tarefa 'X'").
+            objeto: A tarefa ou lista, nos eventos de criação e de remoção.
+            campos: Os campos alterados, com o valor antigo e o novo, nos eventos de alteração.
+            afetadas: Os IDs das tarefas removidas junto com uma lista.
+        """
+
+        self.sequencia = sequencia
+        self.acao = acao
+        self.tipo = tipo
+        self.objeto_id = objeto_id
+        self.descricao = descricao
+        self.objeto = objeto
+        self.campos = campos or {}
+        self.afetadas = afetadas or []
+
+    def __repr__(self) -> str:
+        return f"Evento({self.sequencia}, {self.tipo}, {self.objeto_id})"
+
+
+def _foi_concluida(mudancas: Dict[str, Tuple[Any, Any]]) -> bool:
+    """Indica se a alteração de uma tarefa é uma conclusão (inclusive de uma ocorrência de uma série)."""
+
+    if "concluida" in mudancas and mudancas["concluida"][1]:
+        return True
+    conclusoes = mudancas.get("conclusoes")
+    return conclusoes is not None and len(conclusoes[1]) > len(conclusoes[0])
+
+
+def _listas_removidas(alteracoes: List[Tuple[str, Any]]) -> Set[int]:
+    """Retorna os IDs das listas removidas pelas alterações."""
+
+    return {lista.id for tipo, dados in alteracoes if tipo == historico.LISTAS_REMOVIDAS for _, lista in dados}
+
+
+def contar_eventos(alteracoes: List[Tuple[str, Any]], desfeitas: bool = False) -> int:
+    """
+    Conta os eventos que `eventos_das_alteracoes` geraria, sem criá-los.
+
+    Com `desfeitas=True`, conta os eventos das alterações que as desfazem (`historico.inverter`).
+    """
+
+    if desfeitas:
+        alteracoes = [(historico.INVERSOS[tipo], dados) for tipo, dados in alteracoes]
+    listas_removidas = _listas_removidas(alteracoes)
+    quantidade = 0
+    for tipo, dados in alteracoes:
+        if tipo in (historico.TAREFA_ALTERADA, historico.LISTA_ALTERADA):
+            quantidade += 1
+        elif tipo == historico.TAREFAS_REMOVIDAS and listas_removidas:
+            quantidade += sum(1 for _, tarefa in dados if tarefa.lista_id not in listas_removidas)
+        else:
+            quantidade += len(dados)
+    return quantidade
+
+
+def eventos_das_alteracoes(alteracoes: List[Tuple[str, Any]]) -> List[Tuple[str, int, Dict[str, Any]]]:
+    """
+    Converte as alterações primitivas de uma ação (como no histórico) em eventos, em ordem.
+
+    As tarefas removidas junto com uma lista não geram um evento cada: os IDs delas vão
+    no evento da remoção da lista.
+
+    Returns:
+        Uma lista de (tipo, ID do objeto, demais atributos do evento).
+    """
+
+    listas_removidas = _listas_removidas(alteracoes)
+    afetadas: Dict[int, List[int]] = {}
+    eventos = []
+    for tipo, dados in alteracoes:
+        if tipo == historico.TAREFAS_INSERIDAS:
+            eventos.extend((TAREFA_CRIADA, tarefa.id, {"objeto": tarefa}) for _, tarefa in dados)
+        elif tipo == historico.TAREFAS_REMOVIDAS:
+            for _, tarefa in dados:
+                if tarefa.lista_id in listas_removidas:
+                    afetadas.setdefault(tarefa.lista_id, []).append(tarefa.id)
+                else:
+                    eventos.append((TAREFA_REMOVIDA, tarefa.id, {"objeto": tarefa}))
+        elif tipo == historico.TAREFA_ALTERADA:
+            tarefa_id, mudancas = dados
+            tipo_evento = TAREFA_CONCLUIDA if _foi_concluida(mudancas) else TAREFA_ALTERADA
+            eventos.append((tipo_evento, tarefa_id, {"campos": mudancas}))
+        elif tipo == historico.LISTAS_INSERIDAS:
+            eventos.extend((LISTA_CRIADA, lista.id, {"objeto": lista}) for _, lista in dados)
+        elif tipo == historico.LISTAS_REMOVIDAS:
+            # A lista de IDs é preenchida abaixo, pelas remoções de tarefas da mesma ação
+            eventos.extend((LISTA_REMOVIDA, lista.id, {"objeto": lista, "afetadas": afetadas.setdefault(lista.id, [])})
+                           for _, lista in dados)
+        elif tipo == historico.LISTA_ALTERADA:
+            lista_id, mudancas = dados
+            eventos.append((LISTA_ALTERADA, lista_id, {"campos": mudancas}))
+    return eventos
+
+
+class _Acao:
+    """
+    Uma ação publicada no feed: as suas alterações primitivas e a sequência do seu primeiro evento.
+
+    Os objetos `Evento` só são criados quando alguém os recebe, porque uma ação em massa
+    gera um evento por tarefa, e a maioria das ações não tem nenhum assinante.
+    """
+
+    __slots__ = ("primeira", "quantidade", "descricao", "alteracoes", "desfeitas")
+
+    def __init__(self, primeira: int, descricao: str, alteracoes: List[Tuple[str, Any]], desfeitas: bool):
+        self.primeira = primeira
+        self.descricao = descricao
+        self.alteracoes = alteracoes
+        self.desfeitas = desfeitas
+        self.quantidade = contar_eventos(alteracoes, desfeitas)
+
+    @property
+    def ultima(self) -> int:
+        """A sequência do último evento da ação."""
+
+        return self.primeira + self.quantidade - 1
+
+    def eventos(self) -> List[Evento]:
+        """Cria os eventos da ação, em ordem."""
+
+        alteracoes = historico.inverter(self.alteracoes) if self.desfeitas else self.alteracoes
+        return [Evento(self.primeira + posicao, self.primeira, tipo, objeto_id, self.descricao, **atributos)
+                for posicao, (tipo, objeto_id, atributos) in enumerate(eventos_das_alteracoes(alteracoes))]
+
+
+class FeedEventos:
+    """
+    Os eventos publicados pelo TaskManager, entregues em ordem aos assinantes.
+
+    Cada evento recebe um número de sequência, que é o cursor de um assinante: quem
+    guardou o número do último evento que processou pode retomar dali com `desde`, sem
+    comparar as tarefas. Ao menos os últimos `retencao` eventos ficam guardados para isso
+    (as ações são guardadas inteiras). O número de sequência continua de onde parou
+    quando os dados são carregados de novo, mas os eventos guardados não, então só é
+    possível retomar de um cursor anterior ao carregamento se ele estava em dia.
+    """
+
+    def __init__(self, sequencia: int = 0, retencao: int = RETENCAO_PADRAO):
+        """
+        Args:
+            sequencia (int): O número do último evento já publicado (guardado nos metadados).
+            retencao (int): Quantos eventos guardar para os assinantes que retomam de um cursor.
+        """
+
+        self._sequencia = sequencia
+        self._retencao = retencao
+        # Ações guardadas, da mais antiga para a mais recente, e o total de eventos delas
+        self._acoes: deque = deque()
+        self._guardados = 0
+        # Pares (assinante, em_lotes), na ordem em que assinaram
+        self._assinantes: List[Tuple[Callable, bool]] = []
+        # Ações publicadas enquanto outra está sendo entregue (um assinante que altera os dados)
+        self._pendentes: deque = deque()
+        self._entregando = False
+
+    @property
+    def cursor(self) -> int:
+        """O número do último evento publicado."""
+
+        return self._sequencia
+
+    def registrar(self, descricao: str, alteracoes: List[Tuple[str, Any]], desfeitas: bool = False) -> Optional[_Acao]:
+        """
+        Numera e guarda os eventos das alterações de uma ação, sem entregá-los ainda.
+
+        Args:
+            descricao (str): A ação (ex: "desfazer: remover a tarefa 'X'").
+            alteracoes: As alterações primitivas da ação, como no histórico.
+            desfeitas (bool): Se True, os eventos são os que desfazem as alterações.
+
+        Returns:
+            A ação registrada, para `entregar`, ou None se ela não gerou nenhum evento.
+        """
+
+        acao = _Acao(self._sequencia + 1, descricao, alteracoes, desfeitas)
+        if not acao.quantidade:
+            return None
+        self._sequencia = acao.ultima
+        self._acoes.append(acao)
+        self._guardados += acao.quantidade
+        while len(self._acoes) > 1 and self._guardados - self._acoes[0].quantidade >= self._retencao:
+            self._guardados -= self._acoes.popleft().quantidade
+        return acao
+
+    def entregar(self, acao: Optional[_Acao]):
+        """
+        Entrega os eventos de uma ação a todos os assinantes.
+
+        Uma ação publicada durante a entrega de outra (por um assinante que altera os
+        dados) só é entregue depois, para que todos recebam os eventos na mesma ordem.
+        """
+
+        if acao is None or not self._assinantes:
+            return
+        self._pendentes.append(acao)
+        if self._entregando:
+            return
+
+        self._entregando = True
+        try:
+            while self._pendentes:
+                lote = self._pendentes.popleft().eventos()
+                for assinante, em_lotes in list(self._assinantes):
+                    self._chamar(assinante, em_lotes, lote)
+        finally:
+            self._entregando = False
+
+    @staticmethod
+    def _chamar(assinante: Callable, em_lotes: bool, lote: List[Evento]):
+        """Entrega um lote a um assinante. Um erro nele não impede a entrega aos demais."""
+
+        try:
+            if em_lotes:
+                assinante(lote)
+            else:
+                for evento in lote:
+                    assinante(evento)
+        except Exception:
+            logger.exception("Erro no assinante de eventos %r.", assinante)
+
+    def _acoes_desde(self, cursor: int) -> List[_Acao]:
+        """
+        Retorna as ações com eventos posteriores ao cursor.
+
+        Raises:
+            CursorExpirado: Se algum evento posterior ao cursor não estiver mais guardado,
+                ou se o cursor for maior que o último evento publicado.
+        """
+
+        if cursor > self._sequencia:
+            raise CursorExpirado(f"O cursor {cursor} é posterior ao último evento ({self._sequencia}).")
+        primeiro_guardado = self._acoes[0].primeira if self._acoes else self._sequencia + 1
+        if cursor < primeiro_guardado - 1:
+            raise CursorExpirado(f"Os eventos posteriores ao cursor {cursor} não estão mais guardados.")
+
+        acoes = []
+        for acao in reversed(self._acoes):
+            if acao.ultima <= cursor:
+                break
+            acoes.append(acao)
+        acoes.reverse()
+        return acoes
+
+    def desde(self, cursor: int) -> List[Evento]:
+        """
+        Retorna os eventos publicados depois do cursor, em ordem.
+
+        Raises:
+            CursorExpirado: Se algum evento posterior ao cursor não estiver mais guardado,
+                ou se o cursor for maior que o último evento publicado. O assinante deve
+                então reler as tarefas e continuar do cursor atual.
+        """
+
+        return [evento for acao in self._acoes_desde(cursor) for evento in acao.eventos() if evento.sequencia > cursor]
+
+    def assinar(self, assinante: Callable, em_lotes: bool = False, desde: Optional[int] = None) -> int:
+        """
+        Registra um assinante e retorna o cursor a partir do qual ele passa a receber eventos.
+
+        Args:
+            assinante (Callable): Recebe cada `Evento` ou, com `em_lotes=True`, a lista
+                dos eventos de cada ação.
+            em_lotes (bool): Entrega os eventos de uma ação de uma só vez.
+            desde (Optional[int]): Se informado, os eventos publicados depois desse cursor
+                são entregues antes, como se tivessem acabado de acontecer.
+
+        Raises:
+            CursorExpirado: Se não for possível retomar do cursor `desde`.
+        """
+
+        if desde is not None:
+            for acao in self._acoes_desde(desde):
+                lote = [evento for evento in acao.eventos() if evento.sequencia > desde]
+                self._chamar(assinante, em_lotes, lote)
+        self._assinantes.append((assinante, em_lotes))
+        return self._sequencia
+
+    def cancelar(self, assinante: Callable) -> bool:
+        """Deixa de entregar eventos a um assinante. Retorna False se ele não estava registrado."""
+
+        for posicao, (registrado, _) in enumerate(self._assinantes):
+            if registrado == assinante:
+                del self._assinantes[posicao]
+                return True
+        return False
@@ -0,0 +1,137 @@
+import argparse
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import List, Optional, Tuple
+from models import Tarefa, ListaDeTarefas
+import persistence
+import recorrencia
+
+# Palavras usadas para montar títulos, notas e nomes de tags sintéticos
+_PALAVRAS = (
+    "revisar enviar relatorio reuniao cliente projeto estudar prova comprar mercado pagar conta "
+    "ligar agendar consulta corrigir bug deploy planejar viagem treino academia ler livro escrever "
+    "artigo organizar arquivos backup servidor orcamento contrato entrega apresentacao equipe "
+    "documentacao testes integracao login cadastro pedido fornecedor estoque pesquisa entrevista"
+).split()
+
+_PRIORIDADES = ["alta", "media", "baixa", "nenhuma"]
+_PESOS_PRIORIDADES = [15, 30, 25, 30]
+
+_REPETICOES = ["nunca"] + list(recorrencia.REGRAS_RECORRENCIA)
+_PESOS_REPETICOES = [90, 5, 3, 1.5, 0.5]
+
+
+def _pesos_zipf(quantidade: int, expoente: float) -> List[float]:
+    """Retorna os pesos acumulados de uma distribuição de Zipf com `quantidade` elementos."""
+
+    return list(accumulate(1 / (posicao ** expoente) for posicao in range(1, quantidade + 1)))
+
+
+def _texto(rng: random.Random, num_palavras: int) -> str:
+    """Monta um texto com palavras sorteadas do vocabulário."""
+
+    return " ".join(rng.choices(_PALAVRAS, k=num_palavras))
+
+
+def gerar_dados(num_tarefas: int,
+                num_listas: int = 50,
+                num_tags: int = 500,
+                expoente_zipf: float = 1.1,
+                hoje: Optional[date] = None,
+                semente: int = 42) -> Tuple[List[ListaDeTarefas], List[Tarefa]]:
+    """
+    Gera um conjunto de dados sintético e realista de listas e tarefas.
+
+    As tags seguem uma distribuição de Zipf (poucas tags muito usadas e muitas raras),
+    as datas misturam tarefas atrasadas, futuras e sem data, parte das tarefas é
+    recorrente e algumas têm notas longas. A mesma semente sempre gera os mesmos dados.
+
+    Args:
+        num_tarefas (int): Quantidade de tarefas.
+        num_listas (int): Quantidade de listas.
+        num_tags (int): Tamanho do vocabulário de tags.
+        expoente_zipf (float): Expoente da distribuição das tags.
+        hoje (Optional[date]): Data de referência para as datas geradas. Padrão é hoje.
+        semente (int): Semente do gerador de números aleatórios.
+
+    Returns:
+        Tuple[List[ListaDeTarefas], List[Tarefa]]: As listas e as tarefas geradas.
+    """
+
+    rng = random.Random(semente)
+    hoje = hoje or date.today()
+
+    listas = [ListaDeTarefas(id=lista_id, nome="Geral" if lista_id == 1 else f"Lista {lista_id}")
+              for lista_id in range(1, num_listas + 1)]
+    # Algumas listas concentram a maior parte das tarefas, como acontece no uso real
+    pesos_listas = _pesos_zipf(num_listas, 0.8)
+
+    vocabulario_tags = [f"{rng.choice(_PALAVRAS)}-{indice}" for indice in range(num_tags)]
+    pesos_tags = _pesos_zipf(num_tags, expoente_zipf)
+
+    tarefas = []
+    for tarefa_id in range(1, num_tarefas + 1):
+        # 20% sem data; o restante espalhado entre 90 dias atrás e 180 dias à frente
+        data_termino = None
+        if rng.random() >= 0.2:
+            data_termino = hoje + timedelta(days=rng.randint(-90, 180))
+
+        repeticao = rng.choices(_REPETICOES, weights=_PESOS_REPETICOES)[0]
+        if data_termino is None:
+            repeticao = "nunca"
+
+        tags = list(dict.fromkeys(rng.choices(vocabulario_tags, cum_weights=pesos_tags, k=rng.randint(0, 4))))
+
+        # A maioria das notas é vazia ou curta, mas algumas são bem longas
+        sorteio_notas = rng.random()
+        if sorteio_notas < 0.5:
+            notas = ""
+        elif sorteio_notas < 0.9:
+            notas = _texto(rng, rng.randint(3, 15))
+        else:
+            notas = _texto(rng, rng.randint(100, 400))
+
+        tarefa = Tarefa(
+            id=tarefa_id,
+            titulo=_texto(rng, rng.randint(2, 6)).capitalize(),
+            lista_id=rng.choices(listas, cum_weights=pesos_listas)[0].id,
+            concluida=repeticao == "nunca" and rng.random() < 0.3,
+            data_termino=data_termino,
+            prioridade=rng.choices(_PRIORIDADES, weights=_PESOS_PRIORIDADES)[0],
+            tags=tags,
+            notas=notas,
+            repeticao=repeticao
+        )
+
+        if recorrencia.eh_recorrente(repeticao):
+            # Séries com algumas ocorrências já concluídas antes da data atual
+            num_conclusoes = rng.randint(0, 10)
+            tarefa.inicio_serie = data_termino
+            tarefa.conclusoes = [recorrencia.ocorrencia(data_termino, repeticao, indice)
+                                 for indice in range(num_conclusoes)]
+            tarefa.data_termino = recorrencia.ocorrencia(data_termino, repeticao, num_conclusoes)
+
+        tarefas.append(tarefa)
+
+    return listas, tarefas
+
+
+def main():
+    """Gera um arquivo de dados sintético pela linha de comando."""
+
+    parser = argparse.ArgumentParser(description="Gera um arquivo de dados sintético para testes de desempenho.")
+    parser.add_argument("num_tarefas", type=int, help="quantidade de tarefas (ex: 10000 a 1000000)")
+    parser.add_argument("--listas", type=int, default=50, help="quantidade de listas (padrão: 50)")
+    parser.add_argument("--tags", type=int, default=500, help="tamanho do vocabulário de tags (padrão: 500)")
+    parser.add_argument("--semente", type=int, default=42, help="semente aleatória (padrão: 42)")
+    parser.add_argument("--saida", default="dados_sinteticos.json", help="arquivo de saída (padrão: dados_sinteticos.json)")
+    args = parser.parse_args()
+
+    listas, tarefas = gerar_dados(args.num_tarefas, num_listas=args.listas, num_tags=args.tags, semente=args.semente)
+    persistence.DATA_FILE = args.saida
+    persistence.salvar_dados(listas, tarefas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import threading
+from typing import Any, Dict, Optional, Sequence
+from models import Tarefa, ListaDeTarefas
+import persistence
+
+
+class GravadorEmGrupo:
+    """
+    Grava os dados de um gerenciador em uma thread própria, agrupando as ações (group commit).
+
+    Cada ação só entrega ao gravador a versão publicada dos dados, que é imutável, e
+    segue em frente. A thread grava a versão mais recente que recebeu; as ações que
+    chegam enquanto uma gravação está em andamento são cobertas pela seguinte, então um
+    único fsync leva ao disco todas elas. Com muitas ações por segundo, a vazão deixa de
+    ser limitada pelo tempo de uma gravação completa por ação.
+
+    A thread só existe enquanto há o que gravar, e não é daemon: o programa só termina
+    depois de gravar a última versão recebida.
+
+    Se uma gravação falha, os pedidos que ela cobria continuam pendentes: a próxima
+    versão pedida os cobre, e `aguardar()` informa a falha a quem esperava por eles.
+    """
+
+    def __init__(self, caminho: str):
+        """
+        Args:
+            caminho (str): O arquivo de dados.
+        """
+
+        self._caminho = caminho
+        self._condicao = threading.Condition()
+        # Última versão recebida e ainda não gravada: (número do pedido, listas, tarefas, metadados)
+        self._pendente: Optional[tuple] = None
+        self._pedidos = 0
+        # Último pedido que chegou ao disco e último cuja gravação terminou, com ou sem sucesso
+        self._gravado = 0
+        self._tentado = 0
+        self._gravacoes = 0
+        self._falhas = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def solicitar(self, listas: Sequence[ListaDeTarefas], tarefas: Sequence[Tarefa],
+                  metadados: Dict[str, Any]) -> int:
+        """
+        Pede a gravação de uma versão dos dados e retorna o número do pedido, sem esperar.
+
+        As listas e tarefas devem ser as de uma versão publicada (que não muda mais), e
+        os metadados, uma cópia que o gerenciador não vai alterar.
+        """
+
+        with self._condicao:
+            self._pedidos += 1
+            self._pendente = (self._pedidos, listas, tarefas, metadados)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="gravador-em-grupo")
+                self._thread.start()
+            return self._pedidos
+
+    def _executar(self):
+        """Grava a versão pendente mais recente até não haver mais nenhuma."""
+
+        while True:
+            with self._condicao:
+                if self._pendente is None:
+                    self._thread = None
+                    return
+                numero, listas, tarefas, metadados = self._pendente
+                self._pendente = None
+
+            gravou = persistence.salvar_dados(listas, tarefas, metadados, self._caminho)
+
+            with self._condicao:
+                self._tentado = numero
+                if gravou:
+                    self._gravado = numero
+                    self._gravacoes += 1
+                else:
+                    self._falhas += 1
+                self._condicao.notify_all()
+
+    def aguardar(self, numero: Optional[int] = None) -> bool:
+        """
+        Espera a gravação de um pedido (padrão: o último) terminar.
+
+        Retorna True se ele chegou ao disco, ou False se a gravação que o cobria falhou
+        (o erro fica no log). Um pedido que falhou só é gravado quando outro for pedido.
+        """
+
+        with self._condicao:
+            numero = self._pedidos if numero is None else numero
+            while self._gravado < numero and self._tentado < numero:
+                self._condicao.wait()
+            return self._gravado >= numero
+
+    def pendente(self) -> bool:
+        """Indica se há algum pedido que ainda não chegou ao disco, inclusive por uma falha."""
+
+        with self._condicao:
+            return self._gravado < self._pedidos
+
+    def falhou(self) -> bool:
+        """Indica se a última gravação terminou com erro e não há outra pedida depois dela."""
+
+        with self._condicao:
+            return self._tentado == self._pedidos and self._gravado < self._pedidos
+
+    def estatisticas(self) -> Dict[str, int]:
+        """Retorna quantas versões foram pedidas, quantas gravações as cobriram e quantas falharam."""
+
+        with self._condicao:
+            return {"pedidos": self._pedidos, "gravados": self._gravado,
+                    "gravacoes": self._gravacoes, "falhas": self._falhas}
@@ -0,0 +1,122 @@
+from collections import deque
+from typing import Any, List, Optional, Tuple
+
+# Tipos de alteração primitiva registrados pelo TaskManager. Cada ação do usuário
+# vira uma Operacao com uma sequência dessas alterações, que guardam apenas o que
+# mudou: os objetos inseridos ou removidos (com a posição que ocupavam) e, nas
+# edições, o valor antigo e o novo de cada campo alterado.
+TAREFAS_INSERIDAS = "tarefas_inseridas"  # dados: [(posicao, tarefa), ...] em ordem crescente de posição
+TAREFAS_REMOVIDAS = "tarefas_removidas"  # dados: [(posicao, tarefa), ...] em ordem crescente de posição
+TAREFA_ALTERADA = "tarefa_alterada"      # dados: (tarefa_id, {campo: (valor_antigo, valor_novo)})
+LISTAS_INSERIDAS = "listas_inseridas"    # dados: [(posicao, lista), ...]
+LISTAS_REMOVIDAS = "listas_removidas"    # dados: [(posicao, lista), ...]
+LISTA_ALTERADA = "lista_alterada"        # dados: (lista_id, {campo: (valor_antigo, valor_novo)})
+
+# Quantidade padrão de ações que podem ser desfeitas
+PROFUNDIDADE_PADRAO = 50
+
+
+# Tipo de alteração que desfaz cada tipo
+INVERSOS = {
+    TAREFAS_INSERIDAS: TAREFAS_REMOVIDAS,
+    TAREFAS_REMOVIDAS: TAREFAS_INSERIDAS,
+    LISTAS_INSERIDAS: LISTAS_REMOVIDAS,
+    LISTAS_REMOVIDAS: LISTAS_INSERIDAS,
+    TAREFA_ALTERADA: TAREFA_ALTERADA,
+    LISTA_ALTERADA: LISTA_ALTERADA
+}
+
+
+def inverter(alteracoes: List[Tuple[str, Any]]) -> List[Tuple[str, Any]]:
+    """Retorna as alterações que desfazem as informadas, na ordem em que são aplicadas ao desfazer."""
+
+    invertidas = []
+    for tipo, dados in reversed(alteracoes):
+        if tipo in (TAREFA_ALTERADA, LISTA_ALTERADA):
+            objeto_id, mudancas = dados
+            dados = (objeto_id, {chave: (novo, antigo) for chave, (antigo, novo) in mudancas.items()})
+        invertidas.append((INVERSOS[tipo], dados))
+    return invertidas
+
+
+class Operacao:
+    """Uma ação do usuário, registrada como a lista de alterações primitivas que ela causou."""
+
+    def __init__(self, descricao: str):
+        """
+        Inicializa uma operação vazia.
+
+        Args:
+            descricao (str): Texto curto exibido ao desfazer ou refazer a ação.
+        """
+
+        self.descricao = descricao
+        self.alteracoes: List[Tuple[str, Any]] = []
+
+    def registrar(self, tipo: str, dados: Any):
+        """Acrescenta uma alteração primitiva à operação."""
+
+        self.alteracoes.append((tipo, dados))
+
+    def __repr__(self) -> str:
+        """Retorna uma representação legível da operação."""
+
+        return f"Operacao('{self.descricao}', {len(self.alteracoes)} alterações)"
+
+
+class Historico:
+    """Pilhas de desfazer e refazer com profundidade máxima."""
+
+    def __init__(self, profundidade: int = PROFUNDIDADE_PADRAO):
+        """
+        Inicializa o histórico vazio.
+
+        Args:
+            profundidade (int): Quantas operações são guardadas em cada pilha. As mais
+                antigas são descartadas quando o limite é atingido.
+        """
+
+        self._desfazer: deque = deque(maxlen=profundidade)
+        self._refazer: deque = deque(maxlen=profundidade)
+
+    def registrar(self, operacao: Operacao):
+        """Registra uma nova operação. Uma ação nova invalida tudo o que poderia ser refeito."""
+
+        self._desfazer.append(operacao)
+        self._refazer.clear()
+
+    def retirar_para_desfazer(self) -> Optional[Operacao]:
+        """Retira e retorna a última operação feita, ou None se não houver nenhuma."""
+
+        return self._desfazer.pop() if self._desfazer else None
+
+    def retirar_para_refazer(self) -> Optional[Operacao]:
+        """Retira e retorna a última operação desfeita, ou None se não houver nenhuma."""
+
+        return self._refazer.pop() if self._refazer else None
+
+    def marcar_desfeita(self, operacao: Operacao):
+        """Guarda uma operação que acabou de ser desfeita para que possa ser refeita."""
+
+        self._refazer.append(operacao)
+
+    def marcar_refeita(self, operacao: Operacao):
+        """Guarda uma operação que acabou de ser refeita para que possa ser desfeita de novo."""
+
+        self._desfazer.append(operacao)
+
+    def limpar(self):
+        """Descarta todo o histórico."""
+
+        self._desfazer.clear()
+        self._refazer.clear()
+
+    def pode_desfazer(self) -> bool:
+        """Indica se há alguma operação para desfazer."""
+
+        return bool(self._desfazer)
+
+    def pode_refazer(self) -> bool:
+        """Indica se há alguma operação para refazer."""
+
+        return bool(self._refazer)
@@ -0,0 +1,255 @@
+import re
+from typing import Dict, Iterable, List, Set, Union
+
+# Quantidade de tarefas a partir da qual uma tag deixa de guardar os IDs em um
+# conjunto e passa a usar um bitmap. Tags raras (a maioria, com distribuição de
+# Zipf) ficam compactas; tags frequentes ganham operações de conjunto rápidas.
+LIMITE_BITMAP = 2048
+
+# Palavras reservadas das expressões de consulta (sem diferenciar maiúsculas)
+_OPERADORES = {"AND", "OR", "NOT"}
+
+# Parênteses, tags entre aspas (que podem ter espaços) e tags simples
+_TOKENS = re.compile(r'\(|\)|"[^"]*"|[^\s()"]+')
+
+# Posições dos bits ligados em cada valor possível de um byte
+_BITS_POR_BYTE = [tuple(bit for bit in range(8) if valor >> bit & 1) for valor in range(256)]
+
+
+def normalizar_tag(tag: str) -> str:
+    """Normaliza uma tag para comparação: sem espaços nas pontas e em minúsculas."""
+
+    return tag.strip().lower()
+
+
+def _ligar_bit(bitmap: bytearray, posicao: int):
+    """Liga um bit do bitmap, aumentando-o se necessário."""
+
+    indice_byte = posicao >> 3
+    if indice_byte >= len(bitmap):
+        bitmap.extend(bytes(indice_byte - len(bitmap) + 1))
+    bitmap[indice_byte] |= 1 << (posicao & 7)
+
+
+def _desligar_bit(bitmap: bytearray, posicao: int):
+    """Desliga um bit do bitmap, se ele existir."""
+
+    indice_byte = posicao >> 3
+    if indice_byte < len(bitmap):
+        bitmap[indice_byte] &= ~(1 << (posicao & 7)) & 0xFF
+
+
+def ids_do_bitmap(bitmap: int) -> List[int]:
+    """Retorna, em ordem crescente, as posições dos bits ligados de um bitmap inteiro."""
+
+    ids = []
+    dados = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for indice_byte, valor in enumerate(dados):
+        if valor:
+            base = indice_byte << 3
+            ids.extend(base + bit for bit in _BITS_POR_BYTE[valor])
+    return ids
+
+
+class IndiceTags:
+    """
+    Índice invertido das tags das tarefas.
+
+    Cada tag é codificada como um número inteiro e guarda os IDs das tarefas que a
+    possuem: em um conjunto, enquanto a tag é rara, ou em um bitmap (um bit por ID),
+    quando passa a ser frequente. As consultas combinam as tags com AND, OR e NOT
+    usando operações bit a bit sobre inteiros do Python.
+    """
+
+    def __init__(self):
+        """Inicializa um índice vazio."""
+
+        self._codigos: Dict[str, int] = {}
+        self._nomes: List[str] = []
+        # Para cada código, um conjunto de IDs (tag rara) ou um bitmap (tag frequente)
+        self._ids: List[Union[Set[int], bytearray]] = []
+        self._contagens: List[int] = []
+        # Bitmap de todas as tarefas indexadas, usado pelo NOT
+        self._universo = bytearray()
+
+    def _codigo(self, tag: str) -> int:
+        """Retorna o código de uma tag normalizada, criando-o se ainda não existir."""
+
+        codigo = self._codigos.get(tag)
+        if codigo is None:
+            codigo = self._codigos[tag] = len(self._nomes)
+            self._nomes.append(tag)
+            self._ids.append(set())
+            self._contagens.append(0)
+        return codigo
+
+    def adicionar(self, tarefa_id: int, tags: Iterable[str]):
+        """Indexa uma tarefa com as suas tags."""
+
+        _ligar_bit(self._universo, tarefa_id)
+        for tag in {normalizar_tag(tag) for tag in tags}:
+            if not tag:
+                continue
+            codigo = self._codigo(tag)
+            ids = self._ids[codigo]
+            if isinstance(ids, set):
+                if tarefa_id in ids:
+                    continue
+                ids.add(tarefa_id)
+                # A tag ficou frequente: o conjunto é convertido em bitmap
+                if len(ids) > LIMITE_BITMAP:
+                    bitmap = bytearray()
+                    for outro_id in ids:
+                        _ligar_bit(bitmap, outro_id)
+                    self._ids[codigo] = bitmap
+            else:
+                indice_byte = tarefa_id >> 3
+                if indice_byte < len(ids) and ids[indice_byte] >> (tarefa_id & 7) & 1:
+                    continue
+                _ligar_bit(ids, tarefa_id)
+            self._contagens[codigo] += 1
+
+    def remover(self, tarefa_id: int, tags: Iterable[str]):
+        """Retira uma tarefa do índice. As tags devem ser as mesmas usadas ao adicioná-la."""
+
+        _desligar_bit(self._universo, tarefa_id)
+        for tag in {normalizar_tag(tag) for tag in tags}:
+            codigo = self._codigos.get(tag)
+            if codigo is None:
+                continue
+            ids = self._ids[codigo]
+            if isinstance(ids, set):
+                if tarefa_id not in ids:
+                    continue
+                ids.discard(tarefa_id)
+            else:
+                indice_byte = tarefa_id >> 3
+                if indice_byte >= len(ids) or not ids[indice_byte] >> (tarefa_id & 7) & 1:
+                    continue
+                _desligar_bit(ids, tarefa_id)
+            self._contagens[codigo] -= 1
+
+    def contagem(self, tag: str) -> int:
+        """Retorna quantas tarefas possuem a tag, em tempo constante."""
+
+        codigo = self._codigos.get(normalizar_tag(tag))
+        return self._contagens[codigo] if codigo is not None else 0
+
+    def tags(self) -> Dict[str, int]:
+        """Retorna todas as tags em uso e a quantidade de tarefas de cada uma."""
+
+        return {nome: contagem for nome, contagem in zip(self._nomes, self._contagens) if contagem > 0}
+
+    def bitmap(self, tag: str) -> int:
+        """Retorna o bitmap (como inteiro) das tarefas que possuem a tag."""
+
+        codigo = self._codigos.get(normalizar_tag(tag))
+        if codigo is None:
+            return 0
+        ids = self._ids[codigo]
+        if isinstance(ids, set):
+            bitmap = bytearray((max(ids) >> 3) + 1) if ids else bytearray()
+            for tarefa_id in ids:
+                bitmap[tarefa_id >> 3] |= 1 << (tarefa_id & 7)
+            return int.from_bytes(bitmap, "little")
+        return int.from_bytes(ids, "little")
+
+    def universo(self) -> int:
+        """Retorna o bitmap (como inteiro) de todas as tarefas indexadas."""
+
+        return int.from_bytes(self._universo, "little")
+
+    def avaliar(self, expressao: str) -> int:
+        """
+        Avalia uma expressão de tags e retorna o bitmap das tarefas que a satisfazem.
+
+        A expressão aceita tags, os operadores AND, OR e NOT e parênteses. Tags lado a
+        lado equivalem a AND, e NOT vale tanto sozinho quanto depois de outra tag, como
+        em `urgente AND cliente-x NOT bloqueado`. AND tem precedência sobre OR. Tags
+        com espaços ou com o nome de um operador podem ser escritas entre aspas.
+
+        Raises:
+            ValueError: Se a expressão for vazia ou mal formada.
+        """
+
+        tokens = _TOKENS.findall(expressao)
+        if not tokens:
+            raise ValueError("A expressão de tags está vazia.")
+
+        avaliador = _Avaliador(self, tokens)
+        resultado = avaliador.expressao()
+        if avaliador.posicao < len(tokens):
+            raise ValueError(f"Expressão de tags inválida perto de '{tokens[avaliador.posicao]}'.")
+        return resultado
+
+    def consultar(self, expressao: str) -> List[int]:
+        """Retorna, em ordem crescente, os IDs das tarefas que satisfazem a expressão."""
+
+        return ids_do_bitmap(self.avaliar(expressao))
+
+    def contar(self, expressao: str) -> int:
+        """Retorna quantas tarefas satisfazem a expressão."""
+
+        return self.avaliar(expressao).bit_count()
+
+
+class _Avaliador:
+    """Analisador descendente recursivo das expressões de tags."""
+
+    def __init__(self, indice: IndiceTags, tokens: List[str]):
+        self.indice = indice
+        self.tokens = tokens
+        self.posicao = 0
+
+    def _atual(self) -> str:
+        return self.tokens[self.posicao] if self.posicao < len(self.tokens) else ""
+
+    def _operador(self) -> str:
+        atual = self._atual().upper()
+        return atual if atual in _OPERADORES else ""
+
+    def expressao(self) -> int:
+        # expressao := termo ('OR' termo)*
+        resultado = self.termo()
+        while self._operador() == "OR":
+            self.posicao += 1
+            resultado |= self.termo()
+        return resultado
+
+    def termo(self) -> int:
+        # termo := fator (['AND'] fator)*
+        resultado = self.fator()
+        while self.posicao < len(self.tokens) and self._atual() != ")" and self._operador() != "OR":
+            if self._operador() == "AND":
+                self.posicao += 1
+            resultado &= self.fator()
+        return resultado
+
+    def fator(self) -> int:
+        # fator := 'NOT' fator | '(' expressao ')' | tag
+        atual = self._atual()
+        if not atual:
+            raise ValueError("Expressão de tags incompleta.")
+
+        if self._operador() == "NOT":
+            self.posicao += 1
+            return self.indice.universo() & ~self.fator()
+
+        if self._operador():
+            raise ValueError(f"Operador '{atual}' fora de lugar na expressão de tags.")
+
+        if atual == "(":
+            self.posicao += 1
+            resultado = self.expressao()
+            if self._atual() != ")":
+                raise ValueError("Parêntese não fechado na expressão de tags.")
+            self.posicao += 1
+            return resultado
+
+        if atual == ")":
+            raise ValueError("Parêntese fechado sem ter sido aberto na expressão de tags.")
+
+        self.posicao += 1
+        if atual.startswith('"'):
+            atual = atual[1:-1]
+        return self.indice.bitmap(atual)
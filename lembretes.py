@@ -0,0 +1,318 @@
+import asyncio
+import heapq
+import inspect
+import itertools
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from models import Tarefa
+import eventos
+import persistence
+
+# Variável de ambiente que liga os lembretes no programa principal. O valor é a
+# antecedência, em dias, com que uma tarefa é lembrada (ex: "1" lembra na véspera).
+VARIAVEL_AMBIENTE = "GERENCIADOR_LEMBRETES_DIAS"
+
+# Horário do dia em que os lembretes são disparados
+HORA_PADRAO = time(9, 0)
+
+# Arquivo, ao lado do arquivo de dados, com as tarefas já lembradas
+SUFIXO_ESTADO = ".lembretes.json"
+
+logger = logging.getLogger(__name__)
+
+
+def notificar(tarefa: Tarefa):
+    """Notificação local padrão: exibe o lembrete no terminal, pelo logging."""
+
+    situacao = "venceu" if tarefa.data_termino < date.today() else "vence"
+    logger.info("Lembrete: a tarefa '%s' (ID: %d) %s em %s.",
+                tarefa.titulo, tarefa.id, situacao, tarefa.data_termino.strftime('%d/%m/%Y'))
+
+
+def caminho_para(caminho_dados: str) -> str:
+    """Retorna o caminho do arquivo com as tarefas já lembradas de um arquivo de dados."""
+
+    return os.path.splitext(caminho_dados)[0] + SUFIXO_ESTADO
+
+
+class AgendadorLembretes:
+    """
+    Dispara um lembrete para cada tarefa pendente que se aproxima da data de término.
+
+    Os lembretes ficam em um heap ordenado pelo momento do disparo. O agendador assina
+    os eventos do `TaskManager` e, ao fim de cada ação, atualiza o heap com as tarefas
+    que ela criou, editou, concluiu, avançou pela recorrência ou removeu, sem percorrer
+    as demais. Como os eventos só chegam com a ação concluída, um estado intermediário
+    (ex: no meio de uma alteração em cascata) nunca é agendado. Uma entrada que ficou
+    desatualizada não é procurada no heap: ela é apenas ignorada quando chega ao topo.
+    Assim, cada verificação custa o número de lembretes vencidos (vezes log n), e não o
+    número de tarefas.
+    """
+
+    def __init__(self,
+                 gerenciador,
+                 ao_disparar: Callable[[Tarefa], Any] = notificar,
+                 antecedencia: timedelta = timedelta(days=1),
+                 hora: time = HORA_PADRAO,
+                 caminho_estado: Optional[str] = None):
+        """
+        Cria o agendador, agenda as tarefas atuais e assina os eventos do gerenciador.
+
+        Args:
+            gerenciador (TaskManager): O gerenciador cujas tarefas serão lembradas.
+            ao_disparar (Callable[[Tarefa], Any]): Chamada com a tarefa quando o lembrete
+                dispara. Pode ser uma função assíncrona. Padrão é `notificar`.
+            antecedencia (timedelta): Quanto tempo antes da data de término o lembrete dispara.
+            hora (time): Horário, no dia de término, a partir do qual a antecedência é contada.
+            caminho_estado (Optional[str]): Arquivo onde as tarefas já lembradas são
+                guardadas (ver `caminho_para`), para que não sejam lembradas de novo a cada
+                vez que o programa é aberto. None guarda só na memória.
+        """
+
+        self._gerenciador = gerenciador
+        self._caminho_estado = caminho_estado
+        self._ao_disparar = ao_disparar
+        self._antecedencia = antecedencia
+        self._hora = hora
+        # Heap de (momento do disparo, desempate, ID da tarefa)
+        self._heap: List[Tuple[datetime, int, int]] = []
+        self._contador = itertools.count()
+        # Lembrete válido de cada tarefa: (momento, desempate, tarefa). Uma entrada do
+        # heap que não corresponde à daqui está desatualizada e é descartada.
+        self._agendados: Dict[int, Tuple[datetime, int, Tarefa]] = {}
+        # Data de término já lembrada de cada tarefa pendente, para que editar outro campo
+        # de uma tarefa já lembrada (ou reabrir o programa) não dispare o lembrete de novo.
+        # Uma tarefa sai daqui ao ser concluída ou removida.
+        self._lembradas: Dict[int, date] = {}
+        # As alterações chegam pela thread do gerenciador e os disparos pela do loop
+        self._trava = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._acordar: Optional[asyncio.Event] = None
+        self.disparados = 0
+
+        lembradas = self._carregar_lembradas()
+        for tarefa in gerenciador.get_todas_tarefas():
+            # Só continua lembrada a tarefa que ainda está pendente e com a mesma data
+            if lembradas.get(tarefa.id) == tarefa.data_termino and not tarefa.concluida:
+                self._lembradas[tarefa.id] = tarefa.data_termino
+            self.adicionar(tarefa)
+        if len(self._lembradas) != len(lembradas):
+            self._gravar_lembradas()
+        gerenciador.assinar_eventos(self._receber_eventos, em_lotes=True)
+
+    def momento_disparo(self, tarefa: Tarefa) -> Optional[datetime]:
+        """Retorna quando a tarefa deve ser lembrada, ou None se ela não tem lembrete."""
+
+        if tarefa.concluida or tarefa.data_termino is None:
+            return None
+        return datetime.combine(tarefa.data_termino, self._hora) - self._antecedencia
+
+    # Tarefas já lembradas, guardadas entre uma execução e outra
+
+    def _carregar_lembradas(self) -> Dict[int, date]:
+        """Lê o arquivo das tarefas já lembradas. Um arquivo ausente ou ilegível conta como vazio."""
+
+        if self._caminho_estado is None or not os.path.exists(self._caminho_estado):
+            return {}
+        try:
+            with open(self._caminho_estado, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+            return {int(tarefa_id): date.fromisoformat(data) for tarefa_id, data in dados["lembradas"].items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as error:
+            logger.warning("Não foi possível ler as tarefas já lembradas em '%s': %s", self._caminho_estado, error)
+            return {}
+
+    def _gravar_lembradas(self):
+        """Grava as tarefas já lembradas. Deve ser chamado com a trava, ou antes de o agendador ser usado."""
+
+        if self._caminho_estado is None:
+            return
+        temporario = self._caminho_estado + ".tmp"
+        try:
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({"lembradas": {str(tarefa_id): data.isoformat()
+                                         for tarefa_id, data in self._lembradas.items()}}, f)
+            persistence.substituir_arquivo(temporario, self._caminho_estado, duravel=False, backups=0)
+        except OSError as error:
+            logger.error("Erro ao gravar as tarefas já lembradas: %s", error)
+
+    # Eventos do gerenciador: recebidos ao fim de cada ação
+
+    def _receber_eventos(self, eventos_acao: List[eventos.Evento]):
+        """Atualiza os lembretes das tarefas afetadas por uma ação, pelo estado em que ela as deixou."""
+
+        afetadas = set()
+        for evento in eventos_acao:
+            if evento.tipo in (eventos.TAREFA_CRIADA, eventos.TAREFA_ALTERADA,
+                               eventos.TAREFA_CONCLUIDA, eventos.TAREFA_REMOVIDA):
+                afetadas.add(evento.objeto_id)
+            elif evento.tipo == eventos.LISTA_REMOVIDA:
+                afetadas.update(evento.afetadas)
+
+        esquecidas = False
+        for tarefa_id in afetadas:
+            tarefa = self._gerenciador.buscar_tarefa_por_id(tarefa_id)
+            self.remover(tarefa_id)
+            if tarefa is None or tarefa.concluida:
+                # Concluída ou removida: se voltar a ficar pendente, é lembrada de novo
+                with self._trava:
+                    if self._lembradas.pop(tarefa_id, None) is not None:
+                        esquecidas = True
+                continue
+            self.adicionar(tarefa)
+
+        if esquecidas:
+            with self._trava:
+                self._gravar_lembradas()
+
+    def adicionar(self, tarefa: Tarefa):
+        """Agenda o lembrete de uma tarefa nova ou recém-alterada."""
+
+        momento = self.momento_disparo(tarefa)
+        if momento is None:
+            return
+
+        with self._trava:
+            lembrada = self._lembradas.get(tarefa.id)
+            if lembrada == tarefa.data_termino:
+                return
+            if lembrada is not None:
+                # A data mudou (ex: a recorrência avançou), então há um novo prazo a lembrar
+                del self._lembradas[tarefa.id]
+                self._gravar_lembradas()
+
+            desempate = next(self._contador)
+            self._agendados[tarefa.id] = (momento, desempate, tarefa)
+            heapq.heappush(self._heap, (momento, desempate, tarefa.id))
+            # Entradas desatualizadas longe do topo não são descartadas no disparo, então o
+            # heap é refeito quando elas passam a ser a maioria
+            if len(self._heap) > 2 * len(self._agendados) + 64:
+                self._heap = [(agendado[0], agendado[1], tarefa_id)
+                              for tarefa_id, agendado in self._agendados.items()]
+                heapq.heapify(self._heap)
+            # Só é preciso acordar o loop se o novo lembrete ficou antes do que ele aguarda
+            eh_o_proximo = self._heap[0][1] == desempate
+
+        if eh_o_proximo:
+            self._avisar_loop()
+
+    def remover(self, tarefa_id: int):
+        """Cancela o lembrete agendado de uma tarefa."""
+
+        with self._trava:
+            self._agendados.pop(tarefa_id, None)
+
+    # Disparo
+
+    def _descartar_desatualizadas(self):
+        """Tira do topo do heap as entradas que não correspondem mais a um lembrete válido."""
+
+        while self._heap:
+            _, desempate, tarefa_id = self._heap[0]
+            agendado = self._agendados.get(tarefa_id)
+            if agendado is not None and agendado[1] == desempate:
+                return
+            heapq.heappop(self._heap)
+
+    def proximo_disparo(self) -> Optional[datetime]:
+        """Retorna o momento do próximo lembrete, ou None se não houver nenhum."""
+
+        with self._trava:
+            self._descartar_desatualizadas()
+            return self._heap[0][0] if self._heap else None
+
+    def retirar_vencidos(self, agora: Optional[datetime] = None) -> List[Tarefa]:
+        """Retira e retorna as tarefas cujo lembrete já deveria ter disparado."""
+
+        agora = agora or datetime.now()
+        vencidas = []
+        with self._trava:
+            self._descartar_desatualizadas()
+            while self._heap and self._heap[0][0] <= agora:
+                _, _, tarefa_id = heapq.heappop(self._heap)
+                _, _, tarefa = self._agendados.pop(tarefa_id)
+                self._lembradas[tarefa_id] = tarefa.data_termino
+                vencidas.append(tarefa)
+                self._descartar_desatualizadas()
+            if vencidas:
+                self._gravar_lembradas()
+        return vencidas
+
+    async def disparar_vencidos(self, agora: Optional[datetime] = None) -> int:
+        """Chama `ao_disparar` para cada lembrete vencido e retorna quantos foram disparados."""
+
+        vencidas = self.retirar_vencidos(agora)
+        for tarefa in vencidas:
+            try:
+                resultado = self._ao_disparar(tarefa)
+                if inspect.isawaitable(resultado):
+                    await resultado
+            except Exception as error:
+                logger.exception("Erro ao disparar o lembrete da tarefa %d: %s", tarefa.id, error)
+        self.disparados += len(vencidas)
+        return len(vencidas)
+
+    def _avisar_loop(self):
+        """Acorda o loop, de qualquer thread, para que ele recalcule a espera."""
+
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._acordar.set)
+
+    async def executar(self):
+        """
+        Roda o agendador no loop do asyncio até ser cancelado.
+
+        O loop dorme até o próximo lembrete, ou até um lembrete mais próximo ser agendado.
+        """
+
+        self._loop = asyncio.get_running_loop()
+        self._acordar = asyncio.Event()
+        try:
+            while True:
+                await self.disparar_vencidos()
+                proximo = self.proximo_disparo()
+                espera = None if proximo is None else max((proximo - datetime.now()).total_seconds(), 0)
+                self._acordar.clear()
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._loop = None
+
+    def __len__(self) -> int:
+        """Quantidade de lembretes agendados."""
+
+        return len(self._agendados)
+
+
+def iniciar_em_segundo_plano(agendador: AgendadorLembretes) -> threading.Thread:
+    """Roda o agendador em um loop do asyncio, em uma thread que termina junto com o programa."""
+
+    thread = threading.Thread(target=asyncio.run, args=(agendador.executar(),),
+                              name="lembretes", daemon=True)
+    thread.start()
+    return thread
+
+
+def iniciar_pelo_ambiente(gerenciador) -> Optional[AgendadorLembretes]:
+    """Liga os lembretes se a variável GERENCIADOR_LEMBRETES_DIAS estiver definida."""
+
+    dias = os.environ.get(VARIAVEL_AMBIENTE)
+    if not dias:
+        return None
+    try:
+        antecedencia = timedelta(days=float(dias))
+    except ValueError:
+        print(f"Aviso: valor inválido em {VARIAVEL_AMBIENTE}: '{dias}'. Lembretes desligados.")
+        return None
+
+    agendador = AgendadorLembretes(gerenciador, antecedencia=antecedencia,
+                                   caminho_estado=caminho_para(gerenciador.get_caminho()))
+    iniciar_em_segundo_plano(agendador)
+    return agendador
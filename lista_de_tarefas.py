@@ -1,7 +1,15 @@
+import logging
+import sys
 from datetime import date, timedelta
-from typing import List
+from typing import List, Optional, Tuple
+from consultas import ordenar_tarefas
 from manager import TaskManager
 from models import Tarefa
+import consultas
+import lembretes
+import metricas
+import operacoes_lentas
+import sessoes
 import ui
 
 
@@ -14,12 +22,10 @@ def visualizar_tarefas(gerenciador: TaskManager):
         if contexto_escolha == '4':
             break
 
-        tarefas_base = []
         titulo_cabecalho = "Tarefas"
-        todas_as_tarefas = gerenciador.get_todas_tarefas()
 
         if contexto_escolha == '1': # Todas
-            tarefas_base = todas_as_tarefas
+            contexto, valor = consultas.CONTEXTO_TODAS, None
             titulo_cabecalho = "Todas as Tarefas"
 
         elif contexto_escolha == '2': # Por Lista
@@ -32,7 +38,7 @@ def visualizar_tarefas(gerenciador: TaskManager):
                 lista_id = int(input("\nDigite o ID da lista desejada: "))
                 lista_obj = gerenciador.buscar_lista_por_id(lista_id)
                 if lista_obj:
-                    tarefas_base = [t for t in todas_as_tarefas if t.lista_id == lista_id]
+                    contexto, valor = consultas.CONTEXTO_LISTA, lista_id
                     titulo_cabecalho = f"Tarefas da Lista: {lista_obj.nome}"
                 else:
                     input("\nID não encontrado. Presssione ENTER para continuar...")
@@ -42,56 +48,45 @@ def visualizar_tarefas(gerenciador: TaskManager):
                 continue
 
         elif contexto_escolha == '3': # Por Tag
-            tag_escolhida = input("Digite a tag que deseja filtrar: ").lower()
+            expressao = ui.obter_expressao_tags(gerenciador)
 
-            if not tag_escolhida:
+            if not expressao:
                 input("\nTag não informada. Pressione ENTER para continuar...")
                 continue
 
-            tarefas_base = [t for t in todas_as_tarefas if tag_escolhida in [tag.lower() for tag in t.tags]]
-            titulo_cabecalho = f"Tarefas com a Tag: {tag_escolhida}"
+            # Valida a expressão antes de seguir para o filtro e a ordenação
+            try:
+                gerenciador.contar_tarefas_por_tags(expressao)
+            except ValueError as erro:
+                input(f"\nErro: {erro} Pressione ENTER para continuar...")
+                continue
+            contexto, valor = consultas.CONTEXTO_TAGS, expressao
+            titulo_cabecalho = f"Tarefas com as Tags: {expressao}"
 
         else:
             print("Opção de contexto inválida.")
             continue
 
         filtro_escolha = ui.menu_filtro_secundario()
-        tarefas_filtradas = []
-        hoje = date.today()
-
-        if filtro_escolha == '1':
-            tarefas_filtradas = tarefas_base
-
-        elif filtro_escolha == '2':
-            tarefas_filtradas = [t for t in tarefas_base if t.data_termino and t.data_termino <= hoje]
-
-        elif filtro_escolha == '3':
-            limite = hoje + timedelta(days=7)
-            tarefas_filtradas = [t for t in tarefas_base if t.data_termino and t.data_termino <= limite]
-
-        elif filtro_escolha == '4':
-            tarefas_filtradas = [t for t in tarefas_base if not t.concluida]
-
-        elif filtro_escolha == '5':
-            tarefas_filtradas = [t for t in tarefas_base if t.concluida]
-
-        else:
-            print("Opção de filtro inválida.")
-            continue
 
         # Ordenação
         ordenacao_escolha = ui.menu_escolha_ordenacao()
+        # Padrão é 1 (data) ou qualquer outra coisa
+        ordenacao = consultas.ORDENACAO_PRIORIDADE if ordenacao_escolha == '2' else consultas.ORDENACAO_DATA
 
-        if ordenacao_escolha == '2':
-            tarefas_finais = ordenar_tarefas(tarefas_filtradas, "PRIORIDADE")
+        # O gerenciador reaproveita o resultado se as tarefas da consulta não mudaram
+        tarefas_finais = gerenciador.consultar_tarefas(contexto, filtro_escolha, ordenacao, valor)
 
-        else: # Padrão é 1 ou qualquer outra coisa
-            tarefas_finais = ordenar_tarefas(tarefas_filtradas, "DATA")
+        if tarefas_finais is None:
+            print("Opção de filtro inválida.")
+            continue
 
-        # Exibição final
+        # Exibição final. Nos filtros por data, cada ocorrência das séries recorrentes
+        # aparece na sua data; as ações continuam sobre as tarefas (as séries)
         ui.clear_screen()
         ui.imprimir_cabecalho(titulo_cabecalho)
-        ui.imprimir_tarefas(tarefas_finais, gerenciador)
+        ocorrencias = gerenciador.consultar_ocorrencias(contexto, filtro_escolha, ordenacao, valor)
+        imprimir_resultado(gerenciador, tarefas_finais, ocorrencias)
 
         if not tarefas_finais:
             ui.pausar_e_limpar()
@@ -99,7 +94,7 @@ def visualizar_tarefas(gerenciador: TaskManager):
 
         if filtro_escolha == '4': # Apenas pendentes
             escolha_acao = ui.menu_acoes_pendentes()
-            if escolha_acao == '4':
+            if escolha_acao == '5':
                 continue
 
             if escolha_acao == '1': # Concluir
@@ -121,9 +116,12 @@ def visualizar_tarefas(gerenciador: TaskManager):
                 if tarefa_id and gerenciador.remover_tarefa(tarefa_id):
                     print("Tarefa removida!")
 
+            elif escolha_acao == '4': # Todas as exibidas
+                aplicar_acao_em_massa(gerenciador, tarefas_finais)
+
         elif filtro_escolha == '5': # Apenas concluídas
             escolha_acao = ui.menu_acoes_concluidas()
-            if escolha_acao == '4':
+            if escolha_acao == '6':
                 continue
 
             if escolha_acao == '1': # Desmarcar
@@ -142,9 +140,15 @@ def visualizar_tarefas(gerenciador: TaskManager):
                     num = gerenciador.remover_tarefas_concluidas()
                     print(f"{num} tarefas removidas.")
 
+            elif escolha_acao == '4': # Todas as exibidas
+                aplicar_acao_em_massa(gerenciador, tarefas_finais)
+
+            elif escolha_acao == '5': # Arquivar
+                arquivar_concluidas(gerenciador)
+
         else: # Filtros mistos (1, 2, 3)
             escolha_acao = ui.menu_acoes_gerais()
-            if escolha_acao == '5':
+            if escolha_acao == '6':
                 continue
 
             if escolha_acao == '1': # Concluir
@@ -170,26 +174,66 @@ def visualizar_tarefas(gerenciador: TaskManager):
                 if tarefa_id:
                     gerenciador.remover_tarefa(tarefa_id)
 
+            elif escolha_acao == '5': # Todas as exibidas
+                aplicar_acao_em_massa(gerenciador, tarefas_finais)
+
         # Pausa antes de recarregar o loop de filtros
         ui.pausar_e_limpar()
 
 
-def ordenar_tarefas(tarefas: List[Tarefa], criterio: str) -> List[Tarefa]:
-    """Ordena uma lista de tarefas pelo criterio especificado."""
+def imprimir_resultado(gerenciador: TaskManager, tarefas: List[Tarefa],
+                       ocorrencias: List[Tuple[Tarefa, Optional[date]]]):
+    """
+    Exibe o resultado de uma consulta ou visão.
+
+    Se alguma série recorrente vence mais de uma vez no período, cada ocorrência ganha a
+    sua linha; senão, as tarefas são exibidas com as subtarefas recuadas sob a principal.
+    """
+
+    if len(ocorrencias) > len(tarefas):
+        ui.imprimir_ocorrencias(ocorrencias, gerenciador)
+    else:
+        ui.imprimir_tarefas(tarefas, gerenciador)
+
+
+def aplicar_acao_em_massa(gerenciador: TaskManager, tarefas: List[Tarefa]):
+    """Aplica uma única ação a todas as tarefas exibidas, com um só salvamento."""
 
-    prioridade_map = {"alta": 0, "media": 1, "baixa": 2, "nenhuma": 3}
+    tarefa_ids = [tarefa.id for tarefa in tarefas]
+    escolha = ui.menu_acoes_em_massa(len(tarefa_ids))
+    resultados = {}
 
-    def sort_key(tarefa: Tarefa):
-        data_key = tarefa.data_termino if tarefa.data_termino is not None else date.max
-        prioridade_key = prioridade_map.get(tarefa.prioridade.lower(), 4)
-        lista_key = tarefa.lista_id
+    if escolha == '1': # Concluir
+        resultados = gerenciador.concluir_tarefas(tarefa_ids)
 
-        if criterio == "PRIORIDADE":
-            return (prioridade_key, data_key, lista_key)
+    elif escolha == '2': # Desmarcar
+        resultados = gerenciador.desmarcar_tarefas(tarefa_ids)
 
-        return (data_key, prioridade_key, lista_key)
+    elif escolha == '3': # Editar
+        novos_dados = ui.obter_dados_edicao_em_massa()
+        if not novos_dados:
+            print("\nNenhuma alteração foi feita.")
+            return
+        resultados = gerenciador.editar_tarefas(tarefa_ids, novos_dados)
+
+    elif escolha == '4': # Mover
+        lista_id = ui.obter_id_lista_destino(gerenciador)
+        if lista_id is None:
+            return
+        resultados = gerenciador.mover_tarefas(tarefa_ids, lista_id)
+
+    elif escolha == '5': # Remover
+        confirmacao = input(f"Remover as {len(tarefa_ids)} tarefas exibidas? (s/n): ").lower()
+        if confirmacao != 's':
+            print("Remoção cancelada.")
+            return
+        resultados = gerenciador.remover_tarefas(tarefa_ids)
+
+    else: # Voltar ou opção inválida
+        return
 
-    return sorted(tarefas, key=sort_key)
+    num_sucesso = sum(1 for sucesso in resultados.values() if sucesso)
+    print(f"\nAção aplicada a {num_sucesso} de {len(tarefa_ids)} tarefas.")
 
 
 def gerenciar_tarefas_pendentes(gerenciador: TaskManager):
@@ -207,7 +251,11 @@ def gerenciar_tarefas_pendentes(gerenciador: TaskManager):
     while True:
         escolha = ui.menu_acoes_pendentes()
 
-        if escolha == '4': # Voltar
+        if escolha == '5': # Voltar
+            break
+
+        if escolha == '4': # Todas as exibidas
+            aplicar_acao_em_massa(gerenciador, tarefas_pendentes_ordenadas)
             break
 
         acao_str = ""
@@ -264,7 +312,10 @@ def gerenciar_tarefas_concluidas(gerenciador: TaskManager):
 
     escolha_acao = ui.menu_acoes_concluidas()
 
-    if escolha_acao == '1': # Desmarcar
+    if escolha_acao == '4': # Todas as exibidas
+        aplicar_acao_em_massa(gerenciador, tarefas_concluidas_ordenadas)
+
+    elif escolha_acao == '1': # Desmarcar
         tarefa_id = ui.obter_id_para_acao("desmarcar")
         if tarefa_id:
             if gerenciador.desmarcar_tarefa(tarefa_id):
@@ -288,6 +339,9 @@ def gerenciar_tarefas_concluidas(gerenciador: TaskManager):
         else:
             print("Operação cancelada.")
 
+    elif escolha_acao == '5': # Arquivar
+        arquivar_concluidas(gerenciador)
+
     # Pausa para o usuário ver o resultado antes de voltar ao menu anterior
     ui.pausar_e_limpar()
 
@@ -306,7 +360,11 @@ def gerenciar_todas_as_tarefas(gerenciador: TaskManager):
 
     while True:
         escolha = ui.menu_acoes_gerais()
-        if escolha == '5':
+        if escolha == '6':
+            break
+
+        if escolha == '5': # Todas as exibidas
+            aplicar_acao_em_massa(gerenciador, todas_as_tarefas_ordenadas)
             break
 
         acao_str = ""
@@ -464,6 +522,119 @@ def gerenciar_listas(gerenciador: TaskManager):
                 print("ID inválido.")
 
 
+def gerenciar_visoes_salvas(gerenciador: TaskManager):
+    """Lógica para o submenu das visões salvas."""
+
+    while True:
+        ui.imprimir_cabecalho("Visões Salvas")
+        visoes_salvas = gerenciador.get_visoes_salvas()
+        print("Visões existentes:")
+
+        if not visoes_salvas:
+            print("  Nenhuma visão salva.")
+        for visao in visoes_salvas:
+            print(f"  {visao.nome}")
+
+        print("\nOpções:")
+        print("1. Abrir uma visão")
+        print("2. Criar nova visão")
+        print("3. Remover uma visão")
+        print("4. Voltar")
+        escolha = input("\nEscolha uma opção: ")
+
+        if escolha == '4':
+            break
+
+        if escolha == '1':
+            nome = input("Digite o nome da visão: ").strip()
+            tarefas = gerenciador.abrir_visao(nome)
+            if tarefas is None:
+                print("Erro: Visão não encontrada.")
+                continue
+
+            ui.clear_screen()
+            ui.imprimir_cabecalho(f"Visão: {nome}")
+            imprimir_resultado(gerenciador, tarefas, gerenciador.abrir_visao_ocorrencias(nome))
+            if tarefas and input("\nAplicar uma ação a todas as tarefas exibidas? (s/n): ").lower() == 's':
+                aplicar_acao_em_massa(gerenciador, tarefas)
+            ui.pausar_e_limpar()
+
+        elif escolha == '2':
+            visao = ui.obter_dados_visao(gerenciador)
+            if visao and gerenciador.salvar_visao(visao):
+                print(f"Visão '{visao.nome}' salva com sucesso.")
+
+        elif escolha == '3':
+            nome = input("Digite o nome da visão a ser removida: ").strip()
+            if gerenciador.remover_visao(nome):
+                print("Visão removida com sucesso.")
+            else:
+                print("Erro: Visão não encontrada.")
+
+
+def mostrar_calendario(gerenciador: TaskManager):
+    """Lógica da tela do calendário: navega entre os meses e as listas."""
+
+    mes = date.today().replace(day=1)
+    lista_id = None
+    while True:
+        ui.clear_screen()
+        ui.imprimir_calendario(gerenciador, mes.year, mes.month, lista_id)
+        escolha = ui.menu_calendario()
+
+        if escolha == '5':
+            break
+
+        if escolha == '1':
+            mes = (mes - timedelta(days=1)).replace(day=1)
+        elif escolha == '2':
+            mes = (mes + timedelta(days=31)).replace(day=1)
+        elif escolha == '3':
+            print("\nListas disponíveis:")
+            print("  ID: 0 - Todas as listas")
+            for lista in gerenciador.get_todas_listas():
+                print(f"  ID: {lista.id} - {lista.nome}")
+            try:
+                novo_id = int(input("\nDigite o ID da lista: "))
+            except ValueError:
+                print("ID inválido.")
+                ui.pausar_e_limpar()
+                continue
+            if novo_id == 0:
+                lista_id = None
+            elif gerenciador.buscar_lista_por_id(novo_id):
+                lista_id = novo_id
+            else:
+                print("Erro: Lista com o ID informado não encontrada.")
+                ui.pausar_e_limpar()
+        elif escolha == '4':
+            novo_mes = ui.obter_mes()
+            if novo_mes:
+                mes = novo_mes
+            else:
+                ui.pausar_e_limpar()
+        else:
+            print("Opção inválida.")
+            ui.pausar_e_limpar()
+
+
+def arquivar_concluidas(gerenciador: TaskManager):
+    """Pergunta o número de dias e move as tarefas concluídas antigas para o arquivo morto."""
+
+    dias = ui.obter_dias_arquivamento()
+    if dias is None:
+        return
+
+    print("As tarefas arquivadas saem das visualizações, mas continuam disponíveis na busca.")
+    confirmacao = input("O arquivamento não pode ser desfeito. Continuar? (s/n): ").lower()
+    if confirmacao != 's':
+        print("Operação cancelada.")
+        return
+
+    num_arquivadas = gerenciador.arquivar_tarefas_concluidas(dias)
+    print(f"{num_arquivadas} tarefas concluídas foram arquivadas.")
+
+
 def iniciar_busca(gerenciador: TaskManager):
     """Inicia o fluxo de busca de tarefas."""
 
@@ -474,19 +645,39 @@ def iniciar_busca(gerenciador: TaskManager):
         print("A busca foi cancelada.")
         return
 
-    resultados = gerenciador.buscar_tarefas_por_termo(termo)
+    # O prefixo "re:" indica uma busca por expressão regular
+    regex = termo.startswith("re:")
+    if regex:
+        termo = termo[len("re:"):]
+
+    try:
+        resultados = gerenciador.buscar_tarefas_por_termo(termo, regex)
+    except ValueError as erro:
+        print(f"Erro: {erro}")
+        return
     resultados = ordenar_tarefas(resultados, "DATA")
 
     print("\n--- Resultados da Busca ---")
     ui.imprimir_tarefas(resultados, gerenciador)
     print("---------------------------\n")
 
+    # O arquivo morto só é lido se o usuário pedir, porque exige ler o arquivo inteiro
+    if input("Buscar também nas tarefas arquivadas? (s/n): ").lower() == 's':
+        arquivadas = ordenar_tarefas(gerenciador.buscar_tarefas_arquivadas(termo, regex), "DATA")
+        print("\n--- Tarefas Arquivadas ---")
+        ui.imprimir_tarefas(arquivadas, gerenciador)
+        print("--------------------------\n")
+
     if not resultados:
         return
 
     while True:
         escolha = ui.menu_busca_acoes()
-        if escolha == '5':
+        if escolha == '6':
+            break
+
+        if escolha == '5': # Todos os resultados
+            aplicar_acao_em_massa(gerenciador, resultados)
             break
 
         acao_str = ""
@@ -529,39 +720,96 @@ def iniciar_busca(gerenciador: TaskManager):
                 print("Erro: Tarefa não encontrada.")
 
 
-# Código principal que roda loop da aplicação.
+def main():
+    """Código principal que roda o loop da aplicação."""
 
-gerenciador = TaskManager()
+    # Exibe no terminal as mensagens de progresso e de erro da persistência
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
 
-while True:
-    ui.clear_screen()
-    escolha = ui.menu_principal()
+    # A coleta de métricas só é ligada se a variável GERENCIADOR_METRICAS estiver definida
+    metricas.ativar_pelo_ambiente()
+    # E o registro de operações lentas, se GERENCIADOR_LIMITE_LENTO_MS estiver definida
+    operacoes_lentas.configurar_pelo_ambiente()
+    # E a gravação da sessão, para reproduzi-la depois com sessoes.py, se GERENCIADOR_GRAVAR_SESSAO estiver definida
+    sessoes.gravar_pelo_ambiente()
 
-    if escolha == '1':
-        ui.clear_screen()
-        visualizar_tarefas(gerenciador)
+    try:
+        gerenciador = TaskManager()
+    except ValueError as erro:
+        # Ex: um arquivo gravado por uma versão mais nova do programa, que não deve ser sobrescrito
+        print(f"Erro: {erro}")
+        return
 
-    elif escolha == '2':
-        ui.clear_screen()
-        dados = ui.obter_dados_nova_tarefa(gerenciador)
-        if dados:
-            gerenciador.adicionar_tarefa(dados)
-            print("\nTarefa adicionada com sucesso!")
+    # Séries recorrentes atrasadas são levadas até hoje ao iniciar, em uma única passagem
+    num_avancadas = gerenciador.avancar_recorrencias_atrasadas()
+    if num_avancadas > 0:
+        print(f"{num_avancadas} tarefas recorrentes atrasadas foram avançadas para a próxima ocorrência.")
         ui.pausar_e_limpar()
 
-    elif escolha == '3':
-        ui.clear_screen()
-        iniciar_busca(gerenciador)
-        ui.pausar_e_limpar()
+    # Os lembretes das tarefas que estão vencendo são ligados se GERENCIADOR_LEMBRETES_DIAS estiver definida
+    lembretes.iniciar_pelo_ambiente(gerenciador)
 
-    elif escolha == '4':
+    while True:
         ui.clear_screen()
-        gerenciar_listas(gerenciador)
+        escolha = ui.menu_principal()
 
-    elif escolha == '5':
-        print("Obrigado por usar o Gerenciador de Tarefas! Até mais!")
-        break
+        if escolha == '1':
+            ui.clear_screen()
+            visualizar_tarefas(gerenciador)
 
-    else:
-        print("Opção inválida, por favor tente novamente.")
-        ui.pausar_e_limpar()
+        elif escolha == '2':
+            ui.clear_screen()
+            dados = ui.obter_dados_nova_tarefa(gerenciador)
+            if dados and gerenciador.adicionar_tarefa(dados):
+                print("\nTarefa adicionada com sucesso!")
+            ui.pausar_e_limpar()
+
+        elif escolha == '3':
+            ui.clear_screen()
+            iniciar_busca(gerenciador)
+            ui.pausar_e_limpar()
+
+        elif escolha == '4':
+            ui.clear_screen()
+            gerenciar_listas(gerenciador)
+
+        elif escolha == '5':
+            descricao = gerenciador.desfazer()
+            if descricao:
+                print(f"\nAção desfeita: {descricao}.")
+            else:
+                print("\nNão há nenhuma ação para desfazer.")
+            ui.pausar_e_limpar()
+
+        elif escolha == '6':
+            descricao = gerenciador.refazer()
+            if descricao:
+                print(f"\nAção refeita: {descricao}.")
+            else:
+                print("\nNão há nenhuma ação para refazer.")
+            ui.pausar_e_limpar()
+
+        elif escolha == '7':
+            ui.clear_screen()
+            ui.imprimir_painel(gerenciador)
+            ui.pausar_e_limpar()
+
+        elif escolha == '8':
+            ui.clear_screen()
+            gerenciar_visoes_salvas(gerenciador)
+
+        elif escolha == '9':
+            mostrar_calendario(gerenciador)
+
+        elif escolha == '10':
+            print("Obrigado por usar o Gerenciador de Tarefas! Até mais!")
+            break
+
+        else:
+            print("Opção inválida, por favor tente novamente.")
+            ui.pausar_e_limpar()
+
+
+# Só inicia o programa quando o arquivo é executado diretamente, e não importado
+if __name__ == "__main__":
+    main()
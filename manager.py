@@ -1,28 +1,610 @@
 import copy
-from datetime import timedelta
-from typing import List, Optional, Dict, Any
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Callable, Iterable, Iterator, List, Optional, Dict, Any, Sequence, Set, Tuple
 from models import Tarefa, ListaDeTarefas
+import arquivo_morto
+import busca_paralela
+import calendario
+import consultas
+import eventos
+import gravacao
+import historico
+import indice_tags
+import painel
 import persistence
+import recorrencia
+import sincronizacao
+import subtarefas
+import versoes
+import visoes
+
+# Metadados da sincronização que uma ação interrompida devolve ao estado do início
+_METADADOS_SINCRONIZACAO = ("relogio", "vistos", "lapides_listas", "lapides_tarefas")
 
 
 class TaskManager:
     """Gerencia toda a lógica de negócios para listas e tarefas."""
 
-    def __init__(self):
-        """Inicializa o gerenciador, carregando os dados existentes do arquivo."""
+    def __init__(self,
+                 caminho: Optional[str] = None,
+                 profundidade_historico: int = historico.PROFUNDIDADE_PADRAO,
+                 salvar_automaticamente: bool = True,
+                 gravacao_em_grupo: bool = False):
+        """
+        Inicializa o gerenciador, carregando os dados existentes do arquivo.
+
+        Args:
+            caminho (Optional[str]): Arquivo de dados deste gerenciador. Padrão é
+                `persistence.DATA_FILE`. Permite ter vários gerenciadores, um por arquivo.
+            profundidade_historico (int): Quantas ações podem ser desfeitas.
+            salvar_automaticamente (bool): Se True (padrão), cada ação salva o arquivo.
+                Se False, as ações só marcam que há alterações pendentes, e o arquivo
+                é gravado ao chamar `salvar()`.
+            gravacao_em_grupo (bool): Com o salvamento automático, grava em uma thread
+                própria (ver `gravacao.GravadorEmGrupo`): cada ação retorna sem esperar o
+                disco, e uma gravação cobre todas as ações feitas enquanto a anterior
+                estava em andamento. `salvar()` espera as gravações pendentes.
+        """
 
-        # Carrega as listas e tarefas usando o módulo de persistência
-        self._listas, self._tarefas = persistence.carregar_dados()
+        self._caminho = caminho or persistence.DATA_FILE
+        self._salvar_automaticamente = salvar_automaticamente
+        self._gravador = (gravacao.GravadorEmGrupo(self._caminho)
+                          if salvar_automaticamente and gravacao_em_grupo else None)
+        self._alteracoes_pendentes = False
+        # Carrega as listas e tarefas usando o módulo de persistência. As listas ficam em uma
+        # tupla e as tarefas em um vetor imutável: cada alteração cria uma nova versão, que
+        # reaproveita tudo o que não mudou, e as versões já entregues aos leitores não mudam.
+        listas, tarefas, self._metadados = persistence.carregar_dados(self._caminho)
+        self._listas = tuple(listas)
+        self._tarefas = versoes.VetorTarefas(tarefas)
+        self._versao = versoes.Versao(0, self._listas, self._tarefas)
+        # As tarefas concluídas há muito tempo ficam no arquivo morto, ao lado do arquivo de dados
+        self._caminho_arquivo_morto = arquivo_morto.caminho_para(self._caminho)
+        # Observadores externos, avisados a cada tarefa indexada ou desindexada, como os índices internos
+        self._observadores: List[Any] = []
+        # Feed de eventos: cada ação publica, ao final, o que mudou aos assinantes. O
+        # número do último evento fica nos metadados, para que os cursores continuem valendo.
+        self._eventos = eventos.FeedEventos(self._metadados.get("sequencia_eventos", 0))
+        # Sincronização entre réplicas: desligada até `habilitar_sincronizacao()`. Quando
+        # ligada, cada alteração local recebe um carimbo [relógio lógico, réplica].
+        self._replica: Optional[str] = self._metadados.get("replica")
+        self._carimbos_ligados = True
+        self._reconstruir_indices()
+        # Histórico de desfazer/refazer e a operação que está sendo registrada no momento
+        self._historico = historico.Historico(profundidade_historico)
+        self._operacao_atual: Optional[historico.Operacao] = None
         # Se não houver listas, garante que a padrão "Geral" exista e a salva
         if not self._listas:
             lista_geral = ListaDeTarefas(id=1, nome="Geral")
-            self._listas.append(lista_geral)
+            self._listas = (lista_geral,)
             self._salvar_tudo()
 
     def _salvar_tudo(self):
-        """Função auxiliar privada para salvar o estado atual no arquivo."""
+        """Publica a versão atual dos dados para os leitores e a salva no arquivo."""
+
+        if self._listas is not self._versao.listas or self._tarefas is not self._versao.tarefas:
+            self._versao = versoes.Versao(self._versao.numero + 1, self._listas, self._tarefas)
+
+        if not self._salvar_automaticamente:
+            self._alteracoes_pendentes = True
+            return
+        if self._gravador is not None:
+            # Os metadados são alterados no lugar pelas próximas ações, então vão copiados
+            self._gravador.solicitar(self._versao.listas, self._versao.tarefas, copy.deepcopy(self._metadados))
+            return
+        # Se a gravação falhar, as alterações ficam pendentes até um `salvar()` conseguir gravá-las
+        if not persistence.salvar_dados(self._versao.listas, self._versao.tarefas, self._metadados, self._caminho):
+            self._alteracoes_pendentes = True
+
+    def salvar(self) -> bool:
+        """
+        Grava no arquivo as alterações pendentes de um gerenciador sem salvamento automático.
+        Com a gravação em grupo, espera as gravações pendentes chegarem ao disco, e tenta
+        de novo se a última falhou.
+
+        Retorna True se havia alterações e o arquivo foi gravado. Se a gravação falhar, as
+        alterações continuam pendentes (ver `tem_alteracoes_pendentes()`) e o retorno é False.
+        """
+
+        if self._gravador is not None:
+            if not self._gravador.pendente():
+                return False
+            if self._gravador.falhou():
+                self._gravador.solicitar(self._versao.listas, self._versao.tarefas, copy.deepcopy(self._metadados))
+            return self._gravador.aguardar()
+        if not self._alteracoes_pendentes:
+            return False
+        if not persistence.salvar_dados(self._versao.listas, self._versao.tarefas, self._metadados, self._caminho):
+            return False
+        self._alteracoes_pendentes = False
+        return True
+
+    def tem_alteracoes_pendentes(self) -> bool:
+        """Indica se há alterações que ainda não foram gravadas no arquivo."""
+
+        if self._gravador is not None:
+            return self._gravador.pendente()
+        return self._alteracoes_pendentes
+
+    def get_caminho(self) -> str:
+        """Retorna o caminho do arquivo de dados deste gerenciador."""
+
+        return self._caminho
+
+    def _reconstruir_indices(self):
+        """Reconstrói do zero os índices mantidos em memória sobre as tarefas."""
+
+        # Tarefas por ID, para buscas diretas sem percorrer a lista
+        self._tarefas_por_id: Dict[int, Tarefa] = {}
+        # Séries recorrentes por ID, para que operações sobre elas não percorram todas as tarefas
+        self._series: Dict[int, Tarefa] = {}
+        # Tags codificadas em bitmaps de IDs, para as consultas com AND/OR/NOT
+        self._indice_tags = indice_tags.IndiceTags()
+        # Contadores do painel (pendentes, atrasadas, etc.) por lista e gerais
+        self._painel = painel.Painel()
+        # Quantidade de tarefas que vencem em cada dia, para o calendário
+        self._calendario = calendario.CalendarioVencimentos()
+        # Hierarquia das subtarefas, com o progresso de cada tarefa principal
+        self._arvore = subtarefas.ArvoreTarefas()
+        # Gerações dos dados: aumentam a cada tarefa indexada ou desindexada, no geral e
+        # na lista da tarefa. O cache de consultas as usa para saber se um resultado envelheceu.
+        self._geracao = 0
+        self._geracoes_lista: Dict[int, int] = {}
+        self._cache_consultas = consultas.CacheConsultas()
+        # Visões salvas (guardadas nos metadados), com o resultado mantido a cada alteração
+        self._visoes: Dict[str, visoes.VisaoMaterializada] = {}
+        for dados_visao in self._metadados.get("visoes_salvas", []):
+            visao = visoes.VisaoSalva.from_dict(dados_visao)
+            self._visoes[visao.nome.lower()] = visoes.VisaoMaterializada(visao)
+        for tarefa in self._tarefas:
+            self._indexar_tarefa(tarefa)
+
+    def _indexar_tarefa(self, tarefa: Tarefa):
+        """Registra uma tarefa nova ou recém-alterada nos índices em memória."""
+
+        self._tarefas_por_id[tarefa.id] = tarefa
+        if recorrencia.eh_recorrente(tarefa.repeticao):
+            self._series[tarefa.id] = tarefa
+        self._indice_tags.adicionar(tarefa.id, tarefa.tags)
+        self._painel.adicionar(tarefa)
+        self._calendario.adicionar(tarefa)
+        self._arvore.adicionar(tarefa)
+        for visao in self._visoes.values():
+            visao.adicionar(tarefa)
+        for observador in self._observadores:
+            observador.adicionar(tarefa)
+        self._avancar_geracao(tarefa.lista_id)
+
+    def _desindexar_tarefa(self, tarefa: Tarefa):
+        """Retira uma tarefa dos índices em memória, antes de removê-la ou alterá-la."""
+
+        self._tarefas_por_id.pop(tarefa.id, None)
+        self._series.pop(tarefa.id, None)
+        self._indice_tags.remover(tarefa.id, tarefa.tags)
+        self._painel.remover(tarefa)
+        self._calendario.remover(tarefa)
+        self._arvore.remover(tarefa)
+        for visao in self._visoes.values():
+            visao.remover(tarefa)
+        for observador in self._observadores:
+            observador.remover(tarefa)
+        self._avancar_geracao(tarefa.lista_id)
+
+    def registrar_observador(self, observador: Any):
+        """
+        Registra um objeto que acompanha as tarefas, avisando-o de todas as tarefas atuais.
+
+        O observador precisa ter os métodos `adicionar(tarefa)`, chamado para cada tarefa
+        nova ou recém-alterada, e `remover(tarefa)`, chamado antes de uma tarefa ser
+        alterada ou removida. Eles são chamados no meio das ações, então devem ser rápidos
+        e não podem alterar o gerenciador.
+        """
+
+        self._observadores.append(observador)
+        for tarefa in self._tarefas:
+            observador.adicionar(tarefa)
+
+    def remover_observador(self, observador: Any) -> bool:
+        """Deixa de avisar um observador. Retorna False se ele não estava registrado."""
+
+        if observador not in self._observadores:
+            return False
+        self._observadores.remove(observador)
+        return True
+
+    def assinar_eventos(self,
+                        assinante: Callable[[Any], None],
+                        em_lotes: bool = False,
+                        desde: Optional[int] = None) -> int:
+        """
+        Registra uma função que recebe, em ordem, os eventos de cada ação que altera as tarefas ou listas.
+
+        Ao contrário dos observadores, os assinantes são chamados ao fim de cada ação,
+        depois de os dados serem salvos, e podem consultar ou alterar o gerenciador.
+        Desfazer, refazer, sincronizar e arquivar também publicam eventos.
+
+        Args:
+            assinante (Callable): Recebe cada `eventos.Evento` (criação, alteração com os
+                campos alterados, conclusão ou remoção de uma tarefa ou lista) ou, com
+                `em_lotes=True`, a lista dos eventos de cada ação.
+            em_lotes (bool): Entrega de uma só vez os eventos de cada ação.
+            desde (Optional[int]): Um cursor guardado pelo assinante (a `sequencia` do
+                último evento que ele processou). Os eventos posteriores são entregues
+                antes dos novos.
+
+        Returns:
+            int: O cursor atual, a partir do qual o assinante recebe os eventos.
+
+        Raises:
+            eventos.CursorExpirado: Se os eventos posteriores a `desde` não estiverem mais
+                guardados. O assinante deve reler os dados e assinar sem cursor.
+        """
+
+        return self._eventos.assinar(assinante, em_lotes, desde)
+
+    def cancelar_assinatura_eventos(self, assinante: Callable[[Any], None]) -> bool:
+        """Deixa de entregar eventos a um assinante. Retorna False se ele não estava registrado."""
+
+        return self._eventos.cancelar(assinante)
+
+    def get_cursor_eventos(self) -> int:
+        """Retorna o cursor atual do feed de eventos (a sequência do último evento publicado)."""
+
+        return self._eventos.cursor
+
+    def get_eventos_desde(self, cursor: int) -> List[eventos.Evento]:
+        """
+        Retorna os eventos publicados depois de um cursor, para quem consulta o feed em vez de assiná-lo.
+
+        Raises:
+            eventos.CursorExpirado: Se os eventos posteriores ao cursor não estiverem mais guardados.
+        """
+
+        return self._eventos.desde(cursor)
+
+    def _avancar_geracao(self, lista_id: int):
+        """Marca que as tarefas mudaram, no geral e na lista informada."""
+
+        self._geracao += 1
+        self._geracoes_lista[lista_id] = self._geracoes_lista.get(lista_id, 0) + 1
+
+    # Alterações primitivas: toda mudança no estado passa por estes métodos, que
+    # mantêm os índices e registram a alteração na operação em andamento.
+
+    @contextmanager
+    def _operacao(self, descricao: str, desfazivel: bool = True) -> Iterator[historico.Operacao]:
+        """
+        Agrupa as alterações de uma ação do usuário.
+
+        Ao final, a ação vira uma única entrada no histórico de desfazer (se `desfazivel`),
+        os dados são salvos uma única vez e os eventos da ação são publicados. Operações
+        aninhadas são incorporadas à mais externa.
+
+        Se a ação for interrompida por uma exceção, as alterações que ela já tinha feito são
+        revertidas antes de a exceção seguir adiante: nada dela fica na memória, no
+        histórico, no arquivo ou no próximo delta da sincronização.
+        """
+
+        if self._operacao_atual is not None:
+            yield self._operacao_atual
+            return
+
+        operacao = historico.Operacao(descricao)
+        self._operacao_atual = operacao
+        inicio = (self._listas, self._tarefas, self._metadados_sincronizacao())
+        try:
+            yield operacao
+        except BaseException:
+            # A reversão não é registrada: a operação termina aqui
+            self._operacao_atual = None
+            self._reverter(operacao, *inicio)
+            raise
+        finally:
+            self._operacao_atual = None
+
+        if operacao.alteracoes:
+            if desfazivel:
+                self._historico.registrar(operacao)
+            self._publicar(operacao.descricao, operacao.alteracoes)
+
+    def _metadados_sincronizacao(self) -> Optional[Dict[str, Any]]:
+        """Copia o relógio, os vetores e as lápides de uma réplica, ou retorna None sem sincronização."""
+
+        if self._replica is None:
+            return None
+        return {chave: copy.copy(self._metadados[chave]) for chave in _METADADOS_SINCRONIZACAO
+                if chave in self._metadados}
+
+    def _reverter(self, operacao: historico.Operacao, listas: Tuple[ListaDeTarefas, ...],
+                  tarefas: versoes.VetorTarefas, sincronizacao_inicio: Optional[Dict[str, Any]]):
+        """
+        Desfaz as alterações de uma operação interrompida, voltando ao estado do seu início.
+
+        A reversão não é uma alteração para as outras réplicas, porque a ação nunca foi
+        publicada: é feita sem carimbos, os objetos alterados voltam com os carimbos que
+        tinham, e o relógio e as lápides voltam aos do início.
+        """
+
+        carimbos_ligados = self._carimbos_ligados
+        self._carimbos_ligados = False
+        try:
+            for tipo, dados in historico.inverter(operacao.alteracoes):
+                self._aplicar_alteracao(tipo, dados, desfazer=False)
+
+            # O histórico não guarda os carimbos das alterações, só os valores dos campos
+            for tipo, dados in operacao.alteracoes:
+                if tipo == historico.TAREFA_ALTERADA:
+                    atual = self._tarefas_por_id.get(dados[0])
+                    posicao = tarefas.posicao(dados[0])
+                    original = tarefas[posicao] if posicao < len(tarefas) else None
+                    if atual and original and original.id == atual.id and atual.relogios != original.relogios:
+                        self._alterar_tarefa(atual, {"relogios": original.relogios})
+                elif tipo == historico.LISTA_ALTERADA:
+                    atual = self.buscar_lista_por_id(dados[0])
+                    original = next((lista for lista in listas if lista.id == dados[0]), None)
+                    if atual and original and atual.relogios != original.relogios:
+                        self._alterar_lista(atual, {"relogios": original.relogios})
+        finally:
+            self._carimbos_ligados = carimbos_ligados
+
+        if sincronizacao_inicio is not None:
+            for chave in _METADADOS_SINCRONIZACAO:
+                if chave in sincronizacao_inicio:
+                    self._metadados[chave] = sincronizacao_inicio[chave]
+                else:
+                    self._metadados.pop(chave, None)
+
+    def _publicar(self, descricao: str, alteracoes: List[Tuple[str, Any]], desfeitas: bool = False):
+        """Salva os dados de uma ação concluída e entrega os eventos dela aos assinantes."""
+
+        acao = self._eventos.registrar(descricao, alteracoes, desfeitas)
+        if acao:
+            self._metadados["sequencia_eventos"] = self._eventos.cursor
+        self._salvar_tudo()
+        self._eventos.entregar(acao)
+
+    def _registrar(self, tipo: str, dados: Any):
+        """Registra uma alteração primitiva na operação em andamento, se houver uma."""
+
+        if self._operacao_atual is not None:
+            self._operacao_atual.registrar(tipo, dados)
+
+    def _inserir_tarefa(self, tarefa: Tarefa):
+        """Insere uma tarefa nova, que fica na posição do seu ID (o maior, no caso de uma tarefa criada agora)."""
+
+        self._marcar_criacao(tarefa, "lapides_tarefas")
+        self._tarefas = self._tarefas.com_tarefa(tarefa)
+        self._indexar_tarefa(tarefa)
+        self._registrar(historico.TAREFAS_INSERIDAS, [(self._tarefas.posicao(tarefa.id), tarefa)])
+
+    def _remover_tarefas_onde(self, condicao: Callable[[Tarefa], bool], lapides: bool = True) -> List[Tarefa]:
+        """
+        Remove todas as tarefas que satisfazem a condição e retorna as removidas.
+
+        Com a sincronização ligada, cada tarefa removida deixa uma lápide, para que a
+        remoção chegue às outras réplicas. `lapides=False` é usado ao arquivar, que tira a
+        tarefa só desta réplica.
+        """
+
+        self._tarefas, removidas = self._tarefas.sem(condicao)
+        return self._retirar_removidas(removidas, lapides)
+
+    def _remover_tarefas_por_id(self, tarefa_ids: Iterable[int], lapides: bool = True) -> List[Tarefa]:
+        """Como `_remover_tarefas_onde`, mas só examina as tarefas vizinhas às dos IDs informados."""
+
+        self._tarefas, removidas = self._tarefas.sem_ids(tarefa_ids)
+        return self._retirar_removidas(removidas, lapides)
+
+    def _retirar_removidas(self, removidas: List[Tuple[int, Tarefa]], lapides: bool) -> List[Tarefa]:
+        """Tira dos índices as tarefas que saíram do vetor e registra a remoção."""
+
+        for _, tarefa in removidas:
+            self._desindexar_tarefa(tarefa)
+        if removidas and lapides:
+            self._marcar_remocao([tarefa for _, tarefa in removidas], "lapides_tarefas")
+
+        if removidas:
+            self._registrar(historico.TAREFAS_REMOVIDAS, removidas)
+        return [tarefa for _, tarefa in removidas]
+
+    def _alterar_tarefa(self, tarefa: Tarefa, campos: Dict[str, Any]) -> Tarefa:
+        """
+        Cria uma nova versão da tarefa com os novos valores, registrando apenas os campos que mudaram.
+
+        A tarefa original não é alterada, porque pode estar sendo lida em uma versão já
+        publicada. Retorna a nova versão da tarefa (ou a original, se nada mudou), que
+        deve ser usada dali em diante.
+        """
+
+        mudancas = {}
+        for chave, valor in campos.items():
+            valor_antigo = getattr(tarefa, chave)
+            if valor_antigo != valor:
+                mudancas[chave] = (valor_antigo, valor)
+        if not mudancas:
+            return tarefa
+
+        # A cópia é rasa: listas como as tags são compartilhadas, por isso nunca são
+        # alteradas no lugar, e sim substituídas por novas listas
+        nova_tarefa = copy.copy(tarefa)
+        for chave, (_, valor) in mudancas.items():
+            setattr(nova_tarefa, chave, valor)
+        self._marcar_alteracao(nova_tarefa, mudancas)
+
+        self._desindexar_tarefa(tarefa)
+        self._tarefas = self._tarefas.com_tarefa(nova_tarefa)
+        self._indexar_tarefa(nova_tarefa)
+        self._registrar(historico.TAREFA_ALTERADA, (tarefa.id, mudancas))
+        return nova_tarefa
+
+    def _inserir_lista(self, lista: ListaDeTarefas):
+        """Acrescenta uma lista ao final das listas."""
+
+        self._marcar_criacao(lista, "lapides_listas")
+        self._listas = self._listas + (lista,)
+        self._registrar(historico.LISTAS_INSERIDAS, [(len(self._listas) - 1, lista)])
 
-        persistence.salvar_dados(self._listas, self._tarefas)
+    def _remover_listas_onde(self, condicao: Callable[[ListaDeTarefas], bool]) -> List[ListaDeTarefas]:
+        """Remove todas as listas que satisfazem a condição e retorna as removidas."""
+
+        removidas = [(posicao, lista) for posicao, lista in enumerate(self._listas) if condicao(lista)]
+        if removidas:
+            self._listas = tuple(lista for lista in self._listas if not condicao(lista))
+            self._marcar_remocao([lista for _, lista in removidas], "lapides_listas")
+            self._registrar(historico.LISTAS_REMOVIDAS, removidas)
+        return [lista for _, lista in removidas]
+
+    def _alterar_lista(self, lista: ListaDeTarefas, campos: Dict[str, Any]) -> ListaDeTarefas:
+        """Cria uma nova versão da lista com os novos valores e a retorna, registrando apenas os campos que mudaram."""
+
+        mudancas = {chave: (getattr(lista, chave), valor) for chave, valor in campos.items()
+                    if getattr(lista, chave) != valor}
+        if not mudancas:
+            return lista
+
+        nova_lista = copy.copy(lista)
+        for chave, (_, valor) in mudancas.items():
+            setattr(nova_lista, chave, valor)
+        self._marcar_alteracao(nova_lista, mudancas)
+        self._listas = tuple(nova_lista if item is lista else item for item in self._listas)
+        self._registrar(historico.LISTA_ALTERADA, (lista.id, mudancas))
+        return nova_lista
+
+    # Carimbos da sincronização: registram, nos objetos e nas lápides, quando e em qual
+    # réplica cada alteração local foi feita
+
+    def _carimbar(self, forcar: bool = False) -> Optional[List]:
+        """
+        Avança o relógio lógico e retorna o carimbo de uma alteração local, ou None se não houver carimbos.
+
+        Com `forcar=True`, carimba mesmo durante a aplicação de um delta recebido.
+        """
+
+        if self._replica is None or not (self._carimbos_ligados or forcar):
+            return None
+        relogio = self._metadados.get("relogio", 0) + 1
+        self._metadados["relogio"] = relogio
+        return [relogio, self._replica]
+
+    def _marcar_criacao(self, objeto: Any, chave_lapides: str, novo: bool = True) -> Any:
+        """
+        Carimba a criação de uma tarefa ou lista ainda não publicada e retira a sua lápide, se houver.
+
+        Um objeto novo recebe um identificador entre réplicas. Um objeto que volta a
+        existir (ao desfazer uma remoção) mantém o que tinha.
+        """
+
+        carimbo = self._carimbar()
+        if carimbo is not None:
+            if novo and objeto.uid is None:
+                objeto.uid = f"{self._replica}:{objeto.id}"
+                objeto.relogios = {**objeto.relogios, sincronizacao.CRIACAO: carimbo}
+            else:
+                campos = sincronizacao.CAMPOS_TAREFA if isinstance(objeto, Tarefa) else sincronizacao.CAMPOS_LISTA
+                objeto.relogios = sincronizacao.renovar_criacao(objeto.relogios, campos, carimbo)
+            self._metadados.get(chave_lapides, {}).pop(sincronizacao.uid_de(objeto), None)
+        return objeto
+
+    def _marcar_alteracao(self, objeto: Any, mudancas: Dict[str, Any]):
+        """Carimba os campos alterados na nova versão de uma tarefa ou lista."""
+
+        carimbo = self._carimbar()
+        if carimbo is not None:
+            objeto.relogios = {**objeto.relogios, **{chave: carimbo for chave in mudancas if chave != "relogios"}}
+
+    def _marcar_remocao(self, objetos: List[Any], chave_lapides: str):
+        """Deixa uma lápide para cada tarefa ou lista removida."""
+
+        carimbo = self._carimbar()
+        if carimbo is not None:
+            lapides = self._metadados.setdefault(chave_lapides, {})
+            for objeto in objetos:
+                lapides[sincronizacao.uid_de(objeto)] = carimbo
+
+    # Desfazer e refazer
+
+    def desfazer(self) -> Optional[str]:
+        """
+        Desfaz a última ação registrada.
+
+        O custo é proporcional ao tamanho da alteração, não ao número de tarefas.
+        Retorna a descrição da ação desfeita ou None se não houver nada a desfazer.
+        """
+
+        operacao = self._historico.retirar_para_desfazer()
+        if operacao is None:
+            return None
+
+        # As alterações são revertidas na ordem inversa em que foram feitas
+        for tipo, dados in reversed(operacao.alteracoes):
+            self._aplicar_alteracao(tipo, dados, desfazer=True)
+
+        self._historico.marcar_desfeita(operacao)
+        self._publicar(f"desfazer: {operacao.descricao}", operacao.alteracoes, desfeitas=True)
+        return operacao.descricao
+
+    def refazer(self) -> Optional[str]:
+        """Refaz a última ação desfeita e retorna a sua descrição (ou None se não houver)."""
+
+        operacao = self._historico.retirar_para_refazer()
+        if operacao is None:
+            return None
+
+        for tipo, dados in operacao.alteracoes:
+            self._aplicar_alteracao(tipo, dados, desfazer=False)
+
+        self._historico.marcar_refeita(operacao)
+        self._publicar(f"refazer: {operacao.descricao}", operacao.alteracoes)
+        return operacao.descricao
+
+    def pode_desfazer(self) -> bool:
+        """Indica se há alguma ação para desfazer."""
+
+        return self._historico.pode_desfazer()
+
+    def pode_refazer(self) -> bool:
+        """Indica se há alguma ação para refazer."""
+
+        return self._historico.pode_refazer()
+
+    def _aplicar_alteracao(self, tipo: str, dados: Any, desfazer: bool):
+        """Aplica uma alteração primitiva do histórico no sentido original ou no inverso."""
+
+        if tipo in (historico.TAREFAS_INSERIDAS, historico.TAREFAS_REMOVIDAS):
+            # Desfazer uma inserção é remover; desfazer uma remoção é inserir de volta
+            # (as tarefas ficam em ordem de ID, então cada uma volta para a sua posição)
+            if (tipo == historico.TAREFAS_INSERIDAS) != desfazer:
+                for _, tarefa in dados:
+                    # Voltar a existir é uma nova criação para as outras réplicas
+                    tarefa = self._marcar_criacao(copy.copy(tarefa), "lapides_tarefas", novo=False)
+                    self._tarefas = self._tarefas.com_tarefa(tarefa)
+                    self._indexar_tarefa(tarefa)
+            else:
+                self._remover_tarefas_por_id(tarefa.id for _, tarefa in dados)
+
+        elif tipo in (historico.LISTAS_INSERIDAS, historico.LISTAS_REMOVIDAS):
+            if (tipo == historico.LISTAS_INSERIDAS) != desfazer:
+                for posicao, lista in dados:
+                    lista = self._marcar_criacao(copy.copy(lista), "lapides_listas", novo=False)
+                    self._listas = self._listas[:posicao] + (lista,) + self._listas[posicao:]
+            else:
+                ids = {lista.id for _, lista in dados}
+                self._remover_listas_onde(lambda l: l.id in ids)
+
+        elif tipo == historico.TAREFA_ALTERADA:
+            tarefa_id, mudancas = dados
+            tarefa = self._tarefas_por_id.get(tarefa_id)
+            if tarefa:
+                indice = 0 if desfazer else 1
+                self._alterar_tarefa(tarefa, {chave: valores[indice] for chave, valores in mudancas.items()})
+
+        elif tipo == historico.LISTA_ALTERADA:
+            lista_id, mudancas = dados
+            lista = self.buscar_lista_por_id(lista_id)
+            if lista:
+                indice = 0 if desfazer else 1
+                self._alterar_lista(lista, {chave: valores[indice] for chave, valores in mudancas.items()})
 
     def _gerar_proximo_id_lista(self) -> int:
         """Gera o próximo ID sequencial para uma lista."""
@@ -35,14 +617,28 @@ class TaskManager:
     def _gerar_proximo_id_tarefa(self) -> int:
         """Gera o próximo ID sequencial para uma tarefa."""
 
-        if not self._tarefas:
-            return 1
-        return max(tarefa.id for tarefa in self._tarefas) + 1
+        # Os IDs das tarefas arquivadas nunca são reaproveitados
+        maior_id = self._metadados.get("maior_id_arquivado", 0)
+        if self._tarefas:
+            # As tarefas ficam em ordem de ID, então a última tem o maior
+            maior_id = max(maior_id, self._tarefas[-1].id)
+        return maior_id + 1
+
+    def get_versao(self) -> versoes.Versao:
+        """
+        Retorna a versão atual dos dados, sem copiar nada.
+
+        A versão não muda depois de entregue: as ações seguintes criam novas versões.
+        Assim, outra thread pode percorrê-la enquanto o gerenciador é alterado. Uma
+        versão só é publicada ao fim de cada ação, nunca com uma ação pela metade.
+        """
+
+        return self._versao
 
-    def get_todas_listas(self) -> List[ListaDeTarefas]:
-        """Retorna uma cópia de todas as listas de tarefas."""
+    def get_todas_listas(self) -> Sequence[ListaDeTarefas]:
+        """Retorna todas as listas de tarefas da versão atual (uma tupla imutável, sem cópia)."""
 
-        return self._listas.copy()
+        return self._versao.listas
 
     def buscar_lista_por_id(self, lista_id: int) -> Optional[ListaDeTarefas]:
         """Busca e retorna uma lista pelo seu ID."""
@@ -66,8 +662,8 @@ class TaskManager:
 
         novo_id = self._gerar_proximo_id_lista()
         nova_lista = ListaDeTarefas(id=novo_id, nome=nome)
-        self._listas.append(nova_lista)
-        self._salvar_tudo()
+        with self._operacao(f"adicionar a lista '{nome}'"):
+            self._inserir_lista(nova_lista)
         return nova_lista
 
     def editar_lista(self, lista_id: int, novo_nome: str) -> Optional[ListaDeTarefas]:
@@ -83,9 +679,9 @@ class TaskManager:
             print("Erro: Lista não encontrada.")
             return None
 
-        lista_para_editar.nome = novo_nome
-        self._salvar_tudo()
-        return lista_para_editar
+        with self._operacao(f"renomear a lista '{lista_para_editar.nome}'"):
+            lista_editada = self._alterar_lista(lista_para_editar, {"nome": novo_nome})
+        return lista_editada
 
     def remover_lista(self, lista_id: int) -> bool:
         """
@@ -99,72 +695,354 @@ class TaskManager:
             print("Erro: Não é possível remover a última lista de tarefas.")
             return False
 
-        # Remove a lista
-        self._listas = [lista for lista in self._listas if lista.id != lista_id]
+        lista = self.buscar_lista_por_id(lista_id)
+        descricao = f"remover a lista '{lista.nome}'" if lista else "remover lista"
+        with self._operacao(descricao):
+            # Remove todas as tarefas associadas à lista, com as suas subtarefas (mesmo as
+            # que estiverem em outra lista, ex: depois de uma sincronização). As tarefas saem
+            # antes da lista, para que, ao desfazer, a lista volte antes delas.
+            self._remover_com_subtarefas([t.id for t in self._tarefas if t.lista_id == lista_id])
 
-        # Remove todas as tarefas associadas à lista removida
-        self._tarefas = [tarefa for tarefa in self._tarefas if tarefa.lista_id != lista_id]
+            # Remove a lista
+            self._remover_listas_onde(lambda l: l.id == lista_id)
 
-        self._salvar_tudo()
         return True
 
-    def get_todas_tarefas(self) -> List[Tarefa]:
-        """Retorna uma cópia de todas as tarefas."""
+    def get_todas_tarefas(self) -> Sequence[Tarefa]:
+        """Retorna todas as tarefas da versão atual, em ordem de ID (um vetor imutável, sem cópia)."""
 
-        return self._tarefas.copy()
+        return self._versao.tarefas
 
-    def buscar_tarefas_por_termo(self, termo: str) -> List[Tarefa]:
+    def buscar_tarefas_por_termo(self, termo: str, regex: bool = False) -> List[Tarefa]:
         """
         Busca tarefas que contenham o termo no título, notas ou tags.
 
-        A busca não diferencia maiúsculas de minúsculas.
+        A busca não diferencia maiúsculas de minúsculas. Com `regex=True`, o termo é
+        tratado como uma expressão regular. Em conjuntos muito grandes de tarefas, a
+        busca é dividida entre vários processos (veja o módulo busca_paralela).
+
+        Raises:
+            ValueError: Se `regex` for True e o termo não for uma expressão regular válida.
         """
 
-        termo = termo.lower()
-        tarefas_encontradas = []
-        for tarefa in self._tarefas:
-            # Verifica o título
-            if termo in tarefa.titulo.lower():
-                tarefas_encontradas.append(tarefa)
-                continue # Pula para a próxima tarefa para não adicionar duplicado
-
-            # Verifica as notas
-            if tarefa.notas and termo in tarefa.notas.lower():
-                tarefas_encontradas.append(tarefa)
-                continue
+        return busca_paralela.buscar_por_termo(self._tarefas, termo, regex)
+
+    def buscar_tarefas_por_tags(self, expressao: str) -> List[Tarefa]:
+        """
+        Busca as tarefas que satisfazem uma expressão de tags, em ordem de ID.
+
+        A expressão combina tags com AND, OR, NOT e parênteses, sem diferenciar
+        maiúsculas de minúsculas (ex: `urgente AND cliente-x NOT bloqueado`).
+        Tags lado a lado equivalem a AND, então uma tag sozinha também é uma expressão válida.
+
+        Raises:
+            ValueError: Se a expressão for vazia ou mal formada.
+        """
+
+        return [self._tarefas_por_id[tarefa_id] for tarefa_id in self._indice_tags.consultar(expressao)]
+
+    def contar_tarefas_por_tags(self, expressao: str) -> int:
+        """Conta as tarefas que satisfazem uma expressão de tags, sem montar a lista delas."""
+
+        return self._indice_tags.contar(expressao)
+
+    def get_contagem_tags(self) -> Dict[str, int]:
+        """Retorna cada tag em uso (em minúsculas) e a quantidade de tarefas que a possuem."""
+
+        return self._indice_tags.tags()
+
+    def get_contadores(self, lista_id: Optional[int] = None, hoje: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Retorna os contadores do painel de uma lista ou, se `lista_id` for None, de todas as tarefas.
+
+        Os contadores são mantidos a cada alteração, então a consulta não percorre as tarefas.
+
+        Returns:
+            Dict[str, Any]: `total`, `pendentes`, `concluidas`, `atrasadas`, `vencem_hoje`
+            e `pendentes_por_prioridade` (um dicionário de prioridade para quantidade).
+        """
+
+        return self._painel.contadores(lista_id, hoje)
+
+    def get_contadores_por_lista(self, hoje: Optional[date] = None) -> Dict[int, Dict[str, Any]]:
+        """Retorna os contadores do painel de cada lista, inclusive das listas vazias."""
+
+        contadores = self._painel.contadores_por_lista(hoje)
+        return {lista.id: contadores.get(lista.id) or self._painel.contadores(lista.id, hoje) for lista in self._listas}
+
+    def contar_vencimentos(self,
+                           inicio: Optional[date],
+                           fim: Optional[date],
+                           lista_id: Optional[int] = None,
+                           concluidas: bool = False) -> int:
+        """
+        Conta as tarefas que vencem entre duas datas (inclusive), sem percorrer as tarefas.
+
+        Nas pendentes, uma série recorrente conta uma vez por ocorrência no intervalo: a
+        próxima vem do calendário, e as seguintes são contadas em tempo constante por série.
+
+        Args:
+            inicio (Optional[date]): A primeira data, ou None para contar desde sempre
+                (ex: `contar_vencimentos(None, ontem)` conta as atrasadas).
+            fim (Optional[date]): A última data, ou None para contar sem limite. Sem limite,
+                cada série conta só a sua próxima ocorrência.
+            lista_id (Optional[int]): A lista. Padrão é contar em todas as listas.
+            concluidas (bool): Se True, conta as concluídas; se False (padrão), as pendentes.
+        """
+
+        total = self._calendario.contar(inicio, fim, lista_id, concluidas)
+        if not concluidas and fim is not None:
+            total += sum(consultas.contar_ocorrencias_seguintes(serie, inicio, fim)
+                         for serie in self._series_pendentes(lista_id))
+        return total
+
+    def get_vencimentos_por_dia(self,
+                                inicio: date,
+                                fim: date,
+                                lista_id: Optional[int] = None,
+                                concluidas: bool = False) -> Dict[date, int]:
+        """
+        Retorna quantas tarefas vencem em cada dia entre duas datas (inclusive), para o calendário.
 
-            # Verifica as tags
-            for tag in tarefa.tags:
-                if termo in tag.lower():
-                    tarefas_encontradas.append(tarefa)
-                    break # Sai do loop de tags e vai para a próxima tarefa
+        Os dias sem tarefas ficam de fora. Nas pendentes, cada ocorrência de uma série
+        recorrente conta no seu dia. O custo depende do número de dias e de séries, e não
+        do número de tarefas.
+        """
+
+        por_dia = self._calendario.por_dia(inicio, fim, lista_id, concluidas)
+        if concluidas:
+            return por_dia
+        adicionou = False
+        for serie in self._series_pendentes(lista_id):
+            for data in consultas.ocorrencias_seguintes(serie, inicio, fim):
+                por_dia[data] = por_dia.get(data, 0) + 1
+                adicionou = True
+        return dict(sorted(por_dia.items())) if adicionou else por_dia
+
+    def _series_pendentes(self, lista_id: Optional[int] = None) -> List[Tarefa]:
+        """Retorna as séries recorrentes pendentes, de uma lista ou de todas."""
+
+        return [serie for serie in self._series.values()
+                if consultas.eh_serie_pendente(serie) and (lista_id is None or serie.lista_id == lista_id)]
+
+    def buscar_ocorrencias(self,
+                           de: Optional[date],
+                           ate: date,
+                           lista_id: Optional[int] = None) -> List[Tuple[Tarefa, date]]:
+        """
+        Retorna as ocorrências pendentes que vencem no intervalo [de, ate], em ordem de data.
 
-        return tarefas_encontradas
+        Tarefas comuns aparecem uma vez; séries recorrentes aparecem uma vez para cada
+        ocorrência no intervalo, calculada sob demanda a partir da regra da série. Cada
+        ocorrência é um par (tarefa, data), em que a tarefa é a própria série.
+
+        Args:
+            de (Optional[date]): A primeira data, ou None para incluir as atrasadas.
+            ate (date): A última data.
+            lista_id (Optional[int]): A lista. Padrão é buscar em todas as listas.
+        """
+
+        tarefas = self._tarefas if lista_id is None else consultas.tarefas_da_lista(self._tarefas, lista_id)
+        return consultas.expandir_ocorrencias([tarefa for tarefa in tarefas if not tarefa.concluida], ate, de)
+
+    def consultar_tarefas(self,
+                          contexto: str,
+                          filtro: str = '1',
+                          ordenacao: str = consultas.ORDENACAO_DATA,
+                          valor: Any = None,
+                          hoje: Optional[date] = None) -> Optional[List[Tarefa]]:
+        """
+        Executa uma consulta da visualização: contexto, filtro e ordenação.
+
+        O resultado fica em um cache e é reaproveitado enquanto as tarefas de que ele
+        depende não mudarem: uma consulta por lista só é refeita quando alguma tarefa
+        entra, sai ou muda naquela lista; as demais, quando qualquer tarefa muda.
+
+        Args:
+            contexto (str): `consultas.CONTEXTO_TODAS`, `CONTEXTO_LISTA` ou `CONTEXTO_TAGS`.
+            filtro (str): A opção do filtro secundário ('1' a '5').
+            ordenacao (str): `consultas.ORDENACAO_DATA` ou `ORDENACAO_PRIORIDADE`.
+            valor (Any): O ID da lista ou a expressão de tags, conforme o contexto.
+            hoje (Optional[date]): Data de referência dos filtros por data. Padrão é hoje.
+
+        Returns:
+            Optional[List[Tarefa]]: As tarefas encontradas, ou None se o contexto ou o
+            filtro forem inválidos.
+
+        Raises:
+            ValueError: Se a expressão de tags for mal formada.
+        """
+
+        hoje = hoje or date.today()
+        if contexto == consultas.CONTEXTO_LISTA:
+            valor = int(valor)
+            geracao = self._geracoes_lista.get(valor, 0)
+        elif contexto == consultas.CONTEXTO_TAGS:
+            valor = valor.strip().lower()
+            geracao = self._geracao
+        elif contexto == consultas.CONTEXTO_TODAS:
+            valor = None
+            geracao = self._geracao
+        else:
+            return None
+
+        chave = (contexto, valor, filtro, ordenacao, hoje)
+        resultado = self._cache_consultas.obter(chave, geracao)
+        if resultado is None:
+            if contexto == consultas.CONTEXTO_LISTA:
+                tarefas = consultas.tarefas_da_lista(self._tarefas, valor)
+            elif contexto == consultas.CONTEXTO_TAGS:
+                tarefas = self.buscar_tarefas_por_tags(valor)
+            else:
+                tarefas = self._tarefas
+
+            filtradas = consultas.filtrar_tarefas(tarefas, filtro, hoje)
+            if filtradas is None:
+                return None
+            resultado = consultas.ordenar_tarefas(filtradas, ordenacao)
+            self._cache_consultas.guardar(chave, geracao, resultado)
+
+        # Uma cópia, para que quem chamou possa alterá-la sem afetar o cache
+        return resultado.copy()
+
+    def consultar_ocorrencias(self,
+                              contexto: str,
+                              filtro: str = '1',
+                              ordenacao: str = consultas.ORDENACAO_DATA,
+                              valor: Any = None,
+                              hoje: Optional[date] = None) -> Optional[List[Tuple[Tarefa, Optional[date]]]]:
+        """
+        Executa uma consulta como `consultar_tarefas()` e retorna as ocorrências, como pares (tarefa, data).
+
+        Nos filtros por data ('2' e '3'), cada série recorrente aparece uma vez por
+        ocorrência até o limite do filtro; nos demais, cada tarefa aparece uma vez, com a
+        sua data de término. As tarefas dos pares são as do resultado de `consultar_tarefas()`,
+        que continua sendo o alvo das ações em massa.
+        """
+
+        hoje = hoje or date.today()
+        tarefas = self.consultar_tarefas(contexto, filtro, ordenacao, valor, hoje)
+        if tarefas is None:
+            return None
+        limite = consultas.limite_do_filtro(filtro, hoje)
+        if limite is None:
+            return [(tarefa, tarefa.data_termino) for tarefa in tarefas]
+        return consultas.expandir_ocorrencias(tarefas, limite, criterio=ordenacao)
+
+    def get_estatisticas_cache(self) -> Dict[str, Any]:
+        """Retorna os acertos, as falhas e a ocupação do cache de consultas."""
+
+        return self._cache_consultas.estatisticas()
+
+    def get_visoes_salvas(self) -> List[visoes.VisaoSalva]:
+        """Retorna as definições de todas as visões salvas."""
+
+        return [materializada.visao for materializada in self._visoes.values()]
+
+    def _guardar_visoes(self):
+        """Atualiza as definições das visões nos metadados e salva o arquivo."""
+
+        self._metadados["visoes_salvas"] = [materializada.visao.to_dict() for materializada in self._visoes.values()]
+        self._salvar_tudo()
+
+    def salvar_visao(self, visao: visoes.VisaoSalva) -> Optional[visoes.VisaoSalva]:
+        """
+        Salva uma nova visão, guardando a definição junto com os dados.
+
+        Retorna a visão salva ou None se já existir uma visão com o mesmo nome.
+        """
+
+        if visao.nome.lower() in self._visoes:
+            print(f"Erro: Uma visão com o nome '{visao.nome}' já existe.")
+            return None
+
+        self._visoes[visao.nome.lower()] = visoes.materializar(visao, self._tarefas)
+        self._guardar_visoes()
+        return visao
+
+    def remover_visao(self, nome: str) -> bool:
+        """Remove uma visão salva. As tarefas não são alteradas."""
+
+        if self._visoes.pop(nome.lower(), None) is None:
+            return False
+        self._guardar_visoes()
+        return True
+
+    def abrir_visao(self, nome: str, hoje: Optional[date] = None) -> Optional[List[Tarefa]]:
+        """
+        Retorna as tarefas de uma visão salva, na ordem da visão.
+
+        O resultado já está pronto: é mantido a cada alteração das tarefas e, quando o
+        dia muda, só as tarefas que passaram a caber no prazo são avaliadas.
+        Retorna None se a visão não existir.
+        """
+
+        materializada = self._visoes.get(nome.lower())
+        if materializada is None:
+            return None
+
+        hoje = hoje or date.today()
+        if not materializada.atualizar_dia(hoje):
+            materializada = self._visoes[nome.lower()] = visoes.materializar(materializada.visao, self._tarefas, hoje)
+        return [self._tarefas_por_id[tarefa_id] for tarefa_id in materializada.ids()]
+
+    def abrir_visao_ocorrencias(self, nome: str,
+                                hoje: Optional[date] = None) -> Optional[List[Tuple[Tarefa, Optional[date]]]]:
+        """
+        Retorna as ocorrências de uma visão salva, como pares (tarefa, data).
+
+        Em uma visão com prazo, cada série recorrente aparece uma vez por ocorrência até
+        o prazo; sem prazo, cada tarefa aparece uma vez. Retorna None se a visão não existir.
+        """
+
+        hoje = hoje or date.today()
+        tarefas = self.abrir_visao(nome, hoje)
+        if tarefas is None:
+            return None
+        visao = self._visoes[nome.lower()].visao
+        limite = visao.limite(hoje)
+        if limite is None:
+            return [(tarefa, tarefa.data_termino) for tarefa in tarefas]
+        return consultas.expandir_ocorrencias(tarefas, limite, criterio=visao.ordenacao)
 
     def buscar_tarefa_por_id(self, tarefa_id: int) -> Optional[Tarefa]:
         """Busca e retorna uma tarefa pelo seu ID."""
 
-        for tarefa in self._tarefas:
-            if tarefa.id == tarefa_id:
-                return tarefa
-        return None
+        return self._tarefas_por_id.get(tarefa_id)
+
+    def adicionar_tarefa(self, dados_tarefa: Dict[str, Any]) -> Optional[Tarefa]:
+        """
+        Adiciona uma nova tarefa à uma lista específica.
 
-    def adicionar_tarefa(self, dados_tarefa: Dict[str, Any]) -> Tarefa:
-        """Adiciona uma nova tarefa à uma lista específica."""
+        Com `pai_id`, a tarefa é criada como subtarefa de outra, na lista dela (o
+        `lista_id` pode ser omitido). Retorna None se a tarefa principal não existir.
+        """
+
+        lista_id = dados_tarefa.get('lista_id')
+        pai_id = dados_tarefa.get('pai_id')
+        if pai_id is not None:
+            pai = self.buscar_tarefa_por_id(pai_id)
+            if not pai:
+                print("Erro: Tarefa principal não encontrada.")
+                return None
+            lista_id = pai.lista_id
 
         novo_id = self._gerar_proximo_id_tarefa()
         nova_tarefa = Tarefa(
             id=novo_id,
             titulo=dados_tarefa['titulo'],
-            lista_id=dados_tarefa['lista_id'],
+            lista_id=lista_id,
             data_termino=dados_tarefa.get('data_termino'),
             prioridade=dados_tarefa.get('prioridade'),
             tags=dados_tarefa.get('tags'),
             notas=dados_tarefa.get('notas'),
-            repeticao=dados_tarefa.get('repeticao')
+            repeticao=dados_tarefa.get('repeticao'),
+            pai_id=pai_id
         )
-        self._tarefas.append(nova_tarefa)
-        self._salvar_tudo()
+        if recorrencia.eh_recorrente(nova_tarefa.repeticao):
+            nova_tarefa.inicio_serie = nova_tarefa.data_termino
+        with self._operacao(f"adicionar a tarefa '{nova_tarefa.titulo}'"):
+            self._inserir_tarefa(nova_tarefa)
         return nova_tarefa
 
     def editar_tarefa(self, tarefa_id: int, novos_dados: Dict[str, Any]) -> Optional[Tarefa]:
@@ -174,74 +1052,641 @@ class TaskManager:
         if not tarefa:
             return None
 
-        for chave, valor in novos_dados.items():
-            # Esse hasattr verifica se um objeto, no caso aqui a tarefa a ser editada, possui um determinado atributo (titulo, data, prioridade, etc.).
-            # Se tiver, o setattr atribui a aquele atributo o novo valor que foi passado.
-            if hasattr(tarefa, chave):
-                setattr(tarefa, chave, valor)
-
-        self._salvar_tudo()
+        with self._operacao(f"editar a tarefa '{tarefa.titulo}'"):
+            tarefa = self._aplicar_campos(tarefa, novos_dados)
         return tarefa
 
+    def _aplicar_campos(self, tarefa: Tarefa, novos_dados: Dict[str, Any]) -> Tarefa:
+        """Atribui os novos valores aos atributos correspondentes da tarefa e retorna a nova versão dela."""
+
+        # Esse hasattr verifica se um objeto, no caso aqui a tarefa a ser editada, possui um determinado atributo (titulo, data, prioridade, etc.).
+        # Se tiver, o novo valor que foi passado será atribuído a aquele atributo. O ID nunca é alterado.
+        campos = {chave: valor for chave, valor in novos_dados.items()
+                  if chave not in ("id", "uid", "relogios") and hasattr(tarefa, chave)}
+
+        # Uma nova data ou uma nova regra de repetição reinicia a série a partir da data atual
+        if "data_termino" in campos or "repeticao" in campos:
+            repeticao = campos.get("repeticao", tarefa.repeticao)
+            data_termino = campos.get("data_termino", tarefa.data_termino)
+            campos["inicio_serie"] = data_termino if recorrencia.eh_recorrente(repeticao) else None
+
+        # Uma subtarefa fica sempre na lista da tarefa principal: ao mudar de pai, ela vai
+        # para a lista do novo pai; ao mudar sozinha de lista, deixa de ser subtarefa
+        novo_pai_id = campos.get("pai_id", tarefa.pai_id)
+        if novo_pai_id is not None and novo_pai_id != tarefa.pai_id:
+            pai = self._tarefas_por_id.get(novo_pai_id)
+            # A nova tarefa principal não pode ser a própria tarefa nem uma subtarefa dela
+            if pai is None or pai.id == tarefa.id or tarefa.id in self._arvore.ancestrais(pai.id):
+                print(f"Erro: A tarefa {novo_pai_id} não pode ser a tarefa principal da tarefa {tarefa.id}.")
+                del campos["pai_id"]
+            else:
+                campos["lista_id"] = pai.lista_id
+        elif novo_pai_id is not None and "lista_id" in campos:
+            pai = self._tarefas_por_id.get(novo_pai_id)
+            if pai is None or pai.lista_id != campos["lista_id"]:
+                campos["pai_id"] = None
+
+        nova_tarefa = self._alterar_tarefa(tarefa, campos)
+        if nova_tarefa.lista_id != tarefa.lista_id:
+            # As subtarefas acompanham a tarefa principal
+            for descendente in self._descendentes(tarefa.id):
+                self._alterar_tarefa(descendente, {"lista_id": nova_tarefa.lista_id})
+        return nova_tarefa
+
+    # Subtarefas: a hierarquia é mantida no índice `_arvore`, então as operações sobre
+    # uma tarefa e as suas subtarefas custam o tamanho da subárvore, não o total de tarefas
+
+    def get_subtarefas(self, tarefa_id: int) -> List[Tarefa]:
+        """Retorna as subtarefas diretas de uma tarefa, em ordem de ID."""
+
+        return [self._tarefas_por_id[filho_id] for filho_id in self._arvore.filhos(tarefa_id)]
+
+    def get_progresso(self, tarefa_id: int) -> Tuple[int, int]:
+        """
+        Retorna quantas subtarefas de uma tarefa, em qualquer nível, estão concluídas e o total delas.
+
+        A contagem é mantida a cada alteração, então a consulta não percorre as subtarefas.
+        """
+
+        return self._arvore.progresso(tarefa_id)
+
+    def _descendentes(self, tarefa_id: int) -> List[Tarefa]:
+        """Retorna as subtarefas de uma tarefa em todos os níveis, cada pai antes dos seus filhos."""
+
+        return [self._tarefas_por_id[descendente_id] for descendente_id in self._arvore.descendentes(tarefa_id)]
+
+    def _remover_com_subtarefas(self, tarefa_ids: Iterable[int], lapides: bool = True) -> List[Tarefa]:
+        """Remove as tarefas informadas e todas as suas subtarefas."""
+
+        ids = set(tarefa_ids)
+        for tarefa_id in list(ids):
+            ids.update(self._arvore.descendentes(tarefa_id))
+        return self._remover_tarefas_por_id(ids, lapides)
+
+    def _concluir_com_subtarefas(self, tarefa: Tarefa) -> Tarefa:
+        """Conclui uma tarefa e as suas subtarefas pendentes, em todos os níveis, e retorna a nova versão dela."""
+
+        for descendente in self._descendentes(tarefa.id):
+            if not descendente.concluida:
+                self._concluir(descendente)
+        return self._concluir(tarefa)
+
+    def _tem_ancestral_em(self, tarefa_id: int, ids: Set[int]) -> bool:
+        """Indica se algum ancestral da tarefa está entre os IDs informados."""
+
+        return any(ancestral_id in ids for ancestral_id in self._arvore.ancestrais(tarefa_id))
+
     def remover_tarefa(self, tarefa_id: int) -> bool:
-        """Remove uma tarefa da lista."""
+        """Remove uma tarefa da lista, junto com as suas subtarefas."""
 
         tarefa = self.buscar_tarefa_por_id(tarefa_id)
         if not tarefa:
             return False
 
-        self._tarefas.remove(tarefa)
-        self._salvar_tudo()
+        with self._operacao(f"remover a tarefa '{tarefa.titulo}'"):
+            self._remover_com_subtarefas([tarefa.id])
         return True
 
     def concluir_tarefa(self, tarefa_id: int) -> Optional[Tarefa]:
-        """Marca uma tarefa como concluída. Se for recorrente, cria a próxima ocorrência."""
+        """
+        Marca uma tarefa como concluída.
+
+        Se for recorrente, a série registra a conclusão no seu histórico e avança
+        para a próxima ocorrência, em vez de criar uma cópia da tarefa. As subtarefas
+        pendentes também são concluídas.
+        """
 
-        tarefa_original = self.buscar_tarefa_por_id(tarefa_id)
-        if not tarefa_original:
+        tarefa = self.buscar_tarefa_por_id(tarefa_id)
+        if not tarefa:
             return None
 
-        tarefa_original.concluida = True
-
-        # Lógica para tarefas recorrentes
-        if tarefa_original.repeticao != "nunca" and tarefa_original.data_termino:
-            nova_tarefa = copy.deepcopy(tarefa_original) # Cria uma cópia profunda
-            nova_tarefa.id = self._gerar_proximo_id_tarefa()
-            nova_tarefa.concluida = False
-
-            # Calcula a nova data de término
-            if tarefa_original.repeticao == "diaria":
-                nova_tarefa.data_termino += timedelta(days=1)
-            elif tarefa_original.repeticao == "semanal":
-                nova_tarefa.data_termino += timedelta(weeks=1)
-            elif tarefa_original.repeticao == "mensal":
-                # Adiciona um mês (aproximação simples)
-                nova_data = tarefa_original.data_termino
-                nova_tarefa.data_termino = nova_data.replace(month=nova_data.month + 1)
-            elif tarefa_original.repeticao == "anual":
-                nova_data = tarefa_original.data_termino
-                nova_tarefa.data_termino = nova_data.replace(year=nova_data.year + 1)
-
-            self._tarefas.append(nova_tarefa)
+        with self._operacao(f"concluir a tarefa '{tarefa.titulo}'"):
+            tarefa = self._concluir_com_subtarefas(tarefa)
+        return tarefa
 
-        self._salvar_tudo()
-        return tarefa_original
+    def _concluir(self, tarefa: Tarefa) -> Tarefa:
+        """Conclui uma tarefa comum ou a ocorrência atual de uma série recorrente e retorna a nova versão dela."""
+
+        if not (recorrencia.eh_recorrente(tarefa.repeticao) and tarefa.data_termino):
+            return self._alterar_tarefa(tarefa, {"concluida": True, "data_conclusao": date.today()})
+
+        # Séries antigas (ou editadas) podem não ter a data de referência
+        inicio_serie = tarefa.inicio_serie or tarefa.data_termino
+
+        # O histórico é substituído por uma nova lista (e não alterado no lugar)
+        # para que o valor antigo guardado no histórico de desfazer continue válido
+        return self._alterar_tarefa(tarefa, {
+            "inicio_serie": inicio_serie,
+            "conclusoes": tarefa.conclusoes + [tarefa.data_termino],
+            "data_termino": recorrencia.proxima_ocorrencia(inicio_serie, tarefa.repeticao, tarefa.data_termino)
+        })
 
     def desmarcar_tarefa(self, tarefa_id: int) -> Optional[Tarefa]:
-        """Marca uma tarefa como não concluída."""
+        """
+        Marca uma tarefa como não concluída.
+
+        Em uma série recorrente, desfaz a última conclusão: a ocorrência volta a ficar pendente.
+        """
 
         tarefa = self.buscar_tarefa_por_id(tarefa_id)
         if tarefa:
-            tarefa.concluida = False
-            self._salvar_tudo()
+            with self._operacao(f"desmarcar a tarefa '{tarefa.titulo}'"):
+                tarefa = self._desmarcar(tarefa)
         return tarefa
 
+    def _desmarcar(self, tarefa: Tarefa) -> Tarefa:
+        """Torna uma tarefa pendente, voltando a série para a última ocorrência concluída, e retorna a nova versão dela."""
+
+        if not tarefa.concluida and tarefa.conclusoes:
+            tarefa = self._alterar_tarefa(tarefa, {
+                "data_termino": tarefa.conclusoes[-1],
+                "conclusoes": tarefa.conclusoes[:-1]
+            })
+        return self._alterar_tarefa(tarefa, {"concluida": False, "data_conclusao": None})
+
+    def avancar_recorrencias_atrasadas(self, hoje: Optional[date] = None) -> int:
+        """
+        Avança de uma só vez todas as séries recorrentes atrasadas até a primeira ocorrência a partir de hoje.
+
+        As ocorrências que ficaram para trás não contam como conclusões: apenas a quantidade
+        delas é somada em `puladas`. Percorre somente as séries recorrentes e salva uma única vez.
+        Retorna o número de séries avançadas.
+        """
+
+        hoje = hoje or date.today()
+        num_avancadas = 0
+
+        with self._operacao("avançar as tarefas recorrentes atrasadas"):
+            # Copia os valores porque alterar uma tarefa a reindexa no dicionário de séries
+            for tarefa in list(self._series.values()):
+                if tarefa.concluida or not tarefa.data_termino or tarefa.data_termino >= hoje:
+                    continue
+
+                inicio_serie = tarefa.inicio_serie or tarefa.data_termino
+                indice_atual = recorrencia.indice_ocorrencia(inicio_serie, tarefa.repeticao, tarefa.data_termino)
+                indice_hoje = recorrencia.indice_ocorrencia(inicio_serie, tarefa.repeticao, hoje)
+                self._alterar_tarefa(tarefa, {
+                    "inicio_serie": inicio_serie,
+                    "puladas": tarefa.puladas + indice_hoje - indice_atual,
+                    "data_termino": recorrencia.ocorrencia(inicio_serie, tarefa.repeticao, indice_hoje)
+                })
+                num_avancadas += 1
+
+        return num_avancadas
+
     def remover_tarefas_concluidas(self) -> int:
-        """Remove todas as tarefas concluídas e retorna o número de tarefas removidas."""
+        """
+        Remove todas as tarefas concluídas e retorna o número de tarefas removidas.
+
+        As subtarefas de uma tarefa concluída saem junto com ela, mesmo as pendentes.
+        """
+
+        with self._operacao("remover as tarefas concluídas"):
+            removidas = self._remover_com_subtarefas([t.id for t in self._tarefas if t.concluida])
+        return len(removidas)
 
-        tarefas_para_manter = [t for t in self._tarefas if not t.concluida]
-        num_removidas = len(self._tarefas) - len(tarefas_para_manter)
-        self._tarefas = tarefas_para_manter
-        if num_removidas > 0:
+    def arquivar_tarefas_concluidas(self, dias: int, hoje: Optional[date] = None) -> int:
+        """
+        Move para o arquivo morto as tarefas concluídas há mais de `dias` dias.
+
+        As tarefas arquivadas saem das tarefas ativas: deixam de ser carregadas, salvas
+        e exibidas, mas continuam disponíveis em `buscar_tarefas_arquivadas`. A data
+        considerada é a de conclusão ou, nas tarefas concluídas antes de ela ser
+        registrada, a de término; tarefas sem nenhuma das duas não são arquivadas. Uma
+        tarefa com subtarefas só é arquivada junto com todas elas, quando todas puderem
+        ser arquivadas, e uma subtarefa só é arquivada junto com a tarefa principal.
+
+        O arquivamento não pode ser desfeito, e o histórico de desfazer é esvaziado
+        porque as ações registradas nele podem envolver as tarefas arquivadas.
+        Retorna o número de tarefas arquivadas.
+        """
+
+        limite = (hoje or date.today()) - timedelta(days=dias)
+        elegiveis = {tarefa.id for tarefa in self._tarefas
+                     if tarefa.concluida and (tarefa.data_conclusao or tarefa.data_termino)
+                     and (tarefa.data_conclusao or tarefa.data_termino) < limite}
+        arquivadas = []
+        for tarefa in self._tarefas:
+            if tarefa.id in elegiveis and self._arvore.pai(tarefa.id) is None:
+                arvore = [tarefa] + self._descendentes(tarefa.id)
+                if all(item.id in elegiveis for item in arvore):
+                    arquivadas.extend(arvore)
+        if not arquivadas:
+            return 0
+
+        # O arquivo morto é gravado primeiro: se falhar, nenhuma tarefa sai das ativas
+        try:
+            arquivo_morto.arquivar(arquivadas, self._caminho_arquivo_morto)
+        except OSError as erro:
+            print(f"Erro ao gravar o arquivo morto: {erro}")
+            return 0
+
+        ids = {tarefa.id for tarefa in arquivadas}
+        with self._operacao(f"arquivar {len(arquivadas)} tarefas", desfazivel=False):
+            self._remover_tarefas_por_id(ids, lapides=False)
+            self._metadados["maior_id_arquivado"] = max(max(ids), self._metadados.get("maior_id_arquivado", 0))
+        self._historico.limpar()
+        return len(arquivadas)
+
+    def buscar_tarefas_arquivadas(self, termo: str, regex: bool = False) -> List[Tarefa]:
+        """
+        Busca no arquivo morto as tarefas que contenham o termo no título, notas ou tags.
+
+        Lê o arquivo morto inteiro a cada chamada. As tarefas retornadas são cópias
+        somente para consulta: alterá-las não muda o arquivo.
+        """
+
+        # Uma tarefa que também está entre as ativas (ex: se o programa foi interrompido
+        # logo depois de gravar o arquivo morto) aparece apenas como ativa
+        return [tarefa for tarefa in arquivo_morto.buscar(termo, self._caminho_arquivo_morto, regex)
+                if tarefa.id not in self._tarefas_por_id]
+
+    # Operações em massa: aplicam a mesma ação a um conjunto de IDs em uma única
+    # operação, que salva o arquivo uma única vez e é desfeita de uma só vez.
+
+    def concluir_tarefas(self, tarefa_ids: List[int]) -> Dict[int, bool]:
+        """
+        Marca várias tarefas como concluídas, com as suas subtarefas, avançando as séries recorrentes.
+
+        Retorna um dicionário que indica, para cada ID, se a tarefa foi encontrada e concluída.
+        """
+
+        ids = set(tarefa_ids)
+        resultados = {}
+        with self._operacao(f"concluir {len(tarefa_ids)} tarefas"):
+            for tarefa_id in tarefa_ids:
+                tarefa = self._tarefas_por_id.get(tarefa_id)
+                # Uma subtarefa de outra tarefa do lote é concluída junto com ela, e não
+                # de novo (o que avançaria duas vezes uma série recorrente)
+                if tarefa and not self._tem_ancestral_em(tarefa_id, ids):
+                    self._concluir_com_subtarefas(tarefa)
+                resultados[tarefa_id] = tarefa is not None
+        return resultados
+
+    def desmarcar_tarefas(self, tarefa_ids: List[int]) -> Dict[int, bool]:
+        """Marca várias tarefas como não concluídas e retorna o resultado por ID."""
+
+        resultados = {}
+        with self._operacao(f"desmarcar {len(tarefa_ids)} tarefas"):
+            for tarefa_id in tarefa_ids:
+                tarefa = self._tarefas_por_id.get(tarefa_id)
+                if tarefa:
+                    self._desmarcar(tarefa)
+                resultados[tarefa_id] = tarefa is not None
+        return resultados
+
+    def remover_tarefas(self, tarefa_ids: List[int]) -> Dict[int, bool]:
+        """Remove várias tarefas, com as suas subtarefas, e retorna, para cada ID, se a tarefa existia e foi removida."""
+
+        resultados = {tarefa_id: tarefa_id in self._tarefas_por_id for tarefa_id in tarefa_ids}
+        with self._operacao(f"remover {len(tarefa_ids)} tarefas"):
+            self._remover_com_subtarefas(tarefa_ids)
+        return resultados
+
+    def mover_tarefas(self, tarefa_ids: List[int], lista_id: int) -> Dict[int, bool]:
+        """Move várias tarefas para outra lista e retorna o resultado por ID."""
+
+        if not self.buscar_lista_por_id(lista_id):
+            print("Erro: Lista não encontrada.")
+            return {tarefa_id: False for tarefa_id in tarefa_ids}
+
+        return self.editar_tarefas(tarefa_ids, {"lista_id": lista_id})
+
+    def editar_tarefas(self, tarefa_ids: List[int], campos: Dict[str, Any]) -> Dict[int, bool]:
+        """
+        Aplica os mesmos novos valores a várias tarefas.
+
+        O ID nunca é alterado. Campos que não existem na tarefa são ignorados.
+        Retorna um dicionário que indica, para cada ID, se a tarefa foi editada.
+        """
+
+        resultados = {}
+        ordem = tarefa_ids
+        if "lista_id" in campos:
+            # Os pais são movidos antes das subtarefas, que então já estão na nova lista junto
+            # com eles e continuam subtarefas
+            ordem = sorted(tarefa_ids, key=lambda tarefa_id: sum(1 for _ in self._arvore.ancestrais(tarefa_id)))
+        with self._operacao(f"editar {len(tarefa_ids)} tarefas"):
+            for tarefa_id in ordem:
+                tarefa = self._tarefas_por_id.get(tarefa_id)
+                if tarefa:
+                    # Listas (como as tags) são copiadas para que as tarefas não compartilhem o mesmo objeto
+                    self._aplicar_campos(tarefa, {chave: valor.copy() if isinstance(valor, list) else valor
+                                                  for chave, valor in campos.items()})
+                resultados[tarefa_id] = tarefa is not None
+        return resultados
+
+    # Sincronização entre réplicas: cada réplica envia à outra só as alterações que ela
+    # ainda não viu (um delta), e as duas mesclam campo a campo, da mesma forma
+
+    def habilitar_sincronizacao(self) -> str:
+        """Liga a sincronização desta réplica, se ainda não estiver ligada, e retorna o seu identificador."""
+
+        if self._replica is None:
+            self._replica = self._metadados["replica"] = sincronizacao.nova_replica()
             self._salvar_tudo()
-        return num_removidas
+        return self._replica
+
+    def get_replica(self) -> Optional[str]:
+        """Retorna o identificador desta réplica, ou None se a sincronização estiver desligada."""
+
+        return self._replica
+
+    def get_vistos(self) -> Dict[str, int]:
+        """
+        Retorna o vetor de relógios desta réplica: para cada réplica, o maior relógio
+        das alterações dela que esta já recebeu (ou fez, no caso da própria).
+        """
+
+        vistos = dict(self._metadados.get("vistos", {}))
+        if self._replica is not None:
+            vistos[self._replica] = self._metadados.get("relogio", 0)
+        return vistos
+
+    def gerar_delta(self, vistos: Dict[str, int]) -> Dict[str, Any]:
+        """
+        Monta as alterações que uma réplica com o vetor `vistos` ainda não recebeu.
+
+        Na primeira sincronização entre as duas réplicas, todas as tarefas e listas vão
+        completas. Depois disso, vão apenas os campos alterados, as tarefas e listas
+        criadas e as lápides das removidas.
+        """
+
+        # Os dados de antes da sincronização não têm carimbos, então vão completos para uma
+        # réplica que nunca recebeu nada desta, nem por meio de outra réplica
+        completo = self._replica not in vistos
+        uids_listas = {lista.id: sincronizacao.uid_de(lista) for lista in self._listas}
+
+        def tarefa_para_delta(tarefa: Tarefa) -> Dict[str, Any]:
+            return self._tarefa_para_delta(tarefa, uids_listas)
+
+        def registros(objetos, para_delta, campos):
+            return [registro for registro in (sincronizacao.registro_delta(objeto, para_delta, campos, vistos, completo)
+                                              for objeto in objetos) if registro is not None]
+
+        def lapides(chave):
+            return {uid: carimbo for uid, carimbo in self._metadados.get(chave, {}).items()
+                    if completo or sincronizacao.eh_novo(carimbo, vistos)}
+
+        return {
+            "delta": sincronizacao.VERSAO_DELTA,
+            "replica": self._replica,
+            "vistos": self.get_vistos(),
+            "listas": registros(self._listas, ListaDeTarefas.to_dict, sincronizacao.CAMPOS_LISTA),
+            "tarefas": registros(self._tarefas, tarefa_para_delta, sincronizacao.CAMPOS_TAREFA),
+            "lapides_listas": lapides("lapides_listas"),
+            "lapides_tarefas": lapides("lapides_tarefas")
+        }
+
+    def _tarefa_para_delta(self, tarefa: Tarefa, uids_listas: Dict[int, str]) -> Dict[str, Any]:
+        """Converte uma tarefa no formato do delta, com a lista e a tarefa principal pelos identificadores entre réplicas."""
+
+        dados = tarefa.to_dict()
+        dados["lista_id"] = uids_listas.get(tarefa.lista_id, str(tarefa.lista_id))
+        if tarefa.pai_id is not None:
+            pai = self._tarefas_por_id.get(tarefa.pai_id)
+            dados["pai_id"] = sincronizacao.uid_de(pai) if pai else None
+        return dados
+
+    def aplicar_delta(self, delta: Dict[str, Any]) -> Dict[str, int]:
+        """
+        Mescla as alterações recebidas de outra réplica.
+
+        Cada campo fica com o valor da alteração mais recente (pelo relógio lógico, com
+        a réplica como desempate), então as duas réplicas chegam ao mesmo resultado,
+        qualquer que seja a ordem da sincronização. A mesclagem é uma única ação, que
+        pode ser desfeita.
+
+        Returns:
+            Dict[str, int]: Quantas tarefas e listas foram criadas, alteradas, removidas
+            e ignoradas (ex: tarefas de uma lista que foi removida nesta réplica).
+
+        Raises:
+            ValueError: Se o delta for de uma versão desconhecida ou desta mesma réplica.
+        """
+
+        if delta.get("delta") != sincronizacao.VERSAO_DELTA:
+            raise ValueError(f"Versão de delta não suportada: {delta.get('delta')}.")
+        if delta["replica"] == self.habilitar_sincronizacao():
+            # Acontece ao copiar o arquivo de uma réplica que já sincronizou
+            raise ValueError("O delta veio desta mesma réplica. Copie o arquivo antes da primeira sincronização.")
+
+        contadores = {"criadas": 0, "alteradas": 0, "removidas": 0, "ignoradas": 0}
+        # As alterações recebidas mantêm os carimbos da réplica de origem
+        self._carimbos_ligados = False
+        try:
+            with self._operacao("sincronizar com outra réplica"):
+                # O relógio avança além de tudo o que foi recebido (relógio de Lamport) antes da
+                # mesclagem, para que as lápides e os carimbos gerados nela venham depois do
+                # recebido. Dentro da operação, volta ao que era se a aplicação for interrompida.
+                self._metadados["relogio"] = max([self._metadados.get("relogio", 0), *delta["vistos"].values()])
+                listas_por_uid = self._aplicar_listas_recebidas(delta, contadores)
+                self._aplicar_tarefas_recebidas(delta, listas_por_uid, contadores)
+                self._aplicar_lapides_recebidas(delta, listas_por_uid, contadores)
+                if not self._listas:
+                    # As duas réplicas removeram as listas uma da outra: sempre há ao menos uma
+                    self._recriar_lista_padrao()
+                    contadores["criadas"] += 1
+
+                vistos = self._metadados.setdefault("vistos", {})
+                for replica, relogio in delta["vistos"].items():
+                    if replica != self._replica:
+                        vistos[replica] = max(vistos.get(replica, 0), relogio)
+        finally:
+            self._carimbos_ligados = True
+
+        if not (contadores["criadas"] or contadores["alteradas"] or contadores["removidas"]):
+            # Sem alterações a ação não salva nada, mas o vetor de relógios mudou
+            self._salvar_tudo()
+        return contadores
+
+    def _recriar_lista_padrao(self):
+        """Recria a lista "Geral", com o mesmo identificador em todas as réplicas."""
+
+        lista = ListaDeTarefas(nome="Geral", id=self._gerar_proximo_id_lista(), uid=sincronizacao.UID_LISTA_PADRAO,
+                               relogios={sincronizacao.CRIACAO: self._carimbar(forcar=True)})
+        self._metadados.get("lapides_listas", {}).pop(lista.uid, None)
+        self._inserir_lista(lista)
+
+    def _aplicar_listas_recebidas(self, delta: Dict[str, Any], contadores: Dict[str, int]) -> Dict[str, ListaDeTarefas]:
+        """Cria ou mescla as listas recebidas e retorna as listas atuais por identificador."""
+
+        listas_por_uid = {sincronizacao.uid_de(lista): lista for lista in self._listas}
+        lapides = self._metadados.get("lapides_listas", {})
+        carimbar = lambda: self._carimbar(forcar=True)
+        for registro in delta["listas"]:
+            uid = registro["uid"]
+            lista = listas_por_uid.get(uid)
+            if lista is None:
+                if not sincronizacao.deve_criar(registro, lapides.get(uid)):
+                    contadores["ignoradas"] += 1
+                    continue
+                lista_id = registro["id"] if not self.buscar_lista_por_id(registro["id"]) else self._gerar_proximo_id_lista()
+                lista = ListaDeTarefas(nome=registro["campos"]["nome"][0], id=lista_id, uid=uid,
+                                       relogios=sincronizacao.relogios_do_registro(registro, carimbar))
+                lapides.pop(uid, None)
+                self._inserir_lista(lista)
+                listas_por_uid[uid] = lista
+                contadores["criadas"] += 1
+                continue
+
+            vencedores, relogios = sincronizacao.mesclar(lista, lista.to_dict(), registro, carimbar)
+            if relogios:
+                listas_por_uid[uid] = self._alterar_lista(lista, {**vencedores, "relogios": relogios})
+                contadores["alteradas"] += 1
+        return listas_por_uid
+
+    def _aplicar_tarefas_recebidas(self, delta: Dict[str, Any], listas_por_uid: Dict[str, ListaDeTarefas],
+                                   contadores: Dict[str, int]):
+        """
+        Cria ou mescla as tarefas recebidas.
+
+        A tarefa principal de cada subtarefa é ligada só depois, porque ela pode estar
+        mais adiante no mesmo delta.
+        """
+
+        ids_por_uid = {sincronizacao.uid_de(tarefa): tarefa.id for tarefa in self._tarefas}
+        uids_listas = {lista.id: uid for uid, lista in listas_por_uid.items()}
+        lapides = self._metadados.setdefault("lapides_tarefas", {})
+        maior_id_arquivado = self._metadados.get("maior_id_arquivado", 0)
+        carimbar = lambda: self._carimbar(forcar=True)
+        # (ID local da tarefa, identificador da nova tarefa principal)
+        pais_recebidos: List[Tuple[int, Optional[str]]] = []
+
+        for registro in delta["tarefas"]:
+            uid = registro["uid"]
+            tarefa = self._tarefas_por_id.get(ids_por_uid.get(uid))
+
+            if tarefa is None:
+                lista_uid = registro["campos"].get("lista_id", [None])[0]
+                lista = listas_por_uid.get(lista_uid)
+                if lista is None or not sincronizacao.deve_criar(registro, lapides.get(uid)):
+                    if lista is None and lista_uid in self._metadados.get("lapides_listas", {}):
+                        # Uma tarefa de uma lista removida nesta réplica é removida junto com ela
+                        # (a lápide avisa as réplicas que ainda a têm)
+                        lapides[uid] = carimbar()
+                    contadores["ignoradas"] += 1
+                    continue
+                tarefa_id = registro["id"]
+                if tarefa_id in self._tarefas_por_id or tarefa_id <= maior_id_arquivado:
+                    tarefa_id = self._gerar_proximo_id_tarefa()
+                dados = {campo: valor for campo, (valor, _) in registro["campos"].items()}
+                pai_uid = dados.pop("pai_id", None)
+                dados.update(id=tarefa_id, lista_id=lista.id, uid=uid, relogios=sincronizacao.relogios_do_registro(registro, carimbar))
+                tarefa = Tarefa.from_dict(dados)
+                lapides.pop(uid, None)
+                self._inserir_tarefa(tarefa)
+                ids_por_uid[uid] = tarefa.id
+                if pai_uid is not None:
+                    pais_recebidos.append((tarefa.id, pai_uid))
+                contadores["criadas"] += 1
+                continue
+
+            dados_locais = self._tarefa_para_delta(tarefa, uids_listas)
+            vencedores, relogios = sincronizacao.mesclar(tarefa, dados_locais, registro, carimbar)
+            if not relogios:
+                continue
+
+            if "pai_id" in vencedores:
+                pais_recebidos.append((tarefa.id, vencedores.pop("pai_id")))
+            if "lista_id" in vencedores:
+                lista = listas_por_uid.get(vencedores["lista_id"])
+                if lista is None:
+                    # A tarefa foi movida para uma lista removida nesta réplica: sai junto com a lista
+                    contadores["removidas"] += self._remover_recebida(tarefa, carimbar)
+                    continue
+                vencedores["lista_id"] = lista.id
+
+            mesclada = Tarefa.from_dict({**tarefa.to_dict(), **vencedores})
+            campos = {campo: getattr(mesclada, campo) for campo in vencedores}
+            campos["relogios"] = relogios
+            self._alterar_tarefa(tarefa, campos)
+            contadores["alteradas"] += 1
+
+        for tarefa_id, pai_uid in pais_recebidos:
+            tarefa = self._tarefas_por_id.get(tarefa_id)
+            if tarefa is None:
+                continue
+            pai = self._tarefas_por_id.get(ids_por_uid.get(pai_uid)) if pai_uid is not None else None
+            if pai is None and pai_uid in lapides:
+                # A tarefa principal foi removida nesta réplica: a subtarefa sai junto com ela
+                contadores["removidas"] += self._remover_recebida(tarefa, carimbar)
+                continue
+            if pai is not None and (pai.id == tarefa.id or tarefa.id in self._arvore.ancestrais(pai.id)):
+                tarefa, pai = self._desfazer_ciclo(tarefa, pai, carimbar)
+            # Uma tarefa principal que esta réplica não tem (ex: arquivada) não é ligada
+            self._alterar_tarefa(tarefa, {"pai_id": pai.id if pai else None})
+
+    def _remover_recebida(self, tarefa: Tarefa, carimbar: Callable[[], List]) -> int:
+        """
+        Remove uma tarefa recebida que não cabe mais nesta réplica, com as suas subtarefas.
+
+        As lápides são novas alterações desta réplica, para que a remoção chegue também
+        às réplicas que ainda têm as tarefas. Retorna quantas tarefas foram removidas.
+        """
+
+        removidas = self._remover_com_subtarefas([tarefa.id], lapides=False)
+        lapides = self._metadados.setdefault("lapides_tarefas", {})
+        for removida in removidas:
+            lapides[sincronizacao.uid_de(removida)] = carimbar()
+        return len(removidas)
+
+    def _desfazer_ciclo(self, tarefa: Tarefa, pai: Tarefa, carimbar: Callable[[], List]) -> Tuple[Tarefa, Optional[Tarefa]]:
+        """
+        Resolve uma tarefa principal recebida que fecharia um ciclo (ex: cada réplica pôs
+        uma tarefa dentro da outra).
+
+        Das ligações do ciclo, a de carimbo mais recente é desfeita: a tarefa dela vira
+        uma tarefa principal. Todas as réplicas veem o mesmo ciclo com os mesmos carimbos,
+        então desfazem a mesma ligação. Retorna a tarefa e o pai que ela deve receber.
+        """
+
+        ciclo = [tarefa, pai]
+        for ancestral_id in self._arvore.ancestrais(pai.id):
+            if ancestral_id == tarefa.id:
+                break
+            ciclo.append(self._tarefas_por_id[ancestral_id])
+        # A ligação da tarefa é a recebida, cujo carimbo já está nos relógios dela
+        cortada = max(ciclo, key=lambda item: (sincronizacao.carimbo_de(item, "pai_id"), sincronizacao.uid_de(item)))
+        nova = self._alterar_tarefa(cortada, {"pai_id": None, "relogios": {**cortada.relogios, "pai_id": carimbar()}})
+        if cortada is tarefa:
+            return nova, None
+        return tarefa, pai
+
+    def _aplicar_lapides_recebidas(self, delta: Dict[str, Any], listas_por_uid: Dict[str, ListaDeTarefas],
+                                   contadores: Dict[str, int]):
+        """Remove as listas e tarefas que foram removidas na outra réplica depois de criadas."""
+
+        lapides_tarefas = self._metadados.setdefault("lapides_tarefas", {})
+        lapides_listas = self._metadados.setdefault("lapides_listas", {})
+        carimbar = lambda: self._carimbar(forcar=True)
+
+        for uid, carimbo in delta["lapides_listas"].items():
+            lapides_listas[uid] = max(lapides_listas.get(uid, sincronizacao.CARIMBO_BASE), carimbo)
+            lista = listas_por_uid.get(uid)
+            if lista is None or carimbo <= lista.relogios.get(sincronizacao.CRIACAO, sincronizacao.CARIMBO_BASE):
+                continue
+            # As tarefas da lista saem com ela, inclusive as criadas aqui sem a outra réplica
+            # saber. As lápides delas são novas alterações desta réplica, para que cheguem
+            # também às réplicas que já viram a remoção da lista, mas não essas tarefas.
+            self._remover_listas_onde(lambda l: l.id == lista.id)
+            removidas = self._remover_com_subtarefas([t.id for t in self._tarefas if t.lista_id == lista.id], lapides=False)
+            for tarefa in removidas:
+                lapides_tarefas[sincronizacao.uid_de(tarefa)] = carimbar()
+            del listas_por_uid[uid]
+            contadores["removidas"] += 1 + len(removidas)
+
+        tarefas_por_uid = {sincronizacao.uid_de(tarefa): tarefa for tarefa in self._tarefas}
+        ids_removidos = set()
+        for uid, carimbo in delta["lapides_tarefas"].items():
+            lapides_tarefas[uid] = max(lapides_tarefas.get(uid, sincronizacao.CARIMBO_BASE), carimbo)
+            tarefa = tarefas_por_uid.get(uid)
+            if tarefa is not None and carimbo > tarefa.relogios.get(sincronizacao.CRIACAO, sincronizacao.CARIMBO_BASE):
+                ids_removidos.add(tarefa.id)
+        if ids_removidos:
+            removidas = self._remover_com_subtarefas(ids_removidos, lapides=False)
+            for tarefa in removidas:
+                if tarefa.id not in ids_removidos:
+                    # As subtarefas saem com a tarefa principal, como em uma remoção local
+                    lapides_tarefas[sincronizacao.uid_de(tarefa)] = carimbar()
+            contadores["removidas"] += len(removidas)
@@ -0,0 +1,270 @@
+import atexit
+import functools
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Tuple
+
+# Indica se a coleta de métricas está ligada. Enquanto for False, nenhum método é
+# instrumentado e a persistência apenas testa esta variável, então o custo é quase nulo.
+ATIVO = False
+
+# Variável de ambiente que liga a coleta. O valor é o caminho do arquivo exportado
+# ao sair do programa: ".json" gera um JSON, qualquer outra extensão gera o formato
+# de texto do Prometheus.
+VARIAVEL_AMBIENTE = "GERENCIADOR_METRICAS"
+
+# Limites superiores (em segundos) das faixas dos histogramas de latência
+FAIXAS_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_DESCRICOES = {
+    "gerenciador_operacao_segundos": "Latência dos métodos públicos do TaskManager.",
+    "persistencia_segundos": "Latência das etapas de carregamento e salvamento dos dados.",
+    "persistencia_bytes_escritos_total": "Total de bytes escritos no arquivo de dados.",
+    "persistencia_bytes_lidos_total": "Total de bytes lidos do arquivo de dados.",
+}
+
+
+class Histograma:
+    """Contagem de observações por faixa de valor, no estilo dos histogramas do Prometheus."""
+
+    def __init__(self, faixas: Tuple[float, ...] = FAIXAS_SEGUNDOS):
+        """
+        Inicializa um histograma vazio.
+
+        Args:
+            faixas (Tuple[float, ...]): Limites superiores das faixas, em ordem crescente.
+        """
+
+        self.faixas = faixas
+        # Uma posição a mais para as observações acima da maior faixa (+Inf)
+        self.contagens = [0] * (len(faixas) + 1)
+        self.contagem = 0
+        self.soma = 0.0
+
+    def observar(self, valor: float):
+        """Registra uma observação."""
+
+        self.contagens[bisect_left(self.faixas, valor)] += 1
+        self.contagem += 1
+        self.soma += valor
+
+    def acumulado(self) -> List[Tuple[str, int]]:
+        """Retorna as contagens acumuladas por limite de faixa, terminando em '+Inf'."""
+
+        total = 0
+        resultado = []
+        for limite, contagem in zip(list(self.faixas) + ["+Inf"], self.contagens):
+            total += contagem
+            resultado.append((str(limite), total))
+        return resultado
+
+
+# Histogramas por (nome da métrica, nome do rótulo, valor do rótulo)
+_histogramas: Dict[Tuple[str, str, str], Histograma] = {}
+# Contadores simples por nome da métrica
+_contadores: Dict[str, float] = {}
+
+
+def observar(metrica: str, rotulo: str, valor_rotulo: str, segundos: float):
+    """Registra uma latência no histograma da métrica com o rótulo informado."""
+
+    chave = (metrica, rotulo, valor_rotulo)
+    histograma = _histogramas.get(chave)
+    if histograma is None:
+        histograma = _histogramas[chave] = Histograma()
+    histograma.observar(segundos)
+
+
+def incrementar(metrica: str, valor: float = 1):
+    """Soma um valor a um contador."""
+
+    _contadores[metrica] = _contadores.get(metrica, 0) + valor
+
+
+def limpar():
+    """Descarta todas as métricas coletadas até agora."""
+
+    _histogramas.clear()
+    _contadores.clear()
+
+
+class ArquivoMedido:
+    """Envolve um arquivo aberto e acumula o tempo gasto nas chamadas de escrita."""
+
+    def __init__(self, arquivo):
+        """
+        Args:
+            arquivo: O arquivo aberto para escrita.
+        """
+
+        self._arquivo = arquivo
+        self.segundos_escrita = 0.0
+
+    def write(self, texto: str) -> int:
+        """Escreve no arquivo original, medindo o tempo da escrita."""
+
+        inicio = time.perf_counter()
+        resultado = self._arquivo.write(texto)
+        self.segundos_escrita += time.perf_counter() - inicio
+        return resultado
+
+
+def registrar_salvamento(segundos_total: float, segundos_escrita: float, bytes_escritos: int):
+    """Registra as métricas de uma chamada a `persistence.salvar_dados`."""
+
+    observar("persistencia_segundos", "etapa", "salvar_total", segundos_total)
+    observar("persistencia_segundos", "etapa", "salvar_escrita", segundos_escrita)
+    observar("persistencia_segundos", "etapa", "salvar_serializacao", segundos_total - segundos_escrita)
+    incrementar("persistencia_bytes_escritos_total", bytes_escritos)
+
+
+def registrar_carregamento(segundos_total: float, segundos_leitura: float, bytes_lidos: int):
+    """Registra as métricas de uma chamada a `persistence.carregar_dados`."""
+
+    observar("persistencia_segundos", "etapa", "carregar_total", segundos_total)
+    observar("persistencia_segundos", "etapa", "carregar_leitura", segundos_leitura)
+    observar("persistencia_segundos", "etapa", "carregar_objetos", segundos_total - segundos_leitura)
+    incrementar("persistencia_bytes_lidos_total", bytes_lidos)
+
+
+def _medir_metodo(nome: str, metodo: Callable) -> Callable:
+    """Cria uma versão do método que registra a sua latência."""
+
+    # `updated=()`: os atributos de outros invólucros (ex: a marca da gravação de sessões)
+    # não são copiados, senão este invólucro seria tomado pelo deles ao ser desfeito
+    @functools.wraps(metodo, updated=())
+    def metodo_medido(*args, **kwargs):
+        # Um invólucro que ficou sob outro ao desativar apenas repassa a chamada
+        if not ATIVO:
+            return metodo(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            observar("gerenciador_operacao_segundos", "operacao", nome, time.perf_counter() - inicio)
+
+    metodo_medido.__metricas_original__ = metodo
+    return metodo_medido
+
+
+def _instrumentado(metodo: Callable) -> bool:
+    """Indica se o método já passa pelo invólucro das métricas, mesmo sob outros invólucros."""
+
+    while metodo is not None:
+        if "__metricas_original__" in getattr(metodo, "__dict__", {}):
+            return True
+        metodo = getattr(metodo, "__wrapped__", None)
+    return False
+
+
+def instrumentar_classe(classe: type):
+    """Substitui cada método público da classe por uma versão que mede a sua latência."""
+
+    for nome, metodo in list(vars(classe).items()):
+        if nome.startswith("_") or not callable(metodo) or _instrumentado(metodo):
+            continue
+        setattr(classe, nome, _medir_metodo(nome, metodo))
+
+
+def remover_instrumentacao(classe: type):
+    """
+    Restaura os métodos originais de uma classe instrumentada.
+
+    Só é desfeito o invólucro que está por fora. Um que ficou sob outro invólucro (ex: o
+    da gravação de sessões, ligada depois) continua lá, apenas repassando as chamadas
+    enquanto a coleta estiver desligada, para não desfazer também o de fora.
+    """
+
+    for nome, metodo in list(vars(classe).items()):
+        original = getattr(metodo, "__dict__", {}).get("__metricas_original__")
+        if original is not None:
+            setattr(classe, nome, original)
+
+
+def ativar(caminho_exportacao: str = ""):
+    """
+    Liga a coleta de métricas e instrumenta o TaskManager.
+
+    Args:
+        caminho_exportacao (str): Se informado, as métricas são exportadas para este
+            arquivo ao sair do programa (JSON se terminar em ".json", senão Prometheus).
+    """
+
+    global ATIVO
+    # Importado aqui para evitar uma importação circular com o gerenciador
+    from manager import TaskManager
+
+    if not ATIVO:
+        instrumentar_classe(TaskManager)
+        ATIVO = True
+
+    if caminho_exportacao:
+        atexit.register(exportar, caminho_exportacao)
+
+
+def desativar():
+    """Desliga a coleta de métricas e restaura os métodos originais do TaskManager."""
+
+    global ATIVO
+    from manager import TaskManager
+
+    remover_instrumentacao(TaskManager)
+    ATIVO = False
+
+
+def ativar_pelo_ambiente():
+    """Liga a coleta se a variável de ambiente GERENCIADOR_METRICAS estiver definida."""
+
+    caminho = os.environ.get(VARIAVEL_AMBIENTE)
+    if caminho:
+        ativar(caminho)
+
+
+def texto_prometheus() -> str:
+    """Retorna as métricas no formato de texto de exposição do Prometheus."""
+
+    linhas = []
+    metricas_histograma = sorted({metrica for metrica, _, _ in _histogramas})
+    for metrica in metricas_histograma:
+        linhas.append(f"# HELP {metrica} {_DESCRICOES.get(metrica, metrica)}")
+        linhas.append(f"# TYPE {metrica} histogram")
+        for (nome, rotulo, valor_rotulo), histograma in sorted(_histogramas.items()):
+            if nome != metrica:
+                continue
+            for limite, contagem in histograma.acumulado():
+                linhas.append(f'{metrica}_bucket{{{rotulo}="{valor_rotulo}",le="{limite}"}} {contagem}')
+            linhas.append(f'{metrica}_sum{{{rotulo}="{valor_rotulo}"}} {histograma.soma}')
+            linhas.append(f'{metrica}_count{{{rotulo}="{valor_rotulo}"}} {histograma.contagem}')
+
+    for metrica, valor in sorted(_contadores.items()):
+        linhas.append(f"# HELP {metrica} {_DESCRICOES.get(metrica, metrica)}")
+        linhas.append(f"# TYPE {metrica} counter")
+        linhas.append(f"{metrica} {valor}")
+
+    return "\n".join(linhas) + "\n"
+
+
+def como_dicionario() -> Dict[str, Any]:
+    """Retorna as métricas como um dicionário serializável em JSON."""
+
+    histogramas: Dict[str, Dict[str, Any]] = {}
+    for (metrica, _, valor_rotulo), histograma in sorted(_histogramas.items()):
+        histogramas.setdefault(metrica, {})[valor_rotulo] = {
+            "contagem": histograma.contagem,
+            "soma_segundos": histograma.soma,
+            "media_segundos": histograma.soma / histograma.contagem if histograma.contagem else 0.0,
+            "faixas": dict(histograma.acumulado())
+        }
+    return {"histogramas": histogramas, "contadores": dict(_contadores)}
+
+
+def exportar(caminho: str):
+    """Grava as métricas no arquivo informado, em JSON ou no formato do Prometheus."""
+
+    with open(caminho, 'w', encoding='utf-8') as f:
+        if caminho.endswith(".json"):
+            json.dump(como_dicionario(), f, indent=4, ensure_ascii=False)
+        else:
+            f.write(texto_prometheus())
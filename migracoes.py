@@ -0,0 +1,310 @@
+import argparse
+import os
+import sys
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Versão do esquema gravada no cabeçalho dos arquivos de dados pelo programa atual.
+# Toda mudança nos campos gravados ganha uma nova versão e um passo de migração.
+VERSAO_ESQUEMA = 6
+# Os arquivos de antes do controle de versão não têm o número no cabeçalho
+ESQUEMA_SEM_VERSAO = 1
+
+# Tipos de registro de um arquivo de dados
+METADADOS = "metadados"
+LISTA = "lista"
+TAREFA = "tarefa"
+
+# Um registro é o tipo e o dicionário do objeto, como gravado no arquivo
+Registro = Tuple[str, Dict[str, Any]]
+
+_AUSENTE = object()
+
+
+class EsquemaNaoSuportado(ValueError):
+    """Os dados são de uma versão do esquema que este programa não sabe ler."""
+
+
+class Passo:
+    """Um passo de migração: converte os registros de uma versão do esquema para a seguinte."""
+
+    def __init__(self, origem: int, descricao: str):
+        """
+        Args:
+            origem (int): A versão convertida pelo passo (o resultado fica na `origem + 1`).
+            descricao (str): O que o passo muda, para o relatório.
+        """
+
+        self.origem = origem
+        self.descricao = descricao
+        self.conversores: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+
+    def aplicar(self, tipo: str, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """Converte um registro. Os tipos sem conversor neste passo passam sem mudanças."""
+
+        conversor = self.conversores.get(tipo)
+        return conversor(dados) if conversor else dados
+
+    def __repr__(self) -> str:
+        return f"Passo({self.origem} -> {self.origem + 1}: {self.descricao})"
+
+
+# Passos registrados, pela versão de origem
+PASSOS: Dict[int, Passo] = {}
+
+
+def migracao(origem: int, tipo: str, descricao: str):
+    """
+    Registra a função decorada como o conversor de um tipo de registro no passo `origem`.
+
+    O conversor recebe o dicionário do registro e retorna um novo, sem alterar o recebido
+    (a simulação compara os dois). Um passo pode ter um conversor para cada tipo.
+    """
+
+    def registrar(conversor: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        passo = PASSOS.setdefault(origem, Passo(origem, descricao))
+        passo.conversores[tipo] = conversor
+        return conversor
+
+    return registrar
+
+
+def passos_entre(origem: int, destino: int = VERSAO_ESQUEMA) -> List[Passo]:
+    """
+    Retorna os passos que levam os dados da versão `origem` à `destino`, em ordem.
+
+    Raises:
+        EsquemaNaoSuportado: Se os dados forem de uma versão mais nova que a do programa,
+            ou se faltar o passo de alguma versão no caminho.
+    """
+
+    if origem > VERSAO_ESQUEMA:
+        raise EsquemaNaoSuportado(f"Os dados são da versão {origem} do esquema, mais nova que a "
+                                  f"suportada por este programa ({VERSAO_ESQUEMA}).")
+    faltando = [versao for versao in range(origem, destino) if versao not in PASSOS]
+    if faltando:
+        raise EsquemaNaoSuportado(f"Não há migração a partir da versão {faltando[0]} do esquema.")
+    return [PASSOS[versao] for versao in range(origem, destino)]
+
+
+class Relatorio:
+    """O que uma migração mudou (ou mudaria, na simulação): registros e campos por passo."""
+
+    def __init__(self, origem: int, destino: int = VERSAO_ESQUEMA):
+        self.origem = origem
+        self.destino = destino
+        self.registros: Counter = Counter()
+        # Quantos registros tiveram cada combinação de campos alterada, por passo e tipo
+        self._mudancas: Counter = Counter()
+
+    def contar(self, passo: Passo, tipo: str, antes: Dict[str, Any], depois: Dict[str, Any]):
+        """Compara um registro antes e depois de um passo."""
+
+        if antes is depois:
+            return
+        campos = [campo for campo, valor in depois.items() if antes.get(campo, _AUSENTE) != valor]
+        campos.extend(campo for campo in antes if campo not in depois)
+        if campos:
+            # Uma contagem por combinação, e não por campo: os registros de um arquivo
+            # costumam mudar da mesma forma, então a simulação fica quase tão rápida quanto a migração
+            self._mudancas[passo.origem, tipo, tuple(campos)] += 1
+
+    def alterados(self, origem: int) -> Counter:
+        """Retorna quantos registros de cada tipo o passo da versão `origem` alterou."""
+
+        alterados = Counter()
+        for (passo, tipo, _), quantidade in self._mudancas.items():
+            if passo == origem:
+                alterados[tipo] += quantidade
+        return alterados
+
+    def campos(self, origem: int) -> Counter:
+        """Retorna quantas vezes o passo da versão `origem` alterou cada campo (ex: "tarefa.uid")."""
+
+        campos = Counter()
+        for (passo, tipo, alterados), quantidade in self._mudancas.items():
+            if passo == origem:
+                for campo in alterados:
+                    campos[f"{tipo}.{campo}"] += quantidade
+        return campos
+
+    @staticmethod
+    def _quantidades(contagem: Counter) -> str:
+        """Descreve uma contagem por tipo de registro (ex: "2 listas, 10 tarefas")."""
+
+        nomes = {METADADOS: "metadados", LISTA: "listas", TAREFA: "tarefas"}
+        return ", ".join(f"{quantidade} {nomes.get(tipo, tipo)}" for tipo, quantidade in contagem.items())
+
+    def resumo(self) -> str:
+        """Descreve o relatório em texto, um passo por linha."""
+
+        if self.origem == self.destino:
+            return f"Os dados já estão na versão {self.destino} do esquema."
+
+        linhas = [f"Versão do esquema: {self.origem} -> {self.destino}",
+                  "Registros lidos: " + self._quantidades(self.registros)]
+        for passo in passos_entre(self.origem, self.destino):
+            alterados = self.alterados(passo.origem)
+            if not alterados:
+                linhas.append(f"  {passo.origem} -> {passo.origem + 1} ({passo.descricao}): nenhuma alteração")
+                continue
+            registros = self._quantidades(alterados)
+            campos = ", ".join(f"{campo} ({quantidade})" for campo, quantidade in self.campos(passo.origem).most_common())
+            linhas.append(f"  {passo.origem} -> {passo.origem + 1} ({passo.descricao}): {registros}; campos: {campos}")
+        return "\n".join(linhas)
+
+
+def migrar_registro(tipo: str, dados: Dict[str, Any], passos: List[Passo]) -> Dict[str, Any]:
+    """Aplica os passos a um único registro."""
+
+    for passo in passos:
+        dados = passo.aplicar(tipo, dados)
+    return dados
+
+
+def migrar_registros(registros: Iterable[Registro], origem: int,
+                     relatorio: Optional[Relatorio] = None) -> Iterator[Registro]:
+    """
+    Migra os registros um a um, à medida que são lidos.
+
+    É um gerador: cada registro é convertido por todos os passos e entregue antes de o
+    próximo ser lido, então a memória usada não depende do tamanho do arquivo.
+
+    Args:
+        registros (Iterable[Registro]): Os registros na versão `origem`.
+        origem (int): A versão do esquema dos registros.
+        relatorio (Optional[Relatorio]): Se informado, recebe a contagem das alterações.
+    """
+
+    passos = passos_entre(origem)
+    for tipo, dados in registros:
+        if relatorio is not None:
+            relatorio.registros[tipo] += 1
+            for passo in passos:
+                convertido = passo.aplicar(tipo, dados)
+                relatorio.contar(passo, tipo, dados, convertido)
+                dados = convertido
+        else:
+            dados = migrar_registro(tipo, dados, passos)
+        yield tipo, dados
+
+
+# Passos de migração. Os valores preenchidos são os que o programa já assumia para os
+# campos ausentes, então os dados migrados se comportam como antes.
+
+def _com_padroes(dados: Dict[str, Any], padroes: Dict[str, Any]) -> Dict[str, Any]:
+    """Retorna uma cópia do registro com os campos ausentes preenchidos, ao final."""
+
+    return {**dados, **{campo: valor for campo, valor in padroes.items() if campo not in dados}}
+
+
+@migracao(1, TAREFA, "campos opcionais explícitos")
+def _tarefa_campos_opcionais(dados: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **dados,
+        "concluida": dados.get("concluida") or False,
+        "prioridade": dados.get("prioridade") or "nenhuma",
+        "tags": dados.get("tags") if dados.get("tags") is not None else [],
+        "notas": dados.get("notas") or "",
+        "repeticao": dados.get("repeticao") or "nunca"
+    }
+
+
+@migracao(2, TAREFA, "séries recorrentes")
+def _tarefa_series(dados: Dict[str, Any]) -> Dict[str, Any]:
+    return _com_padroes(dados, {"inicio_serie": None, "conclusoes": [], "puladas": 0})
+
+
+@migracao(3, TAREFA, "data de conclusão, usada pelo arquivo morto")
+def _tarefa_data_conclusao(dados: Dict[str, Any]) -> Dict[str, Any]:
+    return _com_padroes(dados, {"data_conclusao": None})
+
+
+@migracao(4, TAREFA, "identificadores e carimbos da sincronização")
+def _tarefa_sincronizacao(dados: Dict[str, Any]) -> Dict[str, Any]:
+    return _com_padroes(dados, {"uid": None, "relogios": {}})
+
+
+@migracao(4, LISTA, "identificadores e carimbos da sincronização")
+def _lista_sincronizacao(dados: Dict[str, Any]) -> Dict[str, Any]:
+    return _com_padroes(dados, {"uid": None, "relogios": {}})
+
+
+@migracao(5, TAREFA, "subtarefas")
+def _tarefa_subtarefas(dados: Dict[str, Any]) -> Dict[str, Any]:
+    return _com_padroes(dados, {"pai_id": None})
+
+
+def migrar_arquivo(caminho: str, destino: Optional[str] = None, simular: bool = False) -> Relatorio:
+    """
+    Atualiza um arquivo de dados para a versão atual do esquema, registro a registro.
+
+    O arquivo é lido, migrado e gravado aos poucos, no mesmo formato (JSON ou snapshot
+    compactado), então mesmo um arquivo com milhões de tarefas é migrado com pouca
+    memória. A gravação vai para um arquivo temporário, que só substitui o destino ao
+    final, para que uma migração interrompida não estrague os dados; a versão anterior
+    do destino fica como backup.
+
+    Args:
+        caminho (str): O arquivo de dados.
+        destino (Optional[str]): Onde gravar o resultado. Padrão é o próprio arquivo.
+        simular (bool): Se True, só lê e migra na memória, sem gravar nada, para ver no
+            relatório o que mudaria.
+
+    Returns:
+        Relatorio: O que mudou (ou mudaria) em cada passo.
+    """
+
+    # Importado aqui porque a persistência usa este módulo ao carregar os dados
+    import persistence
+
+    destino = destino or caminho
+    with persistence.abrir_registros(caminho) as (versao, codec, registros):
+        relatorio = Relatorio(versao)
+        # Nada a migrar: o arquivo nem é lido além do cabeçalho
+        if versao == VERSAO_ESQUEMA:
+            return relatorio
+
+        migrados = migrar_registros(registros, versao, relatorio)
+        if simular:
+            for _ in migrados:
+                pass
+            return relatorio
+
+        temporario = destino + ".migrando"
+        try:
+            persistence.gravar_registros(temporario, migrados, codec)
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+    persistence.substituir_arquivo(temporario, destino)
+    return relatorio
+
+
+def main(argv: Optional[List[str]] = None):
+    """Migra um arquivo de dados pela linha de comando."""
+
+    import persistence
+
+    parser = argparse.ArgumentParser(description="Atualiza um arquivo de dados do gerenciador de tarefas "
+                                                 "para a versão atual do esquema.")
+    parser.add_argument("arquivo", nargs="?", default=persistence.DATA_FILE,
+                        help=f"arquivo de dados (padrão: {persistence.DATA_FILE})")
+    parser.add_argument("--destino", help="grava o resultado em outro arquivo, mantendo o original")
+    parser.add_argument("--simular", action="store_true", help="só mostra o que mudaria, sem gravar nada")
+    args = parser.parse_args(argv)
+
+    try:
+        relatorio = migrar_arquivo(args.arquivo, args.destino, args.simular)
+    except (OSError, ValueError) as erro:
+        print(f"Erro: {erro}")
+        return 1
+
+    print(relatorio.resumo())
+    if args.simular and relatorio.origem != relatorio.destino:
+        print("Simulação: nenhum arquivo foi alterado.")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,34 @@
+import gc
+from contextlib import contextmanager
 from datetime import date
-from typing import List, Optional, Dict, Any
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional, Dict, Any
+
+# Todos os campos de uma tarefa gravada, na ordem de `Tarefa.__init__`, lidos de uma só vez
+# por `Tarefa.from_dicts`
+_CAMPOS_TAREFA = itemgetter("id", "titulo", "lista_id", "concluida", "data_termino", "prioridade", "tags",
+                            "notas", "repeticao", "inicio_serie", "conclusoes", "puladas", "data_conclusao",
+                            "uid", "relogios", "pai_id")
+
+
+@contextmanager
+def coleta_pausada() -> Iterator[None]:
+    """
+    Pausa a coleta de ciclos do Python enquanto muitos objetos são criados de uma vez.
+
+    Os dados carregados não formam ciclos, e cada coleta disparada no meio da criação
+    percorreria de novo todos os objetos já criados, o que chega a dobrar o tempo de
+    carregar um arquivo grande. Se a coleta já estava desligada, continua assim.
+    """
+
+    pausar = gc.isenabled()
+    if pausar:
+        gc.disable()
+    try:
+        yield
+    finally:
+        if pausar:
+            gc.enable()
 
 
 class Tarefa:
@@ -14,7 +43,14 @@ class Tarefa:
                  prioridade: Optional[str] = None,
                  tags: Optional[List[str]] = None,
                  notas: Optional[str] = None,
-                 repeticao: Optional[str] = None):
+                 repeticao: Optional[str] = None,
+                 inicio_serie: Optional[date] = None,
+                 conclusoes: Optional[List[date]] = None,
+                 puladas: int = 0,
+                 data_conclusao: Optional[date] = None,
+                 uid: Optional[str] = None,
+                 relogios: Optional[Dict[str, List]] = None,
+                 pai_id: Optional[int] = None):
         """
         Inicializa um objeto Tarefa.
 
@@ -28,6 +64,19 @@ class Tarefa:
             tags (Optional[List[str]]): Uma lista de tags para categorização.
             notas (Optional[str]): Notas ou detalhes adicionais sobre a tarefa.
             repeticao (Optional[str]): A frequência de repetição ('diaria', 'semanal', etc.).
+            inicio_serie (Optional[date]): Para tarefas recorrentes, a data da primeira ocorrência,
+                usada como referência para calcular as próximas.
+            conclusoes (Optional[List[date]]): Para tarefas recorrentes, as datas das ocorrências
+                já concluídas (histórico da série).
+            puladas (int): Para tarefas recorrentes, quantas ocorrências atrasadas foram puladas
+                sem serem concluídas. Padrão é 0.
+            data_conclusao (Optional[date]): A data em que a tarefa foi concluída.
+            uid (Optional[str]): Identificador da tarefa entre réplicas sincronizadas. As
+                tarefas de antes de a sincronização ser ligada não têm um, e usam o ID.
+            relogios (Optional[Dict[str, List]]): Carimbo [relógio lógico, réplica] da última
+                alteração de cada campo, e da criação (chave "*"). Usado na sincronização.
+            pai_id (Optional[int]): O ID da tarefa da qual esta é uma subtarefa, ou None
+                se for uma tarefa principal.
         """
         self.id = id
         self.titulo = titulo
@@ -38,6 +87,13 @@ class Tarefa:
         self.tags = tags if tags is not None else []
         self.notas = notas if notas else ""
         self.repeticao = repeticao if repeticao else "nunca"
+        self.inicio_serie = inicio_serie
+        self.conclusoes = conclusoes if conclusoes is not None else []
+        self.puladas = puladas
+        self.data_conclusao = data_conclusao
+        self.uid = uid
+        self.relogios = relogios if relogios is not None else {}
+        self.pai_id = pai_id
 
     def __repr__(self) -> str:
         """Retorna uma representação legível da tarefa, útil para debug."""
@@ -59,7 +115,14 @@ class Tarefa:
             "prioridade": self.prioridade,
             "tags": self.tags,
             "notas": self.notas,
-            "repeticao": self.repeticao
+            "repeticao": self.repeticao,
+            "inicio_serie": self.inicio_serie.isoformat() if self.inicio_serie else None,
+            "conclusoes": [data.isoformat() for data in self.conclusoes],
+            "puladas": self.puladas,
+            "data_conclusao": self.data_conclusao.isoformat() if self.data_conclusao else None,
+            "uid": self.uid,
+            "relogios": self.relogios,
+            "pai_id": self.pai_id
         }
 
     @classmethod
@@ -71,6 +134,17 @@ class Tarefa:
             # Converte a string no formato ISO de volta para um objeto date
             data_termino = date.fromisoformat(data["data_termino"])
 
+        inicio_serie = None
+        if data.get("inicio_serie"):
+            inicio_serie = date.fromisoformat(data["inicio_serie"])
+
+        data_conclusao = None
+        if data.get("data_conclusao"):
+            data_conclusao = date.fromisoformat(data["data_conclusao"])
+
+        # Arquivos antigos não possuem o histórico de conclusões
+        conclusoes = [date.fromisoformat(d) for d in data.get("conclusoes", [])]
+
         return cls(
             id=data["id"],
             titulo=data["titulo"],
@@ -80,26 +154,96 @@ class Tarefa:
             prioridade=data.get("prioridade"),
             tags=data.get("tags"),
             notas=data.get("notas"),
-            repeticao=data.get("repeticao")
+            repeticao=data.get("repeticao"),
+            inicio_serie=inicio_serie,
+            conclusoes=conclusoes,
+            puladas=data.get("puladas", 0),
+            data_conclusao=data_conclusao,
+            uid=data.get("uid"),
+            relogios=data.get("relogios"),
+            pai_id=data.get("pai_id")
         )
 
+    @classmethod
+    def from_dicts(cls, registros: Iterable[Dict[str, Any]]) -> List['Tarefa']:
+        """
+        Cria as tarefas de vários dicionários de uma vez, com o mesmo resultado de `from_dict`.
+
+        Usado ao carregar os dados. Os campos de cada registro são lidos de uma só vez, os
+        objetos são preenchidos diretamente, sem passar os argumentos um a um ao `__init__`,
+        e cada data, prioridade, repetição e tag é convertida uma vez só e reaproveitada
+        nas tarefas seguintes. Um registro sem algum campo (ou com um valor inesperado)
+        passa por `from_dict`. A coleta de ciclos fica pausada durante o lote (ver
+        `coleta_pausada`).
+        """
+
+        datas: Dict[str, date] = {}
+        textos: Dict[str, str] = {}
+
+        def converter_data(texto: str) -> date:
+            data = datas[texto] = date.fromisoformat(texto)
+            return data
+
+        def repetir_texto(texto: str) -> str:
+            return textos.setdefault(texto, texto)
+
+        novo = object.__new__
+        tarefas = []
+        with coleta_pausada():
+            for dados in registros:
+                try:
+                    (id, titulo, lista_id, concluida, data_termino, prioridade, tags, notas, repeticao,
+                     inicio_serie, conclusoes, puladas, data_conclusao, uid, relogios, pai_id) = _CAMPOS_TAREFA(dados)
+                    if tags is None:
+                        tags = []
+                    elif type(tags) is list:
+                        for posicao, tag in enumerate(tags):
+                            tags[posicao] = textos.get(tag) or repetir_texto(tag)
+
+                    # Os atributos na mesma ordem do __init__, para que os objetos fiquem iguais
+                    tarefa = novo(cls)
+                    tarefa.id = id
+                    tarefa.titulo = titulo
+                    tarefa.lista_id = lista_id
+                    tarefa.concluida = concluida
+                    tarefa.data_termino = (datas.get(data_termino) or converter_data(data_termino)) if data_termino else None
+                    tarefa.prioridade = (textos.get(prioridade) or repetir_texto(prioridade)) if prioridade else "nenhuma"
+                    tarefa.tags = tags
+                    tarefa.notas = notas if notas else ""
+                    tarefa.repeticao = (textos.get(repeticao) or repetir_texto(repeticao)) if repeticao else "nunca"
+                    tarefa.inicio_serie = (datas.get(inicio_serie) or converter_data(inicio_serie)) if inicio_serie else None
+                    tarefa.conclusoes = [datas.get(texto) or converter_data(texto) for texto in conclusoes]
+                    tarefa.puladas = puladas
+                    tarefa.data_conclusao = (datas.get(data_conclusao) or converter_data(data_conclusao)) if data_conclusao else None
+                    tarefa.uid = uid
+                    tarefa.relogios = relogios if relogios is not None else {}
+                    tarefa.pai_id = pai_id
+                except (KeyError, TypeError):
+                    tarefa = cls.from_dict(dados)
+                tarefas.append(tarefa)
+        return tarefas
+
 
 class ListaDeTarefas:
     """Representa uma lista que contém várias tarefas."""
 
-    def __init__(self, nome: str, id: int):
+    def __init__(self, nome: str, id: int, uid: Optional[str] = None, relogios: Optional[Dict[str, List]] = None):
         """
         Inicializa uma lista de tarefas.
 
         Args:
             nome (str): O nome da lista.
             id (int): O ID da lista.
+            uid (Optional[str]): Identificador da lista entre réplicas sincronizadas.
+            relogios (Optional[Dict[str, List]]): Carimbos das alterações, como em `Tarefa`.
         """
 
         if not nome:
             raise ValueError("O nome da lista não pode ser vazio.")
         self.id = id
         self.nome = nome
+        self.uid = uid
+        self.relogios = relogios if relogios is not None else {}
         # A lista de tarefas não é armazenada diretamente aqui para evitar redundância.
         # O gerenciador principal irá associar tarefas a esta lista pelo `lista_id`.
 
@@ -113,7 +257,9 @@ class ListaDeTarefas:
 
         return {
             "id": self.id,
-            "nome": self.nome
+            "nome": self.nome,
+            "uid": self.uid,
+            "relogios": self.relogios
         }
 
     @classmethod
@@ -122,5 +268,7 @@ class ListaDeTarefas:
 
         return cls(
             id=data["id"],
-            nome=data["nome"]
+            nome=data["nome"],
+            uid=data.get("uid"),
+            relogios=data.get("relogios")
         )
@@ -0,0 +1,231 @@
+import cProfile
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional
+
+# Variáveis de ambiente que ligam o registro de operações lentas.
+# GERENCIADOR_LIMITE_LENTO_MS: limite em milissegundos a partir do qual uma operação é registrada.
+# GERENCIADOR_PERFIL_LENTO: se definida (ex: "1"), salva também um perfil do cProfile da chamada lenta.
+VARIAVEL_LIMITE = "GERENCIADOR_LIMITE_LENTO_MS"
+VARIAVEL_PERFIL = "GERENCIADOR_PERFIL_LENTO"
+
+ARQUIVO_LOG_PADRAO = "operacoes_lentas.log"
+DIRETORIO_PERFIS_PADRAO = "perfis_lentos"
+
+# Os registros vão apenas para o arquivo rotativo, nunca para o terminal
+logger = logging.getLogger("operacoes_lentas")
+logger.propagate = False
+
+# Configuração atual. `_limite_segundos` igual a None significa desligado.
+_limite_segundos: Optional[float] = None
+_capturar_perfil = False
+_diretorio_perfis = DIRETORIO_PERFIS_PADRAO
+
+# Estado da operação mais externa em andamento. Operações chamadas por outras
+# (ex: mover_tarefas chama editar_tarefas) entram no registro da mais externa.
+_profundidade = 0
+_etapas: Dict[str, float] = {}
+
+
+def _resumir(valor: Any, limite_itens: int = 20) -> Any:
+    """Converte um argumento em algo serializável e compacto para o registro."""
+
+    if valor is None or isinstance(valor, (bool, int, float)):
+        return valor
+    if isinstance(valor, str):
+        return valor if len(valor) <= 200 else valor[:200] + "..."
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, (list, tuple, set)):
+        itens = list(valor)
+        resumo = [_resumir(item) for item in itens[:limite_itens]]
+        if len(itens) > limite_itens:
+            resumo.append(f"... (+{len(itens) - limite_itens} itens)")
+        return resumo
+    if isinstance(valor, dict):
+        return {str(chave): _resumir(item) for chave, item in list(valor.items())[:limite_itens]}
+    # Objetos do modelo são identificados apenas pelo ID
+    if hasattr(valor, "id"):
+        return f"{type(valor).__name__}(id={valor.id})"
+    return type(valor).__name__
+
+
+def _tamanho_dados(args: tuple) -> Dict[str, int]:
+    """Obtém o tamanho do conjunto de dados a partir dos argumentos da chamada."""
+
+    tamanho = {}
+    for argumento in args:
+        tarefas = getattr(argumento, "_tarefas", None)
+        if tarefas is not None:
+            tamanho["num_tarefas"] = len(tarefas)
+            tamanho["num_listas"] = len(argumento._listas)
+        elif isinstance(argumento, list):
+            tamanho["num_itens"] = len(argumento)
+    return tamanho
+
+
+def _registrar(nome: str, args: tuple, kwargs: dict, segundos: float, etapas: Dict[str, float],
+               perfil: Optional[cProfile.Profile]):
+    """Escreve o registro estruturado de uma operação lenta e, se houver, o seu perfil."""
+
+    # O primeiro argumento dos métodos é o próprio gerenciador, que não é resumido
+    argumentos = [_resumir(argumento) for argumento in args if not hasattr(argumento, "_tarefas")]
+    registro = {
+        "momento": datetime.now().isoformat(timespec="seconds"),
+        "operacao": nome,
+        "argumentos": argumentos,
+        "argumentos_nomeados": _resumir(kwargs),
+        "segundos": round(segundos, 6),
+        "limite_segundos": _limite_segundos,
+        "etapas_segundos": {etapa: round(duracao, 6) for etapa, duracao in etapas.items()},
+    }
+    registro["etapas_segundos"]["outros"] = round(max(segundos - sum(etapas.values()), 0.0), 6)
+    registro.update(_tamanho_dados(args))
+
+    if perfil is not None:
+        os.makedirs(_diretorio_perfis, exist_ok=True)
+        nome_arquivo = f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}_{nome}.prof"
+        caminho_perfil = os.path.join(_diretorio_perfis, nome_arquivo)
+        perfil.dump_stats(caminho_perfil)
+        registro["perfil"] = caminho_perfil
+
+    logger.warning(json.dumps(registro, ensure_ascii=False))
+
+
+def _monitorar(nome: str, funcao: Callable) -> Callable:
+    """Cria uma versão da função que registra as chamadas mais lentas que o limite."""
+
+    # `updated=()`: as marcas de outros invólucros (métricas, gravação de sessões) não
+    # são copiadas, senão desfazer um deles levaria este junto
+    @functools.wraps(funcao, updated=())
+    def funcao_monitorada(*args, **kwargs):
+        global _profundidade, _etapas
+
+        # Chamadas internas apenas executam; quem registra é a operação mais externa
+        if _limite_segundos is None or _profundidade > 0:
+            return funcao(*args, **kwargs)
+
+        _profundidade += 1
+        _etapas = {}
+        perfil = cProfile.Profile() if _capturar_perfil else None
+        inicio = time.perf_counter()
+        try:
+            if perfil is not None:
+                return perfil.runcall(funcao, *args, **kwargs)
+            return funcao(*args, **kwargs)
+        finally:
+            segundos = time.perf_counter() - inicio
+            _profundidade -= 1
+            if segundos >= _limite_segundos:
+                _registrar(nome, args, kwargs, segundos, _etapas, perfil)
+
+    funcao_monitorada.__operacoes_lentas_original__ = funcao
+    return funcao_monitorada
+
+
+def _medir_etapa(nome: str, funcao: Callable) -> Callable:
+    """Cria uma versão da função que soma a sua duração às etapas da operação em andamento."""
+
+    @functools.wraps(funcao, updated=())
+    def funcao_medida(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            if _profundidade > 0:
+                _etapas[nome] = _etapas.get(nome, 0.0) + time.perf_counter() - inicio
+
+    funcao_medida.__operacoes_lentas_original__ = funcao
+    return funcao_medida
+
+
+def _monitorado(funcao: Callable) -> bool:
+    """Indica se a função já passa por um invólucro deste módulo, mesmo sob outros invólucros."""
+
+    while funcao is not None:
+        if "__operacoes_lentas_original__" in getattr(funcao, "__dict__", {}):
+            return True
+        funcao = getattr(funcao, "__wrapped__", None)
+    return False
+
+
+def _substituir(objeto: Any, nome: str, fabrica: Callable[[str, Callable], Callable], rotulo: str):
+    """Troca um atributo de classe ou módulo por uma versão monitorada, uma única vez."""
+
+    atual = getattr(objeto, nome)
+    if not _monitorado(atual):
+        setattr(objeto, nome, fabrica(rotulo, atual))
+
+
+def configurar(limite_ms: float,
+               caminho_log: str = ARQUIVO_LOG_PADRAO,
+               capturar_perfil: bool = False,
+               diretorio_perfis: str = DIRETORIO_PERFIS_PADRAO,
+               tamanho_maximo_bytes: int = 1_000_000,
+               num_backups: int = 3):
+    """
+    Liga o registro de operações lentas.
+
+    Toda operação pública do TaskManager e toda exibição de tarefas na tela que
+    demorar `limite_ms` ou mais gera um registro JSON em um arquivo de log rotativo,
+    com os argumentos, o tamanho dos dados e o tempo gasto na persistência.
+
+    Args:
+        limite_ms (float): Duração mínima, em milissegundos, para uma operação ser registrada.
+        caminho_log (str): Arquivo de log. Ao atingir o tamanho máximo, é rotacionado.
+        capturar_perfil (bool): Se True, cada operação roda sob o cProfile e o perfil
+            das operações lentas é salvo em `diretorio_perfis`. Deixa tudo mais lento.
+        diretorio_perfis (str): Diretório dos arquivos .prof.
+        tamanho_maximo_bytes (int): Tamanho de cada arquivo de log antes da rotação.
+        num_backups (int): Quantos arquivos antigos de log são mantidos.
+    """
+
+    global _limite_segundos, _capturar_perfil, _diretorio_perfis
+    # Importados aqui para evitar importações circulares
+    from manager import TaskManager
+    import persistence
+    import ui
+
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    handler = logging.handlers.RotatingFileHandler(caminho_log, maxBytes=tamanho_maximo_bytes,
+                                                   backupCount=num_backups, encoding='utf-8')
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.WARNING)
+
+    _limite_segundos = limite_ms / 1000
+    _capturar_perfil = capturar_perfil
+    _diretorio_perfis = diretorio_perfis
+
+    for nome, metodo in list(vars(TaskManager).items()):
+        if not nome.startswith("_") and callable(metodo):
+            _substituir(TaskManager, nome, _monitorar, nome)
+    _substituir(ui, "imprimir_tarefas", _monitorar, "ui.imprimir_tarefas")
+    _substituir(persistence, "salvar_dados", _medir_etapa, "persistence.salvar_dados")
+    _substituir(persistence, "carregar_dados", _medir_etapa, "persistence.carregar_dados")
+
+
+def desligar():
+    """Desliga o registro. As funções monitoradas passam a apenas repassar as chamadas."""
+
+    global _limite_segundos
+    _limite_segundos = None
+
+
+def configurar_pelo_ambiente():
+    """Liga o registro se a variável GERENCIADOR_LIMITE_LENTO_MS estiver definida."""
+
+    limite = os.environ.get(VARIAVEL_LIMITE)
+    if not limite:
+        return
+    try:
+        configurar(float(limite), capturar_perfil=bool(os.environ.get(VARIAVEL_PERFIL)))
+    except ValueError:
+        print(f"Aviso: valor inválido em {VARIAVEL_LIMITE}: '{limite}'. Registro de operações lentas desligado.")
@@ -0,0 +1,148 @@
+from datetime import date
+from typing import Any, Dict, Optional
+from models import Tarefa
+
+PRIORIDADES = ("alta", "media", "baixa", "nenhuma")
+
+
+def _somar_chave(contagens: Dict[Any, int], chave: Any, valor: int):
+    """Soma um valor à contagem de uma chave, descartando as chaves que chegam a zero."""
+
+    total = contagens.get(chave, 0) + valor
+    if total:
+        contagens[chave] = total
+    else:
+        contagens.pop(chave, None)
+
+
+class Contadores:
+    """Contadores de um conjunto de tarefas: as de uma lista ou todas as tarefas."""
+
+    def __init__(self):
+        """Inicializa os contadores zerados."""
+
+        self.total = 0
+        self.concluidas = 0
+        self.atrasadas = 0
+        self.vencem_hoje = 0
+        self.pendentes_por_prioridade: Dict[str, int] = {}
+        # Quantidade de tarefas pendentes por data de término. Quando o dia muda, as
+        # atrasadas e as que vencem hoje são recalculadas a partir daqui, sem percorrer
+        # as tarefas: o custo é proporcional ao número de datas distintas.
+        self._pendentes_por_data: Dict[date, int] = {}
+
+    @property
+    def pendentes(self) -> int:
+        """Quantidade de tarefas não concluídas."""
+
+        return self.total - self.concluidas
+
+    def somar(self, tarefa: Tarefa, sinal: int, dia: date):
+        """Soma (sinal 1) ou subtrai (sinal -1) uma tarefa dos contadores, em relação ao dia informado."""
+
+        self.total += sinal
+        if tarefa.concluida:
+            self.concluidas += sinal
+            return
+
+        _somar_chave(self.pendentes_por_prioridade, tarefa.prioridade, sinal)
+        data = tarefa.data_termino
+        if data:
+            _somar_chave(self._pendentes_por_data, data, sinal)
+            if data < dia:
+                self.atrasadas += sinal
+            elif data == dia:
+                self.vencem_hoje += sinal
+
+    def recalcular_datas(self, dia: date):
+        """Recalcula as atrasadas e as que vencem no dia informado."""
+
+        self.atrasadas = sum(quantidade for data, quantidade in self._pendentes_por_data.items() if data < dia)
+        self.vencem_hoje = self._pendentes_por_data.get(dia, 0)
+
+    def como_dicionario(self) -> Dict[str, Any]:
+        """Retorna uma cópia dos contadores como dicionário."""
+
+        return {
+            "total": self.total,
+            "pendentes": self.pendentes,
+            "concluidas": self.concluidas,
+            "atrasadas": self.atrasadas,
+            "vencem_hoje": self.vencem_hoje,
+            "pendentes_por_prioridade": {prioridade: self.pendentes_por_prioridade.get(prioridade, 0)
+                                         for prioridade in PRIORIDADES}
+        }
+
+
+class Painel:
+    """
+    Contadores do painel, por lista e gerais, mantidos a cada alteração.
+
+    Adicionar ou retirar uma tarefa custa O(1). Os contadores que dependem da data
+    atual (atrasadas e que vencem hoje) são calculados em relação a um dia de
+    referência e só são recalculados quando alguém os consulta em outro dia.
+    """
+
+    def __init__(self, hoje: Optional[date] = None):
+        """
+        Inicializa o painel sem nenhuma tarefa.
+
+        Args:
+            hoje (Optional[date]): Dia de referência inicial. Padrão é hoje.
+        """
+
+        self._dia = hoje or date.today()
+        self._geral = Contadores()
+        self._por_lista: Dict[int, Contadores] = {}
+
+    def _somar(self, tarefa: Tarefa, sinal: int):
+        """Soma ou subtrai uma tarefa dos contadores gerais e dos da sua lista."""
+
+        contadores_lista = self._por_lista.get(tarefa.lista_id)
+        if contadores_lista is None:
+            contadores_lista = self._por_lista[tarefa.lista_id] = Contadores()
+
+        self._geral.somar(tarefa, sinal, self._dia)
+        contadores_lista.somar(tarefa, sinal, self._dia)
+        if not contadores_lista.total:
+            del self._por_lista[tarefa.lista_id]
+
+    def adicionar(self, tarefa: Tarefa):
+        """Conta uma tarefa nova ou recém-alterada."""
+
+        self._somar(tarefa, 1)
+
+    def remover(self, tarefa: Tarefa):
+        """Retira uma tarefa da contagem, com os mesmos valores que ela tinha ao ser adicionada."""
+
+        self._somar(tarefa, -1)
+
+    def _atualizar_dia(self, hoje: Optional[date]):
+        """Recalcula os contadores que dependem da data se o dia de referência mudou."""
+
+        hoje = hoje or date.today()
+        if hoje == self._dia:
+            return
+
+        self._dia = hoje
+        self._geral.recalcular_datas(hoje)
+        for contadores in self._por_lista.values():
+            contadores.recalcular_datas(hoje)
+
+    def contadores(self, lista_id: Optional[int] = None, hoje: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Retorna os contadores de uma lista ou, se `lista_id` for None, os gerais.
+
+        Uma lista sem tarefas tem todos os contadores zerados.
+        """
+
+        self._atualizar_dia(hoje)
+        if lista_id is None:
+            return self._geral.como_dicionario()
+        return self._por_lista.get(lista_id, Contadores()).como_dicionario()
+
+    def contadores_por_lista(self, hoje: Optional[date] = None) -> Dict[int, Dict[str, Any]]:
+        """Retorna os contadores de cada lista que tem pelo menos uma tarefa."""
+
+        self._atualizar_dia(hoje)
+        return {lista_id: contadores.como_dicionario() for lista_id, contadores in self._por_lista.items()}
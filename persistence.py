@@ -1,90 +1,697 @@
+import gzip
+import hashlib
+import io
 import json
+import logging
+import lzma
 import os
-from typing import List, Tuple
-from models import Tarefa, ListaDeTarefas
+import re
+import shutil
+import time
+from contextlib import contextmanager
+from itertools import chain
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+from models import Tarefa, ListaDeTarefas, coleta_pausada
+import metricas
+import migracoes
+
+# O zstd é opcional: só fica disponível se o pacote `zstandard` estiver instalado
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Define o nome do arquivo de dados como uma constante.
 # Facilita a alteração do nome do arquivo em um só lugar, se necessário.
 DATA_FILE = "dados_tarefas.json"
 
+# As mensagens de progresso e de erro passam pelo logging, e não por print, para
+# que possam ser filtradas, redirecionadas e agregadas. O programa principal as
+# exibe no terminal.
+logger = logging.getLogger(__name__)
+
+# Snapshots compactados: o formato é escolhido pela extensão do arquivo ao salvar
+# (ex: "dados_tarefas.json.gz") e reconhecido pelos primeiros bytes ao carregar
+EXTENSOES_SNAPSHOT = {".gz": "gzip", ".xz": "lzma", ".zst": "zstd"}
+_ASSINATURAS_SNAPSHOT = ((b"\x1f\x8b", "gzip"), (b"\xfd7zXZ\x00", "lzma"), (b"\x28\xb5\x2f\xfd", "zstd"))
+VERSAO_SNAPSHOT = 1
+
+# Chaves do JSON comum com os registros de cada tipo
+_TIPOS_JSON = {"listas": migracoes.LISTA, "tarefas": migracoes.TAREFA, "metadados": migracoes.METADADOS}
+# Tamanho dos trechos lidos de cada vez na leitura aos poucos do JSON comum (e dos
+# trechos acumulados antes de cada escrita)
+TAMANHO_TRECHO = 1 << 16
+
+# Soma de verificação gravada ao final de cada arquivo de dados: a última chave do JSON
+# comum, ou a última linha de um snapshot. Ela cobre todos os bytes (descompactados)
+# anteriores a ela e é conferida ao carregar.
+CHAVE_SOMA = "soma_verificacao"
+ALGORITMO_SOMA = "sha256"
+_SOMA_JSON = re.compile(rb',\s*"' + CHAVE_SOMA.encode() + rb'"\s*:\s*"([^"]*)"\s*}\s*$')
+_PREFIXO_SOMA_SNAPSHOT = b'{"' + CHAVE_SOMA.encode() + b'"'
+
+# Quantas versões anteriores do arquivo de dados são mantidas como backup, ao lado
+# dele ("dados_tarefas.json.bak1" é a mais recente)
+BACKUPS_PADRAO = 3
+
+
+class ArquivoCorrompido(ValueError):
+    """O arquivo de dados não pôde ser lido, e não há um backup válido para recuperá-lo."""
+
+
+def codecs_disponiveis() -> List[str]:
+    """Retorna os formatos de compressão que podem ser usados nesta instalação."""
+
+    return [codec for codec in ("gzip", "lzma", "zstd") if codec != "zstd" or zstandard is not None]
+
+
+def codec_para_caminho(caminho: str) -> Optional[str]:
+    """Retorna o formato de compressão indicado pela extensão do arquivo, ou None para JSON comum."""
+
+    return EXTENSOES_SNAPSHOT.get(os.path.splitext(caminho)[1].lower())
+
+
+def detectar_codec(caminho: str) -> Optional[str]:
+    """Reconhece um snapshot compactado pelos primeiros bytes do arquivo. Retorna None para JSON comum."""
+
+    with open(caminho, 'rb') as f:
+        inicio = f.read(6)
+    for assinatura, codec in _ASSINATURAS_SNAPSHOT:
+        if inicio.startswith(assinatura):
+            return codec
+    return None
+
+
+def _abrir_snapshot(caminho: str, modo: str, codec: str) -> BinaryIO:
+    """Abre um snapshot como um fluxo de bytes descompactados, compactando ou descompactando aos poucos."""
+
+    if codec == "gzip":
+        # Nível 6, o mesmo do utilitário gzip: quase a mesma taxa do 9, bem mais rápido
+        return gzip.open(caminho, modo + 'b', compresslevel=6)
+    if codec == "lzma":
+        return lzma.open(caminho, modo + 'b')
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("O formato zstd exige o pacote 'zstandard', que não está instalado.")
+        arquivo = open(caminho, modo + 'b')
+        if modo == 'w':
+            return zstandard.ZstdCompressor(level=3).stream_writer(arquivo)
+        # O leitor do zstd não separa linhas sozinho
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(arquivo))
+    raise ValueError(f"Formato de compressão desconhecido: '{codec}'.")
+
+
+class _EscritorVerificado:
+    """
+    Recebe o texto de um arquivo de dados e o grava em UTF-8, calculando a soma de verificação.
+
+    O texto é acumulado e codificado em trechos de `TAMANHO_TRECHO`, então cada registro
+    não vira uma escrita (nem uma chamada ao compressor) separada.
+    """
+
+    def __init__(self, arquivo: BinaryIO):
+        """
+        Args:
+            arquivo (BinaryIO): O arquivo (ou fluxo compactado) onde os bytes são gravados.
+        """
+
+        self._arquivo = arquivo
+        self._soma = hashlib.new(ALGORITMO_SOMA)
+        self._pendentes: List[str] = []
+        self._tamanho = 0
+
+    def write(self, texto: str) -> int:
+        """Acrescenta um texto, gravando os trechos acumulados quando passam de `TAMANHO_TRECHO`."""
+
+        self._pendentes.append(texto)
+        self._tamanho += len(texto)
+        if self._tamanho >= TAMANHO_TRECHO:
+            self.flush()
+        return len(texto)
+
+    def flush(self):
+        """Grava o texto acumulado."""
+
+        if not self._pendentes:
+            return
+        dados = "".join(self._pendentes).encode('utf-8')
+        self._pendentes = []
+        self._tamanho = 0
+        self._soma.update(dados)
+        self._arquivo.write(dados)
+
+    def soma(self) -> str:
+        """Grava o texto acumulado e retorna a soma de tudo o que foi escrito (ex: "sha256:9f86d0...")."""
+
+        self.flush()
+        return f"{ALGORITMO_SOMA}:{self._soma.hexdigest()}"
+
+
+def _conferir_soma(calculada: Any, esperada: str):
+    """
+    Compara a soma calculada na leitura (um objeto do hashlib) com a gravada no arquivo.
+
+    Raises:
+        ArquivoCorrompido: Se as somas forem diferentes.
+    """
+
+    if f"{calculada.name}:{calculada.hexdigest()}" != esperada:
+        raise ArquivoCorrompido("A soma de verificação não confere: o arquivo foi danificado ou editado à mão.")
+
+
+def _escrever_snapshot(destino, listas: List[ListaDeTarefas], tarefas: List[Tarefa], metadados: Dict[str, Any]):
+    """
+    Escreve um snapshot: um cabeçalho com os metadados e depois uma lista ou tarefa por linha.
+
+    Cada linha é serializada e compactada assim que é gerada, então o documento inteiro
+    nunca fica na memória, nem compactado nem descompactado.
+    """
+
+    destino.write(json.dumps({"snapshot": VERSAO_SNAPSHOT, "esquema": migracoes.VERSAO_ESQUEMA, "metadados": metadados},
+                             ensure_ascii=False) + "\n")
+    for lista in listas:
+        destino.write(json.dumps({"lista": lista.to_dict()}, ensure_ascii=False) + "\n")
+    for tarefa in tarefas:
+        destino.write(json.dumps({"tarefa": tarefa.to_dict()}, ensure_ascii=False) + "\n")
+
+
+def _ler_snapshot(origem) -> Tuple[List[ListaDeTarefas], List[Tarefa], Dict[str, Any]]:
+    """
+    Lê um snapshot linha a linha, criando cada objeto assim que a sua linha é descompactada.
+
+    Raises:
+        ArquivoCorrompido: Se a soma de verificação da última linha não conferir. Os
+            snapshots gravados antes dela não são conferidos.
+    """
+
+    primeira = origem.readline()
+    soma = hashlib.new(ALGORITMO_SOMA, primeira)
+    cabecalho = _ler_cabecalho_snapshot(primeira)
+    # Um snapshot de uma versão antiga do esquema é migrado linha a linha, durante a leitura
+    passos = migracoes.passos_entre(cabecalho.get("esquema", migracoes.ESQUEMA_SEM_VERSAO))
+
+    listas = []
+    esperada = None
+
+    def registros_tarefas() -> Iterator[Dict[str, Any]]:
+        """Entrega os dicionários das tarefas ao decodificador em lote; as listas ficam de lado."""
+
+        nonlocal esperada
+        for linha in origem:
+            if linha.startswith(_PREFIXO_SOMA_SNAPSHOT):
+                esperada = json.loads(linha)[CHAVE_SOMA]
+                continue
+            soma.update(linha)
+            registro = json.loads(linha)
+            if "tarefa" in registro:
+                yield migracoes.migrar_registro(migracoes.TAREFA, registro["tarefa"], passos)
+            elif "lista" in registro:
+                listas.append(ListaDeTarefas.from_dict(migracoes.migrar_registro(migracoes.LISTA, registro["lista"], passos)))
+
+    tarefas = Tarefa.from_dicts(registros_tarefas())
+    if esperada is not None:
+        # Uma linha depois da soma também a faz não conferir
+        _conferir_soma(soma, esperada)
+    return listas, tarefas, migracoes.migrar_registro(migracoes.METADADOS, cabecalho.get("metadados") or {}, passos)
+
+
+def _ler_cabecalho_snapshot(linha: bytes) -> Dict[str, Any]:
+    """Interpreta a primeira linha de um snapshot."""
+
+    cabecalho = json.loads(linha or "{}")
+    if "snapshot" not in cabecalho:
+        raise KeyError("cabeçalho do snapshot não encontrado")
+    return cabecalho
+
+
+class _LeitorJson:
+    """
+    Lê um documento JSON aos poucos, um valor de cada vez.
+
+    Só o trecho do arquivo com o valor sendo lido fica na memória. É usado para percorrer
+    as listas e tarefas de um arquivo de dados grande sem carregá-lo inteiro.
+    """
+
+    _ESPACOS = re.compile(r"[ \t\n\r]*")
+
+    def __init__(self, arquivo: TextIO):
+        self._arquivo = arquivo
+        self._texto = ""
+        self._posicao = 0
+        self._fim = False
+        self._decodificador = json.JSONDecoder()
+
+    def _ler_trecho(self) -> bool:
+        """Acrescenta o próximo trecho do arquivo ao texto, descartando o que já foi lido."""
+
+        trecho = "" if self._fim else self._arquivo.read(TAMANHO_TRECHO)
+        if not trecho:
+            self._fim = True
+            return False
+        self._texto = self._texto[self._posicao:] + trecho
+        self._posicao = 0
+        return True
+
+    def proximo(self) -> str:
+        """Retorna o próximo caractere que não é espaço, sem consumi-lo ("" no fim do arquivo)."""
+
+        while True:
+            self._posicao = self._ESPACOS.match(self._texto, self._posicao).end()
+            if self._posicao < len(self._texto):
+                return self._texto[self._posicao]
+            if not self._ler_trecho():
+                return ""
+
+    def consumir(self, esperado: str):
+        """Consome um caractere de pontuação do JSON (ex: "{", ":", "]")."""
+
+        if self.proximo() != esperado:
+            raise json.JSONDecodeError(f"Esperado '{esperado}'", self._texto, self._posicao)
+        self._posicao += 1
+
+    def valor(self) -> Any:
+        """Lê o próximo valor completo (ex: uma tarefa), lendo mais trechos se ele continuar além do atual."""
+
+        self.proximo()
+        while True:
+            try:
+                valor, fim = self._decodificador.raw_decode(self._texto, self._posicao)
+                # Um número no fim do trecho pode continuar no próximo
+                if fim < len(self._texto) or self._fim:
+                    self._posicao = fim
+                    return valor
+            except json.JSONDecodeError:
+                if self._fim:
+                    raise
+            self._ler_trecho()
+
+    def itens(self) -> Iterator[Tuple[str, Any]]:
+        """Percorre o objeto principal, entregando cada elemento dos valores que são arrays com a sua chave."""
+
+        self.consumir("{")
+        while self.proximo() != "}":
+            if self.proximo() == ",":
+                self.consumir(",")
+            chave = self.valor()
+            self.consumir(":")
+            if self.proximo() != "[":
+                yield chave, self.valor()
+                continue
+            self.consumir("[")
+            while self.proximo() != "]":
+                if self.proximo() == ",":
+                    self.consumir(",")
+                yield chave, self.valor()
+            self.consumir("]")
+
+
+@contextmanager
+def abrir_registros(caminho: str) -> Iterator[Tuple[int, Optional[str], Iterator[migracoes.Registro]]]:
+    """
+    Abre um arquivo de dados para ser percorrido registro a registro, sem carregá-lo inteiro.
+
+    Entrega a versão do esquema do arquivo, o formato de compressão (None para o JSON
+    comum) e um iterador de (tipo, dicionário) com os metadados, as listas e as tarefas,
+    na ordem em que estão no arquivo. Os registros não são migrados.
+    """
+
+    codec = detectar_codec(caminho) if os.path.getsize(caminho) > 0 else None
+    with (_abrir_snapshot(caminho, 'r', codec) if codec else open(caminho, 'r', encoding='utf-8')) as f:
+        if codec:
+            cabecalho = _ler_cabecalho_snapshot(f.readline())
+            versao = cabecalho.get("esquema", migracoes.ESQUEMA_SEM_VERSAO)
+            linhas = (json.loads(linha) for linha in f)
+            registros = chain([(migracoes.METADADOS, cabecalho.get("metadados") or {})],
+                              ((tipo, registro[tipo]) for registro in linhas
+                               for tipo in (migracoes.LISTA, migracoes.TAREFA) if tipo in registro))
+        else:
+            itens = _LeitorJson(f).itens()
+            # A versão é a primeira chave dos arquivos gravados com ela
+            primeiro = next(itens, None)
+            if primeiro is not None and primeiro[0] == "esquema":
+                versao = primeiro[1]
+            else:
+                versao = migracoes.ESQUEMA_SEM_VERSAO
+                itens = chain([primeiro] if primeiro else [], itens)
+            registros = ((_TIPOS_JSON[chave], valor) for chave, valor in itens if chave in _TIPOS_JSON)
+        yield versao, codec, registros
+
+
+def _escrever_registros_json(destino, registros: Iterable[migracoes.Registro]):
+    """
+    Escreve os registros como o JSON comum, no mesmo texto que json.dump(..., indent=4) produziria.
+
+    O "}" final não é escrito: o documento é fechado pela soma de verificação (ver `_gravar`).
+
+    Raises:
+        ValueError: Se os registros não estiverem agrupados por tipo.
+    """
+
+    chaves = {tipo: chave for chave, tipo in _TIPOS_JSON.items()}
+    destino.write('{\n    "esquema": %d' % migracoes.VERSAO_ESQUEMA)
+    gravados = set()
+    tipo_atual = None
+    primeiro = True
+    for tipo, dados in registros:
+        if tipo == migracoes.METADADOS:
+            if tipo_atual is not None:
+                destino.write("\n    ]")
+            destino.write(f',\n    "{chaves[tipo]}": ' + json.dumps(dados, indent=4, ensure_ascii=False).replace("\n", "\n    "))
+            tipo_atual = None
+            gravados.add(tipo)
+            continue
+        if tipo != tipo_atual:
+            if tipo in gravados:
+                raise ValueError(f"Registros do tipo '{tipo}' fora de ordem.")
+            if tipo_atual is not None:
+                destino.write("\n    ]")
+            destino.write(f',\n    "{chaves[tipo]}": [')
+            tipo_atual = tipo
+            gravados.add(tipo)
+            primeiro = True
+        destino.write(("\n        " if primeiro else ",\n        ")
+                      + json.dumps(dados, indent=4, ensure_ascii=False).replace("\n", "\n        "))
+        primeiro = False
+    if tipo_atual is not None:
+        destino.write("\n    ]")
 
-def salvar_dados(listas: List[ListaDeTarefas], tarefas: List[Tarefa]) -> None:
+
+def _sincronizar(caminho: str, diretorio: bool = False):
+    """Espera o conteúdo de um arquivo, ou as entradas de um diretório, chegarem ao disco (fsync)."""
+
+    if diretorio and os.name != "posix":
+        # Fora do POSIX, os diretórios não podem ser abertos nem sincronizados
+        return
+    descritor = os.open(caminho, os.O_RDONLY if diretorio else os.O_RDWR)
+    try:
+        os.fsync(descritor)
+    finally:
+        os.close(descritor)
+
+
+def _gravar(caminho: str, codec: Optional[str], escrever: Callable[[_EscritorVerificado], None],
+            duravel: bool) -> float:
+    """
+    Grava um arquivo de dados no formato do codec, com a soma de verificação ao final.
+
+    Args:
+        caminho (str): O arquivo a ser gravado (normalmente o temporário).
+        codec (Optional[str]): O formato de compressão, ou None para o JSON comum.
+        escrever (Callable): Escreve o conteúdo no destino recebido, que calcula a soma.
+        duravel (bool): Se True, só retorna depois de o arquivo chegar ao disco.
+
+    Returns:
+        float: Os segundos gastos nas escritas (inclusive na compressão), para as métricas.
+    """
+
+    with (_abrir_snapshot(caminho, 'w', codec) if codec else open(caminho, 'wb')) as arquivo:
+        # Com as métricas ligadas, o arquivo é envolvido para medir só o tempo de escrita
+        saida = metricas.ArquivoMedido(arquivo) if metricas.ATIVO else arquivo
+        destino = _EscritorVerificado(saida)
+        escrever(destino)
+        soma = destino.soma()
+        if codec:
+            saida.write((json.dumps({CHAVE_SOMA: soma}) + "\n").encode('utf-8'))
+        else:
+            saida.write(f',\n    "{CHAVE_SOMA}": "{soma}"\n}}'.encode('utf-8'))
+    if duravel:
+        _sincronizar(caminho)
+    return saida.segundos_escrita if metricas.ATIVO else 0.0
+
+
+def gravar_registros(caminho: str, registros: Iterable[migracoes.Registro], codec: Optional[str] = None,
+                     duravel: bool = True):
+    """
+    Grava registros (já na versão atual do esquema) aos poucos, no mesmo formato de `salvar_dados`.
+
+    Os registros de cada tipo devem vir juntos, na ordem em que serão gravados. Em um
+    snapshot, os metadados vêm primeiro, porque ficam no cabeçalho. O arquivo é gravado
+    diretamente no caminho: para substituir um arquivo de dados, grave em um temporário
+    e use `substituir_arquivo()`.
+
+    Raises:
+        ValueError: Se os registros não estiverem agrupados por tipo.
+    """
+
+    def escrever(destino: _EscritorVerificado):
+        if not codec:
+            _escrever_registros_json(destino, registros)
+            return
+        iterador = iter(registros)
+        tipo, metadados = next(iterador, (migracoes.METADADOS, {}))
+        if tipo != migracoes.METADADOS:
+            raise ValueError("Os metadados devem ser o primeiro registro de um snapshot.")
+        _escrever_snapshot(destino, [], [], metadados)
+        for tipo, dados in iterador:
+            destino.write(json.dumps({tipo: dados}, ensure_ascii=False) + "\n")
+
+    _gravar(caminho, codec, escrever, duravel)
+
+
+def caminho_backup(caminho: str, numero: int) -> str:
+    """Retorna o caminho do backup `numero` de um arquivo de dados (1 é o mais recente)."""
+
+    return f"{caminho}.bak{numero}"
+
+
+def _rotacionar_backups(caminho: str, quantidade: int):
+    """Desloca os backups de um arquivo (o mais antigo é descartado) e guarda o arquivo atual como o mais recente."""
+
+    if not os.path.exists(caminho):
+        return
+    for numero in range(quantidade - 1, 0, -1):
+        if os.path.exists(caminho_backup(caminho, numero)):
+            os.replace(caminho_backup(caminho, numero), caminho_backup(caminho, numero + 1))
+    mais_recente = caminho_backup(caminho, 1)
+    if os.path.exists(mais_recente):
+        os.remove(mais_recente)
+    try:
+        # Um link guarda o arquivo atual sem tirá-lo do lugar: até a substituição, que é
+        # atômica, sempre existe um arquivo de dados completo
+        os.link(caminho, mais_recente)
+    except OSError:
+        # Sistemas de arquivos sem links (ex: FAT)
+        shutil.copyfile(caminho, mais_recente)
+
+
+def substituir_arquivo(temporario: str, caminho: str, duravel: bool = True, backups: int = BACKUPS_PADRAO):
+    """
+    Põe um arquivo temporário, já completo, no lugar do arquivo de dados, de uma só vez.
+
+    A troca é atômica (`os.replace`): quem abrir o arquivo encontra a versão anterior ou a
+    nova, nunca uma gravação pela metade. A versão anterior vira o backup mais recente.
+
+    Args:
+        temporario (str): O arquivo completo, no mesmo diretório do destino.
+        caminho (str): O arquivo de dados.
+        duravel (bool): Se True, só retorna depois de a troca chegar ao disco.
+        backups (int): Quantas versões anteriores manter. 0 não guarda nenhuma.
+    """
+
+    if backups > 0:
+        _rotacionar_backups(caminho, backups)
+    os.replace(temporario, caminho)
+    if duravel:
+        _sincronizar(os.path.dirname(os.path.abspath(caminho)), diretorio=True)
+
+
+def salvar_dados(listas: List[ListaDeTarefas], tarefas: List[Tarefa],
+                 metadados: Optional[Dict[str, Any]] = None, caminho: Optional[str] = None,
+                 duravel: bool = True, backups: int = BACKUPS_PADRAO) -> bool:
     """
     Salva todas as listas e tarefas em um arquivo JSON.
     Esta função é chamada sempre que há uma alteração nos dados.
 
+    Se o caminho terminar em ".gz", ".xz" ou ".zst", os dados são gravados como um
+    snapshot compactado (gzip, lzma ou zstd), escrito aos poucos.
+
+    Os dados são gravados em um arquivo temporário, com uma soma de verificação ao final,
+    que substitui o arquivo de dados de uma só vez: uma queda no meio do salvamento deixa
+    o arquivo anterior intacto. As versões anteriores ficam como backup.
+
     Parâmetros:
 
     listas (List[ListaDeTarefas]): A lista contendo todos os objetos ListaDeTarefas.
     tarefas (List[Tarefa]): A lista contendo todos os objetos Tarefa.
+    metadados (Optional[Dict[str, Any]]): Informações do gerenciador que não são listas
+        nem tarefas (ex: o maior ID já arquivado). Devem ser serializáveis em JSON.
+    caminho (Optional[str]): O arquivo de destino. Padrão é DATA_FILE.
+    duravel (bool): Se True (padrão), só retorna depois de os dados chegarem ao disco
+        (fsync), para que sobrevivam a uma queda de energia. Se False, a gravação continua
+        atômica, mas o sistema operacional decide quando levá-la ao disco.
+    backups (int): Quantas versões anteriores do arquivo manter (padrão: BACKUPS_PADRAO).
+
+    Retorna:
+
+    bool: True se os dados foram gravados. Se a gravação falhar, o erro é registrado no
+    log, o arquivo anterior continua no lugar e o retorno é False.
     """
 
-    print("\nSalvando dados...") # Feedback
+    caminho = caminho or DATA_FILE
+    codec = codec_para_caminho(caminho)
+    temporario = caminho + ".tmp"
+
+    def escrever(destino: _EscritorVerificado):
+        if codec:
+            _escrever_snapshot(destino, listas, tarefas, metadados or {})
+            return
+        # Os metadados só são gravados se houver algum
+        registros = chain(((migracoes.LISTA, lista.to_dict()) for lista in listas),
+                          ((migracoes.TAREFA, tarefa.to_dict()) for tarefa in tarefas),
+                          [(migracoes.METADADOS, metadados)] if metadados else [])
+        _escrever_registros_json(destino, registros)
+
+    logger.info("Salvando dados...") # Feedback
+    inicio = time.perf_counter()
     try:
-        # Cria um dicionário principal para armazenar ambas as listas de objetos
-        dados_para_salvar = {
-            # Converte cada objeto para seu formato de dicionário usando o método to_dict()
-            "listas": [lista.to_dict() for lista in listas],
-            "tarefas": [tarefa.to_dict() for tarefa in tarefas]
-        }
-
-        # Abre o arquivo em modo de escrita ('w')
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            # Usa json.dump para escrever o dicionário no arquivo.
-            # indent=4 para deixar o JSON identado e mais legível.
-            json.dump(dados_para_salvar, f, indent=4, ensure_ascii=False)
-        print("Dados salvos com sucesso!")
+        # Em um snapshot, o tempo de escrita medido inclui o da compressão
+        segundos_escrita = _gravar(temporario, codec, escrever, duravel)
+        substituir_arquivo(temporario, caminho, duravel, backups)
+
+        if metricas.ATIVO:
+            metricas.registrar_salvamento(time.perf_counter() - inicio, segundos_escrita, os.path.getsize(caminho))
+        logger.info("Dados salvos com sucesso!")
+        return True
 
     except IOError as error:
-        print(f"Erro ao salvar o arquivo: {error}")
+        logger.error("Erro ao salvar o arquivo: %s", error)
     except Exception as error:
-        print(f"Ocorreu um erro inesperado ao salvar os dados: {error}")
+        logger.exception("Ocorreu um erro inesperado ao salvar os dados: %s", error)
+    finally:
+        # Só resta um temporário se a gravação falhou; o arquivo de dados não foi tocado
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return False
+
+
+def _ler_arquivo(caminho: str) -> Tuple[List[ListaDeTarefas], List[Tarefa], Dict[str, Any]]:
+    """
+    Lê um arquivo de dados (JSON comum ou snapshot), conferindo a soma de verificação.
+
+    Raises:
+        ArquivoCorrompido: Se o arquivo estiver vazio ou a soma não conferir.
+        Qualquer erro de leitura ou decodificação do arquivo.
+    """
+
+    inicio = time.perf_counter()
+    tamanho = os.path.getsize(caminho)
+    if tamanho == 0:
+        raise ArquivoCorrompido("O arquivo está vazio.")
 
+    codec = detectar_codec(caminho)
+    if codec:
+        with _abrir_snapshot(caminho, 'r', codec) as f:
+            listas_carregadas, tarefas_carregadas, metadados = _ler_snapshot(f)
 
-def carregar_dados() -> Tuple[List[ListaDeTarefas], List[Tarefa]]:
+        if metricas.ATIVO:
+            # A leitura e a criação dos objetos são intercaladas, então contam juntas como leitura
+            segundos = time.perf_counter() - inicio
+            metricas.registrar_carregamento(segundos, segundos, tamanho)
+        return listas_carregadas, tarefas_carregadas, metadados
+
+    # Abre o arquivo em modo de leitura
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+
+    # Os arquivos gravados antes da soma de verificação são lidos sem conferência
+    soma = _SOMA_JSON.search(conteudo, max(0, len(conteudo) - 256))
+    if soma:
+        _conferir_soma(hashlib.new(ALGORITMO_SOMA, memoryview(conteudo)[:soma.start()]), soma.group(1).decode())
+    with coleta_pausada():
+        dados = json.loads(conteudo)
+    fim_leitura = time.perf_counter()
+
+    # Um arquivo de uma versão antiga do esquema é atualizado antes de virar objetos
+    versao = dados.get("esquema", migracoes.ESQUEMA_SEM_VERSAO)
+    if versao != migracoes.VERSAO_ESQUEMA:
+        logger.info("Atualizando os dados da versão %d para a %d do esquema.", versao, migracoes.VERSAO_ESQUEMA)
+        passos = migracoes.passos_entre(versao)
+        dados["listas"] = [migracoes.migrar_registro(migracoes.LISTA, d, passos) for d in dados.get("listas", [])]
+        dados["tarefas"] = [migracoes.migrar_registro(migracoes.TAREFA, d, passos) for d in dados.get("tarefas", [])]
+        dados["metadados"] = migracoes.migrar_registro(migracoes.METADADOS, dados.get("metadados", {}), passos)
+
+    # Recria os objetos ListaDeTarefas a partir dos dicionários no arquivo
+    listas_carregadas = [ListaDeTarefas.from_dict(d) for d in dados.get("listas", [])]
+
+    # Recria os objetos Tarefa a partir dos dicionários no arquivo, todos de uma vez
+    tarefas_carregadas = Tarefa.from_dicts(dados.get("tarefas", []))
+
+    if metricas.ATIVO:
+        metricas.registrar_carregamento(time.perf_counter() - inicio, fim_leitura - inicio, tamanho)
+    return listas_carregadas, tarefas_carregadas, dados.get("metadados", {})
+
+
+def carregar_dados(caminho: Optional[str] = None) -> Tuple[List[ListaDeTarefas], List[Tarefa], Dict[str, Any]]:
     """
-    Carrega as listas e tarefas do arquivo JSON.
+    Carrega as listas, as tarefas e os metadados do arquivo JSON.
     Se o arquivo não existir, cria uma lista padrão "Geral".
 
+    Snapshots compactados são reconhecidos pelos primeiros bytes, qualquer que seja a
+    extensão, e lidos aos poucos. Os dados de uma versão antiga do esquema são migrados
+    (ver `migracoes.py`) e gravados na versão atual no próximo salvamento.
+
+    Um arquivo que não pode ser lido (corrompido, truncado ou com a soma de verificação
+    errada) é substituído pelo backup mais recente que puder ser lido, e guardado com a
+    extensão ".corrompido". Sem um backup válido, nada é carregado: começar com os dados
+    padrão faria o próximo salvamento apagar o arquivo.
+
+    Args:
+        caminho (Optional[str]): O arquivo a ser lido. Padrão é DATA_FILE.
+
     Returns:
-        Tuple[List[ListaDeTarefas], List[Tarefa]]: Uma tupla contendo a lista
-        de objetos ListaDeTarefas e a lista de objetos Tarefa.
+        Tuple[List[ListaDeTarefas], List[Tarefa], Dict[str, Any]]: Uma tupla contendo
+        a lista de objetos ListaDeTarefas, a lista de objetos Tarefa e os metadados
+        (vazios se o arquivo não tiver nenhum).
+
+    Raises:
+        migracoes.EsquemaNaoSuportado: Se o arquivo for de uma versão do esquema mais nova
+            que a deste programa.
+        ArquivoCorrompido: Se nem o arquivo nem os backups puderem ser lidos.
     """
 
+    caminho = caminho or DATA_FILE
+
     # Verifica se o arquivo de dados não existe
-    if not os.path.exists(DATA_FILE):
-        print("Arquivo de dados não encontrado. Criando uma lista padrão 'Geral'.")
+    if not os.path.exists(caminho):
+        logger.warning("Arquivo de dados não encontrado. Criando uma lista padrão 'Geral'.")
         # Cria uma lista inicial "Geral" para que o programa sempre tenha pelo menos uma lista.
         lista_geral = ListaDeTarefas(id=1, nome="Geral")
         # Retorna a lista padrão e uma lista de tarefas vazia
-        return [lista_geral], []
+        return [lista_geral], [], {}
 
     try:
-        # Abre o arquivo em modo de leitura
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            # Verifica se o arquivo está vazio para evitar erros de decodificação
-            if os.path.getsize(DATA_FILE) == 0:
-                print("Arquivo de dados vazio. Criando uma lista padrão 'Geral'.")
-                lista_geral = ListaDeTarefas(id=1, nome="Geral")
-                return [lista_geral], []
-
-            dados = json.load(f)
-
-            # Recria os objetos ListaDeTarefas a partir dos dicionários no arquivo
-            listas_carregadas = [ListaDeTarefas.from_dict(d) for d in dados.get("listas", [])]
-
-            # Recria os objetos Tarefa a partir dos dicionários no arquivo
-            tarefas_carregadas = [Tarefa.from_dict(d) for d in dados.get("tarefas", [])]
+        dados = _ler_arquivo(caminho)
+        logger.info("Dados carregados com sucesso!")
+        return dados
+    except migracoes.EsquemaNaoSuportado:
+        # Começar com os dados padrão aqui faria o próximo salvamento apagar o arquivo
+        raise
+    except Exception as error:
+        falha = error
+        logger.error("Erro ao ler ou decodificar o arquivo de dados: %s", error)
 
-            print("Dados carregados com sucesso!")
-            return listas_carregadas, tarefas_carregadas
+    numero = 1
+    while os.path.exists(caminho_backup(caminho, numero)):
+        backup = caminho_backup(caminho, numero)
+        numero += 1
+        try:
+            dados = _ler_arquivo(backup)
+        except migracoes.EsquemaNaoSuportado:
+            raise
+        except Exception as error:
+            logger.error("O backup '%s' também não pôde ser lido: %s", backup, error)
+            continue
+        if os.path.getsize(caminho) > 0:
+            # O arquivo danificado é guardado para análise, fora da rotação dos backups
+            os.replace(caminho, caminho + ".corrompido")
+            logger.warning("O arquivo danificado foi guardado em '%s'.", caminho + ".corrompido")
+        logger.warning("Dados recuperados do backup '%s'.", backup)
+        return dados
 
-    except (json.JSONDecodeError, KeyError) as error:
-        print(f"Erro ao ler ou decodificar o arquivo JSON: {error}. Iniciando com dados padrão.")
-        # Se o arquivo estiver corrompido ou mal formatado, começa com uma lista padrão.
-        lista_geral = ListaDeTarefas(id=1, nome="Geral")
-        return [lista_geral], []
-    except Exception as error:
-        print(f"Ocorreu um erro inesperado ao carregar os dados: {error}. Iniciando com dados padrão.")
+    if os.path.getsize(caminho) == 0:
+        # Um arquivo vazio, sem backups, não tem o que ser preservado
+        logger.warning("Arquivo de dados vazio. Criando uma lista padrão 'Geral'.")
         lista_geral = ListaDeTarefas(id=1, nome="Geral")
-        return [lista_geral], []
+        return [lista_geral], [], {}
+    raise ArquivoCorrompido(f"O arquivo de dados '{caminho}' não pôde ser lido ({falha}) e não há um backup "
+                            "válido. Ele não foi alterado: corrija-o ou restaure uma cópia antes de continuar.")
@@ -0,0 +1,206 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from manager import TaskManager
+
+# Nomes de usuário aceitos: letras, números, "_", "-" e ".", sem começar com "."
+# (impede que um nome aponte para fora do diretório dos dados)
+_NOME_USUARIO = re.compile(r"[\w-][\w.-]*")
+
+logger = logging.getLogger(__name__)
+
+
+class GerenciadorPool:
+    """
+    Mantém em memória os gerenciadores de vários usuários, um arquivo de dados por usuário.
+
+    Cada gerenciador é carregado na primeira vez em que é pedido. Quando o limite de
+    gerenciadores ou de tarefas carregadas é ultrapassado, o usado há mais tempo é
+    descartado (LRU), e as suas alterações pendentes são gravadas antes.
+    """
+
+    def __init__(self,
+                 diretorio: str,
+                 max_gerenciadores: int = 100,
+                 max_tarefas: Optional[int] = None,
+                 salvar_automaticamente: bool = False):
+        """
+        Inicializa um pool vazio.
+
+        Args:
+            diretorio (str): Diretório dos arquivos de dados, um "<usuario>.json" por usuário.
+            max_gerenciadores (int): Quantos gerenciadores podem ficar carregados ao mesmo tempo.
+            max_tarefas (Optional[int]): Limite da soma das tarefas dos gerenciadores carregados,
+                usado como medida da memória ocupada. None não limita.
+            salvar_automaticamente (bool): Se False (padrão), os gerenciadores só gravam o
+                arquivo ao serem descartados ou em `salvar_todos()`, em vez de a cada ação.
+        """
+
+        if max_gerenciadores < 1:
+            raise ValueError("O pool precisa comportar pelo menos um gerenciador.")
+
+        self._diretorio = diretorio
+        self._max_gerenciadores = max_gerenciadores
+        self._max_tarefas = max_tarefas
+        self._salvar_automaticamente = salvar_automaticamente
+        # Do usado há mais tempo para o usado mais recentemente
+        self._gerenciadores: "OrderedDict[str, TaskManager]" = OrderedDict()
+        self._trava = threading.RLock()
+
+        self._acertos = 0
+        self._falhas = 0
+        self._despejos = 0
+        self._falhas_gravacao = 0
+        self._segundos_carregamento_total = 0.0
+        self._segundos_carregamento_max = 0.0
+
+    def _caminho(self, usuario: str) -> str:
+        """Retorna o arquivo de dados de um usuário, validando o nome."""
+
+        if not _NOME_USUARIO.fullmatch(usuario):
+            raise ValueError(f"Nome de usuário inválido: '{usuario}'.")
+        return os.path.join(self._diretorio, f"{usuario}.json")
+
+    def obter(self, usuario: str) -> TaskManager:
+        """
+        Retorna o gerenciador do usuário, carregando-o se ainda não estiver em memória.
+
+        O pool protege a sua própria estrutura com uma trava, mas cada gerenciador não é
+        seguro para uso simultâneo: as chamadas a um mesmo usuário devem ser serializadas.
+
+        Raises:
+            ValueError: Se o nome do usuário tiver caracteres não permitidos.
+        """
+
+        with self._trava:
+            gerenciador = self._gerenciadores.get(usuario)
+            if gerenciador is not None:
+                self._acertos += 1
+                self._gerenciadores.move_to_end(usuario)
+                return gerenciador
+
+            caminho = self._caminho(usuario)
+            self._falhas += 1
+            inicio = time.perf_counter()
+            gerenciador = TaskManager(caminho, salvar_automaticamente=self._salvar_automaticamente)
+            segundos = time.perf_counter() - inicio
+            self._segundos_carregamento_total += segundos
+            self._segundos_carregamento_max = max(self._segundos_carregamento_max, segundos)
+
+            self._gerenciadores[usuario] = gerenciador
+            self._aplicar_limites()
+            return gerenciador
+
+    def _total_tarefas(self) -> int:
+        """Soma as tarefas de todos os gerenciadores carregados."""
+
+        return sum(gerenciador.get_contadores()["total"] for gerenciador in self._gerenciadores.values())
+
+    def _aplicar_limites(self):
+        """Descarta os gerenciadores usados há mais tempo até respeitar os limites do pool."""
+
+        # O gerenciador usado mais recentemente nunca é descartado, mesmo se sozinho passar do limite
+        while len(self._gerenciadores) > 1:
+            excedeu_quantidade = len(self._gerenciadores) > self._max_gerenciadores
+            excedeu_tarefas = self._max_tarefas is not None and self._total_tarefas() > self._max_tarefas
+            if not (excedeu_quantidade or excedeu_tarefas):
+                break
+            # Os gerenciadores que não conseguem gravar ficam no pool; o próximo é tentado
+            for usuario in list(self._gerenciadores)[:-1]:
+                if self._descartar(usuario):
+                    break
+            else:
+                break
+
+    def _retirar(self, usuario: str) -> bool:
+        """
+        Grava as alterações pendentes de um gerenciador e o retira do pool.
+
+        Se a gravação falhar, o gerenciador continua no pool com as suas alterações, a
+        falha é registrada no log e contada, e o retorno é False.
+        """
+
+        gerenciador = self._gerenciadores[usuario]
+        gerenciador.salvar()
+        if gerenciador.tem_alteracoes_pendentes():
+            self._falhas_gravacao += 1
+            logger.error("Não foi possível gravar os dados de '%s'; o gerenciador continua carregado.", usuario)
+            return False
+        del self._gerenciadores[usuario]
+        return True
+
+    def _descartar(self, usuario: str) -> bool:
+        """Retira um gerenciador do pool (ver `_retirar`), contando o descarte."""
+
+        if not self._retirar(usuario):
+            return False
+        self._despejos += 1
+        return True
+
+    def descartar(self, usuario: str) -> bool:
+        """
+        Grava e retira do pool o gerenciador de um usuário.
+
+        Retorna False se ele não estava carregado ou se as suas alterações não puderam ser
+        gravadas (nesse caso, ele continua no pool).
+        """
+
+        with self._trava:
+            if usuario not in self._gerenciadores:
+                return False
+            return self._descartar(usuario)
+
+    def salvar_todos(self) -> int:
+        """Grava as alterações pendentes de todos os gerenciadores e retorna quantos foram gravados."""
+
+        with self._trava:
+            gravados = 0
+            for usuario, gerenciador in self._gerenciadores.items():
+                if gerenciador.salvar():
+                    gravados += 1
+                elif gerenciador.tem_alteracoes_pendentes():
+                    self._falhas_gravacao += 1
+                    logger.error("Não foi possível gravar os dados de '%s'.", usuario)
+            return gravados
+
+    def fechar(self) -> bool:
+        """
+        Grava as alterações pendentes e esvazia o pool.
+
+        Os gerenciadores cujas alterações não puderam ser gravadas continuam no pool, e o
+        retorno é False; `fechar()` pode ser chamado de novo depois de resolvido o problema.
+        """
+
+        with self._trava:
+            for usuario in list(self._gerenciadores):
+                self._retirar(usuario)
+            return not self._gerenciadores
+
+    def estatisticas(self) -> Dict[str, Any]:
+        """
+        Retorna as estatísticas de uso do pool.
+
+        Returns:
+            Dict[str, Any]: Acertos, falhas (carregamentos), taxa de acerto, descartes,
+            gravações que falharam, tempos de carregamento (total, médio e máximo) e o que
+            está carregado no momento.
+        """
+
+        with self._trava:
+            pedidos = self._acertos + self._falhas
+            return {
+                "acertos": self._acertos,
+                "falhas": self._falhas,
+                "taxa_acerto": self._acertos / pedidos if pedidos else 0.0,
+                "despejos": self._despejos,
+                "falhas_gravacao": self._falhas_gravacao,
+                "segundos_carregamento_total": self._segundos_carregamento_total,
+                "segundos_carregamento_medio": self._segundos_carregamento_total / self._falhas if self._falhas else 0.0,
+                "segundos_carregamento_max": self._segundos_carregamento_max,
+                "gerenciadores_carregados": len(self._gerenciadores),
+                "tarefas_carregadas": self._total_tarefas()
+            }
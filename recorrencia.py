@@ -0,0 +1,90 @@
+import calendar
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+# Frequências de repetição aceitas. "nunca" indica uma tarefa comum, sem recorrência.
+REGRAS_RECORRENCIA = ("diaria", "semanal", "mensal", "anual")
+
+# Regras cujo passo é um número fixo de dias
+_DIAS_POR_PASSO = {"diaria": 1, "semanal": 7}
+
+# Regras cujo passo é um número fixo de meses
+_MESES_POR_PASSO = {"mensal": 1, "anual": 12}
+
+
+def eh_recorrente(regra: Optional[str]) -> bool:
+    """Indica se a regra de repetição gera novas ocorrências."""
+
+    return regra in REGRAS_RECORRENCIA
+
+
+def _somar_meses(data: date, meses: int) -> date:
+    """
+    Soma uma quantidade de meses a uma data.
+
+    Quando o dia não existe no mês de destino (ex: 31 de fevereiro), usa o
+    último dia desse mês. Por isso a soma é sempre feita a partir da data
+    inicial da série, e não da ocorrência anterior: uma série que começa no
+    dia 31 volta ao dia 31 nos meses que o têm.
+    """
+
+    total_meses = data.year * 12 + (data.month - 1) + meses
+    ano, mes = divmod(total_meses, 12)
+    ultimo_dia = calendar.monthrange(ano, mes + 1)[1]
+    return date(ano, mes + 1, min(data.day, ultimo_dia))
+
+
+def ocorrencia(inicio: date, regra: str, indice: int) -> date:
+    """Retorna a ocorrência de número `indice` da série (a de índice 0 é o próprio início)."""
+
+    if regra in _DIAS_POR_PASSO:
+        return inicio + timedelta(days=indice * _DIAS_POR_PASSO[regra])
+    return _somar_meses(inicio, indice * _MESES_POR_PASSO[regra])
+
+
+def indice_ocorrencia(inicio: date, regra: str, data: date) -> int:
+    """
+    Retorna o índice da primeira ocorrência da série que cai em `data` ou depois dela.
+
+    O cálculo é feito em tempo constante, sem percorrer as ocorrências anteriores.
+    """
+
+    if regra in _DIAS_POR_PASSO:
+        diferenca = (data - inicio).days
+        # Divisão arredondada para cima
+        return -(-diferenca // _DIAS_POR_PASSO[regra])
+
+    passo = _MESES_POR_PASSO[regra]
+    meses = (data.year - inicio.year) * 12 + (data.month - inicio.month)
+    indice = meses // passo
+    if ocorrencia(inicio, regra, indice) < data:
+        indice += 1
+    return indice
+
+
+def proxima_ocorrencia(inicio: date, regra: str, depois_de: date) -> date:
+    """Retorna a primeira ocorrência da série estritamente posterior a `depois_de`."""
+
+    indice = indice_ocorrencia(inicio, regra, depois_de + timedelta(days=1))
+    return ocorrencia(inicio, regra, max(indice, 0))
+
+
+def ocorrencias_entre(inicio: date, regra: str, de: date, ate: date) -> Iterator[date]:
+    """Gera, sob demanda, as ocorrências da série no intervalo fechado [de, ate]."""
+
+    indice = max(indice_ocorrencia(inicio, regra, de), 0)
+    data = ocorrencia(inicio, regra, indice)
+    while data <= ate:
+        yield data
+        indice += 1
+        data = ocorrencia(inicio, regra, indice)
+
+
+def contar_ocorrencias(inicio: date, regra: str, de: date, ate: date) -> int:
+    """Conta as ocorrências da série no intervalo fechado [de, ate] em tempo constante."""
+
+    if ate < de:
+        return 0
+    primeiro = max(indice_ocorrencia(inicio, regra, de), 0)
+    depois_do_ultimo = max(indice_ocorrencia(inicio, regra, ate + timedelta(days=1)), 0)
+    return max(depois_do_ultimo - primeiro, 0)
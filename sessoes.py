@@ -0,0 +1,465 @@
+import argparse
+import atexit
+import contextlib
+import functools
+import hashlib
+import importlib
+import inspect
+import io
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Variável de ambiente que liga a gravação da sessão. O valor é o caminho do arquivo
+# de sessão (uma chamada por linha, em JSON).
+VARIAVEL_AMBIENTE = "GERENCIADOR_GRAVAR_SESSAO"
+
+VERSAO_FORMATO = 1
+
+# Parâmetros dos métodos do TaskManager que guardam IDs de tarefas ou de listas. Ao
+# reproduzir sobre outros dados, IDs inexistentes são trocados por IDs que existem.
+_PARAMETROS_ID_TAREFA = ("tarefa_id",)
+_PARAMETROS_IDS_TAREFAS = ("tarefa_ids",)
+_PARAMETROS_ID_LISTA = ("lista_id",)
+_PARAMETROS_DADOS = ("dados_tarefa", "novos_dados", "campos")
+
+# Métodos públicos que não são ações do usuário e recebem objetos que não viram JSON
+_METODOS_NAO_GRAVADOS = ("registrar_observador", "remover_observador", "assinar_eventos", "cancelar_assinatura_eventos")
+
+# Módulos que usam `date.today()` nas ações do gerenciador. Na reprodução, o "hoje"
+# deles é o dia da gravação, para que o estado final não dependa do dia em que se reproduz.
+_MODULOS_COM_HOJE = ("manager", "consultas", "painel", "visoes")
+
+# Estado da gravação em andamento. `_arquivo` igual a None significa desligada.
+_arquivo: Optional[TextIO] = None
+_profundidade = 0
+_fim_ultima_chamada: Optional[float] = None
+# Dia da sessão em reprodução, devolvido por `date.today()` nos módulos do gerenciador
+_dia_reproducao: Optional[date] = None
+
+
+def _codificar(valor: Any) -> Any:
+    """Converte um argumento em JSON, marcando os tipos que o JSON não tem."""
+
+    # Importado aqui para evitar uma importação circular com o gerenciador
+    import visoes
+
+    if valor is None or isinstance(valor, (bool, int, float, str)):
+        return valor
+    if isinstance(valor, date):
+        return {"$data": valor.isoformat()}
+    if isinstance(valor, (list, tuple, set)):
+        return [_codificar(item) for item in valor]
+    if isinstance(valor, dict):
+        return {str(chave): _codificar(item) for chave, item in valor.items()}
+    if isinstance(valor, visoes.VisaoSalva):
+        return {"$visao": valor.to_dict()}
+    raise TypeError(f"Argumento de tipo não suportado na gravação: {type(valor).__name__}")
+
+
+def _decodificar(valor: Any) -> Any:
+    """Desfaz a conversão de `_codificar`."""
+
+    import visoes
+
+    if isinstance(valor, list):
+        return [_decodificar(item) for item in valor]
+    if isinstance(valor, dict):
+        if "$data" in valor:
+            return date.fromisoformat(valor["$data"])
+        if "$visao" in valor:
+            return visoes.VisaoSalva.from_dict(valor["$visao"])
+        return {chave: _decodificar(item) for chave, item in valor.items()}
+    return valor
+
+
+def _escrever(registro: Dict[str, Any]):
+    """Acrescenta um registro ao arquivo da sessão."""
+
+    _arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+def _gravar_metodo(nome: str, metodo: Callable) -> Callable:
+    """Cria uma versão do método que grava a chamada, o intervalo desde a anterior e a duração."""
+
+    assinatura = inspect.signature(metodo)
+
+    # Sem copiar o __dict__ do método: as marcas de outros invólucros não passam para este
+    @functools.wraps(metodo, updated=())
+    def metodo_gravado(gerenciador, *args, **kwargs):
+        global _profundidade, _fim_ultima_chamada
+
+        # Chamadas internas (ex: mover_tarefas chama editar_tarefas) não são gravadas,
+        # porque a reprodução da chamada externa já as repete
+        if _arquivo is None or _profundidade > 0:
+            return metodo(gerenciador, *args, **kwargs)
+
+        argumentos = assinatura.bind(gerenciador, *args, **kwargs).arguments
+        argumentos.pop("self")
+        try:
+            registro = {"operacao": nome, "argumentos": _codificar(dict(argumentos))}
+        except TypeError as erro:
+            # A chamada acontece normalmente; só fica fora da sessão, que não a reproduziria
+            logger.warning("Chamada a %s não gravada na sessão: %s", nome, erro)
+            return metodo(gerenciador, *args, **kwargs)
+
+        _profundidade += 1
+        inicio = time.perf_counter()
+        if _fim_ultima_chamada is None:
+            # O cabeçalho é gravado na primeira chamada, quando o tamanho dos dados é conhecido
+            _escrever({"sessao": VERSAO_FORMATO,
+                       "inicio": datetime.now().isoformat(timespec="seconds"),
+                       "data": date.today().isoformat(),
+                       "num_tarefas": len(gerenciador.get_todas_tarefas()),
+                       "num_listas": len(gerenciador.get_todas_listas())})
+            inicio = time.perf_counter()
+            registro["intervalo_segundos"] = 0.0
+        else:
+            registro["intervalo_segundos"] = round(inicio - _fim_ultima_chamada, 6)
+
+        try:
+            return metodo(gerenciador, *args, **kwargs)
+        finally:
+            _profundidade -= 1
+            _fim_ultima_chamada = time.perf_counter()
+            registro["segundos"] = round(_fim_ultima_chamada - inicio, 6)
+            _escrever(registro)
+
+    metodo_gravado.__sessoes_original__ = metodo
+    return metodo_gravado
+
+
+def _gravado(metodo: Callable) -> bool:
+    """Indica se o método já passa pelo invólucro da gravação, mesmo sob outros invólucros."""
+
+    while metodo is not None:
+        if "__sessoes_original__" in getattr(metodo, "__dict__", {}):
+            return True
+        metodo = getattr(metodo, "__wrapped__", None)
+    return False
+
+
+def gravar(caminho: str):
+    """
+    Liga a gravação da sessão: cada chamada pública ao TaskManager vira uma linha do arquivo.
+
+    Cada linha guarda a operação, os argumentos, o tempo parado desde a chamada anterior
+    (o tempo que o usuário levou para decidir) e a duração da chamada. O arquivo é
+    acrescentado linha a linha, então uma sessão interrompida continua legível.
+    """
+
+    global _arquivo
+    from manager import TaskManager
+
+    parar()
+    _arquivo = open(caminho, 'a', encoding='utf-8', buffering=1)
+    for nome, metodo in list(vars(TaskManager).items()):
+        if nome.startswith("_") or nome in _METODOS_NAO_GRAVADOS:
+            continue
+        if not callable(metodo) or _gravado(metodo):
+            continue
+        setattr(TaskManager, nome, _gravar_metodo(nome, metodo))
+    atexit.register(parar)
+
+
+def parar():
+    """Desliga a gravação, fecha o arquivo e restaura os métodos originais do TaskManager."""
+
+    global _arquivo, _fim_ultima_chamada
+    from manager import TaskManager
+
+    for nome, metodo in list(vars(TaskManager).items()):
+        # Só o próprio invólucro da gravação é desfeito; um invólucro de outro módulo por
+        # cima dele fica, e o da gravação, desligado, passa as chamadas adiante
+        original = getattr(metodo, "__dict__", {}).get("__sessoes_original__")
+        if original is not None:
+            setattr(TaskManager, nome, original)
+    if _arquivo is not None:
+        _arquivo.close()
+    _arquivo = None
+    _fim_ultima_chamada = None
+
+
+def gravar_pelo_ambiente():
+    """Liga a gravação se a variável de ambiente GERENCIADOR_GRAVAR_SESSAO estiver definida."""
+
+    caminho = os.environ.get(VARIAVEL_AMBIENTE)
+    if caminho:
+        gravar(caminho)
+
+
+def _ler_registros(caminho: str) -> Iterator[Dict[str, Any]]:
+    """Lê todos os registros de um arquivo de sessão: cabeçalhos e chamadas."""
+
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            if linha.strip():
+                yield json.loads(linha)
+
+
+def ler_sessao(caminho: str) -> Iterator[Dict[str, Any]]:
+    """Lê as chamadas gravadas em um arquivo de sessão, ignorando os cabeçalhos."""
+
+    for registro in _ler_registros(caminho):
+        if "operacao" in registro:
+            yield registro
+
+
+class _DataReproducao(date):
+    """`date` com o `today()` trocado pelo dia da sessão em reprodução."""
+
+    @classmethod
+    def today(cls) -> date:
+        return _dia_reproducao or date.today()
+
+
+@contextlib.contextmanager
+def _hoje_da_sessao():
+    """Faz o `date.today()` dos módulos do gerenciador retornar `_dia_reproducao` enquanto ativo."""
+
+    global _dia_reproducao
+
+    modulos = [importlib.import_module(nome) for nome in _MODULOS_COM_HOJE]
+    originais = [modulo.date for modulo in modulos]
+    for modulo in modulos:
+        modulo.date = _DataReproducao
+    try:
+        yield
+    finally:
+        for modulo, original in zip(modulos, originais):
+            modulo.date = original
+        _dia_reproducao = None
+
+
+def soma_verificacao(gerenciador) -> str:
+    """
+    Retorna um resumo (SHA-256) do estado das listas e tarefas do gerenciador.
+
+    Duas reproduções da mesma sessão sobre os mesmos dados devem terminar com o mesmo
+    resumo, qualquer que seja o modo de salvamento.
+    """
+
+    estado = {
+        "listas": sorted((lista.to_dict() for lista in gerenciador.get_todas_listas()), key=lambda l: l["id"]),
+        "tarefas": sorted((tarefa.to_dict() for tarefa in gerenciador.get_todas_tarefas()), key=lambda t: t["id"])
+    }
+    return hashlib.sha256(json.dumps(estado, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class _MapeadorIds:
+    """Troca os IDs gravados que não existem nos dados da reprodução por IDs que existem."""
+
+    def __init__(self, gerenciador):
+        self._gerenciador = gerenciador
+
+    @staticmethod
+    def _mapear(valor: Any, existe: Callable[[int], Any], existentes: Callable[[], List[int]]) -> Any:
+        """Mantém um ID existente e troca um inexistente, sempre pelo mesmo ID existente."""
+
+        if not isinstance(valor, int) or existe(valor):
+            return valor
+        ids = existentes()
+        return ids[valor % len(ids)] if ids else valor
+
+    def _ids_tarefas(self) -> List[int]:
+        return sorted(tarefa.id for tarefa in self._gerenciador.get_todas_tarefas())
+
+    def _ids_listas(self) -> List[int]:
+        return sorted(lista.id for lista in self._gerenciador.get_todas_listas())
+
+    def argumentos(self, argumentos: Dict[str, Any]) -> Dict[str, Any]:
+        """Aplica o mapeamento aos parâmetros de ID e ao campo `lista_id` dos dados de tarefa."""
+
+        tarefa_existe = self._gerenciador.buscar_tarefa_por_id
+        lista_existe = self._gerenciador.buscar_lista_por_id
+        for nome, valor in argumentos.items():
+            if nome in _PARAMETROS_ID_TAREFA:
+                argumentos[nome] = self._mapear(valor, tarefa_existe, self._ids_tarefas)
+            elif nome in _PARAMETROS_IDS_TAREFAS and isinstance(valor, list):
+                argumentos[nome] = [self._mapear(tarefa_id, tarefa_existe, self._ids_tarefas) for tarefa_id in valor]
+            elif nome in _PARAMETROS_ID_LISTA:
+                argumentos[nome] = self._mapear(valor, lista_existe, self._ids_listas)
+            elif nome in _PARAMETROS_DADOS and isinstance(valor, dict) and "lista_id" in valor:
+                valor["lista_id"] = self._mapear(valor["lista_id"], lista_existe, self._ids_listas)
+        return argumentos
+
+
+def _percentil(valores_ordenados: List[float], percentual: float) -> float:
+    """Retorna o percentil pelo método do posto mais próximo."""
+
+    if not valores_ordenados:
+        return 0.0
+    posicao = max(0, -(-len(valores_ordenados) * percentual // 100) - 1)
+    return valores_ordenados[int(posicao)]
+
+
+def reproduzir(caminho_sessao: str,
+               caminho_dados: str,
+               salvar_automaticamente: bool = True,
+               mapear_ids: bool = True,
+               respeitar_intervalos: bool = False) -> Dict[str, Any]:
+    """
+    Reproduz uma sessão gravada sobre um arquivo de dados e mede cada chamada.
+
+    O arquivo de dados é alterado pela reprodução; use uma cópia. As ações usam como
+    "hoje" o dia gravado no cabeçalho da sessão (ex: a data de conclusão das tarefas),
+    então a soma de verificação não muda com o dia em que a sessão é reproduzida.
+
+    Args:
+        caminho_sessao (str): Arquivo gravado por `gravar()`.
+        caminho_dados (str): Arquivo de dados sobre o qual a sessão é reproduzida.
+        salvar_automaticamente (bool): Modo de salvamento do gerenciador. Se False, o
+            arquivo é gravado uma vez ao final, e esse tempo entra no total.
+        mapear_ids (bool): Se True, IDs gravados que não existem nestes dados são trocados
+            por IDs existentes, para que a sessão possa ser reproduzida em dados de outro tamanho.
+        respeitar_intervalos (bool): Se True, espera entre as chamadas o mesmo tempo da
+            sessão original. Por padrão, as chamadas são feitas o mais rápido possível.
+
+    Returns:
+        Dict[str, Any]: Total de chamadas, erros, tempo total, vazão (chamadas por segundo),
+        latências por operação (contagem, mediana, p95, p99 e máximo, em segundos) e a
+        soma de verificação do estado final.
+    """
+
+    # Importado aqui para evitar uma importação circular com o gerenciador
+    global _dia_reproducao
+    from manager import TaskManager
+
+    gerenciador = TaskManager(caminho_dados, salvar_automaticamente=salvar_automaticamente)
+    mapeador = _MapeadorIds(gerenciador) if mapear_ids else None
+    latencias: Dict[str, List[float]] = {}
+    erros: Dict[str, int] = {}
+
+    inicio_total = time.perf_counter()
+    with _hoje_da_sessao():
+        for registro in _ler_registros(caminho_sessao):
+            if "operacao" not in registro:
+                # Um arquivo pode juntar várias sessões, cada uma com o seu cabeçalho.
+                # As sessões gravadas antes da data no cabeçalho usam o dia atual.
+                data = registro.get("data")
+                _dia_reproducao = date.fromisoformat(data) if data else None
+                continue
+
+            nome = registro["operacao"]
+            if respeitar_intervalos:
+                time.sleep(registro.get("intervalo_segundos", 0.0))
+
+            argumentos = _decodificar(registro["argumentos"])
+            if mapeador is not None:
+                argumentos = mapeador.argumentos(argumentos)
+
+            inicio = time.perf_counter()
+            try:
+                getattr(gerenciador, nome)(**argumentos)
+            except Exception:
+                # A chamada original pode ter falhado do mesmo jeito (ex: expressão de tags inválida)
+                erros[nome] = erros.get(nome, 0) + 1
+            latencias.setdefault(nome, []).append(time.perf_counter() - inicio)
+
+    gerenciador.salvar()
+    segundos_total = time.perf_counter() - inicio_total
+
+    num_chamadas = sum(len(valores) for valores in latencias.values())
+    por_operacao = {}
+    for nome, valores in sorted(latencias.items()):
+        valores.sort()
+        por_operacao[nome] = {
+            "contagem": len(valores),
+            "erros": erros.get(nome, 0),
+            "segundos_mediana": _percentil(valores, 50),
+            "segundos_p95": _percentil(valores, 95),
+            "segundos_p99": _percentil(valores, 99),
+            "segundos_max": valores[-1]
+        }
+
+    return {
+        "num_chamadas": num_chamadas,
+        "num_erros": sum(erros.values()),
+        "segundos_total": segundos_total,
+        "chamadas_por_segundo": num_chamadas / segundos_total if segundos_total else 0.0,
+        "operacoes": por_operacao,
+        "soma_verificacao": soma_verificacao(gerenciador)
+    }
+
+
+def _preparar_dados(diretorio: str, dados: Optional[str], num_tarefas: Optional[int]) -> Tuple[str, int]:
+    """
+    Copia o arquivo de dados (ou gera dados sintéticos) no diretório e retorna o caminho e o tamanho.
+
+    A cópia mantém a extensão do original (ex: ".json.gz"), para que a reprodução grave
+    no mesmo formato, e as tarefas são contadas registro a registro, em qualquer formato.
+    """
+
+    import gerador_dados
+    import migracoes
+    import persistence
+
+    if num_tarefas is not None:
+        caminho = os.path.join(diretorio, "dados_reproducao.json")
+        listas, tarefas = gerador_dados.gerar_dados(num_tarefas)
+        persistence.salvar_dados(listas, tarefas, caminho=caminho)
+        return caminho, len(tarefas)
+
+    origem = dados or persistence.DATA_FILE
+    raiz, extensao = os.path.splitext(origem)
+    if persistence.codec_para_caminho(origem):
+        extensao = os.path.splitext(raiz)[1] + extensao
+    caminho = os.path.join(diretorio, "dados_reproducao" + extensao)
+    shutil.copyfile(origem, caminho)
+    with persistence.abrir_registros(caminho) as (_, _, registros):
+        return caminho, sum(1 for tipo, _ in registros if tipo == migracoes.TAREFA)
+
+
+def main():
+    """Reproduz uma sessão gravada pela linha de comando e grava o relatório em JSON."""
+
+    parser = argparse.ArgumentParser(description="Reproduz uma sessão gravada do gerenciador de tarefas e mede o desempenho.")
+    parser.add_argument("sessao", help="arquivo de sessão gravado com GERENCIADOR_GRAVAR_SESSAO")
+    origem = parser.add_mutually_exclusive_group()
+    origem.add_argument("--dados", help="arquivo de dados usado na reprodução (padrão: dados_tarefas.json); não é alterado")
+    origem.add_argument("--tarefas", type=int, help="reproduz sobre dados sintéticos com esta quantidade de tarefas")
+    parser.add_argument("--sem-salvamento-automatico", action="store_true",
+                        help="grava o arquivo só ao final, em vez de a cada ação")
+    parser.add_argument("--sem-mapear-ids", action="store_true",
+                        help="não troca os IDs que não existem nos dados da reprodução")
+    parser.add_argument("--respeitar-intervalos", action="store_true",
+                        help="espera entre as chamadas o mesmo tempo da sessão original")
+    parser.add_argument("--saida", default="reproducao.json", help="arquivo JSON do relatório (padrão: reproducao.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        # As mensagens da persistência e das operações não interessam ao relatório
+        with contextlib.redirect_stdout(io.StringIO()):
+            caminho_dados, num_tarefas = _preparar_dados(diretorio, args.dados, args.tarefas)
+            relatorio = reproduzir(args.sessao, caminho_dados,
+                                   salvar_automaticamente=not args.sem_salvamento_automatico,
+                                   mapear_ids=not args.sem_mapear_ids,
+                                   respeitar_intervalos=args.respeitar_intervalos)
+    relatorio["num_tarefas_inicial"] = num_tarefas
+    relatorio["salvamento_automatico"] = not args.sem_salvamento_automatico
+
+    print(f"{relatorio['num_chamadas']} chamadas em {relatorio['segundos_total']:.2f} s "
+          f"({relatorio['chamadas_por_segundo']:.1f} chamadas/s), {relatorio['num_erros']} erros, "
+          f"{num_tarefas} tarefas")
+    print(f"\n{'operação':<32} {'chamadas':>9} {'mediana (ms)':>13} {'p95 (ms)':>10} {'p99 (ms)':>10} {'máx (ms)':>10}")
+    for nome, medidas in relatorio["operacoes"].items():
+        print(f"{nome:<32} {medidas['contagem']:>9} {medidas['segundos_mediana'] * 1000:>13.2f} "
+              f"{medidas['segundos_p95'] * 1000:>10.2f} {medidas['segundos_p99'] * 1000:>10.2f} "
+              f"{medidas['segundos_max'] * 1000:>10.2f}")
+    print(f"\nSoma de verificação do estado final: {relatorio['soma_verificacao']}")
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=4, ensure_ascii=False)
+    print(f"Relatório salvo em {args.saida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
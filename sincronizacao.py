@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import sys
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Chave, nos relógios de um objeto, do carimbo da sua criação
+CRIACAO = "*"
+# Carimbo implícito dos dados de antes de a sincronização ser ligada
+CARIMBO_BASE = [0, ""]
+# Identificador da lista "Geral" recriada quando uma sincronização remove todas as
+# listas. É o mesmo em todas as réplicas, para que elas recriem a mesma lista.
+UID_LISTA_PADRAO = "geral"
+
+# Campos sincronizados de cada tipo de objeto. Cada campo é mesclado separadamente,
+# então edições simultâneas de campos diferentes da mesma tarefa são preservadas.
+CAMPOS_TAREFA = ("titulo", "lista_id", "concluida", "data_termino", "prioridade", "tags", "notas",
+                 "repeticao", "inicio_serie", "conclusoes", "puladas", "data_conclusao", "pai_id")
+CAMPOS_LISTA = ("nome",)
+
+VERSAO_DELTA = 1
+
+
+def nova_replica() -> str:
+    """Gera o identificador de uma nova réplica."""
+
+    return uuid.uuid4().hex[:12]
+
+
+def uid_de(objeto: Any) -> str:
+    """Retorna o identificador de uma tarefa ou lista entre réplicas (o ID, nos objetos antigos)."""
+
+    return objeto.uid or str(objeto.id)
+
+
+def carimbo_de(objeto: Any, campo: str) -> List:
+    """Retorna o carimbo da última alteração de um campo (ou da criação do objeto)."""
+
+    relogios = objeto.relogios
+    return relogios.get(campo) or relogios.get(CRIACAO) or CARIMBO_BASE
+
+
+def eh_novo(carimbo: List, vistos: Dict[str, int]) -> bool:
+    """Indica se uma réplica com o vetor `vistos` ainda não recebeu a alteração do carimbo."""
+
+    return carimbo[0] > vistos.get(carimbo[1], 0)
+
+
+def registro_delta(objeto: Any, para_delta: Callable[[Any], Dict[str, Any]], campos: Tuple[str, ...],
+                   vistos: Dict[str, int], completo: bool) -> Optional[Dict[str, Any]]:
+    """
+    Monta o registro de um objeto para o delta: só os campos que a outra réplica não viu.
+
+    Um objeto que a outra réplica não conhece (criado ou recriado depois do que ela viu)
+    vai completo, com o ID e o carimbo da criação. Retorna None se não houver nada novo,
+    sem converter o objeto: o custo de um objeto sem alterações é só olhar os seus carimbos.
+
+    Args:
+        objeto: A tarefa ou lista.
+        para_delta (Callable): Converte o objeto no formato do delta (como em `to_dict`).
+        campos (Tuple[str, ...]): Os campos sincronizados do tipo do objeto.
+        vistos (Dict[str, int]): O vetor de relógios da outra réplica.
+        completo (bool): Se True, envia o objeto completo mesmo que a outra réplica já o tenha.
+    """
+
+    if not completo and not any(eh_novo(carimbo, vistos) for carimbo in objeto.relogios.values()):
+        return None
+
+    criacao = objeto.relogios.get(CRIACAO, CARIMBO_BASE)
+    completo = completo or eh_novo(criacao, vistos)
+    dados = para_delta(objeto)
+    enviados = {}
+    for campo in campos:
+        carimbo = carimbo_de(objeto, campo)
+        if completo or eh_novo(carimbo, vistos):
+            enviados[campo] = [dados[campo], carimbo]
+
+    registro = {"uid": uid_de(objeto), "campos": enviados}
+    if completo:
+        registro["id"] = objeto.id
+        registro["criacao"] = criacao
+    return registro
+
+
+def renovar_criacao(relogios: Dict[str, List], campos: Tuple[str, ...], carimbo: List) -> Dict[str, List]:
+    """
+    Retorna os relógios de um objeto com um novo carimbo de criação (ao voltar a existir).
+
+    Os campos sem carimbo próprio valem pelo carimbo da criação, então recebem o antigo
+    antes da troca: voltar a existir não torna os valores antigos mais recentes.
+    """
+
+    anterior = relogios.get(CRIACAO, CARIMBO_BASE)
+    return {**{campo: anterior for campo in campos}, **relogios, CRIACAO: carimbo}
+
+
+def relogios_do_registro(registro: Dict[str, Any], carimbar: Callable[[], List]) -> Dict[str, List]:
+    """
+    Retorna os relógios de um objeto recebido completo.
+
+    Um objeto de antes da sincronização, que esta réplica não tinha, recebe aqui um
+    carimbo de criação, para que ela o repasse às réplicas que também não o têm.
+    """
+
+    relogios = {campo: carimbo for campo, (_, carimbo) in registro["campos"].items()}
+    relogios[CRIACAO] = carimbar() if registro["criacao"] == CARIMBO_BASE else registro["criacao"]
+    return relogios
+
+
+def deve_criar(registro: Dict[str, Any], lapide: Optional[List]) -> bool:
+    """
+    Indica se um objeto recebido que não existe aqui deve ser criado.
+
+    Só objetos recebidos completos podem ser criados, e a lápide de uma remoção vence
+    todas as alterações feitas no objeto antes de ele ser recriado.
+    """
+
+    return "criacao" in registro and (lapide is None or registro["criacao"] > lapide)
+
+
+def vence(valor_recebido: Any, carimbo_recebido: List, valor_local: Any, carimbo_local: List) -> bool:
+    """
+    Decide se o valor recebido substitui o local: vence o carimbo maior (última escrita).
+
+    A decisão é a mesma nas duas réplicas. Carimbos iguais com valores diferentes só
+    acontecem com dados alterados antes de a sincronização ser ligada; nesse caso vence
+    o maior valor em JSON, só para que as duas réplicas terminem iguais.
+    """
+
+    if carimbo_recebido != carimbo_local:
+        return carimbo_recebido > carimbo_local
+    return json.dumps(valor_recebido, sort_keys=True) > json.dumps(valor_local, sort_keys=True)
+
+
+def mesclar(objeto: Any, dados: Dict[str, Any], registro: Dict[str, Any],
+            carimbar: Callable[[], List]) -> Tuple[Dict[str, Any], Dict[str, List]]:
+    """
+    Mescla um registro recebido com um objeto local, campo a campo.
+
+    Args:
+        objeto: A tarefa ou lista local.
+        dados (Dict[str, Any]): O objeto local no formato do delta (como em `to_dict`).
+        registro (Dict[str, Any]): O registro recebido.
+        carimbar (Callable[[], List]): Gera um carimbo local. Um conflito entre valores
+            sem carimbo (de antes da sincronização) é resolvido com um carimbo novo, para
+            que o valor escolhido chegue também às réplicas que ainda não o viram.
+
+    Returns:
+        Os campos em que o valor recebido venceu (no formato do delta) e os novos relógios
+        do objeto. Os dois ficam vazios se nada mudou.
+    """
+
+    vencedores = {}
+    relogios = dict(objeto.relogios)
+    for campo, (valor, carimbo) in registro["campos"].items():
+        carimbo_local = carimbo_de(objeto, campo)
+        conflito_base = carimbo == carimbo_local == CARIMBO_BASE and valor != dados[campo]
+        if vence(valor, carimbo, dados[campo], carimbo_local):
+            vencedores[campo] = valor
+            relogios[campo] = carimbar() if conflito_base else carimbo
+        elif conflito_base:
+            relogios[campo] = carimbar()
+
+    criacao = registro.get("criacao")
+    if criacao and criacao > objeto.relogios.get(CRIACAO, CARIMBO_BASE):
+        # Só os registros completos trazem a criação, e eles trazem todos os campos
+        relogios = renovar_criacao(relogios, tuple(registro["campos"]), criacao)
+    if not vencedores and relogios == objeto.relogios:
+        return {}, {}
+    return vencedores, relogios
+
+
+def _caminho_dados(caminho: str) -> str:
+    """Aceita o arquivo de dados ou o diretório que o contém."""
+
+    import persistence
+
+    if os.path.isdir(caminho):
+        return os.path.join(caminho, persistence.DATA_FILE)
+    return caminho
+
+
+def sincronizar(caminho_a: str, caminho_b: str) -> Dict[str, Any]:
+    """
+    Sincroniza duas réplicas dos dados, cada uma em um arquivo ou diretório local.
+
+    Cada réplica envia à outra apenas o que ela ainda não viu, então os bytes
+    transferidos acompanham o volume de alterações, e não o tamanho dos dados. Ao final,
+    as duas réplicas ficam com o mesmo conteúdo.
+
+    Returns:
+        Dict[str, Any]: Os bytes de cada delta e o resultado da aplicação em cada réplica.
+    """
+
+    # Importado aqui para evitar uma importação circular com o gerenciador
+    from manager import TaskManager
+
+    gerenciador_a = TaskManager(_caminho_dados(caminho_a))
+    gerenciador_b = TaskManager(_caminho_dados(caminho_b))
+    gerenciador_a.habilitar_sincronizacao()
+    gerenciador_b.habilitar_sincronizacao()
+
+    # Os dois deltas são calculados antes de qualquer um ser aplicado. Eles passam por
+    # JSON, como passariam se as réplicas estivessem em máquinas diferentes.
+    delta_ab = json.dumps(gerenciador_a.gerar_delta(gerenciador_b.get_vistos()), ensure_ascii=False)
+    delta_ba = json.dumps(gerenciador_b.gerar_delta(gerenciador_a.get_vistos()), ensure_ascii=False)
+
+    return {
+        "bytes_a_para_b": len(delta_ab.encode("utf-8")),
+        "bytes_b_para_a": len(delta_ba.encode("utf-8")),
+        "aplicado_em_b": gerenciador_b.aplicar_delta(json.loads(delta_ab)),
+        "aplicado_em_a": gerenciador_a.aplicar_delta(json.loads(delta_ba))
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    """Sincroniza duas réplicas pela linha de comando."""
+
+    parser = argparse.ArgumentParser(description="Sincroniza duas réplicas dos dados do gerenciador de tarefas.")
+    parser.add_argument("replica_a", help="Arquivo de dados, ou diretório com o dados_tarefas.json, da primeira réplica.")
+    parser.add_argument("replica_b", help="Arquivo de dados, ou diretório com o dados_tarefas.json, da segunda réplica.")
+    args = parser.parse_args(argv)
+
+    try:
+        resultado = sincronizar(args.replica_a, args.replica_b)
+    except ValueError as erro:
+        print(f"Erro: {erro}")
+        return 1
+    print(f"Enviado de A para B: {resultado['bytes_a_para_b']} bytes")
+    print(f"Enviado de B para A: {resultado['bytes_b_para_a']} bytes")
+    for nome, chave in (("A", "aplicado_em_a"), ("B", "aplicado_em_b")):
+        aplicado = resultado[chave]
+        print(f"Réplica {nome}: {aplicado['criadas']} criadas, {aplicado['alteradas']} alteradas, "
+              f"{aplicado['removidas']} removidas, {aplicado['ignoradas']} ignoradas")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
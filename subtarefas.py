@@ -0,0 +1,118 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+from models import Tarefa
+
+
+class ArvoreTarefas:
+    """
+    Índice da hierarquia de tarefas e subtarefas (pelo `pai_id` de cada tarefa).
+
+    Guarda os filhos de cada tarefa, em ordem de ID, e o progresso de cada uma: quantas
+    das suas subtarefas, em qualquer nível, estão concluídas. O progresso é mantido a
+    cada tarefa indexada ou desindexada, subindo só pelos ancestrais dela, então
+    consultá-lo não percorre as subtarefas. Listar os filhos ou os descendentes custa o
+    tamanho da resposta.
+
+    Uma tarefa cujo pai não está indexado (ex: um pai que não existe mais) é tratada
+    como uma tarefa principal.
+    """
+
+    def __init__(self):
+        """Inicializa o índice vazio."""
+
+        # Pai e conclusão de cada tarefa indexada
+        self._nos: Dict[int, Tuple[Optional[int], bool]] = {}
+        # IDs dos filhos de cada tarefa, em ordem
+        self._filhos: Dict[int, List[int]] = {}
+        # [concluídas, total] das subtarefas de cada tarefa, em qualquer nível. Uma tarefa
+        # desindexada mantém o seu enquanto nenhum filho muda, para que alterá-la (que a
+        # desindexa e indexa de novo) não precise recontar os filhos.
+        self._progresso: Dict[int, List[int]] = {}
+
+    def _contribuicao(self, tarefa_id: int, concluida: bool) -> Tuple[int, int]:
+        """Quanto uma tarefa soma ao progresso dos ancestrais: ela mesma e as suas subtarefas."""
+
+        concluidas, total = self._progresso.get(tarefa_id, (0, 0))
+        return concluidas + concluida, total + 1
+
+    def _propagar(self, pai_id: Optional[int], concluidas: int, total: int):
+        """Soma uma contribuição ao progresso do pai e dos ancestrais indexados dele."""
+
+        while pai_id is not None:
+            no = self._nos.get(pai_id)
+            if no is None:
+                # O pai está fora do índice (no meio de uma alteração ou de uma remoção):
+                # o progresso dele será recontado a partir dos filhos se ele voltar
+                self._progresso.pop(pai_id, None)
+                return
+            progresso = self._progresso.setdefault(pai_id, [0, 0])
+            progresso[0] += concluidas
+            progresso[1] += total
+            pai_id = no[0]
+
+    def adicionar(self, tarefa: Tarefa):
+        """Registra uma tarefa nova ou recém-alterada."""
+
+        if tarefa.id not in self._progresso and tarefa.id in self._filhos:
+            # Os filhos foram indexados antes dela (ex: ao desfazer uma remoção)
+            progresso = [0, 0]
+            for filho_id in self._filhos[tarefa.id]:
+                concluidas, total = self._contribuicao(filho_id, self._nos[filho_id][1])
+                progresso[0] += concluidas
+                progresso[1] += total
+            self._progresso[tarefa.id] = progresso
+
+        self._nos[tarefa.id] = (tarefa.pai_id, tarefa.concluida)
+        if tarefa.pai_id is not None:
+            insort(self._filhos.setdefault(tarefa.pai_id, []), tarefa.id)
+            self._propagar(tarefa.pai_id, *self._contribuicao(tarefa.id, tarefa.concluida))
+
+    def remover(self, tarefa: Tarefa):
+        """Retira uma tarefa, antes de ela ser alterada ou removida."""
+
+        pai_id, concluida = self._nos.pop(tarefa.id)
+        if pai_id is not None:
+            irmaos = self._filhos[pai_id]
+            del irmaos[bisect_left(irmaos, tarefa.id)]
+            if not irmaos:
+                del self._filhos[pai_id]
+            concluidas, total = self._contribuicao(tarefa.id, concluida)
+            self._propagar(pai_id, -concluidas, -total)
+        if self._progresso.get(tarefa.id, (0, 0))[1] == 0:
+            self._progresso.pop(tarefa.id, None)
+
+    def pai(self, tarefa_id: int) -> Optional[int]:
+        """Retorna o ID do pai de uma tarefa, ou None se ela for uma tarefa principal."""
+
+        no = self._nos.get(tarefa_id)
+        if no is None or no[0] not in self._nos:
+            return None
+        return no[0]
+
+    def filhos(self, tarefa_id: int) -> List[int]:
+        """Retorna os IDs das subtarefas diretas de uma tarefa, em ordem de ID."""
+
+        return list(self._filhos.get(tarefa_id, ()))
+
+    def descendentes(self, tarefa_id: int) -> Iterator[int]:
+        """Percorre os IDs das subtarefas de uma tarefa, em todos os níveis (cada pai antes dos filhos)."""
+
+        pilha = list(reversed(self._filhos.get(tarefa_id, ())))
+        while pilha:
+            filho_id = pilha.pop()
+            yield filho_id
+            pilha.extend(reversed(self._filhos.get(filho_id, ())))
+
+    def ancestrais(self, tarefa_id: int) -> Iterator[int]:
+        """Percorre os IDs dos ancestrais indexados de uma tarefa, do pai até a tarefa principal."""
+
+        pai_id = self.pai(tarefa_id)
+        while pai_id is not None:
+            yield pai_id
+            pai_id = self.pai(pai_id)
+
+    def progresso(self, tarefa_id: int) -> Tuple[int, int]:
+        """Retorna quantas subtarefas de uma tarefa, em qualquer nível, estão concluídas e o total delas."""
+
+        concluidas, total = self._progresso.get(tarefa_id, (0, 0))
+        return concluidas, total
@@ -0,0 +1,141 @@
+from datetime import date
+
+import pytest
+
+from manager import TaskManager
+
+
+class Falha(Exception):
+    pass
+
+
+def estado(gerenciador: TaskManager):
+    return ([lista.to_dict() for lista in gerenciador.get_todas_listas()],
+            [tarefa.to_dict() for tarefa in gerenciador.get_todas_tarefas()],
+            gerenciador.get_contadores(), gerenciador.get_contagem_tags())
+
+
+def falhar_na_chamada(gerenciador: TaskManager, nome: str, numero: int):
+    """Faz o método do gerenciador lançar `Falha` na chamada de número `numero`."""
+
+    original = getattr(gerenciador, nome)
+    chamadas = []
+
+    def substituto(*args, **kwargs):
+        chamadas.append(args)
+        if len(chamadas) == numero:
+            raise Falha()
+        return original(*args, **kwargs)
+
+    setattr(gerenciador, nome, substituto)
+
+
+@pytest.fixture
+def gerenciador(tmp_path):
+    gerenciador = TaskManager(str(tmp_path / "dados.json"))
+    casa = gerenciador.adicionar_lista("Casa")
+    for numero in range(1, 6):
+        gerenciador.adicionar_tarefa({"titulo": f"Tarefa {numero}", "lista_id": casa.id, "tags": ["casa"]})
+    gerenciador.adicionar_tarefa({"titulo": "Subtarefa", "pai_id": 2})
+    gerenciador.adicionar_tarefa({"titulo": "Semanal", "lista_id": 1, "data_termino": date(2024, 5, 1), "repeticao": "semanal"})
+    return gerenciador
+
+
+@pytest.mark.parametrize("acao, metodo, numero", [
+    (lambda g: g.concluir_tarefas([1, 2, 3, 7]), "_concluir_com_subtarefas", 3),
+    (lambda g: g.remover_lista(2), "_remover_listas_onde", 1),
+    (lambda g: g.editar_tarefas([1, 2, 3], {"titulo": "Editada", "tags": ["nova"]}), "_aplicar_campos", 2),
+], ids=["concluir", "remover_lista", "editar"])
+def test_acao_interrompida_e_revertida(gerenciador, acao, metodo, numero):
+    antes = estado(gerenciador)
+    versao = gerenciador.get_versao()
+    cursor = gerenciador.get_cursor_eventos()
+    arquivo = open(gerenciador.get_caminho(), "rb").read()
+    falhar_na_chamada(gerenciador, metodo, numero)
+
+    with pytest.raises(Falha):
+        acao(gerenciador)
+
+    assert estado(gerenciador) == antes
+    assert gerenciador.get_versao() is versao
+    assert gerenciador.get_cursor_eventos() == cursor
+    assert open(gerenciador.get_caminho(), "rb").read() == arquivo
+    # A última ação registrada continua sendo a de antes da falha
+    assert gerenciador.desfazer() == "adicionar a tarefa 'Semanal'"
+    assert gerenciador.refazer() == "adicionar a tarefa 'Semanal'"
+
+
+def test_acao_seguinte_a_uma_falha_funciona(gerenciador):
+    falhar_na_chamada(gerenciador, "_concluir_com_subtarefas", 2)
+    with pytest.raises(Falha):
+        gerenciador.concluir_tarefas([1, 2])
+
+    gerenciador.concluir_tarefas([2])
+    assert [tarefa.concluida for tarefa in gerenciador.get_todas_tarefas()][:6] == [False, True, False, False, False, True]
+    assert TaskManager(gerenciador.get_caminho()).get_contadores() == gerenciador.get_contadores()
+    assert gerenciador.desfazer() == "concluir 1 tarefas"
+    assert gerenciador.get_contadores()["concluidas"] == 0
+
+
+@pytest.fixture
+def replicas(gerenciador, tmp_path):
+    """O gerenciador como réplica, já sincronizado com outra, com uma lápide de cada tipo."""
+
+    gerenciador.habilitar_sincronizacao()
+    gerenciador.adicionar_lista("Temporária")
+    gerenciador.remover_lista(3)
+    gerenciador.remover_tarefa(5)
+    outra = TaskManager(str(tmp_path / "outra.json"))
+    outra.habilitar_sincronizacao()
+    outra.aplicar_delta(gerenciador.gerar_delta(outra.get_vistos()))
+    gerenciador.aplicar_delta(outra.gerar_delta(gerenciador.get_vistos()))
+    return gerenciador, outra
+
+
+def sincronizacao_de(gerenciador: TaskManager, outra: TaskManager):
+    return (gerenciador.gerar_delta({}), gerenciador.gerar_delta(outra.get_vistos()), gerenciador.get_vistos(),
+            [tarefa.relogios for tarefa in gerenciador.get_todas_tarefas()],
+            [lista.relogios for lista in gerenciador.get_todas_listas()])
+
+
+@pytest.mark.parametrize("acao, metodo, numero", [
+    (lambda g: g.concluir_tarefas([1, 2, 3, 7]), "_concluir_com_subtarefas", 3),
+    (lambda g: g.remover_lista(2), "_remover_listas_onde", 1),
+    (lambda g: g.editar_tarefas([1, 2, 3], {"titulo": "Editada", "tags": ["nova"]}), "_aplicar_campos", 2),
+], ids=["concluir", "remover_lista", "editar"])
+def test_acao_interrompida_nao_chega_a_outra_replica(replicas, acao, metodo, numero):
+    gerenciador, outra = replicas
+    antes = estado(gerenciador)
+    sincronizacao = sincronizacao_de(gerenciador, outra)
+    assert not gerenciador.gerar_delta(outra.get_vistos())["tarefas"]
+    falhar_na_chamada(gerenciador, metodo, numero)
+
+    with pytest.raises(Falha):
+        acao(gerenciador)
+
+    # Nem carimbos novos, nem lápides, nem o relógio avançado: o próximo delta é o mesmo
+    assert estado(gerenciador) == antes
+    assert sincronizacao_de(gerenciador, outra) == sincronizacao
+    assert outra.aplicar_delta(gerenciador.gerar_delta(outra.get_vistos()))["alteradas"] == 0
+
+
+def test_delta_interrompido_e_revertido(replicas):
+    gerenciador, outra = replicas
+    outra.editar_tarefa(1, {"titulo": "Editada na outra"})
+    outra.remover_tarefa(2)
+    antes = estado(gerenciador)
+    sincronizacao = sincronizacao_de(gerenciador, outra)
+    delta = outra.gerar_delta(gerenciador.get_vistos())
+    falhar_na_chamada(gerenciador, "_aplicar_lapides_recebidas", 1)
+
+    with pytest.raises(Falha):
+        gerenciador.aplicar_delta(delta)
+
+    assert estado(gerenciador) == antes
+    assert sincronizacao_de(gerenciador, outra) == sincronizacao
+
+    # O mesmo delta, aplicado de novo, chega inteiro
+    del gerenciador._aplicar_lapides_recebidas
+    gerenciador.aplicar_delta(delta)
+    assert gerenciador.buscar_tarefa_por_id(1).titulo == "Editada na outra"
+    assert gerenciador.buscar_tarefa_por_id(2) is None
@@ -0,0 +1,108 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import lembretes
+from manager import TaskManager
+
+HOJE = date.today()
+
+
+@pytest.fixture
+def gerenciador(tmp_path):
+    gerenciador = TaskManager(str(tmp_path / "dados.json"))
+    gerenciador.adicionar_lista("Casa")
+    return gerenciador
+
+
+def novo_agendador(gerenciador, disparadas=None):
+    disparadas = [] if disparadas is None else disparadas
+    return lembretes.AgendadorLembretes(gerenciador, ao_disparar=lambda tarefa: disparadas.append(tarefa.id),
+                                        caminho_estado=lembretes.caminho_para(gerenciador.get_caminho()))
+
+
+def disparar(agendador, agora=None):
+    return [tarefa.id for tarefa in agendador.retirar_vencidos(agora or datetime.now())]
+
+
+def test_agenda_a_partir_dos_eventos(gerenciador):
+    agendador = novo_agendador(gerenciador)
+    tarefa = gerenciador.adicionar_tarefa({"titulo": "Conta", "lista_id": 1, "data_termino": HOJE + timedelta(days=10)})
+    assert agendador.proximo_disparo() == datetime.combine(HOJE + timedelta(days=9), lembretes.HORA_PADRAO)
+
+    gerenciador.editar_tarefa(tarefa.id, {"data_termino": HOJE + timedelta(days=3)})
+    assert agendador.proximo_disparo() == datetime.combine(HOJE + timedelta(days=2), lembretes.HORA_PADRAO)
+
+    gerenciador.concluir_tarefa(tarefa.id)
+    assert agendador.proximo_disparo() is None
+    gerenciador.desfazer()
+    assert len(agendador) == 1
+    gerenciador.remover_tarefa(tarefa.id)
+    assert len(agendador) == 0
+
+
+def test_so_o_estado_final_de_cada_acao_e_agendado(gerenciador):
+    agendador = novo_agendador(gerenciador)
+    pai = gerenciador.adicionar_tarefa({"titulo": "Mudança", "lista_id": 1, "data_termino": HOJE + timedelta(days=5)})
+    for numero in range(3):
+        gerenciador.adicionar_tarefa({"titulo": f"Caixa {numero}", "pai_id": pai.id, "data_termino": HOJE + timedelta(days=5)})
+    serie = gerenciador.adicionar_tarefa({"titulo": "Lixo", "lista_id": 1, "data_termino": HOJE, "repeticao": "semanal"})
+    agendadas = []
+    original = agendador.adicionar
+    agendador.adicionar = lambda tarefa: (agendadas.append((tarefa.id, tarefa.data_termino, tarefa.lista_id)), original(tarefa))
+
+    # Mover a tarefa principal leva as subtarefas junto, uma alteração por vez
+    gerenciador.editar_tarefa(pai.id, {"lista_id": 2, "data_termino": HOJE + timedelta(days=6)})
+    assert sorted(agendadas) == [(pai.id, HOJE + timedelta(days=6), 2)] + [
+        (subtarefa.id, HOJE + timedelta(days=5), 2) for subtarefa in gerenciador.get_subtarefas(pai.id)]
+
+    agendadas.clear()
+    gerenciador.concluir_tarefa(serie.id)
+    assert agendadas == [(serie.id, HOJE + timedelta(days=7), 1)]
+
+
+def test_remocao_da_lista_cancela_os_lembretes_das_tarefas(gerenciador):
+    agendador = novo_agendador(gerenciador)
+    for numero in range(3):
+        gerenciador.adicionar_tarefa({"titulo": f"T{numero}", "lista_id": 2, "data_termino": HOJE + timedelta(days=4)})
+    assert len(agendador) == 3
+    gerenciador.remover_lista(2)
+    assert len(agendador) == 0 and agendador.proximo_disparo() is None
+
+
+def test_tarefa_lembrada_nao_e_lembrada_de_novo_ao_reabrir(gerenciador):
+    atrasada = gerenciador.adicionar_tarefa({"titulo": "Atrasada", "lista_id": 1, "data_termino": HOJE - timedelta(days=2)})
+    outra = gerenciador.adicionar_tarefa({"titulo": "Outra", "lista_id": 1, "data_termino": HOJE - timedelta(days=1)})
+    assert sorted(disparar(novo_agendador(gerenciador))) == [atrasada.id, outra.id]
+
+    # Ao reabrir o programa, nada é lembrado de novo
+    reaberto = TaskManager(gerenciador.get_caminho())
+    agendador = novo_agendador(reaberto)
+    assert disparar(agendador) == []
+
+    # Uma nova data volta a ser lembrada
+    reaberto.editar_tarefa(outra.id, {"data_termino": HOJE - timedelta(days=3)})
+    assert disparar(agendador) == [outra.id]
+
+
+def test_conclusao_e_remocao_esquecem_a_tarefa_lembrada(gerenciador):
+    atrasada = gerenciador.adicionar_tarefa({"titulo": "Atrasada", "lista_id": 1, "data_termino": HOJE - timedelta(days=2)})
+    removida = gerenciador.adicionar_tarefa({"titulo": "Removida", "lista_id": 1, "data_termino": HOJE - timedelta(days=2)})
+    agendador = novo_agendador(gerenciador)
+    assert sorted(disparar(agendador)) == [atrasada.id, removida.id]
+
+    gerenciador.concluir_tarefa(atrasada.id)
+    gerenciador.remover_tarefa(removida.id)
+    assert agendador._lembradas == {}
+    assert novo_agendador(TaskManager(gerenciador.get_caminho()))._lembradas == {}
+
+    # Reaberta, a tarefa volta a ser lembrada
+    gerenciador.desmarcar_tarefa(atrasada.id)
+    assert disparar(agendador) == [atrasada.id]
+
+
+def test_arquivo_de_estado_ilegivel_e_ignorado(gerenciador):
+    gerenciador.adicionar_tarefa({"titulo": "Atrasada", "lista_id": 1, "data_termino": HOJE - timedelta(days=2)})
+    with open(lembretes.caminho_para(gerenciador.get_caminho()), "w") as f:
+        f.write("{não é json")
+    assert len(disparar(novo_agendador(gerenciador))) == 1
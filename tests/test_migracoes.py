@@ -0,0 +1,163 @@
+import copy
+import gzip
+import json
+import os
+
+import pytest
+
+import migracoes
+import persistence
+
+# Um arquivo da versão 1 do esquema: sem o número da versão, sem soma de verificação e
+# com os campos opcionais ausentes ou nulos, como o programa gravava
+LISTAS_V1 = [{"id": 1, "nome": "Geral"}, {"id": 2, "nome": "Casa"}]
+TAREFAS_V1 = [
+    {"id": 1, "titulo": "Relatório", "lista_id": 1, "concluida": False, "data_termino": "2024-05-01",
+     "prioridade": "alta", "tags": ["trabalho"], "notas": "capítulo 2", "repeticao": "nunca"},
+    {"id": 2, "titulo": "Lavar a louça", "lista_id": 2},
+    {"id": 3, "titulo": "Feira", "lista_id": 2, "concluida": True, "data_termino": "2024-05-03",
+     "prioridade": None, "tags": None, "notas": None, "repeticao": "semanal"},
+]
+
+
+def escrever_v1(caminho):
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({"listas": LISTAS_V1, "tarefas": TAREFAS_V1}, f, indent=4)
+
+
+def escrever_snapshot_v1(caminho):
+    with gzip.open(caminho, "wt", encoding="utf-8") as f:
+        f.write(json.dumps({"snapshot": persistence.VERSAO_SNAPSHOT, "metadados": {}}) + "\n")
+        for lista in LISTAS_V1:
+            f.write(json.dumps({"lista": lista}) + "\n")
+        for tarefa in TAREFAS_V1:
+            f.write(json.dumps({"tarefa": tarefa}) + "\n")
+
+
+@pytest.fixture(params=["json", "gz"])
+def arquivo_v1(request, tmp_path):
+    if request.param == "json":
+        caminho = tmp_path / "dados.json"
+        escrever_v1(caminho)
+    else:
+        caminho = tmp_path / "dados.json.gz"
+        escrever_snapshot_v1(caminho)
+    return str(caminho)
+
+
+def como_dicionarios(dados):
+    listas, tarefas, metadados = dados
+    return [lista.to_dict() for lista in listas], [tarefa.to_dict() for tarefa in tarefas], metadados
+
+
+def registros(caminho):
+    with persistence.abrir_registros(caminho) as (versao, codec, itens):
+        return versao, codec, list(itens)
+
+
+def test_passos_cobrem_todas_as_versoes():
+    passos = migracoes.passos_entre(migracoes.ESQUEMA_SEM_VERSAO)
+    assert [passo.origem for passo in passos] == list(range(migracoes.ESQUEMA_SEM_VERSAO, migracoes.VERSAO_ESQUEMA))
+    assert migracoes.passos_entre(migracoes.VERSAO_ESQUEMA) == []
+
+
+def test_versao_mais_nova_nao_e_suportada(tmp_path):
+    with pytest.raises(migracoes.EsquemaNaoSuportado):
+        migracoes.passos_entre(migracoes.VERSAO_ESQUEMA + 1)
+    with pytest.raises(migracoes.EsquemaNaoSuportado):
+        migracoes.passos_entre(0)
+
+    # O arquivo de uma versão mais nova não é aberto nem migrado, e fica como estava
+    caminho = tmp_path / "dados.json"
+    caminho.write_text(json.dumps({"esquema": migracoes.VERSAO_ESQUEMA + 1, "listas": LISTAS_V1, "tarefas": []}))
+    conteudo = caminho.read_bytes()
+    with pytest.raises(migracoes.EsquemaNaoSuportado):
+        persistence.carregar_dados(str(caminho))
+    with pytest.raises(migracoes.EsquemaNaoSuportado):
+        migracoes.migrar_arquivo(str(caminho))
+    assert caminho.read_bytes() == conteudo
+
+
+@pytest.mark.parametrize("passo", migracoes.passos_entre(migracoes.ESQUEMA_SEM_VERSAO), ids=repr)
+def test_passos_nao_alteram_o_registro_recebido(passo):
+    versao_anterior = migracoes.passos_entre(migracoes.ESQUEMA_SEM_VERSAO, passo.origem)
+    exemplos = [(migracoes.TAREFA, tarefa) for tarefa in TAREFAS_V1] + [(migracoes.LISTA, lista) for lista in LISTAS_V1]
+    exemplos.append((migracoes.METADADOS, {}))
+    for tipo, dados in exemplos:
+        dados = migracoes.migrar_registro(tipo, copy.deepcopy(dados), versao_anterior)
+        original = copy.deepcopy(dados)
+        passo.aplicar(tipo, dados)
+        assert dados == original
+
+
+def test_arquivo_migrado_igual_a_migracao_ao_carregar(arquivo_v1, tmp_path):
+    carregado = como_dicionarios(persistence.carregar_dados(arquivo_v1))
+    destino = str(tmp_path / ("migrado" + os.path.splitext(arquivo_v1)[1]))
+    original = open(arquivo_v1, "rb").read()
+
+    relatorio = migracoes.migrar_arquivo(arquivo_v1, destino)
+
+    assert open(arquivo_v1, "rb").read() == original
+    assert (relatorio.origem, relatorio.destino) == (migracoes.ESQUEMA_SEM_VERSAO, migracoes.VERSAO_ESQUEMA)
+    assert relatorio.registros[migracoes.TAREFA] == len(TAREFAS_V1)
+    assert como_dicionarios(persistence.carregar_dados(destino)) == carregado
+
+    versao, codec, migrados = registros(destino)
+    _, codec_original, antigos = registros(arquivo_v1)
+    assert versao == migracoes.VERSAO_ESQUEMA
+    assert codec == codec_original
+    # Os metadados vazios não são gravados no JSON comum, como em `salvar_dados`
+    esperados = [registro for registro in migracoes.migrar_registros(antigos, migracoes.ESQUEMA_SEM_VERSAO)
+                 if registro[0] != migracoes.METADADOS or registro[1] or codec]
+    assert migrados == esperados
+
+
+def test_migrar_no_lugar_guarda_o_original_como_backup(arquivo_v1):
+    original = open(arquivo_v1, "rb").read()
+    carregado = como_dicionarios(persistence.carregar_dados(arquivo_v1))
+
+    migracoes.migrar_arquivo(arquivo_v1)
+
+    assert registros(arquivo_v1)[0] == migracoes.VERSAO_ESQUEMA
+    assert como_dicionarios(persistence.carregar_dados(arquivo_v1)) == carregado
+    assert open(persistence.caminho_backup(arquivo_v1, 1), "rb").read() == original
+    assert not os.path.exists(arquivo_v1 + ".migrando")
+
+
+def test_simulacao_nao_altera_o_arquivo(arquivo_v1, capsys):
+    diretorio = os.path.dirname(arquivo_v1)
+    arquivos = sorted(os.listdir(diretorio))
+    original = open(arquivo_v1, "rb").read()
+
+    relatorio = migracoes.migrar_arquivo(arquivo_v1, simular=True)
+    assert migracoes.main([arquivo_v1, "--simular"]) is None
+
+    assert open(arquivo_v1, "rb").read() == original
+    assert sorted(os.listdir(diretorio)) == arquivos
+    assert "Simulação: nenhum arquivo foi alterado." in capsys.readouterr().out
+    # No passo 1 só mudam as duas tarefas com campos opcionais ausentes ou nulos
+    assert relatorio.alterados(1)[migracoes.TAREFA] == 2
+    assert relatorio.campos(1)["tarefa.prioridade"] == 2
+    assert relatorio.alterados(4) == {migracoes.TAREFA: 3, migracoes.LISTA: 2}
+    assert "1 -> 2" in relatorio.resumo()
+
+
+def test_arquivo_na_versao_atual_nao_e_tocado(tmp_path):
+    caminho = str(tmp_path / "dados.json")
+    escrever_v1(caminho)
+    listas, tarefas, _ = persistence.carregar_dados(caminho)
+    assert persistence.salvar_dados(listas, tarefas, caminho=caminho, duravel=False)
+    arquivos = sorted(os.listdir(tmp_path))
+    original = open(caminho, "rb").read()
+    modificado = os.stat(caminho).st_mtime_ns
+
+    relatorio = migracoes.migrar_arquivo(caminho)
+    simulado = migracoes.migrar_arquivo(caminho, simular=True)
+
+    for resultado in (relatorio, simulado):
+        assert resultado.origem == resultado.destino == migracoes.VERSAO_ESQUEMA
+        assert not resultado.registros
+        assert resultado.resumo() == f"Os dados já estão na versão {migracoes.VERSAO_ESQUEMA} do esquema."
+    assert open(caminho, "rb").read() == original
+    assert os.stat(caminho).st_mtime_ns == modificado
+    assert sorted(os.listdir(tmp_path)) == arquivos
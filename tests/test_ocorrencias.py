@@ -0,0 +1,114 @@
+from datetime import date, timedelta
+
+import pytest
+
+import consultas
+import visoes
+from manager import TaskManager
+
+HOJE = date(2024, 5, 6)
+
+
+@pytest.fixture
+def gerenciador(tmp_path):
+    gerenciador = TaskManager(str(tmp_path / "dados.json"))
+    casa = gerenciador.adicionar_lista("Casa")
+    trabalho = gerenciador.adicionar_lista("Trabalho")
+    gerenciador.adicionar_tarefa({"titulo": "Diária", "lista_id": casa.id, "data_termino": HOJE, "repeticao": "diaria"})
+    gerenciador.adicionar_tarefa({"titulo": "Semanal", "lista_id": trabalho.id,
+                                  "data_termino": HOJE + timedelta(days=2), "repeticao": "semanal"})
+    gerenciador.adicionar_tarefa({"titulo": "Comum", "lista_id": casa.id, "data_termino": HOJE + timedelta(days=3)})
+    gerenciador.adicionar_tarefa({"titulo": "Sem data", "lista_id": casa.id})
+    return gerenciador
+
+
+def datas_de(ocorrencias, titulo):
+    return [data for tarefa, data in ocorrencias if tarefa.titulo == titulo]
+
+
+def test_filtro_dos_proximos_7_dias_lista_cada_ocorrencia(gerenciador):
+    tarefas = gerenciador.consultar_tarefas(consultas.CONTEXTO_TODAS, '3', hoje=HOJE)
+    ocorrencias = gerenciador.consultar_ocorrencias(consultas.CONTEXTO_TODAS, '3', hoje=HOJE)
+
+    # As ações em massa usam as tarefas, com cada série uma vez
+    assert [tarefa.titulo for tarefa in tarefas] == ["Diária", "Semanal", "Comum"]
+    assert datas_de(ocorrencias, "Diária") == [HOJE + timedelta(days=dias) for dias in range(8)]
+    assert datas_de(ocorrencias, "Semanal") == [HOJE + timedelta(days=2)]
+    assert datas_de(ocorrencias, "Comum") == [HOJE + timedelta(days=3)]
+    assert [data for _, data in ocorrencias] == sorted(data for _, data in ocorrencias)
+    assert {tarefa.id for tarefa, _ in ocorrencias} == {tarefa.id for tarefa in tarefas}
+
+
+def test_filtros_sem_data_e_de_hoje(gerenciador):
+    hoje = gerenciador.consultar_ocorrencias(consultas.CONTEXTO_TODAS, '2', hoje=HOJE)
+    assert [(tarefa.titulo, data) for tarefa, data in hoje] == [("Diária", HOJE)]
+
+    todas = gerenciador.consultar_ocorrencias(consultas.CONTEXTO_TODAS, '1', hoje=HOJE)
+    assert len(todas) == 4
+    assert gerenciador.consultar_ocorrencias(consultas.CONTEXTO_TODAS, '9', hoje=HOJE) is None
+
+
+def test_serie_atrasada_aparece_desde_a_data_pendente(gerenciador):
+    gerenciador.editar_tarefa(1, {"data_termino": HOJE - timedelta(days=2)})
+
+    ocorrencias = gerenciador.consultar_ocorrencias(consultas.CONTEXTO_TODAS, '2', hoje=HOJE)
+    assert datas_de(ocorrencias, "Diária") == [HOJE - timedelta(days=2), HOJE - timedelta(days=1), HOJE]
+
+
+def test_buscar_ocorrencias_em_um_intervalo(gerenciador):
+    de, ate = HOJE + timedelta(days=1), HOJE + timedelta(days=20)
+    ocorrencias = gerenciador.buscar_ocorrencias(de, ate)
+
+    assert datas_de(ocorrencias, "Diária") == [de + timedelta(days=dias) for dias in range(20)]
+    assert datas_de(ocorrencias, "Semanal") == [HOJE + timedelta(days=dias) for dias in (2, 9, 16)]
+    assert datas_de(ocorrencias, "Comum") == [HOJE + timedelta(days=3)]
+    assert datas_de(gerenciador.buscar_ocorrencias(de, ate, lista_id=3), "Diária") == []
+
+    # Concluir a série avança a próxima ocorrência, e as seguintes acompanham
+    gerenciador.concluir_tarefa(1)
+    assert datas_de(gerenciador.buscar_ocorrencias(None, HOJE + timedelta(days=2)), "Diária") == \
+        [HOJE + timedelta(days=1), HOJE + timedelta(days=2)]
+
+
+@pytest.mark.parametrize("lista_id", [None, 2, 3])
+def test_calendario_conta_as_ocorrencias(gerenciador, lista_id):
+    primeiro, ultimo = date(2024, 5, 1), date(2024, 5, 31)
+    ocorrencias = gerenciador.buscar_ocorrencias(primeiro, ultimo, lista_id)
+
+    por_dia = {}
+    for _, data in ocorrencias:
+        por_dia[data] = por_dia.get(data, 0) + 1
+    assert gerenciador.get_vencimentos_por_dia(primeiro, ultimo, lista_id) == por_dia
+    assert list(gerenciador.get_vencimentos_por_dia(primeiro, ultimo, lista_id)) == sorted(por_dia)
+    assert gerenciador.contar_vencimentos(primeiro, ultimo, lista_id) == len(ocorrencias)
+    assert gerenciador.contar_vencimentos(HOJE, HOJE + timedelta(days=6), lista_id) == \
+        len(gerenciador.buscar_ocorrencias(HOJE, HOJE + timedelta(days=6), lista_id))
+
+
+def test_calendario_das_concluidas_nao_expande(gerenciador):
+    gerenciador.concluir_tarefa(3)
+    assert gerenciador.contar_vencimentos(date(2024, 5, 1), date(2024, 5, 31), concluidas=True) == 1
+    assert gerenciador.get_vencimentos_por_dia(date(2024, 5, 1), date(2024, 5, 31), concluidas=True) == \
+        {HOJE + timedelta(days=3): 1}
+
+
+def test_visao_com_prazo_lista_cada_ocorrencia(gerenciador):
+    gerenciador.salvar_visao(visoes.VisaoSalva("Semana", status=visoes.STATUS_PENDENTES, prazo_dias=7))
+    gerenciador.salvar_visao(visoes.VisaoSalva("Casa", listas=[2]))
+
+    semana = gerenciador.abrir_visao_ocorrencias("Semana", HOJE)
+    assert len(datas_de(semana, "Diária")) == 8
+    assert len(gerenciador.abrir_visao("Semana", HOJE)) == 3
+
+    casa = gerenciador.abrir_visao_ocorrencias("Casa", HOJE)
+    assert [tarefa.titulo for tarefa, _ in casa] == [tarefa.titulo for tarefa in gerenciador.abrir_visao("Casa", HOJE)]
+    assert gerenciador.abrir_visao_ocorrencias("Não existe", HOJE) is None
+
+
+def test_acao_em_massa_age_uma_vez_sobre_a_serie(gerenciador):
+    tarefas = gerenciador.consultar_tarefas(consultas.CONTEXTO_TODAS, '3', hoje=HOJE)
+    gerenciador.concluir_tarefas([tarefa.id for tarefa in tarefas])
+
+    serie = gerenciador.buscar_tarefa_por_id(1)
+    assert serie.data_termino == HOJE + timedelta(days=1)
+    assert len(serie.conclusoes) == 1
@@ -0,0 +1,206 @@
+import json
+import shutil
+from datetime import date
+
+import pytest
+
+import consultas
+import manager
+import metricas
+import sessoes
+from manager import TaskManager
+
+
+@pytest.fixture(autouse=True)
+def restaurar_gerenciador():
+    """Devolve à classe os métodos originais, mesmo que um teste deixe invólucros nela."""
+
+    metodos = dict(vars(TaskManager))
+    yield
+    sessoes.parar()
+    metricas.desativar()
+    metricas.limpar()
+    for nome, metodo in metodos.items():
+        if vars(TaskManager).get(nome) is not metodo:
+            setattr(TaskManager, nome, metodo)
+
+
+@pytest.fixture
+def dados(tmp_path):
+    caminho = str(tmp_path / "dados.json")
+    gerenciador = TaskManager(caminho)
+    casa = gerenciador.adicionar_lista("Casa")
+    for numero in range(1, 4):
+        gerenciador.adicionar_tarefa({"titulo": f"Tarefa {numero}", "lista_id": casa.id})
+    return caminho
+
+
+def chamadas(caminho_sessao):
+    return [registro["operacao"] for registro in sessoes.ler_sessao(caminho_sessao)]
+
+
+def ligar_sessao(caminho):
+    sessoes.gravar(caminho)
+
+
+def ligar_metricas(_):
+    metricas.ativar()
+
+
+@pytest.mark.parametrize("primeiro, segundo", [(ligar_sessao, ligar_metricas), (ligar_metricas, ligar_sessao)],
+                         ids=["sessao_por_baixo", "metricas_por_baixo"])
+def test_gravacao_junto_com_metricas(dados, tmp_path, primeiro, segundo):
+    original = vars(TaskManager)["adicionar_lista"]
+    caminho_sessao = str(tmp_path / "sessao.jsonl")
+    primeiro(caminho_sessao)
+    segundo(caminho_sessao)
+
+    # Cada invólucro tem só a sua marca, e não a do que está por baixo
+    externo = vars(TaskManager)["adicionar_lista"]
+    interno = externo.__wrapped__
+    marcas = {"__sessoes_original__", "__metricas_original__"}
+    assert len(marcas & set(vars(externo))) == 1
+    assert len(marcas & set(vars(interno))) == 1
+    assert marcas & set(vars(externo)) != marcas & set(vars(interno))
+
+    TaskManager(dados).adicionar_lista("Trabalho")
+    assert chamadas(caminho_sessao) == ["adicionar_lista"]
+    assert metricas.como_dicionario()["histogramas"]["gerenciador_operacao_segundos"]["adicionar_lista"]["contagem"] == 1
+
+    # Desligar na ordem inversa deixa os métodos originais
+    desligar = {ligar_sessao: sessoes.parar, ligar_metricas: metricas.desativar}
+    desligar[segundo]()
+    desligar[primeiro]()
+    assert vars(TaskManager)["adicionar_lista"] is original
+
+
+def test_desligar_a_gravacao_por_baixo_das_metricas(dados, tmp_path):
+    caminho_sessao = str(tmp_path / "sessao.jsonl")
+    sessoes.gravar(caminho_sessao)
+    metricas.ativar()
+
+    # As métricas continuam por cima; a gravação, desligada, só repassa as chamadas
+    sessoes.parar()
+    assert "__metricas_original__" in vars(vars(TaskManager)["adicionar_lista"])
+    TaskManager(dados).adicionar_lista("Trabalho")
+    assert chamadas(caminho_sessao) == []
+    assert metricas.como_dicionario()["histogramas"]["gerenciador_operacao_segundos"]["adicionar_lista"]["contagem"] == 1
+
+    # Religar não cria um segundo invólucro de gravação
+    sessoes.gravar(caminho_sessao)
+    TaskManager(dados).adicionar_lista("Mercado")
+    assert chamadas(caminho_sessao) == ["adicionar_lista"]
+
+
+def test_chamada_com_argumento_nao_suportado(dados, tmp_path, caplog):
+    caminho_sessao = str(tmp_path / "sessao.jsonl")
+    sessoes.gravar(caminho_sessao)
+    gerenciador = TaskManager(dados)
+
+    resultado = gerenciador.consultar_tarefas(consultas.CONTEXTO_TODAS, valor=object())
+    gerenciador.adicionar_lista("Trabalho")
+
+    # A chamada acontece, mas fica fora da sessão, e as seguintes continuam gravadas
+    assert len(resultado) == 3
+    assert chamadas(caminho_sessao) == ["adicionar_lista"]
+    assert "consultar_tarefas" in caplog.text
+
+
+def test_reproducao_usa_o_dia_da_sessao(dados, tmp_path):
+    caminho_sessao = str(tmp_path / "sessao.jsonl")
+    gravacao = str(tmp_path / "gravacao.json")
+    shutil.copyfile(dados, gravacao)
+    sessoes.gravar(caminho_sessao)
+    gerenciador = TaskManager(gravacao)
+    gerenciador.concluir_tarefa(2)
+    gerenciador.adicionar_tarefa({"titulo": "Tarefa 4", "lista_id": 1})
+    sessoes.parar()
+
+    with open(caminho_sessao, encoding="utf-8") as f:
+        registros = [json.loads(linha) for linha in f]
+    assert registros[0]["data"] == date.today().isoformat()
+
+    # Uma sessão gravada em outro dia: a conclusão reproduzida tem a data dela
+    registros[0]["data"] = "2024-01-15"
+    with open(caminho_sessao, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(registro) + "\n" for registro in registros)
+
+    somas = []
+    for numero in range(2):
+        copia = str(tmp_path / f"reproducao{numero}.json")
+        shutil.copyfile(dados, copia)
+        relatorio = sessoes.reproduzir(caminho_sessao, copia, mapear_ids=False)
+        assert relatorio["num_erros"] == 0
+        somas.append(relatorio["soma_verificacao"])
+        assert TaskManager(copia).buscar_tarefa_por_id(2).data_conclusao == date(2024, 1, 15)
+
+    assert somas[0] == somas[1]
+    assert manager.date is date
+
+
+def test_operacoes_lentas_por_cima_das_metricas(dados, tmp_path, monkeypatch):
+    import operacoes_lentas
+    import persistence
+    import ui
+
+    for modulo, nome in ((persistence, "salvar_dados"), (persistence, "carregar_dados"), (ui, "imprimir_tarefas")):
+        monkeypatch.setattr(modulo, nome, getattr(modulo, nome))
+    metricas.ativar()
+    operacoes_lentas.configurar(0, caminho_log=str(tmp_path / "lentas.log"))
+    try:
+        # Desativar as métricas não leva junto o invólucro das operações lentas, que está por cima
+        monitorado = vars(TaskManager)["adicionar_lista"]
+        metricas.desativar()
+        assert vars(TaskManager)["adicionar_lista"] is monitorado
+
+        # Religar as métricas reaproveita o invólucro delas que ficou por baixo, e configurar
+        # de novo não envolve outra vez o método já monitorado
+        metricas.ativar()
+        operacoes_lentas.configurar(0, caminho_log=str(tmp_path / "lentas.log"))
+        assert vars(TaskManager)["adicionar_lista"] is monitorado
+        TaskManager(dados).adicionar_lista("Trabalho")
+        assert metricas.como_dicionario()["histogramas"]["gerenciador_operacao_segundos"]["adicionar_lista"]["contagem"] == 1
+    finally:
+        operacoes_lentas.desligar()
+        for handler in list(operacoes_lentas.logger.handlers):
+            operacoes_lentas.logger.removeHandler(handler)
+            handler.close()
+
+
+def test_reproducao_sobre_snapshot_compactado(tmp_path, monkeypatch):
+    import persistence
+
+    dados = str(tmp_path / "dados.json.gz")
+    gerenciador = TaskManager(dados)
+    for numero in range(1, 4):
+        gerenciador.adicionar_tarefa({"titulo": f"Tarefa {numero}", "lista_id": 1})
+    assert persistence.detectar_codec(dados) == "gzip"
+
+    caminho_sessao = str(tmp_path / "sessao.jsonl")
+    gravacao = str(tmp_path / "gravacao.json.gz")
+    shutil.copyfile(dados, gravacao)
+    sessoes.gravar(caminho_sessao)
+    gerenciador = TaskManager(gravacao)
+    gerenciador.concluir_tarefa(2)
+    gerenciador.adicionar_tarefa({"titulo": "Tarefa 4", "lista_id": 1})
+    sessoes.parar()
+
+    # A cópia mantém a extensão, então a reprodução grava no mesmo formato
+    diretorio = tmp_path / "reproducao"
+    diretorio.mkdir()
+    copia, num_tarefas = sessoes._preparar_dados(str(diretorio), dados, None)
+    assert copia.endswith(".json.gz")
+    assert num_tarefas == 3
+    relatorio = sessoes.reproduzir(caminho_sessao, copia)
+    assert relatorio["num_chamadas"] == 2 and relatorio["num_erros"] == 0
+    assert persistence.detectar_codec(copia) == "gzip"
+    assert len(TaskManager(copia).get_todas_tarefas()) == 4
+
+    # Pela linha de comando, com o arquivo compactado em --dados
+    saida = str(tmp_path / "relatorio.json")
+    monkeypatch.setattr("sys.argv", ["sessoes.py", caminho_sessao, "--dados", dados, "--saida", saida])
+    sessoes.main()
+    with open(saida, encoding="utf-8") as f:
+        relatorio = json.load(f)
+    assert relatorio["num_tarefas_inicial"] == 3
+    assert relatorio["num_erros"] == 0
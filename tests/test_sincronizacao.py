@@ -0,0 +1,212 @@
+import shutil
+
+import pytest
+
+import sincronizacao
+from manager import TaskManager
+
+
+def estado(gerenciador: TaskManager):
+    """Retorna as listas e tarefas de uma réplica pelos identificadores entre réplicas, sem os IDs locais."""
+
+    uids_listas = {lista.id: sincronizacao.uid_de(lista) for lista in gerenciador.get_todas_listas()}
+    listas = {uid: gerenciador.buscar_lista_por_id(lista_id).nome for lista_id, uid in uids_listas.items()}
+    tarefas = {}
+    for tarefa in gerenciador.get_todas_tarefas():
+        dados = tarefa.to_dict()
+        for chave in ("id", "uid", "relogios"):
+            del dados[chave]
+        dados["lista_id"] = uids_listas[tarefa.lista_id]
+        if tarefa.pai_id is not None:
+            dados["pai_id"] = sincronizacao.uid_de(gerenciador.buscar_tarefa_por_id(tarefa.pai_id))
+        tarefas[sincronizacao.uid_de(tarefa)] = dados
+    return listas, tarefas
+
+
+def enviar(origem: TaskManager, destino: TaskManager):
+    """Aplica no destino o que ele ainda não recebeu da origem."""
+
+    return destino.aplicar_delta(origem.gerar_delta(destino.get_vistos()))
+
+
+def por_titulo(gerenciador: TaskManager, titulo: str):
+    return next(tarefa for tarefa in gerenciador.get_todas_tarefas() if tarefa.titulo == titulo)
+
+
+def lista_por_nome(gerenciador: TaskManager, nome: str):
+    return next(lista for lista in gerenciador.get_todas_listas() if lista.nome == nome)
+
+
+@pytest.fixture
+def replicas(tmp_path):
+    """Duas réplicas já sincronizadas uma vez, a partir de uma cópia do mesmo arquivo."""
+
+    caminho_a = tmp_path / "a.json"
+    caminho_b = tmp_path / "b.json"
+    base = TaskManager(str(caminho_a))
+    trabalho = base.adicionar_lista("Trabalho")
+    base.adicionar_tarefa({"titulo": "Relatório", "lista_id": 1, "prioridade": "baixa"})
+    base.adicionar_tarefa({"titulo": "Reunião", "lista_id": trabalho.id})
+    base.adicionar_tarefa({"titulo": "Compras", "lista_id": 1, "tags": ["casa"]})
+    base.adicionar_tarefa({"titulo": "Orçamento", "lista_id": trabalho.id})
+    shutil.copyfile(caminho_a, caminho_b)
+
+    a, b = TaskManager(str(caminho_a)), TaskManager(str(caminho_b))
+    a.habilitar_sincronizacao()
+    b.habilitar_sincronizacao()
+    enviar(a, b)
+    enviar(b, a)
+    assert estado(a) == estado(b)
+    return tmp_path
+
+
+def abrir(diretorio):
+    return TaskManager(str(diretorio / "a.json")), TaskManager(str(diretorio / "b.json"))
+
+
+def copiar_replicas(origem, destino):
+    destino.mkdir()
+    for nome in ("a.json", "b.json"):
+        shutil.copyfile(origem / nome, destino / nome)
+    return destino
+
+
+def editar_campos_diferentes(a, b):
+    a.editar_tarefa(por_titulo(a, "Relatório").id, {"titulo": "Relatório final"})
+    b.editar_tarefa(por_titulo(b, "Relatório").id, {"prioridade": "alta"})
+
+
+def editar_mesmo_campo(a, b):
+    a.editar_tarefa(por_titulo(a, "Compras").id, {"notas": "feira"})
+    b.editar_tarefa(por_titulo(b, "Compras").id, {"notas": "mercado"})
+    b.editar_tarefa(por_titulo(b, "Reunião").id, {"tags": ["b"]})
+    a.editar_tarefa(por_titulo(a, "Reunião").id, {"tags": ["a"]})
+
+
+def remover_e_editar(a, b):
+    a.remover_tarefa(por_titulo(a, "Compras").id)
+    b.editar_tarefa(por_titulo(b, "Compras").id, {"titulo": "Compras do mês"})
+    b.concluir_tarefa(por_titulo(b, "Compras do mês").id)
+
+
+def remover_lista_e_criar_tarefa(a, b):
+    a.remover_lista(lista_por_nome(a, "Trabalho").id)
+    b.adicionar_tarefa({"titulo": "Apresentação", "lista_id": lista_por_nome(b, "Trabalho").id})
+    b.editar_tarefa(por_titulo(b, "Reunião").id, {"notas": "sala 2"})
+
+
+def criar_subtarefas_em_ciclo(a, b):
+    a.editar_tarefa(por_titulo(a, "Reunião").id, {"pai_id": por_titulo(a, "Orçamento").id})
+    b.editar_tarefa(por_titulo(b, "Orçamento").id, {"pai_id": por_titulo(b, "Reunião").id})
+
+
+def remover_pai_e_criar_subtarefa(a, b):
+    a.remover_tarefa(por_titulo(a, "Relatório").id)
+    b.adicionar_tarefa({"titulo": "Gráficos", "pai_id": por_titulo(b, "Relatório").id})
+
+
+CENARIOS = [editar_campos_diferentes, editar_mesmo_campo, remover_e_editar,
+            remover_lista_e_criar_tarefa, criar_subtarefas_em_ciclo, remover_pai_e_criar_subtarefa]
+
+
+@pytest.mark.parametrize("cenario", CENARIOS, ids=lambda cenario: cenario.__name__)
+def test_ordens_opostas_convergem(replicas, cenario):
+    cenario(*abrir(replicas))
+    primeiro_a = copiar_replicas(replicas, replicas / "primeiro_a")
+    primeiro_b = copiar_replicas(replicas, replicas / "primeiro_b")
+
+    a1, b1 = abrir(primeiro_a)
+    enviar(a1, b1)
+    enviar(b1, a1)
+    a2, b2 = abrir(primeiro_b)
+    enviar(b2, a2)
+    enviar(a2, b2)
+
+    assert estado(a1) == estado(b1) == estado(a2) == estado(b2)
+    # O estado também sobrevive à gravação e à releitura
+    assert estado(TaskManager(a1.get_caminho())) == estado(a1)
+
+
+def test_deltas_simultaneos_convergem(replicas):
+    a, b = abrir(replicas)
+    editar_mesmo_campo(a, b)
+    remover_e_editar(a, b)
+    delta_a = a.gerar_delta(b.get_vistos())
+    delta_b = b.gerar_delta(a.get_vistos())
+    b.aplicar_delta(delta_a)
+    a.aplicar_delta(delta_b)
+    assert estado(a) == estado(b)
+
+
+def test_campos_diferentes_sao_mantidos(replicas):
+    a, b = abrir(replicas)
+    editar_campos_diferentes(a, b)
+    enviar(a, b)
+    enviar(b, a)
+    for replica in (a, b):
+        tarefa = por_titulo(replica, "Relatório final")
+        assert tarefa.prioridade == "alta"
+
+
+def test_remocao_vence_edicao_anterior(replicas):
+    a, b = abrir(replicas)
+    remover_e_editar(a, b)
+    enviar(a, b)
+    enviar(b, a)
+    for replica in (a, b):
+        assert not any(tarefa.titulo.startswith("Compras") for tarefa in replica.get_todas_tarefas())
+
+
+def test_remocao_de_lista_leva_tarefas_criadas_na_outra_replica(replicas):
+    a, b = abrir(replicas)
+    remover_lista_e_criar_tarefa(a, b)
+    enviar(a, b)
+    enviar(b, a)
+    for replica in (a, b):
+        assert [lista.nome for lista in replica.get_todas_listas()] == ["Geral"]
+        assert {tarefa.titulo for tarefa in replica.get_todas_tarefas()} == {"Relatório", "Compras"}
+
+
+def test_ciclo_de_subtarefas_e_desfeito_igual_nas_replicas(replicas):
+    a, b = abrir(replicas)
+    criar_subtarefas_em_ciclo(a, b)
+    enviar(a, b)
+    enviar(b, a)
+    assert estado(a) == estado(b)
+    for replica in (a, b):
+        reuniao, orcamento = por_titulo(replica, "Reunião"), por_titulo(replica, "Orçamento")
+        assert (reuniao.pai_id is None) != (orcamento.pai_id is None)
+
+
+@pytest.mark.parametrize("cenario", CENARIOS, ids=lambda cenario: cenario.__name__)
+def test_aplicar_o_mesmo_delta_duas_vezes_nao_muda_nada(replicas, cenario):
+    a, b = abrir(replicas)
+    cenario(a, b)
+    delta = a.gerar_delta(b.get_vistos())
+    b.aplicar_delta(delta)
+    antes = estado(b)
+    vistos = b.get_vistos()
+
+    contadores = b.aplicar_delta(delta)
+
+    assert contadores["criadas"] == contadores["alteradas"] == contadores["removidas"] == 0
+    assert estado(b) == antes
+    assert b.get_vistos() == vistos
+
+
+def test_sem_alteracoes_o_delta_fica_vazio(replicas):
+    a, b = abrir(replicas)
+    editar_campos_diferentes(a, b)
+    enviar(a, b)
+    enviar(b, a)
+    enviar(a, b)
+
+    delta = a.gerar_delta(b.get_vistos())
+    assert delta["listas"] == delta["tarefas"] == []
+    assert delta["lapides_listas"] == delta["lapides_tarefas"] == {}
+
+
+def test_delta_da_propria_replica_e_recusado(replicas):
+    a, _ = abrir(replicas)
+    with pytest.raises(ValueError):
+        a.aplicar_delta(a.gerar_delta({}))
@@ -0,0 +1,191 @@
+import copy
+import random
+
+import pytest
+
+import persistence
+import versoes
+from manager import TaskManager
+from models import ListaDeTarefas, Tarefa
+
+
+def nova_tarefa(tarefa_id: int, titulo: str = None) -> Tarefa:
+    return Tarefa(titulo=titulo or f"Tarefa {tarefa_id}", id=tarefa_id, lista_id=1)
+
+
+def ids(tarefas):
+    return [tarefa.id for tarefa in tarefas]
+
+
+def fotografar(tarefas):
+    """Copia o conteúdo das tarefas, para comparar depois com o que a versão mostra."""
+
+    return [(tarefa, copy.deepcopy(tarefa.to_dict())) for tarefa in tarefas]
+
+
+def conferir_fotografia(tarefas, fotografia):
+    assert len(tarefas) == len(fotografia)
+    for tarefa, (original, dados) in zip(tarefas, fotografia):
+        assert tarefa is original
+        assert tarefa.to_dict() == dados
+
+
+@pytest.fixture
+def blocos_pequenos(monkeypatch):
+    """Blocos de 4 tarefas, para que poucas tarefas já atravessem vários blocos e divisões."""
+
+    monkeypatch.setattr(versoes, "TAMANHO_BLOCO", 4)
+    return 4
+
+
+def test_indexacao_e_fatias_atravessam_os_blocos(blocos_pequenos):
+    tarefas = [nova_tarefa(tarefa_id) for tarefa_id in range(1, 4 * blocos_pequenos + 4)]
+    vetor = versoes.VetorTarefas(reversed(tarefas))
+
+    assert list(vetor) == tarefas
+    assert len(vetor) == len(tarefas)
+    assert [vetor[posicao] for posicao in range(-len(tarefas), len(tarefas))] == tarefas + tarefas
+    for inicio in range(len(tarefas) + 1):
+        for fim in range(inicio, len(tarefas) + 2):
+            assert vetor[inicio:fim] == tarefas[inicio:fim]
+    assert vetor[::2] == tarefas[::2]
+    with pytest.raises(IndexError):
+        vetor[len(tarefas)]
+
+
+def test_bloco_cheio_e_dividido_sem_alterar_a_versao_anterior(blocos_pequenos):
+    vetor = versoes.VetorTarefas(nova_tarefa(tarefa_id * 100) for tarefa_id in range(1, 2 * blocos_pequenos + 1))
+    blocos_antes = len(vetor._blocos)
+    fotografia = fotografar(vetor)
+    versoes_anteriores = []
+
+    # Todas as inserções caem no mesmo bloco, até ele passar de 2 * TAMANHO_BLOCO e ser dividido
+    atual = vetor
+    for tarefa_id in range(101, 101 + 2 * blocos_pequenos):
+        versoes_anteriores.append((atual, list(atual)))
+        atual = atual.com_tarefa(nova_tarefa(tarefa_id))
+
+    assert len(atual._blocos) > blocos_antes
+    assert all(len(bloco) <= 2 * blocos_pequenos for bloco in atual._blocos)
+    assert ids(atual) == sorted(ids(atual))
+    assert len(atual) == len(vetor) + 2 * blocos_pequenos
+    conferir_fotografia(vetor, fotografia)
+    for anterior, tarefas in versoes_anteriores:
+        assert list(anterior) == tarefas
+
+
+def test_substituir_copia_so_o_bloco_da_tarefa(blocos_pequenos):
+    vetor = versoes.VetorTarefas(nova_tarefa(tarefa_id) for tarefa_id in range(1, 4 * blocos_pequenos + 1))
+    novo = vetor.com_tarefa(nova_tarefa(blocos_pequenos + 1, "Alterada"))
+
+    assert vetor[blocos_pequenos].titulo == f"Tarefa {blocos_pequenos + 1}"
+    assert novo[blocos_pequenos].titulo == "Alterada"
+    assert len(novo) == len(vetor)
+    compartilhados = [antigo is atual for antigo, atual in zip(vetor._blocos, novo._blocos)]
+    assert compartilhados == [True, False, True, True]
+
+
+def test_remocoes_atravessam_e_juntam_blocos(blocos_pequenos):
+    tarefas = [nova_tarefa(tarefa_id) for tarefa_id in range(1, 5 * blocos_pequenos + 1)]
+    vetor = versoes.VetorTarefas(tarefas)
+    fotografia = fotografar(vetor)
+    retirar = {3, 4, 5, 6, 7, 12, 13, 20}
+
+    por_condicao, removidas = vetor.sem(lambda tarefa: tarefa.id in retirar)
+    por_ids, removidas_ids = vetor.sem_ids(retirar | {999})
+
+    esperadas = [tarefa for tarefa in tarefas if tarefa.id not in retirar]
+    assert list(por_condicao) == list(por_ids) == esperadas
+    assert removidas == removidas_ids == [(posicao, tarefa) for posicao, tarefa in enumerate(tarefas) if tarefa.id in retirar]
+    assert all(0 < len(bloco) for bloco in por_condicao._blocos)
+    assert len(por_condicao._blocos) < len(vetor._blocos)
+    conferir_fotografia(vetor, fotografia)
+    # Sem nada a retirar, a mesma versão é devolvida
+    assert vetor.sem_ids([999]) == (vetor, [])
+
+
+def test_sequencia_aleatoria_equivale_a_uma_lista_ordenada(blocos_pequenos):
+    aleatorio = random.Random(42)
+    referencia = {}
+    vetor = versoes.VetorTarefas()
+    historico = []
+    for passo in range(600):
+        historico.append((vetor, [referencia[tarefa_id] for tarefa_id in sorted(referencia)]))
+        if referencia and aleatorio.random() < 0.3:
+            alvos = set(aleatorio.sample(sorted(referencia), min(len(referencia), aleatorio.randint(1, 6))))
+            vetor, removidas = vetor.sem_ids(alvos)
+            assert {tarefa.id for _, tarefa in removidas} == alvos
+            for tarefa_id in alvos:
+                del referencia[tarefa_id]
+        else:
+            tarefa = nova_tarefa(aleatorio.randint(1, 150), f"passo {passo}")
+            vetor = vetor.com_tarefa(tarefa)
+            referencia[tarefa.id] = tarefa
+
+        ordenadas = [referencia[tarefa_id] for tarefa_id in sorted(referencia)]
+        assert list(vetor) == ordenadas
+        for tarefa_id in (1, 75, 150):
+            assert vetor.posicao(tarefa_id) == sum(1 for outro in referencia if outro < tarefa_id)
+
+    # Nenhuma versão antiga mudou com as alterações seguintes
+    for anterior, tarefas in historico:
+        assert list(anterior) == tarefas
+
+
+@pytest.fixture(params=["pequenos", "padrao"])
+def gerenciador(request, tmp_path, monkeypatch):
+    """Um gerenciador com tarefas em mais de dois blocos, sem salvamento automático."""
+
+    if request.param == "pequenos":
+        monkeypatch.setattr(versoes, "TAMANHO_BLOCO", 4)
+    quantidade = 2 * versoes.TAMANHO_BLOCO + 5
+    listas = [ListaDeTarefas(id=1, nome="Geral"), ListaDeTarefas(id=2, nome="Trabalho")]
+    tarefas = [Tarefa(titulo=f"Tarefa {tarefa_id}", id=tarefa_id, lista_id=1, tags=["t"]) for tarefa_id in range(1, quantidade + 1)]
+    caminho = str(tmp_path / "dados.json")
+    assert persistence.salvar_dados(listas, tarefas, caminho=caminho, duravel=False)
+    return TaskManager(caminho, salvar_automaticamente=False)
+
+
+def test_versao_antiga_nao_muda_com_alteracoes_nas_fronteiras_dos_blocos(gerenciador):
+    bloco = versoes.TAMANHO_BLOCO
+    antiga = gerenciador.get_versao()
+    todas_antes = gerenciador.get_todas_tarefas()
+    fotografia = fotografar(antiga.tarefas)
+    listas_antes = [(lista, lista.nome) for lista in antiga.listas]
+    fronteiras = [1, bloco, bloco + 1, 2 * bloco, 2 * bloco + 1, 2 * bloco + 5]
+
+    for tarefa_id in fronteiras:
+        gerenciador.editar_tarefa(tarefa_id, {"titulo": f"Editada {tarefa_id}", "tags": ["nova"], "prioridade": "alta"})
+    gerenciador.concluir_tarefas([bloco - 1, bloco + 2])
+    gerenciador.mover_tarefas([bloco, bloco + 1], 2)
+    gerenciador.remover_tarefas([2, bloco + 3, 2 * bloco])
+    for _ in range(2 * bloco + 1):
+        gerenciador.adicionar_tarefa({"titulo": "Nova", "lista_id": 1})
+    gerenciador.editar_lista(1, "Renomeada")
+    gerenciador.desfazer()
+
+    atual = gerenciador.get_versao()
+    assert atual.numero > antiga.numero
+    assert gerenciador.buscar_tarefa_por_id(bloco + 1).titulo == f"Editada {bloco + 1}"
+    assert gerenciador.buscar_tarefa_por_id(bloco + 3) is None
+    assert len(atual.tarefas) == len(antiga.tarefas) - 3 + 2 * bloco + 1
+
+    assert todas_antes is antiga.tarefas
+    conferir_fotografia(antiga.tarefas, fotografia)
+    assert [(lista, lista.nome) for lista in antiga.listas] == listas_antes
+    assert [antiga.tarefas[posicao] for posicao in range(len(fotografia))] == [tarefa for tarefa, _ in fotografia]
+
+
+def test_desfazer_restaura_o_conteudo_sem_alterar_a_versao_intermediaria(gerenciador):
+    bloco = versoes.TAMANHO_BLOCO
+    inicial = [tarefa.to_dict() for tarefa in gerenciador.get_todas_tarefas()]
+    gerenciador.editar_tarefa(bloco, {"titulo": "Editada"})
+    gerenciador.remover_tarefa(bloco + 1)
+    intermediaria = gerenciador.get_versao()
+    fotografia = fotografar(intermediaria.tarefas)
+
+    gerenciador.desfazer()
+    gerenciador.desfazer()
+
+    assert [tarefa.to_dict() for tarefa in gerenciador.get_todas_tarefas()] == inicial
+    conferir_fotografia(intermediaria.tarefas, fotografia)
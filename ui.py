@@ -1,8 +1,11 @@
+import calendar
 import os
-from datetime import date, datetime
-from typing import List, Dict, Any, Optional
+from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
 from manager import TaskManager
 from models import Tarefa
+import consultas
+import visoes
 
 
 def clear_screen():
@@ -31,9 +34,13 @@ def imprimir_tarefas(tarefas: List[Tarefa], gerenciador: TaskManager):
     """
     Imprime uma lista de tarefas de forma formatada e legível.
 
+    As subtarefas aparecem recuadas logo abaixo da tarefa principal, quando ela também
+    está entre as exibidas, e as tarefas com subtarefas mostram quantas delas estão
+    concluídas (ex: "(2/5)").
+
     Parâmetros:
     tarefas (List[Tarefa]): A lista de objetos Tarefa a serem impressos.
-    gerenciador (TaskManager): O gerenciador para buscar nomes de listas.
+    gerenciador (TaskManager): O gerenciador para buscar nomes de listas e o progresso das subtarefas.
     """
 
     if not tarefas:
@@ -43,20 +50,74 @@ def imprimir_tarefas(tarefas: List[Tarefa], gerenciador: TaskManager):
     # Cria um mapa de ID de lista para nome para evitar buscas repetidas no loop
     mapa_listas = {lista.id: lista.nome for lista in gerenciador.get_todas_listas()}
 
+    # Monta a árvore só com as tarefas exibidas, mantendo a ordem recebida entre irmãs
+    exibidas = {tarefa.id for tarefa in tarefas}
+    filhas: Dict[int, List[Tarefa]] = {}
+    principais = []
     for tarefa in tarefas:
-        status = "✓" if tarefa.concluida else " "
-        data_str = tarefa.data_termino.strftime('%d/%m/%Y') if tarefa.data_termino else "Sem data"
+        if tarefa.pai_id in exibidas and tarefa.pai_id != tarefa.id:
+            filhas.setdefault(tarefa.pai_id, []).append(tarefa)
+        else:
+            principais.append(tarefa)
+
+    # Percorre a árvore em profundidade, com o nível de cada tarefa
+    pilha = [(tarefa, 0) for tarefa in reversed(principais)]
+    while pilha:
+        tarefa, nivel = pilha.pop()
+        pilha.extend((filha, nivel + 1) for filha in reversed(filhas.pop(tarefa.id, [])))
+        imprimir_tarefa(tarefa, mapa_listas, gerenciador, nivel)
+
+
+def imprimir_ocorrencias(ocorrencias: List[Tuple[Tarefa, Optional[date]]], gerenciador: TaskManager):
+    """
+    Imprime as ocorrências de uma consulta, uma linha por par (tarefa, data), na ordem recebida.
+
+    Uma série recorrente aparece uma vez por ocorrência, cada uma com a sua data. Sem a
+    árvore de subtarefas, já que a mesma tarefa pode aparecer em várias linhas.
+
+    Parâmetros:
+    ocorrencias (List[Tuple[Tarefa, Optional[date]]]): Os pares a serem impressos.
+    gerenciador (TaskManager): O gerenciador para buscar nomes de listas e o progresso das subtarefas.
+    """
+
+    if not ocorrencias:
+        print("Nenhuma tarefa encontrada para exibir.")
+        return
+
+    mapa_listas = {lista.id: lista.nome for lista in gerenciador.get_todas_listas()}
+    for tarefa, data in ocorrencias:
+        imprimir_tarefa(tarefa, mapa_listas, gerenciador, data_ocorrencia=data)
+
+
+def imprimir_tarefa(tarefa: Tarefa, mapa_listas: Dict[int, str], gerenciador: TaskManager, nivel: int = 0,
+                    data_ocorrencia: Optional[date] = None):
+    """
+    Imprime uma única tarefa, recuada conforme o seu nível na árvore de subtarefas.
 
-        # Adiciona um marcador de atraso
-        if tarefa.data_termino and tarefa.data_termino < date.today() and not tarefa.concluida:
-            data_str += " (Atrasada!)"
+    `data_ocorrencia`, se informada, é exibida no lugar da data de término (a data de
+    uma das ocorrências de uma série recorrente).
+    """
+
+    status = "✓" if tarefa.concluida else " "
+    data = data_ocorrencia or tarefa.data_termino
+    data_str = data.strftime('%d/%m/%Y') if data else "Sem data"
+
+    # Adiciona um marcador de atraso
+    if data and data < date.today() and not tarefa.concluida:
+        data_str += " (Atrasada!)"
 
-        nome_lista = mapa_listas.get(tarefa.lista_id, "Desconhecida")
-        tags_str = f"Tags: {', '.join(tarefa.tags)}" if tarefa.tags else ""
+    nome_lista = mapa_listas.get(tarefa.lista_id, "Desconhecida")
+    tags_str = f"Tags: {', '.join(tarefa.tags)}" if tarefa.tags else ""
 
-        print(f"[{status}] ID: {tarefa.id:<4} | {tarefa.titulo:<30} | Data: {data_str:<14} | Lista: {nome_lista:<16} | Prioridade: {tarefa.prioridade.capitalize():<8} | Repetição: {tarefa.repeticao.capitalize():<8} | {tags_str}")
-        if tarefa.notas:
-            print(f"    Notas: {tarefa.notas}")
+    # As subtarefas ficam recuadas sob a principal, que mostra o progresso delas
+    recuo = "  " * nivel + ("↳ " if nivel else "")
+    concluidas, total = gerenciador.get_progresso(tarefa.id)
+    progresso_str = f" ({concluidas}/{total})" if total else ""
+    titulo_str = f"{recuo}{tarefa.titulo}{progresso_str}"
+
+    print(f"[{status}] ID: {tarefa.id:<4} | {titulo_str:<30} | Data: {data_str:<14} | Lista: {nome_lista:<16} | Prioridade: {tarefa.prioridade.capitalize():<8} | Repetição: {tarefa.repeticao.capitalize():<8} | {tags_str}")
+    if tarefa.notas:
+        print(f"    {'  ' * nivel}Notas: {tarefa.notas}")
 
 
 def obter_dados_nova_tarefa(gerenciador: TaskManager) -> Optional[Dict[str, Any]]:
@@ -64,19 +125,32 @@ def obter_dados_nova_tarefa(gerenciador: TaskManager) -> Optional[Dict[str, Any]
 
     imprimir_cabecalho("Adicionar Nova Tarefa")
 
-    listas = gerenciador.get_todas_listas()
-    print("Listas disponíveis:")
-    for lista in listas:
-        print(f"  ID: {lista.id} - {lista.nome}")
+    # Uma subtarefa fica na lista da tarefa principal, então a lista não é perguntada
+    pai_id = None
+    pai_str = input("ID da tarefa principal (opcional, para criar uma subtarefa): ")
+    if pai_str:
+        try:
+            pai = gerenciador.buscar_tarefa_por_id(int(pai_str))
+        except ValueError:
+            pai = None
+        if not pai:
+            print("Erro: Tarefa principal não encontrada.")
+            return None
+        pai_id, lista_id = pai.id, pai.lista_id
+    else:
+        listas = gerenciador.get_todas_listas()
+        print("\nListas disponíveis:")
+        for lista in listas:
+            print(f"  ID: {lista.id} - {lista.nome}")
 
-    try:
-        lista_id = int(input("\nDigite o ID da lista para a nova tarefa: "))
-        if not gerenciador.buscar_lista_por_id(lista_id):
-            print("Erro: ID de lista inválido.")
+        try:
+            lista_id = int(input("\nDigite o ID da lista para a nova tarefa: "))
+            if not gerenciador.buscar_lista_por_id(lista_id):
+                print("Erro: ID de lista inválido.")
+                return None
+        except ValueError:
+            print("Erro: ID inválido.")
             return None
-    except ValueError:
-        print("Erro: ID inválido.")
-        return None
 
     titulo = input("Título da tarefa: ")
     if not titulo:
@@ -98,6 +172,7 @@ def obter_dados_nova_tarefa(gerenciador: TaskManager) -> Optional[Dict[str, Any]
 
     return {
         "lista_id": lista_id,
+        "pai_id": pai_id,
         "titulo": titulo,
         "data_termino": data_termino,
         "prioridade": prioridade if prioridade in ["alta", "media", "baixa"] else "nenhuma",
@@ -170,9 +245,68 @@ def obter_dados_edicao_tarefa(tarefa: Tarefa, gerenciador: TaskManager) -> Dict[
         except ValueError:
             print("ID inválido. A lista não será alterada.")
 
+    # Editar Tarefa principal (uma subtarefa vai para a lista da nova tarefa principal)
+    pai_atual_str = tarefa.pai_id if tarefa.pai_id is not None else "Nenhuma"
+    novo_pai_str = input(f"ID da tarefa principal (0 para nenhuma, atual: {pai_atual_str}): ")
+    if novo_pai_str:
+        try:
+            novo_pai_id = int(novo_pai_str)
+            novos_dados["pai_id"] = novo_pai_id if novo_pai_id else None
+        except ValueError:
+            print("ID inválido. A tarefa principal não será alterada.")
+
     return novos_dados
 
 
+def obter_dados_edicao_em_massa() -> Dict[str, Any]:
+    """Pede os novos valores que serão aplicados a várias tarefas de uma só vez."""
+
+    imprimir_cabecalho("Editar Tarefas em Massa")
+    print("Deixe o campo em branco e pressione Enter para manter o valor de cada tarefa.")
+
+    novos_dados = {}
+
+    nova_data_str = input("Data de término (DD/MM/AAAA): ")
+    if nova_data_str:
+        try:
+            novos_dados["data_termino"] = datetime.strptime(nova_data_str, '%d/%m/%Y').date()
+        except ValueError:
+            print("Formato de data inválido. A data não será alterada.")
+
+    nova_prioridade = input("Prioridade (alta, media, baixa, nenhuma): ").lower()
+    if nova_prioridade in ["alta", "media", "baixa", "nenhuma"]:
+        novos_dados["prioridade"] = nova_prioridade
+
+    novas_tags_str = input("Tags (separadas por vírgula, substituem as atuais): ")
+    if novas_tags_str:
+        novos_dados["tags"] = [tag.strip() for tag in novas_tags_str.split(',')]
+
+    nova_repeticao = input("Repetição (diaria, semanal, mensal, anual, nunca): ").lower()
+    if nova_repeticao in ["diaria", "semanal", "mensal", "anual", "nunca"]:
+        novos_dados["repeticao"] = nova_repeticao
+
+    return novos_dados
+
+
+def obter_id_lista_destino(gerenciador: TaskManager) -> Optional[int]:
+    """Mostra as listas disponíveis e pede o ID da lista de destino."""
+
+    print("\nListas disponíveis:")
+    for lista in gerenciador.get_todas_listas():
+        print(f"  ID: {lista.id} - {lista.nome}")
+
+    try:
+        lista_id = int(input("\nDigite o ID da lista de destino: "))
+    except ValueError:
+        print("Erro: ID inválido.")
+        return None
+
+    if not gerenciador.buscar_lista_por_id(lista_id):
+        print("Erro: Lista com o ID informado não encontrada.")
+        return None
+    return lista_id
+
+
 def obter_id_para_acao(acao: str) -> Optional[int]:
     """Pede ao usuário um ID de tarefa para uma ação específica."""
 
@@ -184,9 +318,85 @@ def obter_id_para_acao(acao: str) -> Optional[int]:
         return None
 
 
+def obter_expressao_tags(gerenciador: TaskManager) -> str:
+    """Mostra as tags mais usadas e pede ao usuário uma tag ou uma expressão de tags."""
+
+    contagem_tags = gerenciador.get_contagem_tags()
+    if contagem_tags:
+        mais_usadas = sorted(contagem_tags.items(), key=lambda item: (-item[1], item[0]))[:10]
+        print("\nTags mais usadas: " + ", ".join(f"{tag} ({quantidade})" for tag, quantidade in mais_usadas))
+
+    print("Combine tags com AND, OR, NOT e parênteses (ex: urgente AND cliente-x NOT bloqueado).")
+    return input("Digite a tag ou a expressão que deseja filtrar: ").strip()
+
+
+def obter_dias_arquivamento() -> Optional[int]:
+    """Pede ao usuário há quantos dias uma tarefa deve ter sido concluída para ser arquivada."""
+
+    try:
+        dias = int(input("Arquivar as tarefas concluídas há mais de quantos dias? (ex: 30): "))
+    except ValueError:
+        print("Número de dias inválido.")
+        return None
+
+    if dias < 0:
+        print("O número de dias não pode ser negativo.")
+        return None
+    return dias
+
+
+def obter_dados_visao(gerenciador: TaskManager) -> Optional[visoes.VisaoSalva]:
+    """Coleta do usuário a definição de uma nova visão salva."""
+
+    nome = input("Nome da visão (ex: Minha semana): ").strip()
+    if not nome:
+        print("Erro: O nome da visão não pode ser vazio.")
+        return None
+
+    print("\nListas disponíveis:")
+    for lista in gerenciador.get_todas_listas():
+        print(f"  ID: {lista.id} - {lista.nome}")
+    listas_str = input("IDs das listas, separados por vírgula (deixe em branco para todas): ")
+    try:
+        listas = [int(parte) for parte in listas_str.split(',') if parte.strip()]
+    except ValueError:
+        print("Erro: ID de lista inválido.")
+        return None
+    for lista_id in listas:
+        if not gerenciador.buscar_lista_por_id(lista_id):
+            print(f"Erro: Lista com o ID {lista_id} não encontrada.")
+            return None
+
+    print("\nQuais tarefas entram na visão?")
+    print("1. Todas")
+    print("2. Apenas não concluídas")
+    print("3. Apenas concluídas")
+    status = {'1': visoes.STATUS_TODAS, '2': visoes.STATUS_PENDENTES,
+              '3': visoes.STATUS_CONCLUIDAS}.get(input("Escolha uma opção (padrão é 1): "), visoes.STATUS_TODAS)
+
+    prazo_str = input("\nIncluir só tarefas que vencem nos próximos quantos dias? "
+                      "(0 = hoje e atrasadas, deixe em branco para não limitar): ").strip()
+    prazo_dias = None
+    if prazo_str:
+        try:
+            prazo_dias = int(prazo_str)
+        except ValueError:
+            print("Erro: Número de dias inválido.")
+            return None
+
+    ordenacao = consultas.ORDENACAO_PRIORIDADE if menu_escolha_ordenacao() == '2' else consultas.ORDENACAO_DATA
+
+    try:
+        return visoes.VisaoSalva(nome, listas, status, prazo_dias, ordenacao)
+    except ValueError as erro:
+        print(f"Erro: {erro}")
+        return None
+
+
 def obter_termo_busca() -> str:
     """Pede ao usuário um termo para a busca."""
 
+    print("Para buscar com uma expressão regular, comece com 're:' (ex: re:relat[oó]rio)")
     return input("Digite o termo que deseja buscar no título, notas ou tags: ")
 
 
@@ -198,7 +408,21 @@ def menu_busca_acoes() -> str:
     print("2. Desmarcar uma tarefa (tornar pendente)")
     print("3. Editar uma tarefa")
     print("4. Remover uma tarefa")
-    print("4. Voltar ao menu principal")
+    print("5. Aplicar uma ação a todos os resultados")
+    print("6. Voltar ao menu principal")
+    return input("\nEscolha uma opção: ")
+
+
+def menu_acoes_em_massa(quantidade: int) -> str:
+    """Exibe as ações que podem ser aplicadas a todas as tarefas exibidas."""
+
+    print(f"\nAções para as {quantidade} tarefas exibidas:")
+    print("1. Concluir todas")
+    print("2. Desmarcar todas (tornar pendentes)")
+    print("3. Editar todas")
+    print("4. Mover todas para outra lista")
+    print("5. Remover todas")
+    print("6. Voltar")
     return input("\nEscolha uma opção: ")
 
 
@@ -243,7 +467,8 @@ def menu_acoes_gerais() -> str:
     print("2. Desmarcar uma tarefa (tornar pendente)")
     print("3. Editar uma tarefa")
     print("4. Remover uma tarefa")
-    print("5. Voltar")
+    print("5. Aplicar uma ação a todas as tarefas exibidas")
+    print("6. Voltar")
     return input("\nEscolha uma opção: ")
 
 
@@ -254,7 +479,8 @@ def menu_acoes_pendentes() -> str:
     print("1. Concluir uma tarefa")
     print("2. Editar uma tarefa")
     print("3. Remover uma tarefa")
-    print("4. Voltar")
+    print("4. Aplicar uma ação a todas as tarefas exibidas")
+    print("5. Voltar")
     return input("\nEscolha uma opção: ")
 
 
@@ -265,10 +491,108 @@ def menu_acoes_concluidas() -> str:
     print("1. Desmarcar uma tarefa (tornar pendente)")
     print("2. Remover uma tarefa permanentemente")
     print("3. Remover TODAS as tarefas concluídas")
-    print("4. Voltar")
+    print("4. Aplicar uma ação a todas as tarefas exibidas")
+    print("5. Arquivar as tarefas concluídas há mais de alguns dias")
+    print("6. Voltar")
     return input("\nEscolha uma opção: ")
 
 
+def imprimir_painel(gerenciador: TaskManager):
+    """Exibe os contadores de cada lista e o total geral, sem percorrer as tarefas."""
+
+    imprimir_cabecalho("Painel")
+    print(f"{'Lista':<20} {'Total':>7} {'Pendentes':>10} {'Concluídas':>11} {'Atrasadas':>10} {'Hoje':>6} "
+          f"{'Alta':>6} {'Média':>6} {'Baixa':>6} {'Nenhuma':>8}")
+
+    def imprimir_linha(nome: str, contadores: Dict[str, Any]):
+        por_prioridade = contadores["pendentes_por_prioridade"]
+        print(f"{nome[:20]:<20} {contadores['total']:>7} {contadores['pendentes']:>10} {contadores['concluidas']:>11} "
+              f"{contadores['atrasadas']:>10} {contadores['vencem_hoje']:>6} {por_prioridade['alta']:>6} "
+              f"{por_prioridade['media']:>6} {por_prioridade['baixa']:>6} {por_prioridade['nenhuma']:>8}")
+
+    contadores_por_lista = gerenciador.get_contadores_por_lista()
+    for lista in gerenciador.get_todas_listas():
+        imprimir_linha(lista.nome, contadores_por_lista[lista.id])
+
+    print("-" * 101)
+    imprimir_linha("Todas as listas", gerenciador.get_contadores())
+    print("\n(As colunas de prioridade contam apenas as tarefas pendentes.)")
+
+
+MESES = ("Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+         "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro")
+
+
+def imprimir_calendario(gerenciador: TaskManager, ano: int, mes: int,
+                        lista_id: Optional[int] = None, hoje: Optional[date] = None):
+    """
+    Exibe o calendário de um mês com a quantidade de tarefas pendentes que vencem em cada dia.
+
+    As contagens vêm do índice de vencimentos do gerenciador, sem percorrer as tarefas.
+    Os dias passados com tarefas pendentes são marcados com "!" (atrasadas), e o dia
+    de hoje com "*".
+
+    Parâmetros:
+    gerenciador (TaskManager): O gerenciador de onde vêm as contagens.
+    ano (int), mes (int): O mês exibido.
+    lista_id (Optional[int]): A lista exibida. None exibe todas as listas.
+    """
+
+    hoje = hoje or date.today()
+    nome_lista = "Todas as listas"
+    if lista_id is not None:
+        lista = gerenciador.buscar_lista_por_id(lista_id)
+        nome_lista = lista.nome if lista else "Desconhecida"
+
+    primeiro = date(ano, mes, 1)
+    ultimo = date(ano, mes, calendar.monthrange(ano, mes)[1])
+    pendentes = gerenciador.get_vencimentos_por_dia(primeiro, ultimo, lista_id)
+
+    imprimir_cabecalho(f"{MESES[mes - 1]} de {ano}")
+    print(f"Lista: {nome_lista}\n")
+    print("".join(f"{dia:<8}" for dia in ("Dom", "Seg", "Ter", "Qua", "Qui", "Sex", "Sáb")).rstrip())
+    for semana in calendar.Calendar(firstweekday=6).monthdayscalendar(ano, mes):
+        celulas = []
+        for dia in semana:
+            if not dia:
+                celulas.append(" " * 8)
+                continue
+            data = date(ano, mes, dia)
+            quantidade = pendentes.get(data, 0)
+            marcador = "*" if data == hoje else ("!" if quantidade and data < hoje else " ")
+            texto = f"{dia:>2}{marcador}" + (f"{quantidade:<4}" if quantidade else "")
+            celulas.append(f"{texto:<8}")
+        print("".join(celulas).rstrip())
+
+    concluidas = gerenciador.contar_vencimentos(primeiro, ultimo, lista_id, concluidas=True)
+    atrasadas = gerenciador.contar_vencimentos(None, hoje - timedelta(days=1), lista_id)
+    print(f"\nPendentes no mês: {sum(pendentes.values())}    Concluídas no mês: {concluidas}")
+    print(f"Atrasadas (em qualquer mês): {atrasadas}")
+    print("\n(Cada dia mostra quantas tarefas pendentes vencem nele. ! = atrasadas, * = hoje.)")
+
+
+def menu_calendario() -> str:
+    """Exibe as opções do calendário e retorna a escolha do usuário."""
+
+    print("\nOpções:")
+    print("1. Mês anterior")
+    print("2. Próximo mês")
+    print("3. Escolher uma lista")
+    print("4. Ir para um mês (MM/AAAA)")
+    print("5. Voltar")
+    return input("\nEscolha uma opção: ")
+
+
+def obter_mes() -> Optional[date]:
+    """Pede ao usuário um mês no formato MM/AAAA e retorna o primeiro dia dele."""
+
+    try:
+        return datetime.strptime(input("Digite o mês (MM/AAAA): ").strip(), '%m/%Y').date()
+    except ValueError:
+        print("Mês inválido. Use o formato MM/AAAA.")
+        return None
+
+
 def menu_principal():
     """Exibe o menu principal e retorna a escolha do usuário."""
 
@@ -277,5 +601,10 @@ def menu_principal():
     print("2. Adicionar Tarefa")
     print("3. Buscar Tarefas")
     print("4. Gerenciar Listas")
-    print("5. Sair")
+    print("5. Desfazer última ação")
+    print("6. Refazer ação desfeita")
+    print("7. Painel")
+    print("8. Visões Salvas")
+    print("9. Calendário")
+    print("10. Sair")
     return input("\nEscolha uma opção: ")
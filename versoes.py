@@ -0,0 +1,193 @@
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator, List, Tuple, Union
+from models import Tarefa, ListaDeTarefas
+
+# Quantidade de tarefas por bloco. Alterar uma tarefa copia só o seu bloco e a
+# tupla de blocos, então o custo fica em torno de TAMANHO_BLOCO + n / TAMANHO_BLOCO.
+TAMANHO_BLOCO = 512
+
+
+class VetorTarefas(Sequence):
+    """
+    Sequência imutável de tarefas, em ordem de ID, com compartilhamento estrutural.
+
+    As tarefas ficam em blocos (tuplas). Uma nova versão com uma tarefa inserida,
+    substituída ou removida reaproveita todos os blocos que não mudaram, então criar
+    uma versão não copia as tarefas, e as versões antigas continuam válidas para quem
+    ainda as estiver lendo. Um bloco deixa de ocupar memória quando nenhuma versão o
+    usa mais.
+    """
+
+    __slots__ = ("_blocos", "_inicios", "_primeiros_ids", "_tamanho")
+
+    def __init__(self, tarefas: Iterable[Tarefa] = ()):
+        """
+        Args:
+            tarefas (Iterable[Tarefa]): As tarefas iniciais, em qualquer ordem.
+        """
+
+        ordenadas = sorted(tarefas, key=lambda tarefa: tarefa.id)
+        self._montar(tuple(tuple(ordenadas[inicio:inicio + TAMANHO_BLOCO])
+                           for inicio in range(0, len(ordenadas), TAMANHO_BLOCO)))
+
+    def _montar(self, blocos: Tuple[Tuple[Tarefa, ...], ...]):
+        """Guarda os blocos e calcula a posição inicial e o primeiro ID de cada um."""
+
+        inicios = []
+        total = 0
+        for bloco in blocos:
+            inicios.append(total)
+            total += len(bloco)
+        self._blocos = blocos
+        self._inicios = tuple(inicios)
+        self._primeiros_ids = tuple(bloco[0].id for bloco in blocos)
+        self._tamanho = total
+
+    @classmethod
+    def _de_blocos(cls, blocos: Tuple[Tuple[Tarefa, ...], ...]) -> 'VetorTarefas':
+        """Cria um vetor a partir de blocos já ordenados e não vazios."""
+
+        vetor = cls.__new__(cls)
+        vetor._montar(blocos)
+        return vetor
+
+    def __len__(self) -> int:
+        return self._tamanho
+
+    def __iter__(self) -> Iterator[Tarefa]:
+        return chain.from_iterable(self._blocos)
+
+    def __getitem__(self, indice: Union[int, slice]) -> Union[Tarefa, List[Tarefa]]:
+        """Retorna a tarefa na posição informada, ou uma lista com as tarefas de uma fatia."""
+
+        if isinstance(indice, slice):
+            inicio, fim, passo = indice.indices(self._tamanho)
+            if passo != 1:
+                return list(self)[indice]
+            if inicio >= fim:
+                return []
+            numero_bloco = bisect_right(self._inicios, inicio) - 1
+            itens = chain.from_iterable(self._blocos[numero_bloco:])
+            return list(islice(itens, inicio - self._inicios[numero_bloco], fim - self._inicios[numero_bloco]))
+
+        if indice < 0:
+            indice += self._tamanho
+        if not 0 <= indice < self._tamanho:
+            raise IndexError("índice fora do vetor de tarefas")
+        numero_bloco = bisect_right(self._inicios, indice) - 1
+        return self._blocos[numero_bloco][indice - self._inicios[numero_bloco]]
+
+    def _localizar(self, tarefa_id: int) -> Tuple[int, int]:
+        """Retorna o bloco onde o ID está (ou deveria estar) e a posição dentro dele."""
+
+        numero_bloco = max(bisect_right(self._primeiros_ids, tarefa_id) - 1, 0)
+        posicao = bisect_left(self._blocos[numero_bloco], tarefa_id, key=lambda tarefa: tarefa.id)
+        return numero_bloco, posicao
+
+    def posicao(self, tarefa_id: int) -> int:
+        """Retorna a posição da tarefa com o ID informado (ou onde ela seria inserida)."""
+
+        if not self._blocos:
+            return 0
+        numero_bloco, posicao = self._localizar(tarefa_id)
+        return self._inicios[numero_bloco] + posicao
+
+    def com_tarefa(self, tarefa: Tarefa) -> 'VetorTarefas':
+        """Retorna uma nova versão com a tarefa inserida, ou substituída se o ID já existir."""
+
+        if not self._blocos:
+            return self._de_blocos(((tarefa,),))
+
+        numero_bloco, posicao = self._localizar(tarefa.id)
+        bloco = self._blocos[numero_bloco]
+        substitui = posicao < len(bloco) and bloco[posicao].id == tarefa.id
+        novo_bloco = bloco[:posicao] + (tarefa,) + bloco[posicao + 1 if substitui else posicao:]
+
+        # Um bloco que cresceu demais é dividido ao meio
+        if len(novo_bloco) > 2 * TAMANHO_BLOCO:
+            novos_blocos = (novo_bloco[:TAMANHO_BLOCO], novo_bloco[TAMANHO_BLOCO:])
+        else:
+            novos_blocos = (novo_bloco,)
+        return self._de_blocos(self._blocos[:numero_bloco] + novos_blocos + self._blocos[numero_bloco + 1:])
+
+    def sem(self, condicao: Callable[[Tarefa], bool]) -> Tuple['VetorTarefas', List[Tuple[int, Tarefa]]]:
+        """
+        Retorna uma nova versão sem as tarefas que satisfazem a condição.
+
+        Também retorna as tarefas retiradas, com a posição que ocupavam. Os blocos sem
+        nenhuma tarefa retirada são reaproveitados.
+        """
+
+        return self._retirar(condicao, range(len(self._blocos)))
+
+    def sem_ids(self, ids: Iterable[int]) -> Tuple['VetorTarefas', List[Tuple[int, Tarefa]]]:
+        """Como `sem`, mas só examina os blocos que contêm os IDs informados."""
+
+        ids = set(ids)
+        if not self._blocos or not ids:
+            return self, []
+        numeros_blocos = sorted({self._localizar(tarefa_id)[0] for tarefa_id in ids})
+        return self._retirar(lambda tarefa: tarefa.id in ids, numeros_blocos)
+
+    def _retirar(self, condicao: Callable[[Tarefa], bool],
+                 numeros_blocos: Iterable[int]) -> Tuple['VetorTarefas', List[Tuple[int, Tarefa]]]:
+        """Retira as tarefas que satisfazem a condição, examinando só os blocos informados (em ordem)."""
+
+        blocos = []
+        removidas = []
+        proximo = 0
+        for numero_bloco in numeros_blocos:
+            # Os blocos não examinados até aqui são reaproveitados como estão
+            blocos.extend(self._blocos[proximo:numero_bloco])
+            proximo = numero_bloco + 1
+            bloco = self._blocos[numero_bloco]
+            mantidas = []
+            for posicao, tarefa in enumerate(bloco, self._inicios[numero_bloco]):
+                if condicao(tarefa):
+                    removidas.append((posicao, tarefa))
+                else:
+                    mantidas.append(tarefa)
+            if len(mantidas) == len(bloco):
+                blocos.append(bloco)
+            elif blocos and len(blocos[-1]) + len(mantidas) <= TAMANHO_BLOCO:
+                # Blocos que encolheram são juntados ao anterior, para não se acumularem blocos pequenos
+                blocos[-1] = blocos[-1] + tuple(mantidas)
+            elif mantidas:
+                blocos.append(tuple(mantidas))
+        blocos.extend(self._blocos[proximo:])
+
+        if not removidas:
+            return self, removidas
+        return self._de_blocos(tuple(blocos)), removidas
+
+    def __repr__(self) -> str:
+        return f"VetorTarefas({self._tamanho} tarefas em {len(self._blocos)} blocos)"
+
+
+class Versao:
+    """
+    Uma versão publicada dos dados: as listas e as tarefas como estavam ao fim de uma ação.
+
+    Nada em uma versão é alterado depois de publicada (as tarefas editadas viram novos
+    objetos), então ela pode ser lida por outra thread, por um salvamento em segundo
+    plano ou por uma busca demorada enquanto o gerenciador continua recebendo ações.
+    """
+
+    __slots__ = ("numero", "listas", "tarefas")
+
+    def __init__(self, numero: int, listas: Tuple[ListaDeTarefas, ...], tarefas: VetorTarefas):
+        """
+        Args:
+            numero (int): Número da versão, que aumenta a cada ação.
+            listas (Tuple[ListaDeTarefas, ...]): As listas, na ordem em que foram criadas.
+            tarefas (VetorTarefas): As tarefas, em ordem de ID.
+        """
+
+        self.numero = numero
+        self.listas = listas
+        self.tarefas = tarefas
+
+    def __repr__(self) -> str:
+        return f"Versao({self.numero}, {len(self.listas)} listas, {len(self.tarefas)} tarefas)"
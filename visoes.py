@@ -0,0 +1,187 @@
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from models import Tarefa
+import consultas
+
+# Situações aceitas por uma visão salva
+STATUS_TODAS = "todas"
+STATUS_PENDENTES = "pendentes"
+STATUS_CONCLUIDAS = "concluidas"
+STATUS_VALIDOS = (STATUS_TODAS, STATUS_PENDENTES, STATUS_CONCLUIDAS)
+
+
+class VisaoSalva:
+    """Definição de uma visão salva: um nome para uma combinação de listas, situação, prazo e ordenação."""
+
+    def __init__(self,
+                 nome: str,
+                 listas: Optional[List[int]] = None,
+                 status: str = STATUS_TODAS,
+                 prazo_dias: Optional[int] = None,
+                 ordenacao: str = consultas.ORDENACAO_DATA):
+        """
+        Inicializa uma visão salva.
+
+        Args:
+            nome (str): O nome da visão (ex: "Minha semana").
+            listas (Optional[List[int]]): IDs das listas incluídas. Vazio ou None inclui todas.
+            status (str): 'todas', 'pendentes' ou 'concluidas'.
+            prazo_dias (Optional[int]): Se informado, só entram as tarefas com data de término
+                até hoje mais esse número de dias (incluindo as atrasadas). None não limita.
+            ordenacao (str): 'DATA' ou 'PRIORIDADE'.
+        """
+
+        if not nome:
+            raise ValueError("O nome da visão não pode ser vazio.")
+        if status not in STATUS_VALIDOS:
+            raise ValueError(f"Situação inválida: '{status}'.")
+        if prazo_dias is not None and prazo_dias < 0:
+            raise ValueError("O prazo não pode ser negativo.")
+
+        self.nome = nome
+        self.listas = listas if listas else []
+        self.status = status
+        self.prazo_dias = prazo_dias
+        self.ordenacao = ordenacao
+
+    def __repr__(self) -> str:
+        """Retorna uma representação legível da visão."""
+
+        return f"Visao('{self.nome}', listas={self.listas}, status={self.status}, prazo_dias={self.prazo_dias})"
+
+    def aceita_sem_prazo(self, tarefa: Tarefa) -> bool:
+        """Indica se a tarefa satisfaz os critérios da visão que não dependem da data atual."""
+
+        if self.listas and tarefa.lista_id not in self.listas:
+            return False
+        if self.status == STATUS_PENDENTES and tarefa.concluida:
+            return False
+        if self.status == STATUS_CONCLUIDAS and not tarefa.concluida:
+            return False
+        return self.prazo_dias is None or tarefa.data_termino is not None
+
+    def limite(self, hoje: date) -> Optional[date]:
+        """Retorna a maior data de término aceita no dia informado, ou None se não houver prazo."""
+
+        return hoje + timedelta(days=self.prazo_dias) if self.prazo_dias is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte a visão para um dicionário para serialização em JSON."""
+
+        return {
+            "nome": self.nome,
+            "listas": self.listas,
+            "status": self.status,
+            "prazo_dias": self.prazo_dias,
+            "ordenacao": self.ordenacao
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'VisaoSalva':
+        """Cria uma visão a partir de um dicionário."""
+
+        return cls(
+            nome=data["nome"],
+            listas=data.get("listas"),
+            status=data.get("status", STATUS_TODAS),
+            prazo_dias=data.get("prazo_dias"),
+            ordenacao=data.get("ordenacao", consultas.ORDENACAO_DATA)
+        )
+
+
+class VisaoMaterializada:
+    """
+    Resultado de uma visão salva, mantido em ordem a cada alteração das tarefas.
+
+    Cada tarefa adicionada ou retirada custa O(log n) para achar a sua posição. As
+    tarefas que satisfazem a visão, exceto por vencerem depois do prazo, ficam
+    guardadas por data: quando o dia muda, só as datas que passaram a caber no prazo
+    são avaliadas, sem percorrer as demais tarefas.
+    """
+
+    def __init__(self, visao: VisaoSalva, hoje: Optional[date] = None):
+        """
+        Args:
+            visao (VisaoSalva): A definição da visão.
+            hoje (Optional[date]): Dia de referência do prazo. Padrão é hoje.
+        """
+
+        self.visao = visao
+        self._dia = hoje or date.today()
+        self._limite = visao.limite(self._dia)
+        # (chave de ordenação, ID) de cada tarefa do resultado, em ordem
+        self._ordenadas: List[Tuple[Tuple, int]] = []
+        self._chaves: Dict[int, Tuple] = {}
+        # Tarefas que só ficam de fora por vencerem depois do prazo, por data de término
+        self._futuras: Dict[date, Dict[int, Tarefa]] = {}
+
+    def _entrar(self, tarefa: Tarefa):
+        """Coloca a tarefa no resultado, na posição da ordenação."""
+
+        chave = consultas.chave_ordenacao(tarefa, self.visao.ordenacao)
+        self._chaves[tarefa.id] = chave
+        insort(self._ordenadas, (chave, tarefa.id))
+
+    def adicionar(self, tarefa: Tarefa):
+        """Avalia uma tarefa nova ou recém-alterada."""
+
+        if not self.visao.aceita_sem_prazo(tarefa):
+            return
+        if self._limite is not None and tarefa.data_termino > self._limite:
+            self._futuras.setdefault(tarefa.data_termino, {})[tarefa.id] = tarefa
+            return
+        self._entrar(tarefa)
+
+    def remover(self, tarefa: Tarefa):
+        """Retira uma tarefa, antes de ela ser alterada ou removida."""
+
+        chave = self._chaves.pop(tarefa.id, None)
+        if chave is not None:
+            posicao = bisect_left(self._ordenadas, (chave, tarefa.id))
+            del self._ordenadas[posicao]
+            return
+
+        futuras = self._futuras.get(tarefa.data_termino) if tarefa.data_termino else None
+        if futuras and futuras.pop(tarefa.id, None) is not None and not futuras:
+            del self._futuras[tarefa.data_termino]
+
+    def atualizar_dia(self, hoje: date) -> bool:
+        """
+        Ajusta o resultado à data informada.
+
+        Retorna False se o dia voltou para trás, caso em que a visão precisa ser
+        reconstruída (tarefas que já entraram pelo prazo teriam que sair).
+        """
+
+        if hoje == self._dia:
+            return True
+        if hoje < self._dia:
+            return False
+
+        self._dia = hoje
+        if self._limite is None:
+            return True
+
+        novo_limite = self.visao.limite(hoje)
+        # Só as datas entre o limite antigo e o novo passam a caber no prazo
+        for data in [data for data in self._futuras if data <= novo_limite]:
+            for tarefa in self._futuras.pop(data).values():
+                self._entrar(tarefa)
+        self._limite = novo_limite
+        return True
+
+    def ids(self) -> List[int]:
+        """Retorna os IDs das tarefas do resultado, na ordem da visão."""
+
+        return [tarefa_id for _, tarefa_id in self._ordenadas]
+
+
+def materializar(visao: VisaoSalva, tarefas: List[Tarefa], hoje: Optional[date] = None) -> VisaoMaterializada:
+    """Cria o resultado materializado de uma visão a partir de todas as tarefas."""
+
+    materializada = VisaoMaterializada(visao, hoje)
+    for tarefa in tarefas:
+        materializada.adicionar(tarefa)
+    return materializada
+